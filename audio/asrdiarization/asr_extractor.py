@@ -1,16 +1,18 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import torch
-import io
-import numpy as np
 
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.audio.decoding import SAMPLE_RATE, load_audio
+from indexify_extractor_sdk.audio.vad import WINDOW_SECONDS, speech_windows
 from pyannote.audio import Pipeline
 from transformers import pipeline, AutoModelForCausalLM
-from .diarization_utils import diarize
+from .diarization_utils import post_process_segments_and_transcripts, speaker_turns
 
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from typing import Optional, Literal, List, Union
+from typing import Dict, Optional, Literal, List, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +24,13 @@ model_settings = ModelSettings()
 
 class ASRExtractorConfig(BaseModel):
     task: Literal["transcribe", "translate"] = "transcribe"
+    # Seconds of speech packed into a window, up to Whisper's 30.
     chunk_length_s: int = 30
-    sampling_rate: int = 16000
+    # Windows transcribed together, across the tasks of a batch.
+    batch_size: int = 16
+    # Transcribe only the speech found by voice activity detection, instead
+    # of the whole audio.
+    vad: bool = True
     language: Optional[str] = None
     num_speakers: Optional[int] = None
     min_speakers: Optional[int] = None
@@ -59,40 +66,96 @@ class ASRExtractor(Extractor):
             raise e
         print("ASR and diarization models loaded successfully.")
 
+    def transcribe(self, audios: List, params: ASRExtractorConfig) -> List[dict]:
+        """
+        Transcribes the speech of the audios, packed into windows which are
+        batched together, with the timestamps of the chunks in the audios.
+        """
+        windows = [
+            speech_windows(audio, SAMPLE_RATE, min(params.chunk_length_s, WINDOW_SECONDS), params.vad)
+            for audio in audios
+        ]
+        inputs = (
+            {"raw": window.audio(audio), "sampling_rate": SAMPLE_RATE}
+            for audio, audio_windows in zip(audios, windows)
+            for window in audio_windows
+        )
+        results = self.asr_pipeline(
+            inputs,
+            batch_size=params.batch_size,
+            generate_kwargs={"task": params.task, "language": params.language},
+            return_timestamps=True,
+        )
+        outputs = []
+        for audio_windows in windows:
+            output = {"text": "", "chunks": []}
+            for window in audio_windows:
+                result = next(results)
+                output["text"] += result["text"]
+                output["chunks"].extend(window.source_chunks(result["chunks"]))
+            outputs.append(output)
+        return outputs
+
     def extract(self, content: Content, params: ASRExtractorConfig) -> List[Union[Feature, Content]]:
-            generate_kwargs = {
-                "task": params.task,
-                "language": params.language,
-            }
-
-            try:
-                asr_outputs = self.asr_pipeline(
-                    np.frombuffer(content.data, dtype=np.int8),
-                    chunk_length_s=params.chunk_length_s,
-                    generate_kwargs=generate_kwargs,
-                    return_timestamps=True,
-                )
-            except RuntimeError as e:
-                logger.error(f"ASR inference error: {str(e)}")
-                raise RuntimeError(f"ASR inference error: {str(e)}")
-            except Exception as e:
-                logger.error(f"Unknown error diring ASR inference: {str(e)}")
-                raise Exception(f"Unknown error during ASR inference: {str(e)}")
+        return self.extract_batch([content], [params])[0]
+
+    def extract_batch(
+        self, content_list: List[Content], params: List[ASRExtractorConfig] = None
+    ) -> List[List[Union[Feature, Content]]]:
+        params = [p or ASRExtractorConfig() for p in params] if params else [ASRExtractorConfig()] * len(content_list)
+
+        # Decoded once at 16 kHz for both models, and cached for other
+        # extractors and retries on the same audio.
+        audios = [load_audio(content.data) for content in content_list]
 
+        # Diarization doesn't need the transcript, it runs on the same
+        # waveforms in a thread while ASR runs in this one. Both models
+        # release the GIL in their kernels.
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            turns = []
             if self.diarization_pipeline:
+                turns = [pool.submit(speaker_turns, self.diarization_pipeline, audio, p) for audio, p in zip(audios, params)]
+
+            # The tasks sharing the ASR settings are transcribed together.
+            groups: Dict[Tuple, List[int]] = {}
+            for i, p in enumerate(params):
+                key = (p.task, p.language, p.chunk_length_s, p.batch_size, p.vad)
+                groups.setdefault(key, []).append(i)
+            asr_outputs: List[dict] = [None] * len(content_list)
+            for indexes in groups.values():
                 try:
-                    transcript = diarize(self.diarization_pipeline, io.BytesIO(content.data).read(), params, asr_outputs)
+                    outputs = self.transcribe([audios[i] for i in indexes], params[indexes[0]])
                 except RuntimeError as e:
-                    logger.error(f"Diarization inference error: {str(e)}")
-                    raise RuntimeError(f"Diarization inference error: {str(e)}")
+                    logger.error(f"ASR inference error: {str(e)}")
+                    raise RuntimeError(f"ASR inference error: {str(e)}")
                 except Exception as e:
-                    logger.error(f"Unknown error during diarization: {str(e)}")
-                    raise Exception(f"Unknown error during diarization: {str(e)}")
-            else:
+                    logger.error(f"Unknown error diring ASR inference: {str(e)}")
+                    raise Exception(f"Unknown error during ASR inference: {str(e)}")
+                for i, output in zip(indexes, outputs):
+                    asr_outputs[i] = output
+
+            out = []
+            for i, asr_output in enumerate(asr_outputs):
                 transcript = []
+                if turns:
+                    try:
+                        segments = turns[i].result()
+                    except RuntimeError as e:
+                        logger.error(f"Diarization inference error: {str(e)}")
+                        raise RuntimeError(f"Diarization inference error: {str(e)}")
+                    except Exception as e:
+                        logger.error(f"Unknown error during diarization: {str(e)}")
+                        raise Exception(f"Unknown error during diarization: {str(e)}")
+                    transcript = post_process_segments_and_transcripts(
+                        segments, asr_output["chunks"], group_by_speaker=False
+                    )
+                out.append([Content.from_json(transcript)])
+            return out
+        finally:
+            # On errors, the diarizations not started yet are dropped.
+            pool.shutdown(cancel_futures=True)
 
-            return [Content.from_json(transcript)]
-    
     def sample_input(self) -> Content:
         return self.sample_mp3()
 
@@ -1,136 +1,121 @@
 import torch
 import numpy as np
-from torchaudio import functional as F
-from transformers.pipelines.audio_utils import ffmpeg_read
-from starlette.exceptions import HTTPException
+from indexify_extractor_sdk.audio.decoding import SAMPLE_RATE
 import sys
 
 import logging
 logger = logging.getLogger(__name__)
 
-def preprocess_inputs(inputs, sampling_rate):
-    inputs = ffmpeg_read(inputs, sampling_rate)
-
-    if sampling_rate != 16000:
-        inputs = F.resample(
-            torch.from_numpy(inputs), sampling_rate, 16000
-        ).numpy()
-
-    if len(inputs.shape) != 1:
-        message = f"Diarization pipeline expects single channel audio, received {inputs.shape}"
-        logger.error(message)
-        raise Exception(message)
-
-    # diarization model expects float32 torch tensor of shape `(channels, seq_len)`
-    diarizer_inputs = torch.from_numpy(inputs).float()
+def preprocess_inputs(audio: np.ndarray):
+    # diarization model expects float32 torch tensor of shape `(channels, seq_len)`,
+    # copied since the decoded audio is read only
+    diarizer_inputs = torch.tensor(audio, dtype=torch.float32)
     diarizer_inputs = diarizer_inputs.unsqueeze(0)
 
-    return inputs, diarizer_inputs
+    return diarizer_inputs
 
 
 def diarize_audio(diarizer_inputs, diarization_pipeline, parameters):
     diarization = diarization_pipeline(
-        {"waveform": diarizer_inputs, "sample_rate": parameters.sampling_rate},
+        {"waveform": diarizer_inputs, "sample_rate": SAMPLE_RATE},
         num_speakers=parameters.num_speakers,
         min_speakers=parameters.min_speakers,
         max_speakers=parameters.max_speakers,
     )
 
-    segments = []
-    for segment, track, label in diarization.itertracks(yield_label=True):
-        segments.append(
-            {
-                "segment": {"start": segment.start, "end": segment.end},
-                "track": track,
-                "label": label,
-            }
-        )
-
-    # diarizer output may contain consecutive segments from the same speaker (e.g. {(0 -> 1, speaker_1), (1 -> 1.5, speaker_1), ...})
-    # we combine these segments to give overall timestamps for each speaker's turn (e.g. {(0 -> 1.5, speaker_1), ...})
-    new_segments = []
-    prev_segment = cur_segment = segments[0]
+    starts, ends, labels = [], [], []
+    for segment, _, label in diarization.itertracks(yield_label=True):
+        starts.append(segment.start)
+        ends.append(segment.end)
+        labels.append(label)
+    return merge_speaker_turns(np.array(starts), np.array(ends), np.array(labels))
 
-    for i in range(1, len(segments)):
-        cur_segment = segments[i]
 
-        # check if we have changed speaker ("label")
-        if cur_segment["label"] != prev_segment["label"] and i < len(segments):
-            # add the start/end times for the super-segment to the new list
-            new_segments.append(
-                {
-                    "segment": {
-                        "start": prev_segment["segment"]["start"],
-                        "end": cur_segment["segment"]["start"],
-                    },
-                    "speaker": prev_segment["label"],
-                }
-            )
-            prev_segment = segments[i]
-
-    # add the last segment(s) if there was no speaker change
-    new_segments.append(
-        {
-            "segment": {
-                "start": prev_segment["segment"]["start"],
-                "end": cur_segment["segment"]["end"],
-            },
-            "speaker": prev_segment["label"],
-        }
+def merge_speaker_turns(starts: np.ndarray, ends: np.ndarray, labels: np.ndarray) -> list:
+    # diarizer output may contain consecutive segments from the same speaker (e.g. {(0 -> 1, speaker_1), (1 -> 1.5, speaker_1), ...})
+    # we combine these segments to give overall timestamps for each speaker's turn (e.g. {(0 -> 1.5, speaker_1), ...}),
+    # a turn ends where the next speaker's starts
+    if len(labels) == 0:
+        return []
+    turns = np.concatenate(([0], np.flatnonzero(labels[1:] != labels[:-1]) + 1))
+    turn_ends = np.append(starts[turns[1:]], ends[-1])
+    return [
+        {"segment": {"start": start, "end": end}, "speaker": speaker}
+        for start, end, speaker in zip(starts[turns].tolist(), turn_ends.tolist(), labels[turns].tolist())
+    ]
+
+
+def assign_chunks(segment_ends: np.ndarray, chunk_ends: np.ndarray) -> np.ndarray:
+    """
+    Index of the last ASR chunk of every speaker turn: the chunk whose end is
+    the closest to the end of the turn, among the chunks not taken by the
+    turns before it. -1 for the turns after the last chunk is taken. Chunk
+    ends are expected in order.
+    """
+    n = len(chunk_ends)
+    if n == 0:
+        return np.full(len(segment_ends), -1)
+    # The closest end on either side of every turn's end, the first of equal ends.
+    right = np.clip(np.searchsorted(chunk_ends, segment_ends), 0, n - 1)
+    left = np.clip(right - 1, 0, n - 1)
+    closest = np.where(
+        np.abs(chunk_ends[left] - segment_ends) <= np.abs(chunk_ends[right] - segment_ends), left, right
     )
-
-    return new_segments
+    closest = np.searchsorted(chunk_ends, chunk_ends[closest])
+    # Every turn takes at least the next chunk: last[k] = max(closest[k], last[k - 1] + 1),
+    # a running maximum of closest[k] - k.
+    k = np.arange(len(segment_ends))
+    last = np.maximum.accumulate(closest - k) + k
+    # Turns are only assigned chunks while some are left.
+    return np.where(np.concatenate(([-1], last[:-1])) < n - 1, last, -1)
 
 
 def post_process_segments_and_transcripts(new_segments, transcript, group_by_speaker) -> list:
     # get the end timestamps for each chunk from the ASR output
     end_timestamps = np.array(
         [chunk["timestamp"][-1] if chunk["timestamp"][-1] is not None else sys.float_info.max for chunk in transcript])
-    segmented_preds = []
-
-    # align the diarizer timestamps and the ASR timestamps
-    for segment in new_segments:
-        # get the diarizer end timestamp
-        end_time = segment["segment"]["end"]
-        # find the ASR end timestamp that is closest to the diarizer's end timestamp and cut the transcript to here
-        upto_idx = np.argmin(np.abs(end_timestamps - end_time))
+    segment_ends = np.array([segment["segment"]["end"] for segment in new_segments])
 
+    # align the diarizer timestamps and the ASR timestamps, cutting the transcript at the ASR end
+    # timestamp closest to the diarizer's end timestamp for each speaker turn
+    last = assign_chunks(segment_ends, np.maximum.accumulate(end_timestamps)).tolist()
+    segmented_preds = []
+    first = 0
+    for segment, upto_idx in zip(new_segments, last):
+        if upto_idx < 0:
+            break
         if group_by_speaker:
             segmented_preds.append(
                 {
                     "speaker": segment["speaker"],
-                    "text": "".join(
-                        [chunk["text"] for chunk in transcript[: upto_idx + 1]]
-                    ),
+                    "text": "".join([chunk["text"] for chunk in transcript[first : upto_idx + 1]]),
                     "timestamp": (
-                        transcript[0]["timestamp"][0],
+                        transcript[first]["timestamp"][0],
                         transcript[upto_idx]["timestamp"][1],
                     ),
                 }
             )
         else:
-            for i in range(upto_idx + 1):
+            for i in range(first, upto_idx + 1):
                 segmented_preds.append({"speaker": segment["speaker"], **transcript[i]})
-
-        # crop the transcripts and timestamp lists according to the latest timestamp (for faster argmin)
-        transcript = transcript[upto_idx + 1:]
-        end_timestamps = end_timestamps[upto_idx + 1:]
-
-        if len(end_timestamps) == 0:
-            break
+        first = upto_idx + 1
 
     return segmented_preds
 
 
-def diarize(diarization_pipeline, file, parameters, asr_outputs):
-    _, diarizer_inputs = preprocess_inputs(file, parameters.sampling_rate)
+def speaker_turns(diarization_pipeline, audio, parameters):
+    diarizer_inputs = preprocess_inputs(audio)
 
-    segments = diarize_audio(
+    return diarize_audio(
         diarizer_inputs, 
         diarization_pipeline, 
         parameters
     )
 
+
+def diarize(diarization_pipeline, audio, parameters, asr_outputs):
+    segments = speaker_turns(diarization_pipeline, audio, parameters)
+
     return post_process_segments_and_transcripts(
         segments, asr_outputs["chunks"], group_by_speaker=False
     )
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from diarization_utils import assign_chunks, merge_speaker_turns, post_process_segments_and_transcripts
+
+
+def chunk(start, end, text):
+    return {"timestamp": (start, end), "text": text}
+
+
+class TestDiarizationUtils(unittest.TestCase):
+    def test_merge_speaker_turns(self):
+        turns = merge_speaker_turns(
+            np.array([0.0, 1.0, 2.0, 4.0]), np.array([1.0, 1.5, 3.5, 5.0]), np.array(["A", "A", "B", "B"])
+        )
+        self.assertEqual(
+            turns,
+            [
+                {"segment": {"start": 0.0, "end": 2.0}, "speaker": "A"},
+                {"segment": {"start": 2.0, "end": 5.0}, "speaker": "B"},
+            ],
+        )
+        self.assertEqual(merge_speaker_turns(np.array([]), np.array([]), np.array([])), [])
+
+    def test_assign_chunks(self):
+        ends = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        # The closest end, at least one chunk per turn, none once they're all taken.
+        self.assertEqual(assign_chunks(np.array([2.2, 2.3, 4.6, 6.0]), ends).tolist(), [1, 2, 4, -1])
+        # Equal distances and equal ends go to the first chunk.
+        self.assertEqual(assign_chunks(np.array([1.5]), ends).tolist(), [0])
+        self.assertEqual(assign_chunks(np.array([2.0]), np.array([1.0, 2.0, 2.0])).tolist(), [1])
+        self.assertEqual(assign_chunks(np.array([1.0]), np.array([])).tolist(), [-1])
+
+    def test_post_process(self):
+        turns = [
+            {"segment": {"start": 0.0, "end": 2.1}, "speaker": "A"},
+            {"segment": {"start": 2.1, "end": 6.0}, "speaker": "B"},
+        ]
+        transcript = [chunk(0.0, 1.0, " Hi."), chunk(1.0, 2.0, " Hello."), chunk(2.0, None, " Bye.")]
+        self.assertEqual(
+            [(c["speaker"], c["text"]) for c in post_process_segments_and_transcripts(turns, transcript, False)],
+            [("A", " Hi."), ("A", " Hello."), ("B", " Bye.")],
+        )
+        self.assertEqual(
+            post_process_segments_and_transcripts(turns, transcript, True),
+            [
+                {"speaker": "A", "text": " Hi. Hello.", "timestamp": (0.0, 2.0)},
+                {"speaker": "B", "text": " Bye.", "timestamp": (2.0, None)},
+            ],
+        )
+        self.assertEqual(post_process_segments_and_transcripts(turns, [], False), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
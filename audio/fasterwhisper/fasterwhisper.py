@@ -1,8 +1,8 @@
 from pydantic import BaseModel
 from typing import List
 from indexify_extractor_sdk import Extractor, Content
+from indexify_extractor_sdk.audio.decoding import load_audio
 import json
-import io
 from faster_whisper import WhisperModel
 
 class InputParams(BaseModel):
@@ -20,12 +20,12 @@ class FasterWhisper(Extractor):
         super().__init__()
 
     def extract(self, content: Content, params: InputParams) -> List[Content]:
-        # Wrap the content data in io.BytesIO
-        audio_stream = io.BytesIO(content.data)
-    
+        # 16 kHz mono samples, what faster-whisper decodes to itself
+        audio = load_audio(content.data)
+
         model = WhisperModel(params.model, device=params.device, compute_type=params.compute_type)
 
-        segments, info = model.transcribe(audio_stream, beam_size=5)
+        segments, info = model.transcribe(audio, beam_size=5)
 
         entries = []
         for segment in segments:
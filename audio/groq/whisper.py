@@ -1,12 +1,15 @@
 from indexify_extractor_sdk import Extractor, Content
+from indexify_extractor_sdk.rate_limiter import RateLimit, get_scheduler
 
 from pydantic import BaseModel, Field
+from typing import Optional
 
 from openai import OpenAI
 import os
 
 class TranscriptionParams(BaseModel):
     prompt: str = Field(default="")
+    requests_per_minute: Optional[int] = Field(default=None)
 
 def chunked(size, source):
     for i in range(0, len(source), size):
@@ -18,19 +21,22 @@ class WhisperExtractor(Extractor):
 
     def __init__(self):
         api_key = os.getenv("GROQ_API_KEY")
-        self._groq = OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+        self._api_key = api_key
+        # Retries are handled by the scheduler.
+        self._groq = OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1", max_retries=0)
 
     def extract(self, content: Content, params: TranscriptionParams):
         chunks = list(chunked(24000, content.data))
+        scheduler = get_scheduler("groq", "whisper-large-v3", self._api_key, RateLimit(requests_per_minute=params.requests_per_minute))
         text = ""
         for chunk in chunks:
             try:
-                transcription = self._groq.audio.transcriptions.create(
+                transcription = scheduler.run_sync(lambda: self._groq.audio.transcriptions.create(
                     model="whisper-large-v3",
                     file=("temp." + "mp3", chunk, content.content_type),
                     response_format="json",
                     prompt=params.prompt
-                )
+                ))
                 text += transcription.text
             except Exception as e:
                 print(f"unable to call groq {e}")
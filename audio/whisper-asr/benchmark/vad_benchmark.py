@@ -0,0 +1,116 @@
+"""
+CPU real-time factor of WhisperExtractor with voice activity detection against
+fixed windows over the whole audio, and the previous 15 second chunking, on
+generated audio: a speech clip repeated between pauses of low room noise, so
+that `--speech-ratio` of the audio is speech.
+
+    python vad_benchmark.py --minutes 10 --speech-ratio 0.3 --tasks 2
+
+The speech clip is the SDK's sample mp3 unless `--speech` is given. The real
+time factor is the processing time over the duration of the audio, below 1 is
+faster than real time.
+"""
+import argparse
+import difflib
+import io
+import os
+import sys
+import time
+import wave
+
+# CPU only, set before torch is imported.
+os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from whisper_extractor import InputParams, WhisperExtractor  # noqa: E402
+from indexify_extractor_sdk import Content  # noqa: E402
+from indexify_extractor_sdk.audio.decoding import SAMPLE_RATE, load_audio  # noqa: E402
+from indexify_extractor_sdk.audio.vad import speech_windows  # noqa: E402
+
+
+def make_audio(speech: np.ndarray, seconds: int, speech_ratio: float, seed: int) -> np.ndarray:
+    """Copies of `speech` between pauses of random length, with room noise."""
+    rng = np.random.default_rng(seed)
+    total = seconds * SAMPLE_RATE
+    audio = (rng.standard_normal(total) * 0.002).astype(np.float32)
+    mean_pause = len(speech) * (1 - speech_ratio) / speech_ratio
+    position = int(rng.uniform(0, mean_pause))
+    while position + len(speech) <= total:
+        audio[position : position + len(speech)] += speech
+        position += len(speech) + int(rng.uniform(0.5, 1.5) * mean_pause)
+    return audio
+
+
+def to_wav(audio: np.ndarray) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speech", help="an audio file of speech, the SDK's sample mp3 by default")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--speech-ratio", type=float, default=0.3)
+    parser.add_argument("--tasks", type=int, default=2, help="audios transcribed in one batch")
+    args = parser.parse_args()
+
+    extractor = WhisperExtractor()
+    if args.speech:
+        with open(args.speech, "rb") as f:
+            speech_data = f.read()
+    else:
+        speech_data = extractor.sample_mp3().data
+    speech = np.array(load_audio(speech_data))
+
+    seconds = int(args.minutes * 60)
+    audios = [make_audio(speech, seconds, args.speech_ratio, seed) for seed in range(args.tasks)]
+    contents = [Content(content_type="audio/wav", data=to_wav(audio)) for audio in audios]
+    duration = seconds * args.tasks
+    for content in contents:
+        # Decoded ahead, all the runs read the cached samples.
+        load_audio(content.data)
+
+    start = time.perf_counter()
+    windows = [speech_windows(load_audio(content.data)) for content in contents]
+    vad_time = time.perf_counter() - start
+    kept = sum(w.length for content_windows in windows for w in content_windows) / SAMPLE_RATE
+    print(f"{duration} s of audio, VAD kept {kept:.0f} s in {sum(map(len, windows))} windows, in {vad_time:.2f} s")
+
+    def previous():
+        # The pipeline as it was: 15 second chunks over the whole audio, one task at a time.
+        return [
+            extractor._pipe(
+                {"raw": load_audio(content.data), "sampling_rate": SAMPLE_RATE},
+                chunk_length_s=15,
+                generate_kwargs={"max_new_tokens": 128},
+            )["text"]
+            for content in contents
+        ]
+
+    def run(vad: bool):
+        outputs = extractor.extract_batch(contents, [InputParams(vad=vad)] * len(contents))
+        return [output[0].data.decode() for output in outputs]
+
+    texts = {}
+    for name, fn in [("15 s chunks", previous), ("30 s windows", lambda: run(False)), ("VAD windows", lambda: run(True))]:
+        start = time.perf_counter()
+        texts[name] = fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:14} {elapsed:8.1f} s  RTF {elapsed / duration:.3f}")
+
+    reference = " ".join(texts["30 s windows"])
+    for name in ("15 s chunks", "VAD windows"):
+        similarity = difflib.SequenceMatcher(None, reference, " ".join(texts[name])).ratio()
+        print(f"text similarity of {name} to 30 s windows: {similarity:.3f}")
+
+
+if __name__ == "__main__":
+    main()
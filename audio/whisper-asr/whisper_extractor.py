@@ -1,10 +1,12 @@
-from typing import List
+from typing import Iterator, List
 
 from indexify_extractor_sdk import (
     Extractor,
     Content,
 )
 from indexify_extractor_sdk.base_extractor import Feature
+from indexify_extractor_sdk.audio.decoding import SAMPLE_RATE, load_audio
+from indexify_extractor_sdk.audio.vad import WINDOW_SECONDS, SpeechWindow, speech_windows
 from pydantic import BaseModel
 import torch
 from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
@@ -12,8 +14,12 @@ from accelerate import Accelerator
 from accelerate.utils import gather_object
 
 class InputParams(BaseModel):
+    # Seconds of speech packed into a window, up to Whisper's 30.
     chunk_length: int = 30
-    max_new_tokens: int = 128
+    max_new_tokens: int = 256
+    # Transcribe only the speech found by voice activity detection, instead
+    # of the whole audio.
+    vad: bool = True
 
 class WhisperExtractor(Extractor):
     name = "tensorlake/whisper-asr"
@@ -49,8 +55,6 @@ class WhisperExtractor(Extractor):
                 model=model,
                 tokenizer=processor.tokenizer,
                 feature_extractor=processor.feature_extractor,
-                max_new_tokens=128,
-                chunk_length_s=15,
                 batch_size=16,
                 return_timestamps=True,
                 torch_dtype=torch_dtype,
@@ -62,29 +66,53 @@ class WhisperExtractor(Extractor):
                 model=model,
                 tokenizer=processor.tokenizer,
                 feature_extractor=processor.feature_extractor,
-                max_new_tokens=128,
-                chunk_length_s=15,
                 batch_size=16,
                 return_timestamps=True,
                 torch_dtype=torch_dtype,
             )
 
+    def transcribe(self, content_list: List[Content], params: List[InputParams]) -> List[Content]:
+        # The speech of all the contents is packed into windows of up to 30
+        # seconds, which are batched together through the model.
+        windows: List[List[SpeechWindow]] = []
+        audios = []
+        for content, p in zip(content_list, params):
+            # Decoded and resampled once per file, shared with other audio extractors.
+            audio = load_audio(content.data)
+            audios.append(audio)
+            windows.append(speech_windows(audio, SAMPLE_RATE, min(p.chunk_length, WINDOW_SECONDS), p.vad))
+
+        def inputs() -> Iterator[dict]:
+            # Built as the pipeline consumes them, memory stays flat on long audio.
+            for audio, content_windows in zip(audios, windows):
+                for window in content_windows:
+                    yield {"raw": window.audio(audio), "sampling_rate": SAMPLE_RATE}
+
+        max_new_tokens = max(p.max_new_tokens for p in params)
+        results = self._pipe(inputs(), generate_kwargs={"max_new_tokens": max_new_tokens})
+        out = []
+        for content_windows in windows:
+            text = ""
+            chunks = []
+            for window in content_windows:
+                result = next(results)
+                text += result["text"]
+                # Timestamps of the chunks in the original audio.
+                chunks.extend(window.source_chunks(result["chunks"]))
+            out.append(Content.from_text(text, features=[Feature.metadata({"chunks": chunks}, name="transcript")]))
+        return out
+
     def extract(
         self, content: Content, params: InputParams) -> List[Content]:
-        result = self._pipe(content.data)
-        text = result['text']
-        return [Content.from_text(text)]
-    
+        return [self.transcribe([content], [params or InputParams()])[0]]
+
     def extract_batch(self, content_list: List[Content], params: List[type[BaseModel]] = None) -> List[List[Feature | Content]]:
+        params = [p or InputParams() for p in params] if params else [InputParams()] * len(content_list)
         out = []
-        with self._accelerator.split_between_processes(content_list) as content_list:
-            data = [content.data for content in content_list]
-            results = self._pipe(data)
-            texts = []
-            for result in results:
-                texts.append(result["text"])
-            for text in texts:
-                out.append([Content.from_text(text)])
+        with self._accelerator.split_between_processes(list(zip(content_list, params))) as tasks:
+            if tasks:
+                contents = self.transcribe([content for content, _ in tasks], [p for _, p in tasks])
+                out = [[content] for content in contents]
         results_gathered = gather_object(out)
         return results_gathered
 
@@ -0,0 +1,253 @@
+"""
+Times the word/speaker alignment of WhisperDiarizationExtractor against the
+previous list based helpers, on generated transcripts of up to 100k words:
+speaker mapping, punctuation realignment and sentence assembly. Also checks
+both give the same words, speakers and sentences.
+
+    python alignment_benchmark.py --words 1000 10000 100000
+    python alignment_benchmark.py --words 100000 --max-sentence-words 400
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import nltk
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from word_alignment import AlignedWords, SpeakerTurns  # noqa: E402
+
+VOCABULARY = ["the", "a", "speech", "model", "we", "said", "data", "time", "really", "know", "think", "U.S.A."]
+
+
+# The previous helpers.py, word dicts and speaker lists.
+
+
+def get_word_ts_anchor(s, e, option="start"):
+    if option == "end":
+        return e
+    elif option == "mid":
+        return (s + e) / 2
+    return s
+
+
+def get_words_speaker_mapping(wrd_ts, spk_ts, word_anchor_option="start"):
+    s, e, sp = spk_ts[0]
+    wrd_pos, turn_idx = 0, 0
+    wrd_spk_mapping = []
+    for wrd_dict in wrd_ts:
+        ws, we, wrd = (
+            int(wrd_dict["start"] * 1000),
+            int(wrd_dict["end"] * 1000),
+            wrd_dict["word"],
+        )
+        wrd_pos = get_word_ts_anchor(ws, we, word_anchor_option)
+        while wrd_pos > float(e):
+            turn_idx += 1
+            turn_idx = min(turn_idx, len(spk_ts) - 1)
+            s, e, sp = spk_ts[turn_idx]
+            if turn_idx == len(spk_ts) - 1:
+                e = get_word_ts_anchor(ws, we, option="end")
+        wrd_spk_mapping.append(
+            {"word": wrd, "start_time": ws, "end_time": we, "speaker": sp}
+        )
+    return wrd_spk_mapping
+
+
+sentence_ending_punctuations = ".?!"
+
+
+def get_first_word_idx_of_sentence(word_idx, word_list, speaker_list, max_words):
+    is_word_sentence_end = (
+        lambda x: x >= 0 and word_list[x][-1] in sentence_ending_punctuations
+    )
+    left_idx = word_idx
+    while (
+        left_idx > 0
+        and word_idx - left_idx < max_words
+        and speaker_list[left_idx - 1] == speaker_list[left_idx]
+        and not is_word_sentence_end(left_idx - 1)
+    ):
+        left_idx -= 1
+
+    return left_idx if left_idx == 0 or is_word_sentence_end(left_idx - 1) else -1
+
+
+def get_last_word_idx_of_sentence(word_idx, word_list, max_words):
+    is_word_sentence_end = (
+        lambda x: x >= 0 and word_list[x][-1] in sentence_ending_punctuations
+    )
+    right_idx = word_idx
+    while (
+        right_idx < len(word_list)
+        and right_idx - word_idx < max_words
+        and not is_word_sentence_end(right_idx)
+    ):
+        right_idx += 1
+
+    return (
+        right_idx
+        if right_idx == len(word_list) - 1 or is_word_sentence_end(right_idx)
+        else -1
+    )
+
+
+def get_realigned_ws_mapping_with_punctuation(
+    word_speaker_mapping, max_words_in_sentence=50
+):
+    is_word_sentence_end = (
+        lambda x: x >= 0
+        and word_speaker_mapping[x]["word"][-1] in sentence_ending_punctuations
+    )
+    wsp_len = len(word_speaker_mapping)
+
+    words_list, speaker_list = [], []
+    for k, line_dict in enumerate(word_speaker_mapping):
+        word, speaker = line_dict["word"], line_dict["speaker"]
+        words_list.append(word)
+        speaker_list.append(speaker)
+
+    k = 0
+    while k < len(word_speaker_mapping):
+        line_dict = word_speaker_mapping[k]
+        if (
+            k < wsp_len - 1
+            and speaker_list[k] != speaker_list[k + 1]
+            and not is_word_sentence_end(k)
+        ):
+            left_idx = get_first_word_idx_of_sentence(
+                k, words_list, speaker_list, max_words_in_sentence
+            )
+            right_idx = (
+                get_last_word_idx_of_sentence(
+                    k, words_list, max_words_in_sentence - k + left_idx - 1
+                )
+                if left_idx > -1
+                else -1
+            )
+            if min(left_idx, right_idx) == -1:
+                k += 1
+                continue
+
+            spk_labels = speaker_list[left_idx : right_idx + 1]
+            mod_speaker = max(set(spk_labels), key=spk_labels.count)
+            if spk_labels.count(mod_speaker) < len(spk_labels) // 2:
+                k += 1
+                continue
+
+            speaker_list[left_idx : right_idx + 1] = [mod_speaker] * (
+                right_idx - left_idx + 1
+            )
+            k = right_idx
+
+        k += 1
+
+    k, realigned_list = 0, []
+    while k < len(word_speaker_mapping):
+        line_dict = word_speaker_mapping[k].copy()
+        line_dict["speaker"] = speaker_list[k]
+        realigned_list.append(line_dict)
+        k += 1
+
+    return realigned_list
+
+
+def get_sentences_speaker_mapping(word_speaker_mapping, spk_ts):
+    sentence_checker = nltk.tokenize.PunktSentenceTokenizer().text_contains_sentbreak
+    s, e, spk = spk_ts[0]
+    prev_spk = spk
+
+    snts = []
+    snt = {"speaker": f"Speaker {spk}", "start_time": s, "end_time": e, "text": ""}
+
+    for wrd_dict in word_speaker_mapping:
+        wrd, spk = wrd_dict["word"], wrd_dict["speaker"]
+        s, e = wrd_dict["start_time"], wrd_dict["end_time"]
+        if spk != prev_spk or sentence_checker(snt["text"] + " " + wrd):
+            snts.append(snt)
+            snt = {
+                "speaker": f"Speaker {spk}",
+                "start_time": s / 1000,
+                "end_time": e / 1000,
+                "text": "",
+            }
+        else:
+            snt["end_time"] = e / 1000
+        snt["text"] += wrd + " "
+        prev_spk = spk
+
+    snts.append(snt)
+    return snts
+
+
+def make_transcript(num_words: int, max_sentence_words: int = 30, seed: int = 0):
+    """
+    Words of 0.2 to 0.6 s with sentences of 3 to `max_sentence_words` words,
+    and the turns of 3 speakers.
+    """
+    rng = random.Random(seed)
+    word_timestamps = []
+    t = 0.0
+    sentence_left = rng.randint(3, max_sentence_words)
+    for _ in range(num_words):
+        word = rng.choice(VOCABULARY)
+        sentence_left -= 1
+        if sentence_left == 0:
+            word += rng.choice(".?!")
+            sentence_left = rng.randint(3, max_sentence_words)
+        elif rng.random() < 0.05:
+            word += ","
+        duration = rng.uniform(0.2, 0.6)
+        word_timestamps.append({"word": word, "start": round(t, 3), "end": round(t + duration, 3)})
+        t += duration + rng.uniform(0, 0.3)
+    # Turns which don't follow the sentences, as a diarizer's.
+    speaker_ts = []
+    s = 0
+    while s < t * 1000:
+        e = s + rng.randint(2000, 40000)
+        speaker_ts.append([s, e, rng.randint(0, 2)])
+        s = e + rng.randint(0, 500)
+    return word_timestamps, speaker_ts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument(
+        "--max-sentence-words", type=int, default=30,
+        help="longer for transcripts of languages without punctuation restoration",
+    )
+    args = parser.parse_args()
+
+    for num_words in args.words:
+        word_timestamps, speaker_ts = make_transcript(num_words, args.max_sentence_words)
+
+        start = time.perf_counter()
+        wsm = get_words_speaker_mapping(word_timestamps, speaker_ts, "start")
+        wsm = get_realigned_ws_mapping_with_punctuation(wsm)
+        previous = get_sentences_speaker_mapping(wsm, speaker_ts)
+        previous_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        words = AlignedWords.from_word_timestamps(word_timestamps)
+        words.assign_speakers(SpeakerTurns(*zip(*speaker_ts)), "start")
+        words.realign_with_punctuation()
+        sentences = words.sentences()
+        elapsed = time.perf_counter() - start
+
+        same = words.speaker.tolist() == [w["speaker"] for w in wsm]
+        # The previous helper opened with the first turn, in ms, and an empty
+        # sentence when the first word was another speaker's.
+        previous = [s for s in previous if s["text"]]
+        previous[0]["start_time"] = sentences[0]["start_time"]
+        same = same and previous == sentences
+        print(
+            f"{num_words:7} words  {len(sentences):6} sentences  previous {previous_time:8.3f} s  "
+            f"arrays {elapsed:7.3f} s  {previous_time / elapsed:6.1f}x  {'same' if same else 'OUTPUTS DIFFER'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,16 @@ import wget
 from omegaconf import OmegaConf
 import json
 import shutil
-import nltk
+import tempfile
+import numpy as np
+import soundfile as sf
+import torch
+from indexify_extractor_sdk.audio.decoding import SAMPLE_RATE
+from nemo.collections.asr.models.msdd_models import NeuralDiarizer
 from whisperx.alignment import DEFAULT_ALIGN_MODELS_HF, DEFAULT_ALIGN_MODELS_TORCH
 import logging
 from whisperx.utils import LANGUAGES, TO_LANGUAGE_CODE
+from word_alignment import SpeakerTurns
 
 punct_model_langs = [
     "en",
@@ -85,161 +91,20 @@ def create_config(output_dir):
     return config
 
 
-def get_word_ts_anchor(s, e, option="start"):
-    if option == "end":
-        return e
-    elif option == "mid":
-        return (s + e) / 2
-    return s
-
-
-def get_words_speaker_mapping(wrd_ts, spk_ts, word_anchor_option="start"):
-    s, e, sp = spk_ts[0]
-    wrd_pos, turn_idx = 0, 0
-    wrd_spk_mapping = []
-    for wrd_dict in wrd_ts:
-        ws, we, wrd = (
-            int(wrd_dict["start"] * 1000),
-            int(wrd_dict["end"] * 1000),
-            wrd_dict["word"],
-        )
-        wrd_pos = get_word_ts_anchor(ws, we, word_anchor_option)
-        while wrd_pos > float(e):
-            turn_idx += 1
-            turn_idx = min(turn_idx, len(spk_ts) - 1)
-            s, e, sp = spk_ts[turn_idx]
-            if turn_idx == len(spk_ts) - 1:
-                e = get_word_ts_anchor(ws, we, option="end")
-        wrd_spk_mapping.append(
-            {"word": wrd, "start_time": ws, "end_time": we, "speaker": sp}
-        )
-    return wrd_spk_mapping
-
-
-sentence_ending_punctuations = ".?!"
-
-
-def get_first_word_idx_of_sentence(word_idx, word_list, speaker_list, max_words):
-    is_word_sentence_end = (
-        lambda x: x >= 0 and word_list[x][-1] in sentence_ending_punctuations
-    )
-    left_idx = word_idx
-    while (
-        left_idx > 0
-        and word_idx - left_idx < max_words
-        and speaker_list[left_idx - 1] == speaker_list[left_idx]
-        and not is_word_sentence_end(left_idx - 1)
-    ):
-        left_idx -= 1
-
-    return left_idx if left_idx == 0 or is_word_sentence_end(left_idx - 1) else -1
-
-
-def get_last_word_idx_of_sentence(word_idx, word_list, max_words):
-    is_word_sentence_end = (
-        lambda x: x >= 0 and word_list[x][-1] in sentence_ending_punctuations
-    )
-    right_idx = word_idx
-    while (
-        right_idx < len(word_list)
-        and right_idx - word_idx < max_words
-        and not is_word_sentence_end(right_idx)
-    ):
-        right_idx += 1
-
-    return (
-        right_idx
-        if right_idx == len(word_list) - 1 or is_word_sentence_end(right_idx)
-        else -1
-    )
-
-
-def get_realigned_ws_mapping_with_punctuation(
-    word_speaker_mapping, max_words_in_sentence=50
-):
-    is_word_sentence_end = (
-        lambda x: x >= 0
-        and word_speaker_mapping[x]["word"][-1] in sentence_ending_punctuations
-    )
-    wsp_len = len(word_speaker_mapping)
-
-    words_list, speaker_list = [], []
-    for k, line_dict in enumerate(word_speaker_mapping):
-        word, speaker = line_dict["word"], line_dict["speaker"]
-        words_list.append(word)
-        speaker_list.append(speaker)
-
-    k = 0
-    while k < len(word_speaker_mapping):
-        line_dict = word_speaker_mapping[k]
-        if (
-            k < wsp_len - 1
-            and speaker_list[k] != speaker_list[k + 1]
-            and not is_word_sentence_end(k)
-        ):
-            left_idx = get_first_word_idx_of_sentence(
-                k, words_list, speaker_list, max_words_in_sentence
-            )
-            right_idx = (
-                get_last_word_idx_of_sentence(
-                    k, words_list, max_words_in_sentence - k + left_idx - 1
-                )
-                if left_idx > -1
-                else -1
-            )
-            if min(left_idx, right_idx) == -1:
-                k += 1
-                continue
-
-            spk_labels = speaker_list[left_idx : right_idx + 1]
-            mod_speaker = max(set(spk_labels), key=spk_labels.count)
-            if spk_labels.count(mod_speaker) < len(spk_labels) // 2:
-                k += 1
-                continue
-
-            speaker_list[left_idx : right_idx + 1] = [mod_speaker] * (
-                right_idx - left_idx + 1
-            )
-            k = right_idx
-
-        k += 1
-
-    k, realigned_list = 0, []
-    while k < len(word_speaker_mapping):
-        line_dict = word_speaker_mapping[k].copy()
-        line_dict["speaker"] = speaker_list[k]
-        realigned_list.append(line_dict)
-        k += 1
-
-    return realigned_list
-
-
-def get_sentences_speaker_mapping(word_speaker_mapping, spk_ts):
-    sentence_checker = nltk.tokenize.PunktSentenceTokenizer().text_contains_sentbreak
-    s, e, spk = spk_ts[0]
-    prev_spk = spk
-
-    snts = []
-    snt = {"speaker": f"Speaker {spk}", "start_time": s, "end_time": e, "text": ""}
-
-    for wrd_dict in word_speaker_mapping:
-        wrd, spk = wrd_dict["word"], wrd_dict["speaker"]
-        s, e = wrd_dict["start_time"], wrd_dict["end_time"]
-        if spk != prev_spk or sentence_checker(snt["text"] + " " + wrd):
-            snts.append(snt)
-            snt = {
-                "speaker": f"Speaker {spk}",
-                "start_time": s / 1000,
-                "end_time": e / 1000,
-                "text": "",
-            }
-        else:
-            snt["end_time"] = e / 1000
-        snt["text"] += wrd + " "
-        prev_spk = spk
-
-    snts.append(snt)
-    return snts
+def nemo_speaker_turns(audio: np.ndarray, device: str) -> SpeakerTurns:
+    """
+    Diarizes mono 16 kHz `audio` with NeMo's MSDD model in this process. NeMo
+    reads its input from and writes its RTTM to a private directory, removed
+    once the turns are read.
+    """
+    with tempfile.TemporaryDirectory() as output_dir:
+        sf.write(os.path.join(output_dir, "mono_file.wav"), audio, SAMPLE_RATE)
+        msdd_model = NeuralDiarizer(cfg=create_config(output_dir)).to(device)
+        msdd_model.diarize()
+        del msdd_model
+        torch.cuda.empty_cache()
+        with open(os.path.join(output_dir, "pred_rttms", "mono_file.rttm")) as f:
+            return SpeakerTurns.from_rttm(f)
 
 
 def get_speaker_aware_transcript(sentences_speaker_mapping, f):
@@ -0,0 +1,51 @@
+import unittest
+
+from word_alignment import AlignedWords, SpeakerTurns
+
+
+def period_break(text: str) -> bool:
+    # Punkt without abbreviations: a token ending a sentence followed by another.
+    tokens = text.split()
+    return any(t[-1] in ".?!" for t in tokens[:-1])
+
+
+class TestWordAlignment(unittest.TestCase):
+    def test_from_rttm(self):
+        turns = SpeakerTurns.from_rttm(
+            [
+                "SPEAKER mono_file 1   0.000   1.500 <NA> <NA> speaker_0 <NA> <NA>\n",
+                "SPEAKER mono_file 1   1.500   2.250 <NA> <NA> speaker_1 <NA> <NA>\n",
+            ]
+        )
+        self.assertEqual(turns.start.tolist(), [0, 1500])
+        self.assertEqual(turns.end.tolist(), [1500, 3750])
+        self.assertEqual(turns.speaker.tolist(), [0, 1])
+
+    def test_assign_speakers(self):
+        words = AlignedWords(["a", "b", "c", "d", "e"], [0, 900, 1200, 2500, 9000], [800, 1100, 1400, 2600, 9500])
+        turns = SpeakerTurns([0, 1000, 2000], [1000, 2000, 3000], [0, 1, 0])
+        words.assign_speakers(turns)
+        self.assertEqual(words.speaker.tolist(), [0, 0, 1, 0, 0])
+        words.assign_speakers(turns, "end")
+        self.assertEqual(words.speaker.tolist(), [0, 1, 1, 0, 0])
+
+    def test_realign_and_sentences(self):
+        text = "Hello there my friend. How are you? Fine thanks."
+        words = AlignedWords(text.split(), range(0, 9000, 1000), range(500, 9500, 1000), [0, 0, 0, 1, 1, 1, 1, 0, 0])
+        words.realign_with_punctuation()
+        # "friend." goes to the sentence's majority speaker, the question is left
+        # alone: it doesn't change speaker before its end.
+        self.assertEqual(words.speaker.tolist(), [0, 0, 0, 0, 1, 1, 1, 0, 0])
+        self.assertEqual(
+            words.sentences(period_break),
+            [
+                {"speaker": "Speaker 0", "start_time": 0.0, "end_time": 3.5, "text": "Hello there my friend. "},
+                {"speaker": "Speaker 1", "start_time": 4.0, "end_time": 6.5, "text": "How are you? "},
+                {"speaker": "Speaker 0", "start_time": 7.0, "end_time": 8.5, "text": "Fine thanks. "},
+            ],
+        )
+        self.assertEqual(AlignedWords([], [], []).sentences(period_break), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
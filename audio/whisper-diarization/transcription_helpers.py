@@ -1,8 +1,11 @@
+from typing import Union
+
+import numpy as np
 import torch
 
 
 def transcribe(
-    audio_file: str,
+    audio_file: Union[str, np.ndarray],
     language: str,
     model_name: str,
     compute_dtype: str,
@@ -49,7 +52,7 @@ def transcribe(
 
 
 def transcribe_batched(
-    audio_file: str,
+    audio_file: Union[str, np.ndarray],
     language: str,
     batch_size: int,
     model_name: str,
@@ -66,7 +69,10 @@ def transcribe_batched(
         compute_type=compute_dtype,
         asr_options={"suppress_numerals": suppress_numerals},
     )
-    audio = whisperx.load_audio(audio_file)
+    if isinstance(audio_file, str):
+        audio = whisperx.load_audio(audio_file)
+    else:
+        audio = audio_file
     result = whisper_model.transcribe(audio, language=language, batch_size=batch_size)
     del whisper_model
     torch.cuda.empty_cache()
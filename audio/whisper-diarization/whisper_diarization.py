@@ -4,20 +4,16 @@ from indexify_extractor_sdk import (
     Extractor,
     Content,
 )
+from indexify_extractor_sdk.audio.decoding import decode_audio, load_audio
 import torch
 from pydantic import BaseModel
-from pydub import AudioSegment
 import os
-from nemo.collections.asr.models.msdd_models import NeuralDiarizer
-from helpers import wav2vec2_langs, filter_missing_timestamps, create_config
+from helpers import wav2vec2_langs, filter_missing_timestamps, nemo_speaker_turns
 import whisperx
-from helpers import get_words_speaker_mapping, punct_model_langs
+from helpers import punct_model_langs
 from deepmultilingualpunctuation import PunctuationModel
 import re
-from helpers import (
-    get_realigned_ws_mapping_with_punctuation,
-    get_sentences_speaker_mapping,
-)
+from word_alignment import AlignedWords
 import tempfile
 import mimetypes
 import json
@@ -47,45 +43,29 @@ class WhisperDiarizationExtractor(Extractor):
             inputtmpfile.write(content.data)
             inputtmpfile.flush()
             vocal_target = self.get_vocal_target(params, file_path=inputtmpfile.name)
-            whisper_results, language = self.transcribe(vocal_target, params)
+            # Without stemming the vocals are the input itself, whose decoded
+            # audio is shared with the other audio extractors.
+            if vocal_target == inputtmpfile.name:
+                audio = load_audio(content.data)
+            else:
+                with open(vocal_target, "rb") as f:
+                    audio = decode_audio(f.read())
+            whisper_results, language = self.transcribe(audio, params)
             word_timestamps = self.get_word_timestamps(
-                whisper_results, language, vocal_target, params
+                whisper_results, language, audio, params
             )
 
-            # convert audio to mono for NeMo compatibility
-            sound = AudioSegment.from_file(vocal_target).set_channels(1)
-            ROOT = os.getcwd()
-            temp_path = os.path.join(ROOT, "temp_outputs")
-            os.makedirs(temp_path, exist_ok=True)
-            sound.export(os.path.join(temp_path, "mono_file.wav"), format="wav")
+            # NeMo diarizes the same mono 16 kHz samples
+            speaker_turns = nemo_speaker_turns(audio, params.device)
 
-            # Initialize NeMo MSDD diarization model
-            msdd_model = NeuralDiarizer(cfg=create_config(temp_path)).to(params.device)
-            msdd_model.diarize()
-
-            del msdd_model
-            torch.cuda.empty_cache()
-
-            speaker_ts = []
-            with open(
-                os.path.join(temp_path, "pred_rttms", "mono_file.rttm"), "r"
-            ) as f:
-                lines = f.readlines()
-                for line in lines:
-                    line_list = line.split(" ")
-                    s = int(float(line_list[5]) * 1000)
-                    e = s + int(float(line_list[8]) * 1000)
-                    speaker_ts.append([s, e, int(line_list[11].split("_")[-1])])
-
-            wsm = get_words_speaker_mapping(word_timestamps, speaker_ts, "start")
+            words = AlignedWords.from_word_timestamps(word_timestamps)
+            words.assign_speakers(speaker_turns, "start")
 
             if language in punct_model_langs:
                 # restoring punctuation in the transcript to help realign the sentences
                 punct_model = PunctuationModel(model="kredor/punctuate-all")
 
-                words_list = list(map(lambda x: x["word"], wsm))
-
-                labled_words = punct_model.predict(words_list)
+                labled_words = punct_model.predict(words.words)
 
                 ending_puncts = ".?!"
                 model_puncts = ".,;:!?"
@@ -93,8 +73,8 @@ class WhisperDiarizationExtractor(Extractor):
                 # We don't want to punctuate U.S.A. with a period. Right?
                 is_acronym = lambda x: re.fullmatch(r"\b(?:[a-zA-Z]\.){2,}", x)
 
-                for word_dict, labeled_tuple in zip(wsm, labled_words):
-                    word = word_dict["word"]
+                for i, labeled_tuple in enumerate(labled_words):
+                    word = words.words[i]
                     if (
                         word
                         and labeled_tuple[1] in ending_puncts
@@ -103,15 +83,15 @@ class WhisperDiarizationExtractor(Extractor):
                         word += labeled_tuple[1]
                         if word.endswith(".."):
                             word = word.rstrip(".")
-                        word_dict["word"] = word
+                        words.words[i] = word
 
             else:
                 print(
                     f"Punctuation restoration is not available for {language} language. Using the original punctuation."
                 )
 
-            wsm = get_realigned_ws_mapping_with_punctuation(wsm)
-            ssm = get_sentences_speaker_mapping(wsm, speaker_ts)
+            words.realign_with_punctuation()
+            ssm = words.sentences()
 
             return [
                 Content(
@@ -0,0 +1,167 @@
+import re
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+sentence_ending_punctuations = ".?!"
+
+_sentence_ending_punctuation = re.compile("[.?!]")
+
+
+class SpeakerTurns:
+    """Turns of a diarization as parallel arrays, times in ms, in order of start."""
+
+    def __init__(self, start, end, speaker):
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.speaker = np.asarray(speaker, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.start)
+
+    @classmethod
+    def from_rttm(cls, lines: Iterable[str]) -> "SpeakerTurns":
+        start, end, speaker = [], [], []
+        for line in lines:
+            fields = line.split(" ")
+            s = int(float(fields[5]) * 1000)
+            start.append(s)
+            end.append(s + int(float(fields[8]) * 1000))
+            speaker.append(int(fields[11].split("_")[-1]))
+        return cls(start, end, speaker)
+
+
+def punkt_sentence_break() -> Callable[[str], bool]:
+    import nltk
+
+    return nltk.tokenize.PunktSentenceTokenizer().text_contains_sentbreak
+
+
+class AlignedWords:
+    """
+    Words of a transcript as parallel arrays of their text, start and end in
+    ms and speaker, which are joined with the speaker turns of a diarization
+    and assembled into sentences in linear passes.
+    """
+
+    def __init__(self, words: List[str], start, end, speaker=None):
+        self.words = list(words)
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.speaker = (
+            np.zeros(len(self.words), dtype=np.int64) if speaker is None else np.asarray(speaker, dtype=np.int64)
+        )
+
+    def __len__(self):
+        return len(self.words)
+
+    @classmethod
+    def from_word_timestamps(cls, word_timestamps: List[dict]) -> "AlignedWords":
+        """From whisper's word timestamps, {"word", "start", "end"} in seconds."""
+        return cls(
+            [w["word"] for w in word_timestamps],
+            [int(w["start"] * 1000) for w in word_timestamps],
+            [int(w["end"] * 1000) for w in word_timestamps],
+        )
+
+    def assign_speakers(self, turns: SpeakerTurns, word_anchor_option: str = "start"):
+        """
+        Gives every word the speaker of the first turn ending at or after the
+        word's anchor, its start, middle or end, and the words after the last
+        turn the last speaker.
+        """
+        if len(turns) == 0:
+            self.speaker = np.zeros(len(self), dtype=np.int64)
+            return
+        if word_anchor_option == "end":
+            anchors = self.end
+        elif word_anchor_option == "mid":
+            anchors = (self.start + self.end) / 2
+        else:
+            anchors = self.start
+        # Turns may overlap, a turn is only passed once the ones before it ended.
+        turn_ends = np.maximum.accumulate(turns.end)
+        turn = np.minimum(np.searchsorted(turn_ends, anchors), len(turns) - 1)
+        self.speaker = turns.speaker[turn]
+
+    def sentence_ends(self) -> np.ndarray:
+        return np.array([w[-1:] in tuple(sentence_ending_punctuations) for w in self.words], dtype=bool)
+
+    def realign_with_punctuation(self, max_words_in_sentence: int = 50):
+        """
+        Gives the words of a sentence which changes speaker before it ends the
+        majority speaker of the sentence, when there is one for at least half
+        the words. Sentences longer than `max_words_in_sentence` are left
+        alone.
+        """
+        n = len(self)
+        if n < 2:
+            return
+        speaker = self.speaker.copy()
+        ends = self.sentence_ends()
+        index = np.arange(n)
+        # The first word after the last sentence end before each word.
+        sentence_start = np.concatenate(([0], np.maximum.accumulate(np.where(ends, index + 1, 0))[:-1]))
+        # The first word of the speaker run of each word.
+        changes = speaker[1:] != speaker[:-1]
+        run_start = np.maximum.accumulate(np.where(np.concatenate(([True], changes)), index, 0))
+        # The first sentence end at or after each word, n if there is none.
+        next_end = np.minimum.accumulate(np.where(ends, index, n)[::-1])[::-1]
+
+        realigned_up_to = -1
+        for k in np.flatnonzero(changes & ~ends[:-1]).tolist():
+            if k <= realigned_up_to:
+                continue
+            left = max(run_start[k], sentence_start[k], k - max_words_in_sentence)
+            if left > 0 and not ends[left - 1]:
+                continue
+            right = min(next_end[k], k + max(max_words_in_sentence - k + left - 1, 0))
+            if right >= n or (right != n - 1 and not ends[right]):
+                continue
+
+            counts = np.bincount(speaker[left : right + 1])
+            majority = int(np.argmax(counts))
+            if counts[majority] < (right - left + 1) // 2:
+                continue
+            speaker[left : right + 1] = majority
+            realigned_up_to = right
+        self.speaker = speaker
+
+    def sentences(self, sentence_break: Optional[Callable[[str], bool]] = None) -> List[dict]:
+        """
+        Sentences of the words, split where the speaker changes or where
+        `sentence_break`, punkt by default, finds a sentence break between two
+        words.
+        """
+        if sentence_break is None:
+            sentence_break = punkt_sentence_break()
+        words = self.words
+        speakers = self.speaker.tolist()
+        starts = self.start.tolist()
+        ends = self.end.tolist()
+        # Only words with sentence ending punctuation can end a sentence.
+        search = _sentence_ending_punctuation.search
+        punctuated = [search(w) is not None for w in words]
+
+        sentences = []
+
+        def add(first: int, last: int):
+            sentences.append(
+                {
+                    "speaker": f"Speaker {speakers[first]}",
+                    "start_time": starts[first] / 1000,
+                    "end_time": ends[last - 1] / 1000,
+                    "text": " ".join(words[first:last]) + " ",
+                }
+            )
+
+        first = 0
+        for i in range(1, len(words)):
+            if speakers[i] != speakers[i - 1] or (
+                (punctuated[i - 1] or punctuated[i]) and sentence_break(words[i - 1] + " " + words[i])
+            ):
+                add(first, i)
+                first = i
+        if words:
+            add(first, len(words))
+        return sentences
@@ -0,0 +1,113 @@
+"""
+Long-form transcription throughput against the number of 30 second windows
+decoded together, on the torch CPU backend, or on MLX with `--backend mlx`.
+
+    python batch_benchmark.py --audio podcast.mp3 --minutes 10 --batch-sizes 1,2,4,8
+
+The model is MLX converted Whisper weights, a local path or a Hugging Face
+repo. `--random-weights` runs a randomly initialised whisper-tiny instead, to
+time the decoding without downloading anything; its transcripts are noise,
+but as long as decoding runs to `--sample-len` tokens a window, the work per
+window is that of real speech. Without `--audio`, the audio is noise.
+
+Windows are decoded greedily, without the temperature fallback unless
+`--fallback` is given, so the transcripts at every batch size are expected to
+be the same as one window at a time. On MLX, batch size 1 is the sequential
+loop which conditions every window on the text before it, so they may not be.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from whisper import torch_transcribe  # noqa: E402
+from whisper.torch_whisper import ModelDimensions, Whisper  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+# whisper-tiny
+TINY = ModelDimensions(80, 1500, 384, 6, 4, 51865, 448, 384, 6, 4)
+
+
+def make_audio(path: str, seconds: int) -> np.ndarray:
+    """The audio at `path` repeated to `seconds`, or noise."""
+    if path is None:
+        rng = np.random.default_rng(0)
+        return (rng.standard_normal(seconds * SAMPLE_RATE) * 0.05).astype(np.float32)
+
+    from indexify_extractor_sdk.audio.decoding import load_audio
+
+    with open(path, "rb") as f:
+        audio = np.array(load_audio(f.read()))
+    return np.resize(audio, seconds * SAMPLE_RATE)
+
+
+def random_model() -> Whisper:
+    torch.manual_seed(0)
+    model = Whisper(TINY)
+    torch.nn.init.normal_(model.decoder.positional_embedding, std=0.02)
+    return model.eval()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", help="an audio file, repeated to --minutes")
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--model", default="mlx-community/whisper-tiny")
+    parser.add_argument("--random-weights", action="store_true")
+    parser.add_argument("--backend", choices=["torch", "mlx"], default="torch")
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--sample-len", type=int, help="maximum tokens decoded per window")
+    parser.add_argument("--fallback", action="store_true", help="use the temperature fallback")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    seconds = int(args.minutes * 60)
+    audio = make_audio(args.audio, seconds)
+
+    options = dict(language="en", sample_len=args.sample_len)
+    if not args.fallback:
+        options["temperature"] = 0.0
+
+    if args.backend == "mlx":
+        import whisper
+
+        def transcribe(batch_size):
+            return whisper.transcribe(audio, path_or_hf_repo=args.model, batch_size=batch_size, **options)
+
+    else:
+        model = random_model() if args.random_weights else torch_transcribe.load_model(args.model)
+
+        def transcribe(batch_size):
+            return torch_transcribe.transcribe(audio, model=model, batch_size=batch_size, **options)
+
+    n_windows = -(-seconds // 30)
+    print(f"{seconds} s of audio in {n_windows} windows, {args.backend}, {torch.get_num_threads()} threads")
+    reference = None
+    baseline = None
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        start = time.perf_counter()
+        result = transcribe(batch_size)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+
+        segments = [(s["start"], s["end"], s["tokens"]) for s in result["segments"]]
+        if reference is None:
+            reference = segments
+        print(
+            f"batch {batch_size:3}  {elapsed:8.1f} s  {n_windows / elapsed:6.2f} windows/s  "
+            f"RTF {elapsed / seconds:.3f}  x{baseline / elapsed:.2f}  "
+            f"{'same' if segments == reference else 'different'} segments"
+        )
+
+
+if __name__ == "__main__":
+    main()
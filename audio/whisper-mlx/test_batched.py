@@ -0,0 +1,95 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from whisper.batched import clip_seeks, decode_with_fallback, fixed_windows, window_segments
+from whisper.tokenizer import get_tokenizer
+from whisper.torch_decoding import DecodingTask
+from whisper.torch_whisper import ModelDimensions, Whisper
+
+TIMESTAMP_BEGIN = 1000
+
+
+def result(avg_logprob, no_speech_prob=0.0, compression_ratio=1.0):
+    return SimpleNamespace(
+        avg_logprob=avg_logprob, no_speech_prob=no_speech_prob, compression_ratio=compression_ratio
+    )
+
+
+def ts(seconds):
+    return TIMESTAMP_BEGIN + round(seconds / 0.02)
+
+
+class TestBatched(unittest.TestCase):
+    def test_windows(self):
+        self.assertEqual(clip_seeks("0", 7000, 100), [(0, 7000)])
+        self.assertEqual(clip_seeks("10,20,50", 7000, 100), [(1000, 2000), (5000, 7000)])
+        self.assertEqual(fixed_windows([(0, 7000)], 7000, 3000), [(0, 3000), (3000, 3000), (6000, 1000)])
+        self.assertEqual(fixed_windows([(1000, 2000), (5000, 9000)], 7000, 3000), [(1000, 1000), (5000, 2000)])
+
+    def test_decode_with_fallback(self):
+        calls = []
+
+        def decode(indices, t):
+            calls.append((indices, t))
+            # windows 1 and 3 fail at 0.0, window 3 at 0.2 as well
+            return [result(-2.0 if (i, t) in {(1, 0.0), (3, 0.0), (3, 0.2)} else -0.5) for i in indices]
+
+        results = decode_with_fallback(decode, 4, (0.0, 0.2, 0.4), 2.4, -1.0, 0.6)
+        self.assertEqual(calls, [([0, 1, 2, 3], 0.0), ([1, 3], 0.2), ([3], 0.4)])
+        self.assertEqual([r.avg_logprob for r in results], [-0.5] * 4)
+
+        # silent windows are not decoded again
+        calls.clear()
+        decode_with_fallback(lambda indices, t: calls.append(indices) or [result(-2.0, 0.9)] * len(indices), 2, (0.0, 0.2), 2.4, -1.0, 0.6)
+        self.assertEqual(calls, [[0, 1]])
+
+    def test_window_segments(self):
+        tokens = np.array([ts(0), 1, 2, ts(2), ts(2), 3, ts(5), ts(6), 4, 5])
+        segments = window_segments(tokens, TIMESTAMP_BEGIN, 30.0, 30.0, 0.02)
+        self.assertEqual([(start, end) for start, end, _ in segments], [(30.0, 32.0), (32.0, 35.0), (36.0, 60.0)])
+        # the unfinished segment is kept to the end of the window
+        self.assertEqual(segments[-1][2].tolist(), [ts(6), 4, 5])
+
+        segments = window_segments(tokens[:7], TIMESTAMP_BEGIN, 0.0, 20.0, 0.02)
+        self.assertEqual([(start, end) for start, end, _ in segments], [(0.0, 2.0), (2.0, 5.0)])
+        self.assertEqual(window_segments(np.array([1, 2, ts(4)]), TIMESTAMP_BEGIN, 0.0, 20.0, 0.02)[0][:2], (0.0, 4.0))
+        self.assertEqual(window_segments(np.array([1, 2]), TIMESTAMP_BEGIN, 0.0, 20.0, 0.02)[0][:2], (0.0, 20.0))
+
+
+class TestTorchDecoding(unittest.TestCase):
+    def test_batch_matches_single(self):
+        torch.manual_seed(0)
+        model = Whisper(ModelDimensions(80, 1500, 64, 2, 1, 51865, 448, 64, 2, 2)).eval()
+        torch.nn.init.normal_(model.decoder.positional_embedding, std=0.02)
+        tokenizer = get_tokenizer(True, language="en", task="transcribe")
+
+        # the end of text after as many tokens as the first feature of each window,
+        # so the sequences leave the batch at different steps
+        decoder_forward = model.decoder.forward
+
+        def forward(x, xa, kv_cache=None):
+            logits = decoder_forward(x, xa, kv_cache)
+            n_ctx = next(iter(kv_cache.values())).shape[1]
+            logits[:, -1, tokenizer.eot] += torch.where(n_ctx >= xa[:, 0, 0], 1e4, 0.0)
+            return logits
+
+        model.decoder.forward = forward
+        audio_features = torch.randn(5, 1500, 64)
+        audio_features[:, 0, 0] = torch.tensor([9.0, 30.0, 5.0, 100.0, 14.0])
+
+        for without_timestamps in (False, True):
+            task = DecodingTask(model, tokenizer, sample_len=48, without_timestamps=without_timestamps)
+            batched = task.run(audio_features)
+            self.assertGreater(len({len(r.tokens) for r in batched}), 3)
+            for i, r in enumerate(batched):
+                single = task.run(audio_features[i : i + 1])[0]
+                self.assertEqual(r.tokens, single.tokens)
+                self.assertAlmostEqual(r.avg_logprob, single.avg_logprob, places=4)
+                self.assertAlmostEqual(r.no_speech_prob, single.no_speech_prob, places=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,10 @@
 # Copyright © 2023 Apple Inc.
 
-from . import audio, decoding, load_models
-from .transcribe import transcribe
+try:
+    import mlx.core  # noqa: F401
+except ImportError:
+    # without MLX, e.g. on Linux, transcribe on torch
+    from .torch_transcribe import transcribe
+else:
+    from . import audio, decoding, load_models
+    from .transcribe import transcribe
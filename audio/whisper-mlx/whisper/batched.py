@@ -0,0 +1,228 @@
+import zlib
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def compression_ratio(text) -> float:
+    text_bytes = text.encode("utf-8")
+    return len(text_bytes) / len(zlib.compress(text_bytes))
+
+
+def needs_fallback(
+    result,
+    compression_ratio_threshold: Optional[float],
+    logprob_threshold: Optional[float],
+    no_speech_threshold: Optional[float],
+) -> bool:
+    """Whether a decoding should be retried at a higher temperature"""
+    if no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold:
+        return False  # silence
+    if (
+        compression_ratio_threshold is not None
+        and result.compression_ratio > compression_ratio_threshold
+    ):
+        return True  # too repetitive
+    if logprob_threshold is not None and result.avg_logprob < logprob_threshold:
+        return True  # average log probability is too low
+    return False
+
+
+def should_skip(
+    result, logprob_threshold: Optional[float], no_speech_threshold: Optional[float]
+) -> bool:
+    """Whether a window is silent, unless its log probability is high enough"""
+    if no_speech_threshold is None or result.no_speech_prob <= no_speech_threshold:
+        return False
+    return logprob_threshold is None or result.avg_logprob <= logprob_threshold
+
+
+def decode_with_fallback(
+    decode: Callable[[List[int], float], List[Any]],
+    n: int,
+    temperatures: Sequence[float],
+    compression_ratio_threshold: Optional[float],
+    logprob_threshold: Optional[float],
+    no_speech_threshold: Optional[float],
+) -> List[Any]:
+    """
+    Decodes `n` windows at the first of `temperatures`, then only the windows
+    which failed at the next temperature, in a batch, until none fail or the
+    temperatures run out. `decode(indices, temperature)` decodes the windows
+    at `indices` and returns their results in order.
+    """
+    results = [None] * n
+    pending = list(range(n))
+    for t in temperatures:
+        for i, result in zip(pending, decode(pending, t)):
+            results[i] = result
+        pending = [
+            i
+            for i in pending
+            if needs_fallback(
+                results[i],
+                compression_ratio_threshold,
+                logprob_threshold,
+                no_speech_threshold,
+            )
+        ]
+        if not pending:
+            break
+    return results
+
+
+def clip_seeks(
+    clip_timestamps: Union[str, List[float]], content_frames: int, frames_per_second: int
+) -> List[Tuple[int, int]]:
+    """(start, end) in mel frames of the clips, start,end,start,end,... in seconds"""
+    if isinstance(clip_timestamps, str):
+        clip_timestamps = [
+            float(ts) for ts in (clip_timestamps.split(",") if clip_timestamps else [])
+        ]
+    seek_points: List[int] = [round(ts * frames_per_second) for ts in clip_timestamps]
+    if len(seek_points) == 0:
+        seek_points.append(0)
+    if len(seek_points) % 2 == 1:
+        seek_points.append(content_frames)
+    return list(zip(seek_points[::2], seek_points[1::2]))
+
+
+def fixed_windows(
+    seek_clips: List[Tuple[int, int]], content_frames: int, n_frames: int
+) -> List[Tuple[int, int]]:
+    """(seek, size) of consecutive windows of up to `n_frames` mel frames over the clips"""
+    windows = []
+    for start, end in seek_clips:
+        end = min(end, content_frames)
+        windows.extend(
+            (seek, min(n_frames, end - seek)) for seek in range(start, end, n_frames)
+        )
+    return windows
+
+
+def window_segments(
+    tokens: np.ndarray,
+    timestamp_begin: int,
+    time_offset: float,
+    duration: float,
+    time_precision: float,
+) -> List[Tuple[float, float, np.ndarray]]:
+    """
+    (start, end, tokens) of the segments of the tokens decoded from a window,
+    delimited by consecutive timestamp tokens. The windows are decoded ahead,
+    so the text after the last pair of timestamps is kept as a segment to the
+    end of the window rather than decoded again from there.
+    """
+    timestamp_tokens = tokens >= timestamp_begin
+    single_timestamp_ending = timestamp_tokens[-2:].tolist() == [False, True]
+
+    consecutive = np.flatnonzero(timestamp_tokens[:-1] & timestamp_tokens[1:]) + 1
+    if len(consecutive) == 0:
+        end = duration
+        timestamps = tokens[timestamp_tokens]
+        if len(timestamps) > 0 and timestamps[-1].item() != timestamp_begin:
+            # no consecutive timestamps but it has a timestamp; use the last one.
+            end = (timestamps[-1].item() - timestamp_begin) * time_precision
+        return [(time_offset, time_offset + end, tokens)]
+
+    slices = consecutive.tolist()
+    if single_timestamp_ending:
+        slices.append(len(tokens))
+
+    segments = []
+    last_slice = 0
+    for current_slice in slices:
+        sliced_tokens = tokens[last_slice:current_slice]
+        start_timestamp_pos = sliced_tokens[0].item() - timestamp_begin
+        end_timestamp_pos = sliced_tokens[-1].item() - timestamp_begin
+        segments.append(
+            (
+                time_offset + start_timestamp_pos * time_precision,
+                time_offset + end_timestamp_pos * time_precision,
+                sliced_tokens,
+            )
+        )
+        last_slice = current_slice
+
+    unfinished = tokens[last_slice:]
+    if (unfinished < timestamp_begin).any():
+        start_timestamp_pos = unfinished[0].item() - timestamp_begin
+        segments.append(
+            (
+                time_offset + start_timestamp_pos * time_precision,
+                time_offset + duration,
+                unfinished,
+            )
+        )
+    return segments
+
+
+def new_segment(
+    tokenizer, *, seek: int, start: float, end: float, tokens: np.ndarray, result
+) -> dict:
+    tokens = tokens.tolist()
+    text_tokens = [token for token in tokens if token < tokenizer.eot]
+    return {
+        "seek": seek,
+        "start": start,
+        "end": end,
+        "text": tokenizer.decode(text_tokens),
+        "tokens": tokens,
+        "temperature": result.temperature,
+        "avg_logprob": result.avg_logprob,
+        "compression_ratio": result.compression_ratio,
+        "no_speech_prob": result.no_speech_prob,
+    }
+
+
+def transcribe_windows(
+    windows: List[Tuple[int, int]],
+    encode: Callable[[List[Tuple[int, int]]], Any],
+    decode: Callable[[Any, List[int], float], List[Any]],
+    tokenizer,
+    *,
+    batch_size: int,
+    temperatures: Sequence[float],
+    compression_ratio_threshold: Optional[float],
+    logprob_threshold: Optional[float],
+    no_speech_threshold: Optional[float],
+    frame_duration: float,
+    time_precision: float,
+) -> Iterator[Tuple[Tuple[int, int], List[dict]]]:
+    """
+    Transcribes `windows`, (seek, size) in mel frames, `batch_size` at a
+    time, and yields each window with its segments, in order. The windows
+    are decoded independently of each other: `encode(windows)` runs the
+    audio encoder over a batch of windows and `decode(features, indices,
+    temperature)` decodes the rows `indices` of its output together, so only
+    the windows which need a temperature fallback are decoded again.
+    """
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i : i + batch_size]
+        features = encode(batch)
+        results = decode_with_fallback(
+            lambda indices, t: decode(features, indices, t),
+            len(batch),
+            temperatures,
+            compression_ratio_threshold,
+            logprob_threshold,
+            no_speech_threshold,
+        )
+        for (seek, size), result in zip(batch, results):
+            if should_skip(result, logprob_threshold, no_speech_threshold):
+                yield (seek, size), []
+                continue
+
+            segments = window_segments(
+                np.array(result.tokens, dtype=np.int64),
+                tokenizer.timestamp_begin,
+                seek * frame_duration,
+                size * frame_duration,
+                time_precision,
+            )
+            yield (seek, size), [
+                new_segment(
+                    tokenizer, seek=seek, start=start, end=end, tokens=tokens, result=result
+                )
+                for start, end, tokens in segments
+            ]
@@ -1,6 +1,5 @@
 # Copyright © 2023 Apple Inc.
 
-import zlib
 from dataclasses import dataclass, field, replace
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
@@ -10,14 +9,10 @@ import numpy as np
 from mlx.utils import tree_map
 
 from .audio import CHUNK_LENGTH
+from .batched import compression_ratio
 from .tokenizer import Tokenizer, get_tokenizer
 
 
-def compression_ratio(text) -> float:
-    text_bytes = text.encode("utf-8")
-    return len(text_bytes) / len(zlib.compress(text_bytes))
-
-
 def detect_language(
     model: "Whisper", mel: mx.array, tokenizer: Tokenizer = None
 ) -> Tuple[mx.array, List[dict]]:
@@ -149,8 +144,10 @@ class Inference:
     def rearrange_kv_cache(self, source_indices):
         """Update the key-value cache according to the updated beams"""
         # update the key/value cache to contain the selected sequences
-        if source_indices != list(range(len(source_indices))):
-            self.kv_cache = tree_map(lambda x: x[source_indices], self.kv_cache)
+        n_batch = self.kv_cache[0][0][0].shape[0]
+        if source_indices != list(range(n_batch)):
+            indices = mx.array(source_indices)
+            self.kv_cache = tree_map(lambda x: x[indices], self.kv_cache)
 
     def reset(self):
         self.kv_cache = None
@@ -263,9 +260,8 @@ class GreedyDecoder(TokenDecoder):
         if self.temperature == 0:
             next_tokens = logits.argmax(axis=-1)
         else:
-            next_tokens = mx.random.categorical(logits=logits / self.temperature)
+            next_tokens = mx.random.categorical(logits / self.temperature)
 
-        next_tokens = mx.argmax(logits, axis=-1)
         logits = logits.astype(mx.float32)
         logprobs = logits - mx.logsumexp(logits, axis=-1)
 
@@ -573,6 +569,9 @@ class DecodingTask:
         n_batch = tokens.shape[0]
         sum_logprobs: mx.array = mx.zeros(n_batch)
         no_speech_probs = [np.nan] * n_batch
+        # the sequences which reached the end of text, dropped from the batch
+        finished: Dict[int, Tuple[List[int], float]] = {}
+        rows = list(range(n_batch))
 
         try:
             for i in range(self.sample_len):
@@ -600,9 +599,36 @@ class DecodingTask:
 
                 if completed or tokens.shape[-1] > self.n_ctx:
                     break
+
+                ended = (tokens[:, -1] == self.tokenizer.eot).tolist()
+                if any(ended):
+                    # drop the finished sequences along with their key/value caches,
+                    # so the rest of the batch is decoded without them
+                    keep = [j for j, e in enumerate(ended) if not e]
+                    for j, e in enumerate(ended):
+                        if e:
+                            finished[rows[j]] = (
+                                tokens[j].tolist(),
+                                sum_logprobs[j].item(),
+                            )
+                    indices = mx.array(keep)
+                    tokens = tokens[indices]
+                    sum_logprobs = sum_logprobs[indices]
+                    audio_features = audio_features[indices]
+                    self.inference.rearrange_kv_cache(keep)
+                    rows = [rows[j] for j in keep]
         finally:
             self.inference.reset()
 
+        if finished:
+            for j, row in enumerate(rows):
+                finished[row] = (tokens[j].tolist(), sum_logprobs[j].item())
+            sequences = [finished[row] for row in range(n_batch)]
+            length = max(len(t) for t, _ in sequences)
+            eot = self.tokenizer.eot
+            tokens = mx.array([t + [eot] * (length - len(t)) for t, _ in sequences])
+            sum_logprobs = mx.array([lp for _, lp in sequences])
+
         return tokens, sum_logprobs, no_speech_probs
 
     def run(self, mel: mx.array) -> List[DecodingResult]:
@@ -633,9 +659,8 @@ class DecodingTask:
             tokens = mx.broadcast_to(
                 tokens, [n_audio, self.n_group, len(self.initial_tokens)]
             )
-            tokens = tokens.reshape(
-                tokens, (n_audio * self.n_group, len(self.initial_tokens))
-            )
+            tokens = tokens.reshape(n_audio * self.n_group, len(self.initial_tokens))
+            audio_features = mx.repeat(audio_features, self.n_group, axis=0)
 
         # call the main sampling loop
         tokens, sum_logprobs, no_speech_probs = self._main_loop(audio_features, tokens)
@@ -0,0 +1,266 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from .batched import compression_ratio
+from .tokenizer import Tokenizer
+from .torch_audio import CHUNK_LENGTH
+from .torch_whisper import Whisper
+
+
+@dataclass(frozen=True)
+class DecodingResult:
+    language: str
+    tokens: List[int] = field(default_factory=list)
+    text: str = ""
+    avg_logprob: float = np.nan
+    no_speech_prob: float = np.nan
+    temperature: float = np.nan
+    compression_ratio: float = np.nan
+
+
+@torch.no_grad()
+def detect_language(
+    model: Whisper, audio_features: torch.Tensor, tokenizer: Tokenizer
+) -> List[str]:
+    """The most probable language of each of a batch of encoded windows"""
+    tokens = torch.full((audio_features.shape[0], 1), tokenizer.sot)
+    logits = model.logits(tokens, audio_features)[:, 0]
+
+    mask = torch.full(logits.shape[-1:], -np.inf)
+    mask[list(tokenizer.all_language_tokens)] = 0.0
+    codes = dict(zip(tokenizer.all_language_tokens, tokenizer.all_language_codes))
+    return [codes[token] for token in (logits + mask).argmax(dim=-1).tolist()]
+
+
+class DecodingTask:
+    """
+    Decodes a batch of encoded 30-second windows on a torch `Whisper`, greedily
+    or by sampling at `temperature`, with the logit filters of
+    `decoding.DecodingTask`. Every sequence has its own key/value cache rows:
+    the sequences which reach the end of text are dropped from the batch,
+    along with their caches, so each forward pass only runs over the ones
+    still being decoded.
+    """
+
+    def __init__(
+        self,
+        model: Whisper,
+        tokenizer: Tokenizer,
+        *,
+        temperature: float = 0.0,
+        sample_len: Optional[int] = None,
+        prompt: Optional[Union[str, List[int]]] = None,
+        suppress_tokens: Optional[Union[str, Iterable[int]]] = "-1",
+        suppress_blank: bool = True,
+        without_timestamps: bool = False,
+        max_initial_timestamp: Optional[float] = 1.0,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.temperature = temperature
+        self.without_timestamps = without_timestamps
+
+        self.n_ctx: int = model.dims.n_text_ctx
+        self.sample_len: int = sample_len or model.dims.n_text_ctx // 2
+
+        sot_sequence = tokenizer.sot_sequence
+        if without_timestamps:
+            sot_sequence = tokenizer.sot_sequence_including_notimestamps
+        self.initial_tokens: Tuple[int] = self._get_initial_tokens(sot_sequence, prompt)
+        self.sample_begin: int = len(self.initial_tokens)
+        self.sot_index: int = self.initial_tokens.index(tokenizer.sot)
+
+        n_vocab = model.dims.n_vocab
+        self.suppress_mask = torch.zeros(n_vocab)
+        self.suppress_mask[list(self._get_suppress_tokens(suppress_tokens))] = -np.inf
+        self.blank_mask = None
+        if suppress_blank:
+            self.blank_mask = torch.zeros(n_vocab)
+            self.blank_mask[tokenizer.encode(" ") + [tokenizer.eot]] = -np.inf
+
+        self.max_initial_timestamp_index = None
+        if max_initial_timestamp:
+            precision = CHUNK_LENGTH / model.dims.n_audio_ctx  # usually 0.02 seconds
+            self.max_initial_timestamp_index = round(max_initial_timestamp / precision)
+
+    def _get_initial_tokens(
+        self, sot_sequence: Tuple[int], prompt: Optional[Union[str, List[int]]]
+    ) -> Tuple[int]:
+        tokens = list(sot_sequence)
+        if prompt:
+            prompt_tokens = (
+                self.tokenizer.encode(" " + prompt.strip())
+                if isinstance(prompt, str)
+                else prompt
+            )
+            tokens = (
+                [self.tokenizer.sot_prev]
+                + list(prompt_tokens[-(self.n_ctx // 2 - 1) :])
+                + tokens
+            )
+        return tuple(tokens)
+
+    def _get_suppress_tokens(
+        self, suppress_tokens: Optional[Union[str, Iterable[int]]]
+    ) -> Tuple[int]:
+        if isinstance(suppress_tokens, str):
+            suppress_tokens = [int(t) for t in suppress_tokens.split(",")]
+        suppress_tokens = list(suppress_tokens or [])
+
+        if -1 in suppress_tokens:
+            suppress_tokens = [t for t in suppress_tokens if t >= 0]
+            suppress_tokens.extend(self.tokenizer.non_speech_tokens)
+
+        suppress_tokens.extend(
+            [
+                self.tokenizer.transcribe,
+                self.tokenizer.translate,
+                self.tokenizer.sot,
+                self.tokenizer.sot_prev,
+                self.tokenizer.sot_lm,
+            ]
+        )
+        if self.tokenizer.no_speech is not None:
+            # no-speech probability is collected separately
+            suppress_tokens.append(self.tokenizer.no_speech)
+
+        return tuple(sorted(set(suppress_tokens)))
+
+    def _apply_timestamp_rules(
+        self, logits: torch.Tensor, tokens: torch.Tensor
+    ) -> torch.Tensor:
+        tokenizer = self.tokenizer
+        timestamp_begin = tokenizer.timestamp_begin
+        vocab = torch.arange(logits.shape[-1])
+        is_timestamp = vocab >= timestamp_begin
+        mask = torch.zeros(logits.shape, dtype=torch.bool)
+
+        # suppress <|notimestamps|> which is handled by without_timestamps
+        if tokenizer.no_timestamps is not None:
+            mask[:, tokenizer.no_timestamps] = True
+
+        seq = tokens[:, self.sample_begin :]
+        if seq.shape[1] == 0:
+            # suppress generating non-timestamp tokens at the beginning
+            mask |= ~is_timestamp
+            # apply the `max_initial_timestamp` option
+            if self.max_initial_timestamp_index is not None:
+                mask |= vocab > timestamp_begin + self.max_initial_timestamp_index
+        else:
+            # timestamps have to appear in pairs, except directly before EOT
+            last_was_timestamp = seq[:, -1] >= timestamp_begin
+            if seq.shape[1] >= 2:
+                penultimate_was_timestamp = seq[:, -2] >= timestamp_begin
+            else:
+                penultimate_was_timestamp = torch.ones_like(last_was_timestamp)
+            pair_ended = last_was_timestamp & penultimate_was_timestamp
+            pair_started = last_was_timestamp & ~penultimate_was_timestamp
+            # after a pair, has to be non-timestamp; after an opening one, cannot be text
+            mask |= pair_ended[:, None] & is_timestamp
+            mask |= pair_started[:, None] & (vocab < tokenizer.eot)
+
+            # timestamps shouldn't decrease; forbid timestamp tokens smaller than the last
+            # also force each segment to have a nonzero length, to prevent infinite looping
+            last_timestamp = torch.where(seq >= timestamp_begin, seq, -1).max(dim=1).values
+            last_timestamp = last_timestamp + (~pair_started).long()
+            mask |= is_timestamp & (vocab < last_timestamp[:, None])
+
+        logits = logits.masked_fill(mask, -np.inf)
+
+        # if sum of probability over timestamps is above any other token, sample timestamp
+        logprobs = F.log_softmax(logits.float(), dim=-1)
+        timestamp_logprob = logprobs[:, timestamp_begin:].logsumexp(dim=-1)
+        max_text_token_logprob = logprobs[:, :timestamp_begin].max(dim=-1).values
+        sample_timestamp = timestamp_logprob > max_text_token_logprob
+        return logits.masked_fill(sample_timestamp[:, None] & ~is_timestamp, -np.inf)
+
+    def _apply_logit_filters(
+        self, logits: torch.Tensor, tokens: torch.Tensor
+    ) -> torch.Tensor:
+        if self.blank_mask is not None and tokens.shape[1] == self.sample_begin:
+            logits = logits + self.blank_mask
+        logits = logits + self.suppress_mask
+        if not self.without_timestamps:
+            logits = self._apply_timestamp_rules(logits, tokens)
+        return logits
+
+    @torch.no_grad()
+    def run(self, audio_features: torch.Tensor) -> List[DecodingResult]:
+        tokenizer = self.tokenizer
+        n_audio = audio_features.shape[0]
+        tokens = torch.tensor([self.initial_tokens]).repeat(n_audio, 1)
+        sum_logprobs = torch.zeros(n_audio)
+        no_speech_probs = [np.nan] * n_audio
+        # the rows of the batch still being decoded, and the sampled tokens and
+        # cumulative log probability of the finished ones
+        rows = torch.arange(n_audio)
+        finished: Dict[int, Tuple[List[int], float]] = {}
+
+        cache, hooks = self.model.install_kv_cache_hooks()
+        try:
+            for i in range(self.sample_len):
+                # only need to use the last token except in the first forward pass
+                inputs = tokens if i == 0 else tokens[:, -1:]
+                logits = self.model.decoder(inputs, audio_features, kv_cache=cache)
+
+                if i == 0 and tokenizer.no_speech is not None:
+                    probs_at_sot = logits[:, self.sot_index].float().softmax(dim=-1)
+                    no_speech_probs = probs_at_sot[:, tokenizer.no_speech].tolist()
+
+                logits = self._apply_logit_filters(logits[:, -1], tokens)
+                if self.temperature == 0:
+                    next_tokens = logits.argmax(dim=-1)
+                else:
+                    next_tokens = torch.distributions.Categorical(
+                        logits=logits / self.temperature
+                    ).sample()
+
+                logprobs = F.log_softmax(logits.float(), dim=-1)
+                sum_logprobs += logprobs[torch.arange(len(next_tokens)), next_tokens]
+                tokens = torch.cat([tokens, next_tokens[:, None]], dim=-1)
+
+                ended = next_tokens == tokenizer.eot
+                if ended.any():
+                    for j in ended.nonzero()[:, 0].tolist():
+                        finished[rows[j].item()] = (
+                            tokens[j, self.sample_begin : -1].tolist(),
+                            sum_logprobs[j].item(),
+                        )
+                    # drop the finished sequences along with their key/value caches
+                    keep = (~ended).nonzero()[:, 0]
+                    tokens = tokens[keep]
+                    sum_logprobs = sum_logprobs[keep]
+                    audio_features = audio_features[keep]
+                    rows = rows[keep]
+                    for module in cache:
+                        cache[module] = cache[module][keep]
+
+                if len(rows) == 0 or tokens.shape[-1] > self.n_ctx:
+                    break
+        finally:
+            for hook in hooks:
+                hook.remove()
+
+        for j, row in enumerate(rows.tolist()):
+            finished[row] = (tokens[j, self.sample_begin :].tolist(), sum_logprobs[j].item())
+
+        results = []
+        for row in range(n_audio):
+            sampled, sum_logprob = finished[row]
+            text = tokenizer.decode(sampled).strip()
+            results.append(
+                DecodingResult(
+                    language=tokenizer.language,
+                    tokens=sampled,
+                    text=text,
+                    avg_logprob=sum_logprob / (len(sampled) + 1),
+                    no_speech_prob=no_speech_probs[row],
+                    temperature=self.temperature,
+                    compression_ratio=compression_ratio(text),
+                )
+            )
+        return results
@@ -0,0 +1,197 @@
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+from huggingface_hub import snapshot_download
+
+from .batched import clip_seeks, fixed_windows, transcribe_windows
+from .tokenizer import get_tokenizer
+from .torch_audio import (
+    FRAMES_PER_SECOND,
+    HOP_LENGTH,
+    N_FRAMES,
+    N_SAMPLES,
+    SAMPLE_RATE,
+    log_mel_spectrogram,
+    pad_or_trim,
+)
+from .torch_decoding import DecodingResult, DecodingTask, detect_language
+from .torch_whisper import ModelDimensions, Whisper
+
+
+def load_model(path_or_hf_repo: str) -> Whisper:
+    """
+    Loads the MLX converted weights `load_models.load_model` reads into the
+    torch `Whisper`, in float32 for the CPU.
+    """
+    model_path = Path(path_or_hf_repo)
+    if not model_path.exists():
+        model_path = Path(snapshot_download(repo_id=path_or_hf_repo))
+
+    with open(str(model_path / "config.json"), "r") as f:
+        config = json.loads(f.read())
+        config.pop("model_type", None)
+        if config.pop("quantization", None) is not None:
+            raise ValueError("Quantized weights are not supported on torch")
+
+    state_dict = {}
+    with np.load(str(model_path / "weights.npz")) as weights:
+        for name, value in weights.items():
+            value = torch.from_numpy(value.astype(np.float32))
+            if name.endswith(("conv1.weight", "conv2.weight")):
+                # MLX convolution weights are channels last
+                value = value.permute(0, 2, 1)
+            name = name.replace(".mlp1.", ".mlp.0.").replace(".mlp2.", ".mlp.2.")
+            state_dict[name] = value
+
+    model = Whisper(ModelDimensions(**config))
+    missing, unexpected = model.load_state_dict(state_dict, strict=False)
+    # the encoder's sinusoidal positional embedding isn't stored with the MLX weights
+    if unexpected or set(missing) != {"encoder.positional_embedding"}:
+        raise ValueError(
+            f"Weights don't match the model, missing: {missing}, unexpected: {unexpected}"
+        )
+    return model.eval()
+
+
+class ModelHolder:
+    model = None
+    model_path = None
+
+    @classmethod
+    def get_model(cls, model_path: str):
+        if cls.model is None or model_path != cls.model_path:
+            cls.model = load_model(model_path)
+            cls.model_path = model_path
+        return cls.model
+
+
+def transcribe(
+    audio: Union[np.ndarray, torch.Tensor],
+    *,
+    path_or_hf_repo: str = "mlx-community/whisper-tiny",
+    model: Optional[Whisper] = None,
+    batch_size: int = 8,
+    language: Optional[str] = None,
+    task: str = "transcribe",
+    temperature: Union[float, Tuple[float, ...]] = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+    compression_ratio_threshold: Optional[float] = 2.4,
+    logprob_threshold: Optional[float] = -1.0,
+    no_speech_threshold: Optional[float] = 0.6,
+    initial_prompt: Optional[str] = None,
+    clip_timestamps: Union[str, List[float]] = "0",
+    **decode_options,
+):
+    """
+    Transcribe an audio waveform using Whisper on torch, e.g. on a CPU
+    without MLX, as `transcribe.transcribe` does with `batch_size` above 1:
+    the audio is cut into consecutive 30-second windows, `batch_size` of
+    which are encoded and decoded together. Word-level timestamps aren't
+    supported.
+
+    Parameters
+    ----------
+    audio: Union[np.ndarray, torch.Tensor]
+        The audio waveform in 16 kHz
+
+    model: Optional[Whisper]
+        The model to use rather than the one loaded from `path_or_hf_repo`
+
+    decode_options: dict
+        Keyword arguments to construct the `torch_decoding.DecodingTask`
+
+    See `transcribe.transcribe` for the other parameters.
+
+    Returns
+    -------
+    A dictionary containing the resulting text ("text") and segment-level details ("segments"), and
+    the spoken language ("language"), which is detected when `language` is None.
+    """
+    if model is None:
+        model = ModelHolder.get_model(path_or_hf_repo)
+
+    # Pad 30-seconds of silence to the input audio, for slicing
+    mel = log_mel_spectrogram(audio, n_mels=model.dims.n_mels, padding=N_SAMPLES)
+    content_frames = mel.shape[-1] - N_FRAMES
+
+    def mel_window(seek: int, size: int) -> torch.Tensor:
+        return pad_or_trim(mel[:, seek : seek + size], N_FRAMES)
+
+    @torch.no_grad()
+    def encode(windows: List[Tuple[int, int]]) -> torch.Tensor:
+        return model.encoder(torch.stack([mel_window(*window) for window in windows]))
+
+    if language is None:
+        if not model.is_multilingual:
+            language = "en"
+        else:
+            # detect the language using up to the first 30 seconds
+            features = encode([(0, min(N_FRAMES, content_frames))])
+            tokenizer = get_tokenizer(True, num_languages=model.num_languages)
+            language = detect_language(model, features, tokenizer)[0]
+
+    tokenizer = get_tokenizer(
+        model.is_multilingual,
+        num_languages=model.num_languages,
+        language=language,
+        task=task,
+    )
+    initial_prompt_tokens = []
+    if initial_prompt is not None:
+        initial_prompt_tokens = tokenizer.encode(" " + initial_prompt.strip())
+
+    def decode(
+        audio_features: torch.Tensor, indices: List[int], t: float
+    ) -> List[DecodingResult]:
+        if len(indices) < audio_features.shape[0]:
+            audio_features = audio_features[indices]
+        decoding = DecodingTask(
+            model, tokenizer, temperature=t, prompt=initial_prompt_tokens, **decode_options
+        )
+        return decoding.run(audio_features)
+
+    input_stride = N_FRAMES // model.dims.n_audio_ctx  # mel frames per output token: 2
+    all_tokens = []
+    all_segments = []
+    for _, current_segments in transcribe_windows(
+        fixed_windows(
+            clip_seeks(clip_timestamps, content_frames, FRAMES_PER_SECOND),
+            content_frames,
+            N_FRAMES,
+        ),
+        encode,
+        decode,
+        tokenizer,
+        batch_size=batch_size,
+        temperatures=(
+            [temperature] if isinstance(temperature, (int, float)) else temperature
+        ),
+        compression_ratio_threshold=compression_ratio_threshold,
+        logprob_threshold=logprob_threshold,
+        no_speech_threshold=no_speech_threshold,
+        frame_duration=HOP_LENGTH / SAMPLE_RATE,
+        time_precision=input_stride * HOP_LENGTH / SAMPLE_RATE,
+    ):
+        # if a segment is instantaneous or does not contain text, clear it
+        for segment in current_segments:
+            if segment["start"] == segment["end"] or segment["text"].strip() == "":
+                segment["text"] = ""
+                segment["tokens"] = []
+
+        all_segments.extend(
+            [
+                {"id": i, **segment}
+                for i, segment in enumerate(current_segments, start=len(all_segments))
+            ]
+        )
+        all_tokens.extend(
+            [token for segment in current_segments for token in segment["tokens"]]
+        )
+
+    return dict(
+        text=tokenizer.decode(all_tokens),
+        segments=all_segments,
+        language=language,
+    )
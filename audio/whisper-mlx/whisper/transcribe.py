@@ -17,6 +17,7 @@ from .audio import (
     log_mel_spectrogram,
     pad_or_trim,
 )
+from .batched import clip_seeks, fixed_windows, needs_fallback, transcribe_windows
 from .decoding import DecodingOptions, DecodingResult
 from .load_models import load_model
 from .timing import add_word_timestamps
@@ -75,6 +76,7 @@ def transcribe(
     append_punctuations: str = "\"'.。,，!！?？:：”)]}、",
     clip_timestamps: Union[str, List[float]] = "0",
     hallucination_silence_threshold: Optional[float] = None,
+    batch_size: int = 1,
     **decode_options,
 ):
     """
@@ -137,6 +139,12 @@ def transcribe(
         When word_timestamps is True, skip silent periods longer than this threshold (in seconds)
         when a possible hallucination is detected
 
+    batch_size: int
+        Number of 30-second windows to encode and decode together. Above 1, the audio is cut into
+        consecutive windows which are decoded independently, without conditioning on the previous
+        text or the hallucination checks, and only the windows which fail are decoded again at the
+        next temperature.
+
     Returns
     -------
     A dictionary containing the resulting text ("text") and segment-level details ("segments"), and
@@ -186,58 +194,41 @@ def transcribe(
         task=task,
     )
 
-    if isinstance(clip_timestamps, str):
-        clip_timestamps = [
-            float(ts) for ts in (clip_timestamps.split(",") if clip_timestamps else [])
-        ]
-    seek_points: List[int] = [round(ts * FRAMES_PER_SECOND) for ts in clip_timestamps]
-    if len(seek_points) == 0:
-        seek_points.append(0)
-    if len(seek_points) % 2 == 1:
-        seek_points.append(content_frames)
-    seek_clips: List[Tuple[int, int]] = list(zip(seek_points[::2], seek_points[1::2]))
+    seek_clips = clip_seeks(clip_timestamps, content_frames, FRAMES_PER_SECOND)
 
     punctuation = "\"'“¿([{-\"'.。,，!！?？:：”)]}、"
 
     if word_timestamps and task == "translate":
         warnings.warn("Word-level timestamps on translations may not be reliable.")
 
+    temperatures = (
+        [temperature] if isinstance(temperature, (int, float)) else temperature
+    )
+
+    def decoding_options(t: float) -> DecodingOptions:
+        kwargs = {**decode_options}
+        if t > 0:
+            # disable beam_size and patience when t > 0
+            kwargs.pop("beam_size", None)
+            kwargs.pop("patience", None)
+        else:
+            # disable best_of when t == 0
+            kwargs.pop("best_of", None)
+
+        return DecodingOptions(**kwargs, temperature=t)
+
     def decode_with_fallback(segment: mx.array) -> DecodingResult:
-        temperatures = (
-            [temperature] if isinstance(temperature, (int, float)) else temperature
-        )
         decode_result = None
 
         for t in temperatures:
-            kwargs = {**decode_options}
-            if t > 0:
-                # disable beam_size and patience when t > 0
-                kwargs.pop("beam_size", None)
-                kwargs.pop("patience", None)
-            else:
-                # disable best_of when t == 0
-                kwargs.pop("best_of", None)
-
-            options = DecodingOptions(**kwargs, temperature=t)
-            decode_result = model.decode(segment, options)
-
-            needs_fallback = False
-            if (
-                compression_ratio_threshold is not None
-                and decode_result.compression_ratio > compression_ratio_threshold
-            ):
-                needs_fallback = True  # too repetitive
-            if (
-                logprob_threshold is not None
-                and decode_result.avg_logprob < logprob_threshold
-            ):
-                needs_fallback = True  # average log probability is too low
-            if (
-                no_speech_threshold is not None
-                and decode_result.no_speech_prob > no_speech_threshold
+            decode_result = model.decode(segment, decoding_options(t))
+
+            if not needs_fallback(
+                decode_result,
+                compression_ratio_threshold,
+                logprob_threshold,
+                no_speech_threshold,
             ):
-                needs_fallback = False  # silence
-            if not needs_fallback:
                 break
 
         return decode_result
@@ -275,6 +266,96 @@ def transcribe(
             "no_speech_prob": result.no_speech_prob,
         }
 
+    def add_segments(current_segments: List[dict]):
+        if verbose:
+            for segment in current_segments:
+                start, end, text = (
+                    segment["start"],
+                    segment["end"],
+                    segment["text"],
+                )
+                line = f"[{_format_timestamp(start)} --> {_format_timestamp(end)}] {text}"
+                print(make_safe(line))
+
+        # if a segment is instantaneous or does not contain text, clear it
+        for i, segment in enumerate(current_segments):
+            if segment["start"] == segment["end"] or segment["text"].strip() == "":
+                segment["text"] = ""
+                segment["tokens"] = []
+                segment["words"] = []
+
+        all_segments.extend(
+            [
+                {"id": i, **segment}
+                for i, segment in enumerate(current_segments, start=len(all_segments))
+            ]
+        )
+        all_tokens.extend(
+            [token for segment in current_segments for token in segment["tokens"]]
+        )
+
+    if batch_size > 1:
+        if hallucination_silence_threshold is not None:
+            warnings.warn(
+                "hallucination_silence_threshold is not supported with batch_size > 1"
+            )
+        decode_options["prompt"] = initial_prompt_tokens
+
+        def mel_window(seek: int, size: int) -> mx.array:
+            mel_segment = mel[seek : seek + size]
+            return pad_or_trim(mel_segment, N_FRAMES, axis=-2).astype(dtype)
+
+        def encode(windows: List[Tuple[int, int]]) -> mx.array:
+            return model.encoder(mx.stack([mel_window(*window) for window in windows]))
+
+        def decode(
+            audio_features: mx.array, indices: List[int], t: float
+        ) -> List[DecodingResult]:
+            if len(indices) < audio_features.shape[0]:
+                audio_features = audio_features[mx.array(indices)]
+            return model.decode(audio_features, decoding_options(t))
+
+        with tqdm.tqdm(
+            total=content_frames, unit="frames", disable=verbose is not False
+        ) as pbar:
+            last_speech_timestamp = 0.0
+            for (seek, segment_size), current_segments in transcribe_windows(
+                fixed_windows(seek_clips, content_frames, N_FRAMES),
+                encode,
+                decode,
+                tokenizer,
+                batch_size=batch_size,
+                temperatures=temperatures,
+                compression_ratio_threshold=compression_ratio_threshold,
+                logprob_threshold=logprob_threshold,
+                no_speech_threshold=no_speech_threshold,
+                frame_duration=HOP_LENGTH / SAMPLE_RATE,
+                time_precision=time_precision,
+            ):
+                if word_timestamps and current_segments:
+                    add_word_timestamps(
+                        segments=current_segments,
+                        model=model,
+                        tokenizer=tokenizer,
+                        mel=mel_window(seek, segment_size),
+                        num_frames=segment_size,
+                        prepend_punctuations=prepend_punctuations,
+                        append_punctuations=append_punctuations,
+                        last_speech_timestamp=last_speech_timestamp,
+                    )
+                    last_word_end = _get_end(current_segments)
+                    if last_word_end is not None:
+                        last_speech_timestamp = last_word_end
+
+                add_segments(current_segments)
+                pbar.update(segment_size)
+
+        return dict(
+            text=tokenizer.decode(all_tokens[len(initial_prompt_tokens) :]),
+            segments=all_segments,
+            language=language,
+        )
+
     # show the progress bar when verbose is False (if True, transcribed text will be printed)
     with tqdm.tqdm(
         total=content_frames, unit="frames", disable=verbose is not False
@@ -490,41 +571,7 @@ def transcribe(
                     if last_word_end is not None:
                         last_speech_timestamp = last_word_end
 
-                if verbose:
-                    for segment in current_segments:
-                        start, end, text = (
-                            segment["start"],
-                            segment["end"],
-                            segment["text"],
-                        )
-                        line = f"[{_format_timestamp(start)} --> {_format_timestamp(end)}] {text}"
-                        print(make_safe(line))
-
-                # if a segment is instantaneous or does not contain text, clear it
-                for i, segment in enumerate(current_segments):
-                    if (
-                        segment["start"] == segment["end"]
-                        or segment["text"].strip() == ""
-                    ):
-                        segment["text"] = ""
-                        segment["tokens"] = []
-                        segment["words"] = []
-
-                all_segments.extend(
-                    [
-                        {"id": i, **segment}
-                        for i, segment in enumerate(
-                            current_segments, start=len(all_segments)
-                        )
-                    ]
-                )
-                all_tokens.extend(
-                    [
-                        token
-                        for segment in current_segments
-                        for token in segment["tokens"]
-                    ]
-                )
+                add_segments(current_segments)
 
                 if not condition_on_previous_text or result.temperature > 0.5:
                     # do not feed the prompt tokens if a high temperature was used
@@ -5,12 +5,15 @@ from indexify_extractor_sdk import (
     Content,
 )
 from indexify_extractor_sdk.base_extractor import Feature
+from indexify_extractor_sdk.audio.decoding import load_audio
 from pydantic import BaseModel
 from . import whisper
 
 class InputParams(BaseModel):
     chunk_length: int = 30
     max_new_tokens: int = 128
+    # 30 second windows decoded together, 1 decodes them one after another
+    batch_size: int = 8
 
 class WhisperExtractor(Extractor):
     name = "tensorlake/whisper-mlx"
@@ -22,19 +25,16 @@ class WhisperExtractor(Extractor):
 
     def extract(
         self, content: Content, params: InputParams) -> List[Content]:
-        import tempfile
-        with tempfile.NamedTemporaryFile() as fp:
-            fp.write(content.data)
-            result = whisper.transcribe(fp.name)
-            text = result['text']
-            return [Content.from_text(text)]
+        result = whisper.transcribe(load_audio(content.data), batch_size=params.batch_size)
+        text = result['text']
+        return [Content.from_text(text)]
 
     def sample_input(self) -> Content:
         return self.sample_mp3()
 
 if __name__ == "__main__":
     extractor = WhisperExtractor()
-    contents = extractor.extract(extractor.sample_mp3(), None)
+    contents = extractor.extract(extractor.sample_mp3(), InputParams())
     print(len(contents))
     for content in contents:
         print(len(content.features))
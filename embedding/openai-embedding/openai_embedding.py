@@ -1,22 +1,73 @@
-from typing import List
-from indexify_extractor_sdk.embedding.base_embedding import BaseEmbeddingExtractor
-from openai import OpenAI
+import os
+from typing import List, Optional, Union
 
-class OpenAIEmbeddingExtractor(BaseEmbeddingExtractor):
+from indexify_extractor_sdk import AsyncExtractor, Content, Feature
+from indexify_extractor_sdk.rate_limiter import (
+    EmbeddingBatcher,
+    RateLimit,
+    get_scheduler,
+)
+from openai import AsyncOpenAI
+
+# Maximum number of inputs the embeddings endpoint accepts in one request.
+MAX_BATCH_SIZE = 2048
+
+# The endpoint accepts up to 300,000 tokens across the inputs of a request.
+# Tokens are estimated from the characters, which leaves some margin below it.
+MAX_BATCH_TOKENS = 250_000
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+class OpenAIEmbeddingExtractor(AsyncExtractor):
     name = "tensorlake/openai-embedding-ada-002-extractor"
     description = "OpenAI Embedding extractor"
     python_dependencies = ["openai"]
     system_dependencies = []
+    input_mime_types = ["text/plain", "application/json"]
 
     def __init__(self):
-        super(OpenAIEmbeddingExtractor, self).__init__(max_context_length=128)
+        super(OpenAIEmbeddingExtractor, self).__init__()
         self.model_name = "text-embedding-ada-002"
-        self.client = OpenAI()
+        self.limits = RateLimit(
+            requests_per_minute=_env_int("OPENAI_EMBEDDING_RPM"),
+            tokens_per_minute=_env_int("OPENAI_EMBEDDING_TPM"),
+        )
+
+    async def extract_async(self, content: Content, params=None) -> List[Union[Feature, Content]]:
+        embeddings = await self.extract_embeddings([content.data.decode("utf-8")])
+        return [Feature.embedding(values=embeddings[0])]
+
+    async def extract_batch_async(self, content_list: List[Content], params=None) -> List[List[Union[Feature, Content]]]:
+        texts = [content.data.decode("utf-8") for content in content_list]
+        embeddings = await self.extract_embeddings(texts)
+        return [[Feature.embedding(values=embedding)] for embedding in embeddings]
+
+    async def extract_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # Texts of concurrent tasks are coalesced into full size requests.
+        batcher: EmbeddingBatcher = self.get_client("batcher", self._create_batcher)
+        return await batcher.embed(texts)
+
+    def _create_batcher(self) -> EmbeddingBatcher:
+        # Retries are handled by the scheduler.
+        client = AsyncOpenAI(max_retries=0)
+        scheduler = get_scheduler("openai", self.model_name, client.api_key, self.limits)
+
+        async def embed(batch: List[str]) -> List[List[float]]:
+            async with self.concurrency_limit():
+                embeddings = await client.embeddings.create(input=batch, model=self.model_name)
+            return [data.embedding for data in embeddings.data]
+
+        return EmbeddingBatcher(
+            scheduler, embed, max_batch_size=MAX_BATCH_SIZE, max_batch_tokens=MAX_BATCH_TOKENS
+        )
 
-    def extract_embeddings(self, texts: List[str]) -> List[List[float]]:
-        embeddings = self.client.embeddings.create(input=texts, model=self.model_name)
-        return [data.embedding for data in embeddings.data]
+    def sample_input(self) -> Content:
+        return Content.from_text("hello world")
 
 
 if __name__ == "__main__":
-    OpenAIEmbeddingExtractor().extract_sample_input()
\ No newline at end of file
+    OpenAIEmbeddingExtractor().extract_sample_input()
@@ -4,10 +4,13 @@ import sys
 from .base_extractor import (
     EXTRACTOR_MODULE_PATH,
     EXTRACTORS_PATH,
+    AsyncExtractor,
     Content,
+    ContentChunk,
     EmbeddingSchema,
     Extractor,
     Feature,
+    PageRangeExtractor,
     load_extractor,
 )
 from .decorator import extractor
@@ -27,10 +30,13 @@ load_indexify_extractors(EXTRACTOR_MODULE_PATH)
 
 
 __all__ = [
+    "AsyncExtractor",
     "Content",
+    "ContentChunk",
     "EmbeddingSchema",
     "extractor",
     "Extractor",
     "Feature",
     "load_extractor",
+    "PageRangeExtractor",
 ]
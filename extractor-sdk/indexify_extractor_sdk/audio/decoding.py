@@ -0,0 +1,178 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from ..base_extractor import EXTRACTORS_PATH
+from ..spool import spooled_file
+
+# Sample rate of the speech models, Whisper and pyannote alike.
+SAMPLE_RATE = 16000
+
+DEFAULT_MAX_SIZE_BYTES = 4 * 1024 * 1024 * 1024
+
+
+def get_audio_cache_dir() -> str:
+    """Returns the directory holding the decoded audio."""
+    return os.path.join(EXTRACTORS_PATH, "decoded_audio")
+
+
+def needs_seekable_input(data: bytes) -> bool:
+    """
+    Whether `data` is an MP4, M4A or MOV whose moov box comes after its
+    media data. ffmpeg can only read those from a file.
+    """
+    if data[4:8] != b"ftyp":
+        return False
+    pos = 0
+    while pos + 8 <= len(data):
+        size = int.from_bytes(data[pos : pos + 4], "big")
+        kind = data[pos + 4 : pos + 8]
+        if kind == b"moov":
+            return False
+        if kind == b"mdat":
+            return True
+        if size == 1:
+            size = int.from_bytes(data[pos + 8 : pos + 16], "big")
+        if size < 8:
+            break
+        pos += size
+    return False
+
+
+def run_ffmpeg(program: str, args: List[str], data: bytes) -> bytes:
+    """
+    Runs ffmpeg or ffprobe on `data` piped to its stdin and returns its
+    stdout. Only MP4s which can't be read from a pipe are spooled to a file.
+    """
+
+    def run(source: str, stdin: Optional[bytes]) -> bytes:
+        cmd = [program, "-hide_banner", "-loglevel", "error", "-i", source, *args]
+        try:
+            return subprocess.run(cmd, input=stdin, capture_output=True, check=True).stdout
+        except FileNotFoundError as e:
+            raise ValueError(f"{program} was not found but is required to decode audio") from e
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"{program} failed: {e.stderr.decode(errors='replace')}") from e
+
+    if needs_seekable_input(data):
+        with spooled_file(data, suffix=".mp4") as path:
+            return run(path, None)
+    return run("pipe:0", data)
+
+
+def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodes the first audio track of `data` to mono float32 samples at
+    `sample_rate`, downmixing and resampling in the same ffmpeg pass.
+    """
+    args = ["-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1"]
+    audio = np.frombuffer(run_ffmpeg("ffmpeg", args, data), np.float32)
+    if audio.shape[0] == 0:
+        raise ValueError("the content has no audio or isn't a supported audio format")
+    return audio
+
+
+class DecodedAudioCache:
+    """
+    Decoded audio on local disk as .npy files, named by the hash of the
+    encoded bytes and the sample rate. Extractors running on the same file,
+    in any worker process of the machine, and retries of a task decode it
+    once. Arrays are memory mapped read only, so processes reading the same
+    audio share its pages. The least recently used files are removed once
+    the cache grows past `max_size_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+        decoder: Callable[[bytes, int], np.ndarray] = decode_audio,
+    ):
+        self._path = path or get_audio_cache_dir()
+        self._max_size_bytes = max_size_bytes
+        self._decoder = decoder
+        os.makedirs(self._path, exist_ok=True)
+
+    def key(self, data: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}-{sample_rate}"
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self._path, f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        path = self._file(key)
+        try:
+            audio = np.load(path, mmap_mode="r")
+            # The access time drives eviction.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return audio
+
+    def set(self, key: str, audio: np.ndarray):
+        # Written aside and renamed, so readers never see a partial file and
+        # concurrent writers of the same key don't conflict.
+        fd, tmp = tempfile.mkstemp(dir=self._path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(audio, dtype=np.float32))
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self._path):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self._max_size_bytes:
+            return
+        # Evict down to 90% of the limit so that we don't evict on every write.
+        to_free = total - int(self._max_size_bytes * 0.9)
+        for _, size, path in sorted(entries):
+            if to_free <= 0:
+                break
+            try:
+                # Processes which mapped the file keep reading it.
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            to_free -= size
+
+    def load(self, data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+        """The decoded audio of `data`, decoding it only on a miss."""
+        key = self.key(data, sample_rate)
+        audio = self.get(key)
+        if audio is None:
+            decoded = self._decoder(data, sample_rate)
+            self.set(key, decoded)
+            audio = self.get(key)
+            if audio is None:
+                # Evicted right away, the cache is smaller than the audio.
+                return decoded
+        return audio
+
+
+_cache: Optional[DecodedAudioCache] = None
+
+
+def load_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Mono float32 samples of the audio in `data` at `sample_rate`, read only,
+    from the machine's decoded audio cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = DecodedAudioCache()
+    return _cache.load(data, sample_rate)
@@ -0,0 +1,188 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .decoding import SAMPLE_RATE
+
+# Length of the frames whose energy is compared.
+FRAME_SECONDS = 0.03
+
+# Whisper's input window.
+WINDOW_SECONDS = 30.0
+
+# Frames quieter than this are never speech, in dB relative to full scale.
+MIN_SPEECH_DB = -65.0
+
+
+def frame_energies(audio: np.ndarray, frame: int) -> np.ndarray:
+    """Mean power of consecutive frames of `frame` samples, in dB."""
+    n = len(audio) // frame
+    if n == 0:
+        return np.empty(0)
+    frames = np.asarray(audio[: n * frame], dtype=np.float32).reshape(n, frame)
+    power = np.einsum("ij,ij->i", frames, frames) / frame
+    return 10 * np.log10(power + 1e-10)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) of the runs of True in `mask`."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def speech_regions(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    margin_db: float = 12.0,
+    min_speech_seconds: float = 0.25,
+    min_silence_seconds: float = 0.5,
+    pad_seconds: float = 0.2,
+    max_region_seconds: float = WINDOW_SECONDS,
+) -> List[Tuple[int, int]]:
+    """
+    Finds the speech in mono `audio` by energy, returned as [start, end)
+    sample spans. Frames louder than the noise floor, the 10th percentile of
+    the frame energies, by `margin_db` are speech, or when the audio is about
+    as loud throughout, those within `margin_db` of its loudest frames.
+    Pauses shorter than `min_silence_seconds` are bridged, bursts shorter
+    than `min_speech_seconds` dropped and regions padded by `pad_seconds`.
+    Regions longer than `max_region_seconds` are split at their quietest
+    frames.
+    """
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    db = frame_energies(audio, frame)
+    if len(db) == 0:
+        return []
+    floor, loud = np.percentile(db, [10, 99])
+    speech = db > max(min(floor + margin_db, loud - margin_db), MIN_SPEECH_DB)
+
+    min_silence = int(min_silence_seconds / FRAME_SECONDS)
+    for start, end in _runs(~speech):
+        if 0 < start and end < len(speech) and end - start < min_silence:
+            speech[start:end] = True
+    min_speech = int(min_speech_seconds / FRAME_SECONDS)
+    pad = int(pad_seconds * sample_rate)
+
+    regions: List[Tuple[int, int]] = []
+    for start, end in _runs(speech):
+        if end - start < min_speech:
+            continue
+        start = max(0, start * frame - pad)
+        end = min(len(audio), end * frame + pad)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    max_region = int(max_region_seconds * sample_rate)
+    out: List[Tuple[int, int]] = []
+    for start, end in regions:
+        while end - start > max_region:
+            # At the quietest frame between half and all of a region's length.
+            lo = (start + max_region // 2) // frame
+            hi = max(lo + 1, (start + max_region) // frame)
+            cut = max(start + 1, (lo + int(np.argmin(db[lo:hi]))) * frame)
+            out.append((start, cut))
+            start = cut
+        out.append((start, end))
+    return out
+
+
+class SpeechWindow:
+    """
+    Speech regions of one audio packed into a window for the ASR model, with
+    a short silence between them. Maps times in the window back to the
+    source.
+    """
+
+    __slots__ = ("sample_rate", "gap", "segments", "length")
+
+    def __init__(self, sample_rate: int, gap: int):
+        self.sample_rate = sample_rate
+        self.gap = gap
+        # (source start, source end, offset in the window), in samples.
+        self.segments: List[Tuple[int, int, int]] = []
+        self.length = 0
+
+    def fits(self, start: int, end: int, window: int) -> bool:
+        added = end - start + (self.gap if self.segments else 0)
+        return not self.segments or self.length + added <= window
+
+    def add(self, start: int, end: int):
+        if self.segments:
+            self.length += self.gap
+        self.segments.append((start, end, self.length))
+        self.length += end - start
+
+    def audio(self, source: np.ndarray) -> np.ndarray:
+        out = np.zeros(self.length, dtype=np.float32)
+        for start, end, offset in self.segments:
+            out[offset : offset + end - start] = source[start:end]
+        return out
+
+    def source_time(self, t: Optional[float]) -> float:
+        """
+        The time in the source of `t` seconds into the window. Times in a gap
+        map to the end of the region before it, None to the end of the last.
+        """
+        if t is None:
+            return self.segments[-1][1] / self.sample_rate
+        position = int(round(t * self.sample_rate))
+        # The last region starting at or before the position.
+        start, end, offset = self.segments[0]
+        for segment in self.segments[1:]:
+            if segment[2] > position:
+                break
+            start, end, offset = segment
+        position = min(max(position - offset, 0), end - start)
+        return (start + position) / self.sample_rate
+
+    def source_chunks(self, chunks: List[dict]) -> List[dict]:
+        """
+        Timestamped chunks of a transcription of the window, as returned by
+        transformers' ASR pipeline, with their timestamps in the source.
+        """
+        return [
+            {**chunk, "timestamp": tuple(self.source_time(t) for t in chunk["timestamp"])}
+            for chunk in chunks
+        ]
+
+
+def pack_speech(
+    regions: Sequence[Tuple[int, int]],
+    sample_rate: int = SAMPLE_RATE,
+    window_seconds: float = WINDOW_SECONDS,
+    gap_seconds: float = 0.1,
+) -> List[SpeechWindow]:
+    """
+    Packs consecutive speech regions into windows of up to `window_seconds`,
+    so the ASR model runs on near-full windows rather than on silence.
+    Regions longer than a window should be split first, see `speech_regions`.
+    """
+    window = int(window_seconds * sample_rate)
+    gap = int(gap_seconds * sample_rate)
+    windows: List[SpeechWindow] = []
+    for start, end in regions:
+        if not windows or not windows[-1].fits(start, end, window):
+            windows.append(SpeechWindow(sample_rate, gap))
+        windows[-1].add(start, end)
+    return windows
+
+
+def speech_windows(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    window_seconds: float = WINDOW_SECONDS,
+    vad: bool = True,
+) -> List[SpeechWindow]:
+    """
+    The windows to transcribe `audio` in: its speech packed into windows of
+    up to `window_seconds`, or with `vad` off the whole audio cut into
+    consecutive windows.
+    """
+    window = int(window_seconds * sample_rate)
+    if vad:
+        regions = speech_regions(audio, sample_rate, max_region_seconds=window_seconds)
+    else:
+        regions = [(start, min(start + window, len(audio))) for start in range(0, len(audio), window)]
+    return pack_speech(regions, sample_rate, window_seconds)
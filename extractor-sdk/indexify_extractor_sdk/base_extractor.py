@@ -1,14 +1,19 @@
+import asyncio
 import json
 import os
+import threading
 from abc import ABC, abstractmethod
 from importlib import import_module
-from types import ModuleType
+from types import MappingProxyType, ModuleType
 from typing import (
     Any,
+    Callable,
     Dict,
     List,
     Literal,
+    Mapping,
     Optional,
+    Sequence,
     Tuple,
     Type,
     Union,
@@ -123,6 +128,94 @@ class Content(BaseModel):
             return cls(content_type=m, data=f.read())
 
 
+class ContentChunk:
+    """
+    A chunk of the data of a parent content, kept as a reference to the parent
+    and the byte offsets of the chunk in its data. The bytes are sliced from a
+    memoryview of the parent's data when they're read, and pickling a list of
+    chunks pickles the parent once. Chunks whose data isn't a slice of the
+    parent, such as the text of html sections, carry their own bytes.
+
+    The features and labels are the parent's until the chunk writes its own
+    with add_feature or set_label, which copy them for that chunk only.
+    """
+
+    __slots__ = ("parent", "start", "end", "content_type", "_data", "_features", "_labels")
+
+    def __init__(
+        self,
+        parent: Content,
+        start: int,
+        end: int,
+        data: Optional[bytes] = None,
+        content_type: Optional[str] = None,
+    ):
+        self.parent = parent
+        self.start = start
+        self.end = end
+        self.content_type = content_type or parent.content_type
+        self._data = data
+        self._features: Optional[List[Feature]] = None
+        self._labels: Optional[Dict[str, Any]] = None
+
+    @property
+    def view(self) -> memoryview:
+        """The chunk's data, without copying it."""
+        if self._data is not None:
+            return memoryview(self._data)
+        return memoryview(self.parent.data)[self.start : self.end]
+
+    @property
+    def data(self) -> bytes:
+        return self._data if self._data is not None else bytes(self.view)
+
+    @property
+    def text(self) -> str:
+        return str(self.view, "utf-8")
+
+    @property
+    def features(self) -> Sequence[Feature]:
+        return self._features if self._features is not None else tuple(self.parent.features)
+
+    @property
+    def labels(self) -> Mapping[str, Any]:
+        return self._labels if self._labels is not None else MappingProxyType(self.parent.labels)
+
+    def add_feature(self, feature: Feature):
+        if self._features is None:
+            self._features = list(self.parent.features)
+        self._features.append(feature)
+
+    def set_label(self, key: str, value: Any):
+        if self._labels is None:
+            self._labels = dict(self.parent.labels)
+        self._labels[key] = value
+
+    def to_content(self) -> Content:
+        return Content(
+            content_type=self.content_type,
+            data=self.data,
+            features=list(self.features),
+            labels=dict(self.labels),
+        )
+
+    def __len__(self) -> int:
+        return len(self._data) if self._data is not None else self.end - self.start
+
+    def __reduce__(self):
+        return (_restore_chunk, (self.parent, self.start, self.end, self._data, self.content_type, self._features, self._labels))
+
+    def __repr__(self) -> str:
+        return f"ContentChunk(start={self.start}, end={self.end}, content_type={self.content_type!r})"
+
+
+def _restore_chunk(parent, start, end, data, content_type, features, labels) -> ContentChunk:
+    chunk = ContentChunk(parent, start, end, data=data, content_type=content_type)
+    chunk._features = features
+    chunk._labels = labels
+    return chunk
+
+
 class Extractor(ABC):
     name: str = ""
 
@@ -259,6 +352,155 @@ class Extractor(ABC):
         return Content(content_type="text/html", data=f.read(), features=features)
 
 
+# Every worker process runs a single event loop on a background thread which
+# is shared by all the async extractors loaded in that process. Clients created
+# by an extractor are bound to this loop, so they can be reused across tasks.
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_loop_pid: Optional[int] = None
+_worker_loop_lock = threading.Lock()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _worker_loop, _worker_loop_pid
+    with _worker_loop_lock:
+        # A forked worker inherits the loop object but not the thread running it.
+        if _worker_loop is None or _worker_loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="indexify-extractor-loop", daemon=True
+            )
+            thread.start()
+            _worker_loop = loop
+            _worker_loop_pid = os.getpid()
+        return _worker_loop
+
+
+def run_in_worker_loop(coro):
+    """Runs a coroutine on the worker event loop and blocks until it is done."""
+    return asyncio.run_coroutine_threadsafe(coro, get_worker_loop()).result()
+
+
+class AsyncExtractor(Extractor):
+    """
+    Base class for I/O bound extractors, such as the ones calling hosted model
+    APIs. Tasks are awaited on the worker event loop, so a single worker
+    process can keep up to `max_concurrency` requests in flight.
+    """
+
+    max_concurrency: int = 64
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._clients: Dict[Any, Any] = {}
+        self._clients_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @abstractmethod
+    async def extract_async(
+        self, content: Content, params: Type[BaseModel] = None
+    ) -> List[Union[Feature, Content]]:
+        pass
+
+    async def extract_batch_async(
+        self, content_list: List[Content], params: List[Type[BaseModel]]
+    ) -> List[List[Union[Feature, Content]]]:
+        async def _extract(content, param):
+            async with self.concurrency_limit():
+                return await self.extract_async(content, param)
+
+        return await asyncio.gather(
+            *[_extract(content, param) for content, param in zip(content_list, params)]
+        )
+
+    def extract(
+        self, content: Content, params: Type[BaseModel] = None
+    ) -> List[Union[Feature, Content]]:
+        return run_in_worker_loop(self.extract_async(content, params))
+
+    def extract_batch(
+        self, content_list: List[Content], params: List[Type[BaseModel]]
+    ) -> List[List[Union[Feature, Content]]]:
+        return run_in_worker_loop(self.extract_batch_async(content_list, params))
+
+    def get_client(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the client cached under `key`, creating it with `factory` on
+        first use. Clients are shared by all the tasks running on the loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._clients_loop is not loop:
+            self._clients = {}
+            self._clients_loop = loop
+        if key not in self._clients:
+            self._clients[key] = factory()
+        return self._clients[key]
+
+    def concurrency_limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+
+class PageRangeExtractor(Extractor):
+    """
+    Base class for extractors of paged documents, such as PDFs, which can
+    extract any range of pages on its own. The agent splits documents of at
+    least `min_pages_to_split` pages into ranges of `pages_per_range` pages
+    and runs them across its workers. Completed ranges are checkpointed in
+    the worker's local store, so a retried task only runs the missing ones,
+    and the outputs are merged in page order.
+    """
+
+    pages_per_range: int = 32
+    min_pages_to_split: int = 64
+
+    @abstractmethod
+    def page_span(
+        self, content: Content, params: Type[BaseModel] = None
+    ) -> Tuple[int, int]:
+        """Returns the [start, end) pages of `content` to extract."""
+        pass
+
+    @abstractmethod
+    def extract_page_range(
+        self, content: Content, params: Type[BaseModel], start: int, end: int
+    ) -> List[Union[Feature, Content]]:
+        pass
+
+    def merge_page_ranges(
+        self,
+        content: Content,
+        params: Type[BaseModel],
+        outputs: List[List[Union[Feature, Content]]],
+    ) -> List[Union[Feature, Content]]:
+        """Merges the outputs of the page ranges, given in page order."""
+        return [out for range_outputs in outputs for out in range_outputs]
+
+    def page_ranges(
+        self, content: Content, params: Type[BaseModel] = None
+    ) -> List[Tuple[int, int]]:
+        start, end = self.page_span(content, params)
+        if end - start < self.min_pages_to_split:
+            return [(start, end)]
+        return [
+            (range_start, min(range_start + self.pages_per_range, end))
+            for range_start in range(start, end, self.pages_per_range)
+        ]
+
+    def extract(
+        self, content: Content, params: Type[BaseModel] = None
+    ) -> List[Union[Feature, Content]]:
+        outputs = [
+            self.extract_page_range(content, params, start, end)
+            for start, end in self.page_ranges(content, params)
+        ]
+        return self.merge_page_ranges(content, params, outputs)
+
+
 def load_extractor(name: str) -> Tuple[Extractor, Type[BaseModel]]:
     module_name, class_name = name.split(":")
     wrapper = ExtractorWrapper(module_name, class_name)
@@ -270,7 +512,13 @@ class ExtractorWrapper:
         module = import_module(module_name)
         cls = getattr(module, class_name)
         self._instance: Extractor = cls()
-        self._param_cls = get_type_hints(cls.extract).get("params", None)
+        if issubclass(cls, AsyncExtractor):
+            extract_fn = cls.extract_async
+        elif issubclass(cls, PageRangeExtractor):
+            extract_fn = cls.extract_page_range
+        else:
+            extract_fn = cls.extract
+        self._param_cls = get_type_hints(extract_fn).get("params", None)
         extract_batch = getattr(self._instance, "extract_batch", None)
         self._has_batch_extract = True if callable(extract_batch) else False
 
@@ -312,6 +560,28 @@ class ExtractorWrapper:
             out[task_id] = self._instance.extract(content, param_instance)
         return out
 
+    def supports_page_ranges(self) -> bool:
+        return isinstance(self._instance, PageRangeExtractor)
+
+    def page_ranges(self, content: Content, input_params: Json) -> List[Tuple[int, int]]:
+        param_instance = self._param_from_json(input_params)
+        return self._instance.page_ranges(content, param_instance)
+
+    def extract_page_range(
+        self, content: Content, input_params: Json, start: int, end: int
+    ) -> List[Union[Feature, Content]]:
+        param_instance = self._param_from_json(input_params)
+        return self._instance.extract_page_range(content, param_instance, start, end)
+
+    def merge_page_ranges(
+        self,
+        content: Content,
+        input_params: Json,
+        outputs: List[List[Union[Feature, Content]]],
+    ) -> List[Union[Feature, Content]]:
+        param_instance = self._param_from_json(input_params)
+        return self._instance.merge_page_ranges(content, param_instance, outputs)
+
     def describe(self) -> ExtractorDescription:
         s_input = self._instance.sample_input()
         input_params = None
@@ -335,7 +605,7 @@ class ExtractorWrapper:
         )
         output = outputs["task_id"]
         for out in output:
-            features = out.features if type(out) == Content else [out]
+            features = [out] if type(out) == Feature else out.features
             for feature in features:
                 if feature.feature_type == "embedding":
                     embedding_value: Embedding = Embedding.model_validate(feature.value)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Union
+
+from .base_extractor import EXTRACTORS_PATH, Content, Feature
+from .response_cache import request_key
+
+# Checkpoints of tasks which never completed are dropped after a day.
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def get_checkpoint_db_path() -> str:
+    """Returns the path of the database holding the page range checkpoints."""
+    return os.path.join(EXTRACTORS_PATH, "page_range_checkpoints.db")
+
+
+def checkpoint_key(extractor_name: str, content: Content, input_params) -> str:
+    """
+    Identifies the extraction of a document, so a task retried with the same
+    content and params finds the ranges completed by its previous attempts.
+    """
+    if isinstance(input_params, str):
+        input_params = json.loads(input_params)
+    return request_key(
+        {
+            "extractor": extractor_name,
+            "content": hashlib.sha256(content.data).hexdigest(),
+            "params": input_params,
+        }
+    )
+
+
+class PageRangeCheckpoints:
+    """
+    Outputs of the completed page ranges of a document, stored in SQLite in
+    WAL mode so the worker processes of an agent can write the ranges they
+    complete concurrently. Outputs are pickled, the store is local to the
+    machine running the workers.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = DEFAULT_TTL):
+        self._path = path or get_checkpoint_db_path()
+        self._ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections can't be shared with forked workers, nor between threads.
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS page_ranges (
+                    key TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    end INTEGER NOT NULL,
+                    value BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (key, start, end)
+                )
+                """
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def get(
+        self, key: str, start: int, end: int
+    ) -> Optional[List[Union[Feature, Content]]]:
+        row = self._connection().execute(
+            "SELECT value FROM page_ranges WHERE key = ? AND start = ? AND end = ?",
+            (key, start, end),
+        ).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, start: int, end: int, outputs: List[Union[Feature, Content]]):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO page_ranges (key, start, end, value, created_at) VALUES (?, ?, ?, ?, ?)",
+            (key, start, end, pickle.dumps(outputs), now),
+        )
+        if self._ttl is not None:
+            conn.execute("DELETE FROM page_ranges WHERE created_at < ?", (now - self._ttl,))
+
+    def has(self, key: str, start: int, end: int) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM page_ranges WHERE key = ? AND start = ? AND end = ?",
+            (key, start, end),
+        ).fetchone()
+        return row is not None
+
+    def clear(self, key: str):
+        self._connection().execute("DELETE FROM page_ranges WHERE key = ?", (key,))
+
+
+_checkpoints: Optional[PageRangeCheckpoints] = None
+
+
+def get_checkpoints() -> PageRangeCheckpoints:
+    """Returns the checkpoint store shared by the extractors of the worker."""
+    global _checkpoints
+    if _checkpoints is None:
+        _checkpoints = PageRangeCheckpoints()
+    return _checkpoints
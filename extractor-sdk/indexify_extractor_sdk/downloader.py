@@ -20,7 +20,7 @@ class ClassVisitor(ast.NodeVisitor):
 
     def visit_ClassDef(self, node):
         for base in node.bases:
-            if isinstance(base, ast.Name) and base.id in ['Extractor', 'BaseEmbeddingExtractor']:
+            if isinstance(base, ast.Name) and base.id in ['Extractor', 'AsyncExtractor', 'PageRangeExtractor', 'BaseEmbeddingExtractor']:
                 self.classes.append(node.name)
         self.generic_visit(node)
 
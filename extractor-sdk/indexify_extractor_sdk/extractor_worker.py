@@ -1,8 +1,11 @@
-from typing import List, Union, Dict, Optional
+from typing import List, Union, Dict, Optional, Tuple
 from .base_extractor import Content, ExtractorWrapper, Feature, ExtractorDescription, EmbeddingSchema, EXTRACTORS_PATH
 from pydantic import Json, BaseModel
+import asyncio
 import concurrent
+from .checkpoints import checkpoint_key, get_checkpoints
 from .downloader import get_db_path
+from .spool import spool_dir
 import sqlite3
 import os
 import sys
@@ -16,6 +19,9 @@ class ExtractorModule(BaseModel):
 # str here is ExtractorDescription.name
 extractor_wrapper_map: Dict[str, ExtractorWrapper] = {}
 
+# str here is ExtractorDescription.name, filled in by the agent on first use
+extractor_page_range_support: Dict[str, bool] = {}
+
 # List of ExtractorDescription
 # This is used to report the available extractors to the coordinator
 extractor_descriptions: List[ExtractorDescription] = []
@@ -182,6 +188,72 @@ def _extract_content(
     return result
 
 
+def _read_spooled_content(content: Content, path: str) -> Content:
+    with open(path, "rb") as f:
+        return content.model_copy(update={"data": f.read()})
+
+
+def _supports_page_ranges(extractor_name: str) -> bool:
+    load_extractors(extractor_name)
+    return extractor_wrapper_map[extractor_name].supports_page_ranges()
+
+
+def _plan_page_ranges(
+    extractor_name: str, content: Content, path: str, input_params: Json
+) -> Tuple[str, List[Tuple[int, int]]]:
+    load_extractors(extractor_name)
+    content = _read_spooled_content(content, path)
+    key = checkpoint_key(extractor_name, content, input_params)
+    return key, extractor_wrapper_map[extractor_name].page_ranges(content, input_params)
+
+
+def _extract_page_range(
+    extractor_name: str,
+    content: Content,
+    path: str,
+    input_params: Json,
+    key: str,
+    start: int,
+    end: int,
+):
+    checkpoints = get_checkpoints()
+    # Completed by a previous attempt of the task.
+    if checkpoints.has(key, start, end):
+        return
+    load_extractors(extractor_name)
+    content = _read_spooled_content(content, path)
+    outputs = extractor_wrapper_map[extractor_name].extract_page_range(
+        content, input_params, start, end
+    )
+    checkpoints.set(key, start, end, outputs)
+
+
+def _merge_page_ranges(
+    extractor_name: str,
+    content: Content,
+    path: str,
+    input_params: Json,
+    key: str,
+    ranges: List[Tuple[int, int]],
+) -> List[Union[Feature, Content]]:
+    load_extractors(extractor_name)
+    extractor_wrapper = extractor_wrapper_map[extractor_name]
+    content = _read_spooled_content(content, path)
+    checkpoints = get_checkpoints()
+    outputs = []
+    for start, end in ranges:
+        range_outputs = checkpoints.get(key, start, end)
+        if range_outputs is None:
+            # Documents which aren't split are extracted here, in one range.
+            range_outputs = extractor_wrapper.extract_page_range(
+                content, input_params, start, end
+            )
+        outputs.append(range_outputs)
+    merged = extractor_wrapper.merge_page_ranges(content, input_params, outputs)
+    checkpoints.clear(key)
+    return merged
+
+
 def _describe() -> List[ExtractorDescription]:
     return extractor_descriptions
 
@@ -193,12 +265,110 @@ async def extract_content(
     params: Dict[str, Json],
     extractors: Dict[str, str] # task ID -> extractor name
 ) -> Dict[str, List[Union[Feature, Content]]]:
+    for extractor_name in set(extractors.values()):
+        if extractor_name not in extractor_page_range_support:
+            extractor_page_range_support[extractor_name] = await loop.run_in_executor(
+                executor, _supports_page_ranges, extractor_name
+            )
+
+    paged_task_ids = [
+        task_id
+        for task_id in content_list
+        if extractor_page_range_support[extractors[task_id]]
+    ]
+    if len(paged_task_ids) == 0:
+        return await loop.run_in_executor(
+            executor, 
+            _extract_content, 
+            content_list, 
+            params,
+            extractors
+        )
+
+    other_task_ids = [task_id for task_id in content_list if task_id not in paged_task_ids]
+    with spool_dir() as directory:
+        jobs = [
+            _extract_in_page_ranges(
+                loop,
+                executor,
+                os.path.join(directory, str(i)),
+                extractors[task_id],
+                content_list[task_id],
+                params.get(task_id),
+            )
+            for i, task_id in enumerate(paged_task_ids)
+        ]
+        if other_task_ids:
+            jobs.append(
+                loop.run_in_executor(
+                    executor,
+                    _extract_content,
+                    {task_id: content_list[task_id] for task_id in other_task_ids},
+                    {task_id: params.get(task_id) for task_id in other_task_ids},
+                    {task_id: extractors[task_id] for task_id in other_task_ids},
+                )
+            )
+        outputs = await asyncio.gather(*jobs)
+
+    result = dict(zip(paged_task_ids, outputs))
+    if other_task_ids:
+        result.update(outputs[-1])
+    return result
+
+
+async def _extract_in_page_ranges(
+    loop,
+    executor,
+    path: str,
+    extractor_name: str,
+    content: Content,
+    input_params: Json,
+) -> List[Union[Feature, Content]]:
+    """
+    Splits the document into page ranges and runs them across the workers.
+    The workers read the document from a spooled file rather than receiving
+    a copy of it for every range.
+    """
+    with open(path, "wb") as f:
+        f.write(content.data)
+    content = content.model_copy(update={"data": b""})
+
+    key, ranges = await loop.run_in_executor(
+        executor, _plan_page_ranges, extractor_name, content, path, input_params
+    )
+    if len(ranges) > 1:
+        # Let every range run to completion before failing, so that a retry
+        # of the task finds all the ranges which could be completed.
+        results = await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    executor,
+                    _extract_page_range,
+                    extractor_name,
+                    content,
+                    path,
+                    input_params,
+                    key,
+                    start,
+                    end,
+                )
+                for start, end in ranges
+            ],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
     return await loop.run_in_executor(
-        executor, 
-        _extract_content, 
-        content_list, 
-        params,
-        extractors
+        executor,
+        _merge_page_ranges,
+        extractor_name,
+        content,
+        path,
+        input_params,
+        key,
+        ranges,
     )
 
 
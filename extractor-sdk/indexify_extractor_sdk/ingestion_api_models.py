@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import json
-from .base_extractor import Feature, Content
+from .base_extractor import Feature, Content, ContentChunk
 
 
 class ApiFeature(BaseModel):
@@ -25,15 +25,16 @@ class ApiContent(BaseModel):
     labels: Dict[str, Any] = {}
 
     @classmethod
-    def from_content(cls, content: Content):
+    def from_content(cls, content: Union[Content, ContentChunk]):
         content_features = []
         for feature in content.features:
             content_features.append(ApiFeature.from_feature(feature=feature))
         return cls(
             content_type=content.content_type,
-            bytes=list(content.data),
+            # Iterating the view doesn't copy a chunk's bytes first.
+            bytes=list(content.view if isinstance(content, ContentChunk) else content.data),
             features=content_features,
-            labels=content.labels,
+            labels=dict(content.labels),
         )
 
 
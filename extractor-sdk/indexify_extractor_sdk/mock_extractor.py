@@ -1,8 +1,15 @@
-from indexify_extractor_sdk.base_extractor import Extractor, Content, Feature
+from indexify_extractor_sdk.base_extractor import (
+    AsyncExtractor,
+    Extractor,
+    Content,
+    Feature,
+    PageRangeExtractor,
+)
 
 from typing import List, Tuple
 
 import json
+import httpx
 from pydantic import BaseModel
 
 
@@ -75,3 +82,75 @@ class MockExtractorNoInputParams(Extractor):
 
     def sample_input(self) -> Content:
         return Content.from_text("hello world")
+
+
+class ChatInputParams(BaseModel):
+    base_url: str = "http://localhost:8000/v1"
+    model: str = "mock-model"
+
+
+class MockAsyncChatExtractor(AsyncExtractor):
+    """Calls an OpenAI compatible chat completions endpoint."""
+
+    name = "mock_async_chat_extractor"
+    max_concurrency = 8
+
+    def __init__(self):
+        super().__init__()
+
+    async def extract_async(
+        self, content: Content, params: ChatInputParams
+    ) -> List[Content]:
+        client: httpx.AsyncClient = self.get_client(
+            params.base_url, lambda: httpx.AsyncClient(base_url=params.base_url)
+        )
+        response = await client.post(
+            "/chat/completions",
+            json={
+                "model": params.model,
+                "messages": [
+                    {"role": "user", "content": content.data.decode("utf-8")}
+                ],
+            },
+        )
+        response.raise_for_status()
+        message = response.json()["choices"][0]["message"]["content"]
+        return [Content.from_text(message)]
+
+    def sample_input(self) -> Tuple[Content, ChatInputParams]:
+        return (Content.from_text("hello world"), ChatInputParams())
+
+
+class PageInputParams(BaseModel):
+    prefix: str = ""
+
+
+class MockPageRangeExtractor(PageRangeExtractor):
+    """Treats every line of a text as a page."""
+
+    name = "mock_page_range_extractor"
+    input_mime_types = ["text/plain"]
+    pages_per_range = 2
+    min_pages_to_split = 4
+
+    def __init__(self):
+        super().__init__()
+        self.extracted_ranges = []
+
+    def page_span(self, content: Content, params: PageInputParams) -> Tuple[int, int]:
+        return 0, len(content.data.decode("utf-8").splitlines())
+
+    def extract_page_range(
+        self, content: Content, params: PageInputParams, start: int, end: int
+    ) -> List[Content]:
+        self.extracted_ranges.append((start, end))
+        lines = content.data.decode("utf-8").splitlines()[start:end]
+        return [
+            Content.from_text(
+                params.prefix + line, features=[Feature.metadata({"page": start + i})]
+            )
+            for i, line in enumerate(lines)
+        ]
+
+    def sample_input(self) -> Content:
+        return Content.from_text("\n".join(f"page {i}" for i in range(5)))
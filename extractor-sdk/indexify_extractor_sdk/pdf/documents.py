@@ -0,0 +1,126 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pymupdf
+from PIL import Image
+
+from ..utils import batched
+
+# Resolution pages are rasterized at, same as the pdf2image default.
+DEFAULT_DPI = 200
+
+# Number of pages rasterized ahead of the consumer.
+DEFAULT_PAGE_BATCH_SIZE = 8
+
+
+def open_pdf(data: bytes) -> pymupdf.Document:
+    """Opens a PDF from memory, without writing it to disk."""
+    return pymupdf.open(stream=data, filetype="pdf")
+
+
+def page_range_pdf(data: bytes, start: int, end: int) -> bytes:
+    """
+    Returns a PDF holding the pages [start, end) of the PDF in `data`, for
+    the libraries which only take whole documents.
+    """
+    with open_pdf(data) as doc:
+        if start == 0 and end == len(doc):
+            return data
+        with pymupdf.open() as pages:
+            pages.insert_pdf(doc, from_page=start, to_page=end - 1)
+            return pages.tobytes()
+
+
+def render_page(
+    page: pymupdf.Page, dpi: int = DEFAULT_DPI, grayscale: bool = False
+) -> pymupdf.Pixmap:
+    colorspace = pymupdf.csGRAY if grayscale else pymupdf.csRGB
+    return page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+
+
+def page_to_array(
+    page: pymupdf.Page, dpi: int = DEFAULT_DPI, grayscale: bool = False
+) -> np.ndarray:
+    """
+    Rasterizes a page to a HxWx3 RGB array, or a HxW array in grayscale mode.
+    """
+    pixmap = render_page(page, dpi, grayscale)
+    array = np.frombuffer(pixmap.samples, dtype=np.uint8)
+    if grayscale:
+        return array.reshape(pixmap.height, pixmap.width)
+    return array.reshape(pixmap.height, pixmap.width, pixmap.n)
+
+
+def page_to_image(
+    page: pymupdf.Page, dpi: int = DEFAULT_DPI, grayscale: bool = False
+) -> Image.Image:
+    pixmap = render_page(page, dpi, grayscale)
+    mode = "L" if grayscale else "RGB"
+    return Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def page_to_bytes(
+    page: pymupdf.Page, dpi: int = DEFAULT_DPI, format: str = "png"
+) -> bytes:
+    """Encodes a rasterized page in memory, as png or jpeg."""
+    if format in ("jpeg", "jpg"):
+        # Pillow's jpeg encoder is several times faster than MuPDF's.
+        buffer = io.BytesIO()
+        page_to_image(page, dpi).save(buffer, format="JPEG")
+        return buffer.getvalue()
+    return render_page(page, dpi).tobytes(output=format)
+
+
+def image_to_array(data: bytes) -> np.ndarray:
+    """Decodes an encoded image, such as the data of a image/png content."""
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def iter_page_images(
+    data: bytes,
+    dpi: int = DEFAULT_DPI,
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    num_threads: int = 1,
+    grayscale: bool = False,
+    page_nums: Optional[Iterable[int]] = None,
+    as_array: bool = False,
+) -> Iterator[Tuple[int, Union[Image.Image, np.ndarray]]]:
+    """
+    Yields (page number, image) for the pages of a PDF, in page order. Pages
+    are rasterized `batch_size` at a time, so memory stays flat however long
+    the document is. With `num_threads` the pages of a batch are rendered
+    concurrently, each thread with its own handle on the document since MuPDF
+    documents can't be shared between threads.
+    """
+    render = page_to_array if as_array else page_to_image
+    if page_nums is None:
+        with open_pdf(data) as doc:
+            page_nums = range(len(doc))
+
+    if num_threads <= 1:
+        with open_pdf(data) as doc:
+            for page_num in page_nums:
+                yield page_num, render(doc[page_num], dpi, grayscale)
+        return
+
+    local = threading.local()
+    docs = []
+    lock = threading.Lock()
+
+    def render_page_num(page_num: int):
+        if not hasattr(local, "doc"):
+            local.doc = open_pdf(data)
+            with lock:
+                docs.append(local.doc)
+        return page_num, render(local.doc[page_num], dpi, grayscale)
+
+    try:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            for batch in batched(page_nums, batch_size):
+                yield from executor.map(render_page_num, batch)
+    finally:
+        for doc in docs:
+            doc.close()
@@ -0,0 +1,132 @@
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import pymupdf
+
+
+@dataclass
+class PageClassifierConfig:
+    # Pages with fewer visible characters in their text layer are OCR'd.
+    min_glyphs: int = 50
+    # Pages whose images cover less of the page have nothing left to OCR.
+    min_image_coverage: float = 0.05
+    # Pages mostly covered by images with little text, such as scans with a
+    # stamped header, are OCR'd.
+    scanned_image_coverage: float = 0.5
+    scanned_text_coverage: float = 0.05
+    # Text layers with more unmappable characters than this are broken.
+    max_garbage_ratio: float = 0.1
+
+
+@dataclass
+class PageClassification:
+    page_num: int
+    needs_ocr: bool
+    reason: str
+    glyph_count: int
+    text_coverage: float
+    image_coverage: float
+    garbage_ratio: float
+
+
+@dataclass
+class PageText:
+    page_num: int
+    text: str
+    ocr: bool
+
+
+def _is_garbage(char: str) -> bool:
+    # U+FFFD and private use characters come from fonts without a unicode map.
+    return char == "\ufffd" or unicodedata.category(char) in ("Co", "Cc", "Cs")
+
+
+def _coverage(rects: List[pymupdf.Rect], page_rect: pymupdf.Rect) -> float:
+    area = abs(page_rect)
+    if area == 0:
+        return 0.0
+    covered = sum(abs(pymupdf.Rect(rect) & page_rect) for rect in rects)
+    return min(covered / area, 1.0)
+
+
+def classify_page(
+    page: pymupdf.Page, config: Optional[PageClassifierConfig] = None
+) -> PageClassification:
+    """
+    Decides from the text layer and the images of a page whether it needs
+    OCR, or whether the text layer can be used as is.
+    """
+    config = config or PageClassifierConfig()
+    page_rect = page.rect
+    text = page.get_text()
+    glyphs = [char for char in text if not char.isspace()]
+    glyph_count = len(glyphs)
+    garbage_ratio = (
+        sum(1 for char in glyphs if _is_garbage(char)) / glyph_count
+        if glyph_count
+        else 0.0
+    )
+    text_rects = [
+        block[:4] for block in page.get_text("blocks") if block[6] == 0
+    ]
+    image_rects = [image["bbox"] for image in page.get_image_info()]
+    text_coverage = _coverage(text_rects, page_rect)
+    image_coverage = _coverage(image_rects, page_rect)
+
+    if glyph_count > 0 and garbage_ratio > config.max_garbage_ratio:
+        needs_ocr, reason = True, "garbled text layer"
+    elif image_coverage < config.min_image_coverage:
+        needs_ocr, reason = False, "text layer"
+    elif glyph_count < config.min_glyphs:
+        needs_ocr, reason = True, "no text layer"
+    elif (
+        image_coverage >= config.scanned_image_coverage
+        and text_coverage < config.scanned_text_coverage
+    ):
+        needs_ocr, reason = True, "scanned page"
+    else:
+        needs_ocr, reason = False, "text layer"
+
+    return PageClassification(
+        page_num=page.number,
+        needs_ocr=needs_ocr,
+        reason=reason,
+        glyph_count=glyph_count,
+        text_coverage=text_coverage,
+        image_coverage=image_coverage,
+        garbage_ratio=garbage_ratio,
+    )
+
+
+def classify_pages(
+    doc: pymupdf.Document, config: Optional[PageClassifierConfig] = None
+) -> List[PageClassification]:
+    return [classify_page(page, config) for page in doc]
+
+
+def route_pages(
+    doc: pymupdf.Document,
+    ocr: Callable[[List[int]], List[str]],
+    config: Optional[PageClassifierConfig] = None,
+    force_ocr: bool = False,
+) -> List[PageText]:
+    """
+    Returns the text of every page of the document, in page order. Pages with
+    a usable text layer are read directly, the others are passed in a single
+    call to `ocr`, which returns their texts in the order of the given page
+    numbers.
+    """
+    if force_ocr:
+        ocr_pages = list(range(len(doc)))
+    else:
+        ocr_pages = [c.page_num for c in classify_pages(doc, config) if c.needs_ocr]
+
+    ocr_texts = dict(zip(ocr_pages, ocr(ocr_pages))) if ocr_pages else {}
+    pages = []
+    for page in doc:
+        if page.number in ocr_texts:
+            pages.append(PageText(page.number, ocr_texts[page.number], True))
+        else:
+            pages.append(PageText(page.number, page.get_text(), False))
+    return pages
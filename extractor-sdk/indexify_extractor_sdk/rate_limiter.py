@@ -0,0 +1,436 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from .base_extractor import EXTRACTORS_PATH
+
+T = TypeVar("T")
+
+# Rough number of characters per token for the BPE tokenizers used by the
+# hosted model providers. Good enough to budget requests before sending them.
+CHARS_PER_TOKEN = 4
+
+# Tokens added by the chat format for every message.
+TOKENS_PER_MESSAGE = 4
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def get_rate_limit_db_path() -> str:
+    """Returns the path of the database holding the rate limit budgets."""
+    return os.path.join(EXTRACTORS_PATH, "rate_limits.db")
+
+
+@dataclass
+class RateLimit:
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    Estimates the number of tokens of a prompt. Accepts a string, a list of
+    strings or a list of chat messages.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", errors="ignore")
+    if isinstance(value, str):
+        return math.ceil(len(value) / CHARS_PER_TOKEN)
+    if isinstance(value, dict):
+        return TOKENS_PER_MESSAGE + estimate_tokens(value.get("content"))
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(v) for v in value)
+    return estimate_tokens(str(value))
+
+
+class TokenBucketStore:
+    """
+    Token buckets stored in SQLite, so the worker processes of an agent draw
+    from the same budget. A bucket is refilled continuously at `capacity`
+    tokens per minute. Every thread has its own connection.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path or get_rate_limit_db_path()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections can't be shared with forked workers or other threads.
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT NOT NULL PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def try_acquire(self, key: str, amount: float, capacity: float) -> float:
+        """
+        Takes `amount` tokens from the bucket. Returns 0 on success, otherwise
+        the number of seconds to wait until the bucket has enough tokens.
+        """
+        return self.try_acquire_all([(key, amount, capacity)])
+
+    def try_acquire_all(self, buckets: List[Tuple[str, float, float]]) -> float:
+        """
+        Takes the tokens from every (key, amount, capacity) bucket in a single
+        transaction, or from none of them if any is short. Returns 0 on success,
+        otherwise the number of seconds to wait until all the buckets have
+        enough tokens.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            balances = []
+            wait = 0.0
+            for key, amount, capacity in buckets:
+                amount = min(amount, capacity)
+                rate = capacity / 60.0
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    tokens = capacity
+                else:
+                    tokens = min(capacity, row[0] + (now - row[1]) * rate)
+                if tokens < amount:
+                    wait = max(wait, (amount - tokens) / rate)
+                balances.append((key, tokens, amount))
+            for key, tokens, amount in balances:
+                if wait == 0:
+                    tokens -= amount
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def drain(self, key: str, capacity: float, seconds: float):
+        """Empties the bucket so that it only refills after `seconds`."""
+        rate = capacity / 60.0
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+            (key, -seconds * rate, time.time()),
+        )
+
+
+class RetryableError(Exception):
+    """Raised when a request is still failing after all the retries."""
+
+    def __init__(self, status_code: Optional[int], message: str):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def get_status_code(e: Exception) -> Optional[int]:
+    """Finds the HTTP status code of the errors raised by the provider clients."""
+    for attr in ["status_code", "http_status", "code"]:
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(e, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def get_retry_after(e: Exception) -> Optional[float]:
+    """Reads the Retry-After header of a rate limited response, in seconds."""
+    headers = getattr(e, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Schedules the requests sent to a hosted model with the given limits.
+    Requests wait for budget in the request and token buckets of the
+    provider/model/key before they are sent, and rate limited or failed
+    requests are retried with backoff.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        api_key: Optional[str] = None,
+        limits: Optional[RateLimit] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        store: Optional[TokenBucketStore] = None,
+    ):
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        self._key = f"{provider}/{model}/{key_hash}"
+        self._limits = limits or RateLimit()
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._store = store or TokenBucketStore()
+
+    def _reserve(self, tokens: int) -> float:
+        limits = self._limits
+        buckets = []
+        if limits.requests_per_minute:
+            buckets.append((f"{self._key}/requests", 1, limits.requests_per_minute))
+        if limits.tokens_per_minute and tokens > 0:
+            buckets.append((f"{self._key}/tokens", tokens, limits.tokens_per_minute))
+        if not buckets:
+            return 0.0
+        # Both budgets are taken together, so a request waiting for tokens
+        # doesn't hold on to a request it isn't sending.
+        return self._store.try_acquire_all(buckets)
+
+    def _backoff(self, e: Exception, attempt: int) -> Optional[float]:
+        status_code = get_status_code(e)
+        if status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        if attempt >= self._max_retries:
+            raise RetryableError(
+                status_code, f"request failed after {attempt + 1} attempts: {e}"
+            ) from e
+        delay = get_retry_after(e)
+        if delay is None:
+            delay = min(self._max_delay, self._base_delay * 2**attempt)
+            delay = delay * (0.5 + random.random() / 2)
+        if status_code == 429 and self._limits.requests_per_minute:
+            # Hold back the other workers using the same key too.
+            self._store.drain(
+                f"{self._key}/requests", self._limits.requests_per_minute, delay
+            )
+        return delay
+
+    async def run(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            # The buckets are locked in SQLite, which blocks, so off the event loop.
+            wait = await asyncio.to_thread(self._reserve, tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                return await fn()
+            except Exception as e:
+                delay = await asyncio.to_thread(self._backoff, e, attempt)
+                if delay is None:
+                    raise
+                print(f"retrying request to {self._key} in {delay:.2f}s: {e}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def run_sync(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                print(f"retrying request to {self._key} in {delay:.2f}s: {e}")
+                attempt += 1
+                time.sleep(delay)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces the texts of concurrent embedding requests into batches of up to
+    `max_batch_size` inputs, which are sent through the scheduler as a single
+    request. Batches are flushed once full or after `max_wait` seconds.
+    """
+
+    def __init__(
+        self,
+        scheduler: RequestScheduler,
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 2048,
+        max_batch_tokens: Optional[int] = None,
+        max_wait: float = 0.05,
+    ):
+        self._scheduler = scheduler
+        self._embed_fn = embed_fn
+        self._max_batch_size = max_batch_size
+        self._max_batch_tokens = max_batch_tokens
+        self._max_wait = max_wait
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if self._max_batch_tokens and (
+                self._pending_tokens + tokens > self._max_batch_tokens
+            ):
+                self._flush()
+            future = loop.create_future()
+            self._pending.append((text, tokens, future))
+            self._pending_tokens += tokens
+            futures.append(future)
+            if len(self._pending) >= self._max_batch_size:
+                self._flush()
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_wait, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        texts = [text for text, _, _ in batch]
+        tokens = sum(tokens for _, tokens, _ in batch)
+        try:
+            embeddings = await self._scheduler.run(
+                lambda: self._embed_fn(texts), tokens=tokens
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
+class GlobalClientConfig:
+    """
+    Shares a client library's process wide configuration, such as
+    `genai.configure(api_key=...)`, between concurrent requests. Requests
+    using the value the library is configured with run concurrently, a
+    request with another value waits until the ones in flight are done and
+    configures the library once for the requests after it. Waiting requests
+    go in arrival order, so one value can't hold back another indefinitely.
+    """
+
+    def __init__(self, configure: Callable[[Any], None]):
+        self._configure = configure
+        self._value: Any = None
+        self._configured = False
+        self._in_flight = 0
+        self._waiting: Deque[object] = deque()
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        return self._condition
+
+    def _is_configured(self, value: Any) -> bool:
+        return self._configured and self._value == value
+
+    @asynccontextmanager
+    async def use(self, value: Any) -> AsyncIterator[None]:
+        condition = self._get_condition()
+        async with condition:
+            ticket = object()
+            self._waiting.append(ticket)
+            try:
+                await condition.wait_for(
+                    lambda: self._waiting[0] is ticket
+                    and (self._is_configured(value) or self._in_flight == 0)
+                )
+            finally:
+                self._waiting.remove(ticket)
+                # The next in line may be able to go along.
+                condition.notify_all()
+            if not self._is_configured(value):
+                self._configure(value)
+                self._value = value
+                self._configured = True
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self._in_flight -= 1
+                condition.notify_all()
+
+
+_client_configs: Dict[str, GlobalClientConfig] = {}
+
+
+def get_client_config(
+    name: str, configure: Callable[[Any], None]
+) -> GlobalClientConfig:
+    """Returns the worker's configuration of the client library `name`."""
+    if name not in _client_configs:
+        _client_configs[name] = GlobalClientConfig(configure)
+    return _client_configs[name]
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+
+
+def get_scheduler(
+    provider: str,
+    model: str,
+    api_key: Optional[str] = None,
+    limits: Optional[RateLimit] = None,
+) -> RequestScheduler:
+    """Returns the scheduler of the worker for the provider/model/key."""
+    key = json.dumps([provider, model, api_key, limits.__dict__ if limits else None])
+    if key not in _schedulers:
+        _schedulers[key] = RequestScheduler(provider, model, api_key, limits)
+    return _schedulers[key]
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .base_extractor import EXTRACTORS_PATH
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+DEFAULT_MAX_SIZE_BYTES = 1024 * 1024 * 1024
+
+
+def get_response_cache_path() -> str:
+    """Returns the path of the database holding the cached responses."""
+    return os.path.join(EXTRACTORS_PATH, "response_cache.db")
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    size_bytes: int
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value.replace("\r\n", "\n")).strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump())
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(value).hexdigest()
+    return value
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    Hashes a request, such as the model, prompt and content sent to a LLM.
+    Requests which only differ in key order, line endings or surrounding
+    whitespace map to the same key.
+    """
+    normalized = json.dumps(
+        _normalize(request), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On disk cache of model responses, stored in SQLite in WAL mode so the
+    worker processes of an agent can read and write it concurrently. Entries
+    expire after `ttl` seconds and the least recently used entries are evicted
+    once the cache grows past `max_size_bytes`. Values must be JSON
+    serializable. Every thread has its own connection.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+    ):
+        self._path = path or get_response_cache_path()
+        self._ttl = ttl
+        self._max_size_bytes = max_size_bytes
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections can't be shared with forked workers or other threads.
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT NOT NULL PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT NOT NULL PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0)"
+                )
+                # The total size of the responses is kept by triggers, so writes
+                # don't sum the table. A cache created before them is summed once.
+                conn.execute(
+                    "INSERT OR IGNORE INTO stats (name, value) SELECT 'size', COALESCE(SUM(size), 0) FROM responses"
+                )
+                for name, event, delta in [
+                    ("responses_insert", "INSERT", "new.size"),
+                    ("responses_delete", "DELETE", "-old.size"),
+                    ("responses_update", "UPDATE OF size", "new.size - old.size"),
+                ]:
+                    conn.execute(
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON responses
+                        BEGIN
+                            UPDATE stats SET value = value + {delta} WHERE name = 'size';
+                        END
+                        """
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def _record(self, name: str):
+        self._connection().execute(
+            "UPDATE stats SET value = value + 1 WHERE name = ?", (name,)
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.lookup(key)[1]
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """
+        Returns whether the key is cached and its value, so that a cached None
+        can be told apart from a miss.
+        """
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and self._ttl is not None and row[1] + self._ttl < now:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            self._record("misses")
+            return False, None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._record("hits")
+        return True, json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        data = json.dumps(value)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        conn = self._connection()
+        # An upsert rather than INSERT OR REPLACE, whose delete doesn't fire the
+        # size triggers.
+        conn.execute(
+            """
+            INSERT INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                value = excluded.value,
+                size = excluded.size,
+                created_at = excluded.created_at,
+                accessed_at = excluded.accessed_at
+            """,
+            (key, data, size, now, now),
+        )
+        self._evict(now)
+
+    def _size(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM stats WHERE name = 'size'").fetchone()[0]
+
+    def _evict(self, now: float):
+        conn = self._connection()
+        if self._ttl is not None:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self._ttl,))
+        if self._size(conn) <= self._max_size_bytes:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have evicted in the meantime.
+            total = self._size(conn)
+            # Evict down to 90% of the limit so that we don't evict on every write.
+            to_free = total - int(self._max_size_bytes * 0.9)
+            freed = 0
+            keys = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"
+            ):
+                if freed >= to_free:
+                    break
+                keys.append((key,))
+                freed += size
+            conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def cached(
+        self, request: Dict[str, Any], fn: Callable[[], Any], bypass: bool = False
+    ) -> Any:
+        """
+        Returns the cached response of the request, calling `fn` to compute it
+        on a miss. With `bypass` the cache isn't read, but the fresh response
+        is still stored.
+        """
+        key = request_key(request)
+        if not bypass:
+            found, value = self.lookup(key)
+            if found:
+                return value
+        value = fn()
+        self.set(key, value)
+        return value
+
+    async def cached_async(
+        self,
+        request: Dict[str, Any],
+        fn: Callable[[], Awaitable[Any]],
+        bypass: bool = False,
+    ) -> Any:
+        """
+        `cached` for a coroutine. SQLite blocks, so the cache is read and
+        written off the event loop.
+        """
+        key = request_key(request)
+        if not bypass:
+            found, value = await asyncio.to_thread(self.lookup, key)
+            if found:
+                return value
+        value = await fn()
+        await asyncio.to_thread(self.set, key, value)
+        return value
+
+    def stats(self) -> CacheStats:
+        conn = self._connection()
+        counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        lookups = hits + misses
+        return CacheStats(
+            hits=hits,
+            misses=misses,
+            hit_rate=hits / lookups if lookups else 0.0,
+            entries=entries,
+            size_bytes=counters.get("size", 0),
+        )
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM responses")
+        conn.execute("UPDATE stats SET value = 0 WHERE name IN ('hits', 'misses')")
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the response cache shared by the extractors of the worker."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -3,6 +3,7 @@ from typing import Dict, Optional, List
 from .ingestion_api_models import ApiContent, ApiFeature
 from .base_extractor import Content, Feature
 from .extractor_worker import extract_content, ExtractorModule
+from .response_cache import CacheStats, get_response_cache
 import uvicorn
 import asyncio
 import json
@@ -29,10 +30,17 @@ class ServerRouter:
         self.router = APIRouter()
         self.router.add_api_route("/", self.root, methods=["GET"])
         self.router.add_api_route("/extract", self.extract, methods=["POST"])
+        self.router.add_api_route(
+            "/metrics/response_cache", self.response_cache_stats, methods=["GET"]
+        )
 
     async def root(self):
         return {"Indexify Extractor"}
 
+    async def response_cache_stats(self) -> CacheStats:
+        # SQLite blocks, keep it off the event loop.
+        return await asyncio.to_thread(get_response_cache().stats)
+
     async def extract(self, request: ExtractionRequest):
         loop = asyncio.get_event_loop()
         content = Content(
@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def spool_dir(prefix: str = "indexify-spool-") -> Iterator[str]:
+    """
+    Creates a private directory for the files a library can only read from
+    or write to a path. The directory and everything in it is removed when
+    the block exits, also on errors.
+    """
+    path = tempfile.mkdtemp(prefix=f"{prefix}{os.getpid()}-")
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def spooled_file(data: bytes, suffix: str = "") -> Iterator[str]:
+    """
+    Writes `data` to a file in a spool directory and yields its path, the file
+    is removed when the block exits. Only use it when the consumer can't read
+    from memory.
+    """
+    with spool_dir() as directory:
+        path = os.path.join(directory, f"input{suffix}")
+        with open(path, "wb") as f:
+            f.write(data)
+        yield path
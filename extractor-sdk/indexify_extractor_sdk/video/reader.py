@@ -0,0 +1,316 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ..spool import spooled_file
+
+# Decode workers of a reader which isn't given `num_workers`. Extractors run in
+# the agent's worker processes already, so readers decode in the calling process
+# unless the agent sets this.
+NUM_WORKERS_ENV = "INDEXIFY_VIDEO_DECODE_WORKERS"
+
+# Videos shorter than this are decoded in the calling process, a process pool
+# doesn't pay off for them.
+MIN_SECONDS_FOR_POOL = 60
+
+# Length of the segments handed to the workers.
+DEFAULT_SEGMENT_SECONDS = 30.0
+
+# Segments are never shortened below this, so the decode from the preceding
+# keyframe every seek costs stays small against the segment. It covers several
+# keyframe intervals of common encodes, which put one every 2 to 5 seconds.
+MIN_SEGMENT_SECONDS = 10.0
+
+# Decoded frames held by the segments in flight. It bounds how many segments
+# are in flight, a video whose frames don't fit two segments is decoded in the
+# calling process instead.
+DEFAULT_MAX_BUFFER_BYTES = 512 << 20
+
+
+class VideoInfo(NamedTuple):
+    fps: float
+    num_frames: int
+    width: int
+    height: int
+
+
+def video_info(path: str) -> VideoInfo:
+    """Reads the frame rate, frame count and size from the container."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"can't open video {path}")
+        return VideoInfo(
+            fps=cap.get(cv2.CAP_PROP_FPS) or 0.0,
+            num_frames=max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+    finally:
+        cap.release()
+
+
+def default_num_workers() -> int:
+    value = os.environ.get(NUM_WORKERS_ENV)
+    return max(1, int(value)) if value else 1
+
+
+def video_segments(num_frames: int, segment_frames: int, step: int = 1) -> List[Tuple[int, int]]:
+    """
+    Splits the frames of a video into contiguous [start, end) ranges. The
+    ranges are a multiple of `step` long, so every segment samples the same
+    frames a single pass over the video would.
+    """
+    size = max(step, segment_frames // step * step)
+    return [(start, min(start + size, num_frames)) for start in range(0, num_frames, size)]
+
+
+def iter_segment(
+    path: str,
+    start: int,
+    end: Optional[int],
+    step: int = 1,
+    transform: Optional[Callable[[Any], Any]] = None,
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Yields (frame index, frame) for every `step`th frame of [start, end) of
+    the video at `path`, or until its last frame when `end` is None. The
+    frames in between are grabbed but not converted. `transform` is applied
+    to each frame before it's yielded.
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        if start > 0:
+            # OpenCV decodes from the preceding keyframe up to `start`.
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while end is None or index < end:
+            if not cap.grab():
+                break
+            if (index - start) % step == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                yield index, frame if transform is None else transform(frame)
+            index += 1
+    finally:
+        cap.release()
+
+
+def read_segment(
+    path: str,
+    start: int,
+    end: Optional[int],
+    step: int = 1,
+    transform: Optional[Callable[[Any], Any]] = None,
+) -> List[Tuple[int, Any]]:
+    """The frames of `iter_segment` as a list, for the worker processes."""
+    return list(iter_segment(path, start, end, step, transform))
+
+
+def read_segment_shared(
+    path: str,
+    start: int,
+    end: Optional[int],
+    step: int,
+    name: str,
+    shape: Tuple[int, int, int],
+    capacity: int,
+) -> List[Tuple[int, Union[int, np.ndarray]]]:
+    """
+    Decodes the frames of a segment straight into the slots of the shared
+    memory block `name`, which holds `capacity` frames of `shape`. Returns
+    (frame index, slot) for them, and (frame index, frame) for frames which
+    don't fit, when the header's frame count or frame size was off.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        slots = np.ndarray((capacity, *shape), dtype=np.uint8, buffer=block.buf)
+        out = []
+        cap = cv2.VideoCapture(path)
+        try:
+            if start > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            index = start
+            while end is None or index < end:
+                if not cap.grab():
+                    break
+                if (index - start) % step == 0:
+                    slot = len(out)
+                    if slot < capacity:
+                        ok, frame = cap.retrieve(slots[slot])
+                        if ok and frame.shape == shape and np.shares_memory(frame, slots[slot]):
+                            out.append((index, slot))
+                            index += 1
+                            continue
+                    else:
+                        ok, frame = cap.retrieve()
+                    if not ok:
+                        break
+                    out.append((index, frame))
+                index += 1
+        finally:
+            cap.release()
+        del slots
+        return out
+    finally:
+        block.close()
+
+
+class VideoSegmentReader:
+    """
+    Decodes a video in time segments across a process pool and yields its
+    frames in order. Every worker opens its own capture on the same file.
+    Consumers which compare consecutive frames, such as scene detection or
+    tracking, run in the calling process on the ordered frames, so segment
+    boundaries are invisible to them.
+
+    Every segment but the first starts with a seek, which decodes from the
+    preceding keyframe, so segments should be long against the video's
+    keyframe interval. The frames of the segments in flight are kept within
+    `max_buffer_bytes` by holding fewer segments in flight. Segments are only
+    shortened, down to `min_segment_seconds`, to fit two of them.
+
+    The pool is started on the first long video and shut down by `shutdown`,
+    when the reader is garbage collected, or when the process exits.
+    """
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+        min_seconds_for_pool: float = MIN_SECONDS_FOR_POOL,
+        max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+        min_segment_seconds: float = MIN_SEGMENT_SECONDS,
+    ):
+        self._num_workers = num_workers or default_num_workers()
+        self.segment_seconds = segment_seconds
+        self.min_segment_seconds = min_segment_seconds
+        self.min_seconds_for_pool = min_seconds_for_pool
+        self.max_buffer_bytes = max_buffer_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._finalizer: Optional[util.Finalize] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._num_workers)
+            # Finalizers with an exit priority also run when a worker process of
+            # the agent exits, which skips `atexit`.
+            self._finalizer = util.Finalize(self, self._executor.shutdown, exitpriority=10)
+        return self._executor
+
+    def plan(self, info: VideoInfo, step: int = 1) -> Tuple[int, int]:
+        """
+        Returns the segment length in frames and the number of segments in
+        flight for a video. Fewer than two in flight means the video is read
+        in the calling process, as a single segment in flight keeps the
+        consumer waiting on every decode.
+        """
+        fps = info.fps or 30.0
+        frame_bytes = max(1, info.width * info.height * 3)
+        segment_frames = max(1, int(self.segment_seconds * fps))
+        min_frames = min(segment_frames, max(1, int(self.min_segment_seconds * fps)))
+        two_segments = self.max_buffer_bytes // (2 * frame_bytes) * step
+        segment_frames = max(min_frames, min(segment_frames, two_segments))
+        segment_bytes = len(range(0, segment_frames, step)) * frame_bytes
+        in_flight = min(self._num_workers + 1, self.max_buffer_bytes // segment_bytes)
+        return segment_frames, in_flight
+
+    def frames(
+        self,
+        path: str,
+        step: int = 1,
+        transform: Optional[Callable[[Any], Any]] = None,
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Yields (frame index, frame) for every `step`th frame of the video at
+        `path`. `transform` runs in the workers and must be picklable, a
+        module level function or a `functools.partial` of one. At most one
+        segment per worker, plus one, is decoded ahead of the consumer, fewer
+        when their frames don't fit `max_buffer_bytes`.
+        """
+        info = video_info(path)
+        fps = info.fps or 30.0
+        segment_frames, in_flight = self.plan(info, step)
+        if (
+            self._num_workers <= 1
+            or info.num_frames == 0
+            or info.num_frames < self.min_seconds_for_pool * fps
+            or in_flight < 2
+        ):
+            yield from iter_segment(path, 0, None, step, transform)
+            return
+
+        segments = video_segments(info.num_frames, segment_frames, step)
+        shape = (info.height, info.width, 3)
+        pending = deque()
+        try:
+            for i, (start, end) in enumerate(segments):
+                # The frame count in the header can be off, the last segment
+                # reads until the stream ends.
+                last = i == len(segments) - 1
+                pending.append(self._submit(path, start, end, last, step, transform, shape))
+                if len(pending) >= in_flight:
+                    yield from self._collect(*pending.popleft())
+            while pending:
+                yield from self._collect(*pending.popleft())
+        finally:
+            for future, block, _ in pending:
+                future.cancel()
+                if block is not None:
+                    # A running worker keeps its mapping, the memory goes
+                    # once it's closed.
+                    block.close()
+                    block.unlink()
+
+    def _submit(self, path, start, end, last, step, transform, shape):
+        if transform is not None:
+            future = self._pool().submit(read_segment, path, start, None if last else end, step, transform)
+            return future, None, shape
+        # Decoded frames come back through shared memory rather than pickled,
+        # which would copy them three more times in the calling process.
+        capacity = len(range(start, end, step))
+        block = shared_memory.SharedMemory(create=True, size=capacity * int(np.prod(shape)))
+        future = self._pool().submit(
+            read_segment_shared, path, start, None if last else end, step, block.name, shape, capacity
+        )
+        return future, block, shape
+
+    def _collect(self, future, block, shape) -> List[Tuple[int, Any]]:
+        if block is None:
+            return future.result()
+        try:
+            frames = future.result()
+            slots = np.ndarray((block.size // int(np.prod(shape)), *shape), dtype=np.uint8, buffer=block.buf)
+            # Copied out, so the block can be released right away.
+            frames = [
+                (index, slots[frame].copy() if isinstance(frame, int) else frame)
+                for index, frame in frames
+            ]
+            del slots
+            return frames
+        finally:
+            block.close()
+            block.unlink()
+
+    def read(
+        self,
+        data: bytes,
+        step: int = 1,
+        transform: Optional[Callable[[Any], Any]] = None,
+        suffix: str = ".mp4",
+    ) -> Iterator[Tuple[int, Any]]:
+        """`frames` of a video in memory, spooled to a file for the captures."""
+        with spooled_file(data, suffix=suffix) as path:
+            yield from self.frames(path, step, transform)
+
+    def shutdown(self):
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._executor = None
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from indexify_extractor_sdk.base_extractor import Content, ExtractorWrapper
+from indexify_extractor_sdk.mock_extractor import (
+    ChatInputParams,
+    MockAsyncChatExtractor,
+)
+
+RESPONSE_DELAY = 0.2
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(RESPONSE_DELAY)
+        prompt = body["messages"][-1]["content"]
+        response = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": prompt.upper()},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+        data = json.dumps(response).encode("utf-8")
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncExtractor(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.params = ChatInputParams(base_url=f"http://{host}:{port}/v1")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_extract(self):
+        e = MockAsyncChatExtractor()
+        out = e.extract(Content.from_text("hello"), self.params)
+        self.assertEqual(out[0].data, b"HELLO")
+
+    def test_extract_batch_is_concurrent(self):
+        e = MockAsyncChatExtractor()
+        contents = [Content.from_text(f"doc {i}") for i in range(32)]
+        start = time.monotonic()
+        out = e.extract_batch(contents, [self.params] * len(contents))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual([o[0].data for o in out], [f"DOC {i}".encode() for i in range(32)])
+        # 32 requests with 8 in flight take 4 rounds instead of 32.
+        self.assertLess(elapsed, RESPONSE_DELAY * 16)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, e.max_concurrency)
+        # All the requests went through one shared client.
+        self.assertEqual(len(e._clients), 1)
+
+    def test_extractor_wrapper(self):
+        e = ExtractorWrapper(
+            "indexify_extractor_sdk.mock_extractor", "MockAsyncChatExtractor"
+        )
+        self.assertEqual(e._param_cls, ChatInputParams)
+        params = self.params.model_dump_json()
+        out = e.extract_batch(
+            {"task1": Content.from_text("foo"), "task2": Content.from_text("bar")},
+            {"task1": params, "task2": params},
+        )
+        self.assertEqual(out["task1"][0].data, b"FOO")
+        self.assertEqual(out["task2"][0].data, b"BAR")
+
+
+if __name__ == "__main__":
+    unittest.main()
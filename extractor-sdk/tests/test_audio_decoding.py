@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from indexify_extractor_sdk.audio.decoding import DecodedAudioCache, needs_seekable_input
+
+
+class TestDecodedAudioCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.decoded = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def decoder(self, data: bytes, sample_rate: int) -> np.ndarray:
+        self.decoded.append((data, sample_rate))
+        return np.full(len(data) * 100, sample_rate / 1e6, dtype=np.float32)
+
+    def test_decodes_once(self):
+        cache = DecodedAudioCache(self.directory.name, decoder=self.decoder)
+        first = cache.load(b"audio")
+        # Another cache on the same directory, as in another worker process.
+        second = DecodedAudioCache(self.directory.name, decoder=self.decoder).load(b"audio")
+        self.assertEqual(self.decoded, [(b"audio", 16000)])
+        self.assertTrue(np.array_equal(first, second))
+        self.assertIsInstance(second, np.memmap)
+        self.assertFalse(second.flags.writeable)
+
+        cache.load(b"audio", sample_rate=8000)
+        cache.load(b"other audio")
+        self.assertEqual(len(self.decoded), 3)
+
+    def test_evicts_least_recently_used(self):
+        # One entry is 400 bytes of samples plus the .npy header.
+        cache = DecodedAudioCache(self.directory.name, max_size_bytes=1200, decoder=self.decoder)
+        cache.load(b"a")
+        cache.load(b"b")
+        os.utime(cache._file(cache.key(b"a")), (0, 0))
+        cache.load(b"c")
+        self.assertIsNone(cache.get(cache.key(b"a")))
+        self.assertIsNotNone(cache.get(cache.key(b"b")))
+
+    def test_audio_larger_than_the_cache(self):
+        cache = DecodedAudioCache(self.directory.name, max_size_bytes=10, decoder=self.decoder)
+        self.assertEqual(len(cache.load(b"audio")), 500)
+
+
+class TestNeedsSeekableInput(unittest.TestCase):
+    def box(self, kind: bytes, size: int = 16) -> bytes:
+        return size.to_bytes(4, "big") + kind + bytes(size - 8)
+
+    def test_moov_position(self):
+        self.assertFalse(needs_seekable_input(self.box(b"ftyp") + self.box(b"moov") + self.box(b"mdat")))
+        self.assertTrue(needs_seekable_input(self.box(b"ftyp") + self.box(b"mdat") + self.box(b"moov")))
+        self.assertFalse(needs_seekable_input(b"ID3\x04" + bytes(64)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from indexify_extractor_sdk.audio.vad import pack_speech, speech_regions, speech_windows
+
+SAMPLE_RATE = 16000
+
+
+def bursts(seconds: int, starts, length: int) -> np.ndarray:
+    """Noise bursts of `length` seconds over a quiet noise floor."""
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(seconds * SAMPLE_RATE) * 0.001).astype(np.float32)
+    for start in starts:
+        audio[start * SAMPLE_RATE : (start + length) * SAMPLE_RATE] += (
+            rng.standard_normal(length * SAMPLE_RATE).astype(np.float32) * 0.1
+        )
+    return audio
+
+
+class TestSpeechRegions(unittest.TestCase):
+    def test_finds_bursts(self):
+        regions = speech_regions(bursts(60, [5, 20, 40], 4))
+        self.assertEqual(len(regions), 3)
+        for (start, end), burst in zip(regions, [5, 20, 40]):
+            self.assertLessEqual(start, burst * SAMPLE_RATE)
+            self.assertGreaterEqual(end, (burst + 4) * SAMPLE_RATE)
+            self.assertLess(end - start, 5 * SAMPLE_RATE)
+
+    def test_silence_and_uniform_audio(self):
+        self.assertEqual(speech_regions(np.zeros(10 * SAMPLE_RATE, dtype=np.float32)), [])
+        # Audio as loud throughout is all speech, split into windows.
+        loud = np.random.default_rng(0).standard_normal(70 * SAMPLE_RATE).astype(np.float32) * 0.1
+        regions = speech_regions(loud, max_region_seconds=30)
+        self.assertEqual(regions[0][0], 0)
+        self.assertEqual(regions[-1][1], len(loud))
+        self.assertTrue(all(end - start <= 30 * SAMPLE_RATE for start, end in regions))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(regions, regions[1:])))
+
+
+class TestSpeechWindows(unittest.TestCase):
+    def test_packs_and_maps_back(self):
+        regions = [(SAMPLE_RATE, 11 * SAMPLE_RATE), (40 * SAMPLE_RATE, 55 * SAMPLE_RATE), (90 * SAMPLE_RATE, 100 * SAMPLE_RATE)]
+        windows = pack_speech(regions, SAMPLE_RATE, window_seconds=30, gap_seconds=0.5)
+        self.assertEqual([w.segments for w in windows][0], [(SAMPLE_RATE, 11 * SAMPLE_RATE, 0), (40 * SAMPLE_RATE, 55 * SAMPLE_RATE, int(10.5 * SAMPLE_RATE))])
+        self.assertEqual(len(windows), 2)
+
+        window = windows[0]
+        self.assertEqual(window.source_time(2.0), 3.0)
+        # In the gap, the end of the region before it.
+        self.assertEqual(window.source_time(10.2), 11.0)
+        self.assertEqual(window.source_time(12.5), 42.0)
+        self.assertEqual(window.source_time(None), 55.0)
+        chunks = window.source_chunks([{"text": " a", "timestamp": (0.0, 2.0)}, {"text": " b", "timestamp": (11.5, None)}])
+        self.assertEqual([c["timestamp"] for c in chunks], [(1.0, 3.0), (41.0, 55.0)])
+
+        source = np.arange(100 * SAMPLE_RATE, dtype=np.float32)
+        audio = window.audio(source)
+        self.assertEqual(len(audio), int(25.5 * SAMPLE_RATE))
+        self.assertEqual(audio[0], SAMPLE_RATE)
+        self.assertEqual(audio[int(10.2 * SAMPLE_RATE)], 0)
+        self.assertEqual(audio[int(10.5 * SAMPLE_RATE)], 40 * SAMPLE_RATE)
+
+    def test_without_vad(self):
+        windows = speech_windows(bursts(70, [5], 4), SAMPLE_RATE, vad=False)
+        self.assertEqual([w.length for w in windows], [30 * SAMPLE_RATE, 30 * SAMPLE_RATE, 10 * SAMPLE_RATE])
+        self.assertEqual(windows[1].source_time(1.0), 31.0)
+        self.assertLess(sum(w.length for w in speech_windows(bursts(70, [5], 4))), 5 * SAMPLE_RATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
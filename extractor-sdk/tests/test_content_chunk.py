@@ -0,0 +1,54 @@
+import pickle
+import unittest
+
+from indexify_extractor_sdk import Content, ContentChunk, Feature
+from indexify_extractor_sdk.ingestion_api_models import ApiContent
+
+
+class TestContentChunk(unittest.TestCase):
+    def setUp(self):
+        self.parent = Content.from_text(
+            "Ünïcode first.\n\nSecond.",
+            features=[Feature.metadata({"filename": "test.txt"})],
+            labels={"source": "test"},
+        )
+        data = self.parent.data
+        self.first = ContentChunk(self.parent, 0, data.index(b"\n"))
+        self.second = ContentChunk(self.parent, data.index(b"Second"), len(data))
+
+    def test_slices_parent_data(self):
+        self.assertEqual(self.first.text, "Ünïcode first.")
+        self.assertEqual(self.second.data, b"Second.")
+        self.assertEqual(len(self.first), len("Ünïcode first.".encode("utf-8")))
+        own = ContentChunk(self.parent, 0, 0, data=b"own bytes")
+        self.assertEqual(own.text, "own bytes")
+
+    def test_features_are_copied_on_write(self):
+        self.first.add_feature(Feature.metadata({"Header 1": "Title"}))
+        self.second.set_label("chunk", 2)
+
+        self.assertEqual(len(self.first.features), 2)
+        self.assertEqual(len(self.second.features), 1)
+        self.assertEqual(len(self.parent.features), 1)
+        self.assertEqual(dict(self.second.labels), {"source": "test", "chunk": 2})
+        self.assertEqual(self.first.labels, {"source": "test"})
+        self.assertEqual(self.parent.labels, {"source": "test"})
+
+    def test_pickles_parent_once(self):
+        self.first.add_feature(Feature.metadata({"Header 1": "Title"}))
+        chunks = pickle.loads(pickle.dumps([self.first, self.second]))
+        self.assertIs(chunks[0].parent, chunks[1].parent)
+        self.assertEqual(chunks[0].text, "Ünïcode first.")
+        self.assertEqual(chunks[0].features[1].value, {"Header 1": "Title"})
+        self.assertEqual(len(chunks[1].features), 1)
+
+    def test_api_content(self):
+        api_content = ApiContent.from_content(self.second)
+        self.assertEqual(bytes(api_content.bytes), b"Second.")
+        self.assertEqual(api_content.labels, {"source": "test"})
+        self.assertEqual(api_content.features[0].data, {"filename": "test.txt"})
+        self.assertEqual(self.second.to_content().data, b"Second.")
+
+
+if __name__ == "__main__":
+    unittest.main()
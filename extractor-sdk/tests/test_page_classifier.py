@@ -0,0 +1,88 @@
+import unittest
+
+try:
+    import pymupdf
+
+    from indexify_extractor_sdk.pdf.page_classifier import (
+        classify_pages,
+        route_pages,
+    )
+except ImportError:
+    pymupdf = None
+
+PARAGRAPH = "Indexify extracts structured data from documents. " * 20
+
+
+def make_mixed_pdf() -> "pymupdf.Document":
+    doc = pymupdf.open()
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 64, 64), False)
+
+    # A digital page.
+    page = doc.new_page()
+    page.insert_textbox(pymupdf.Rect(72, 72, 540, 700), PARAGRAPH, fontsize=11)
+
+    # A scanned page, a full page image without text.
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=pixmap)
+
+    # A digital page with a figure.
+    page = doc.new_page()
+    page.insert_textbox(pymupdf.Rect(72, 72, 540, 400), PARAGRAPH, fontsize=11)
+    page.insert_image(pymupdf.Rect(72, 420, 300, 650), pixmap=pixmap)
+
+    # A scanned page with a stamped header.
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=pixmap)
+    page.insert_text((72, 30), "Received 2024-01-01, page 4 of the scanned batch", fontsize=8)
+    page.insert_text((72, 42), "Processed by the mail room, ticket 12345-ABCDEF", fontsize=8)
+
+    # A blank page.
+    doc.new_page()
+    return doc
+
+
+@unittest.skipIf(pymupdf is None, "pymupdf is not installed")
+class TestPageClassifier(unittest.TestCase):
+    def test_classify_pages(self):
+        doc = make_mixed_pdf()
+        classifications = classify_pages(doc)
+        self.assertEqual(
+            [c.needs_ocr for c in classifications], [False, True, False, True, False]
+        )
+        self.assertEqual(classifications[1].reason, "no text layer")
+        self.assertEqual(classifications[3].reason, "scanned page")
+
+    def test_route_pages(self):
+        doc = make_mixed_pdf()
+        calls = []
+
+        def ocr(page_nums):
+            calls.append(page_nums)
+            return [f"ocr {page_num}" for page_num in page_nums]
+
+        pages = route_pages(doc, ocr)
+        self.assertEqual(calls, [[1, 3]])
+        self.assertEqual([p.page_num for p in pages], [0, 1, 2, 3, 4])
+        self.assertEqual([p.ocr for p in pages], [False, True, False, True, False])
+        self.assertEqual(pages[1].text, "ocr 1")
+        self.assertIn("Indexify", pages[0].text)
+
+    def test_route_digital_pages_skips_ocr(self):
+        doc = pymupdf.open()
+        page = doc.new_page()
+        page.insert_textbox(pymupdf.Rect(72, 72, 540, 700), PARAGRAPH, fontsize=11)
+
+        def ocr(page_nums):
+            raise AssertionError("digital pages must not be OCR'd")
+
+        pages = route_pages(doc, ocr)
+        self.assertFalse(pages[0].ocr)
+
+    def test_force_ocr(self):
+        doc = make_mixed_pdf()
+        pages = route_pages(doc, lambda page_nums: ["" for _ in page_nums], force_ocr=True)
+        self.assertTrue(all(p.ocr for p in pages))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from indexify_extractor_sdk import checkpoints, extractor_worker
+from indexify_extractor_sdk.base_extractor import Content, ExtractorWrapper
+from indexify_extractor_sdk.checkpoints import PageRangeCheckpoints, checkpoint_key
+from indexify_extractor_sdk.mock_extractor import (
+    MockPageRangeExtractor,
+    PageInputParams,
+)
+
+EXTRACTOR_NAME = "mock_page_range_extractor"
+PARAMS = '{"prefix": "> "}'
+
+
+def document(num_pages: int) -> Content:
+    return Content.from_text("\n".join(f"page {i}" for i in range(num_pages)))
+
+
+class TestPageRanges(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = PageRangeCheckpoints(os.path.join(self.dir.name, "checkpoints.db"))
+        self._saved_store = checkpoints._checkpoints
+        checkpoints._checkpoints = self.store
+        self.wrapper = ExtractorWrapper(
+            "indexify_extractor_sdk.mock_extractor", "MockPageRangeExtractor"
+        )
+        extractor_worker.extractor_wrapper_map[EXTRACTOR_NAME] = self.wrapper
+        extractor_worker.extractor_page_range_support.pop(EXTRACTOR_NAME, None)
+
+    def tearDown(self):
+        checkpoints._checkpoints = self._saved_store
+        extractor_worker.extractor_wrapper_map.pop(EXTRACTOR_NAME, None)
+        self.dir.cleanup()
+
+    def extract(self, content: Content):
+        async def run():
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                return await extractor_worker.extract_content(
+                    asyncio.get_running_loop(),
+                    executor,
+                    {"task": content},
+                    {"task": PARAMS},
+                    {"task": EXTRACTOR_NAME},
+                )
+
+        return asyncio.run(run())["task"]
+
+    def test_page_ranges(self):
+        extractor = MockPageRangeExtractor()
+        params = PageInputParams()
+        self.assertEqual(extractor.page_ranges(document(3), params), [(0, 3)])
+        self.assertEqual(
+            extractor.page_ranges(document(5), params), [(0, 2), (2, 4), (4, 5)]
+        )
+
+    def test_extract_merges_in_page_order(self):
+        extractor = MockPageRangeExtractor()
+        out = extractor.extract(document(5), PageInputParams(prefix="> "))
+        self.assertEqual(extractor.extracted_ranges, [(0, 2), (2, 4), (4, 5)])
+        self.assertEqual([c.data for c in out], [f"> page {i}".encode() for i in range(5)])
+
+    def test_extract_content_splits_document(self):
+        out = self.extract(document(7))
+        self.assertEqual([c.data for c in out], [f"> page {i}".encode() for i in range(7)])
+        self.assertEqual(
+            sorted(self.wrapper._instance.extracted_ranges),
+            [(0, 2), (2, 4), (4, 6), (6, 7)],
+        )
+        # Checkpoints are dropped once the outputs are merged.
+        key = checkpoint_key(EXTRACTOR_NAME, document(7), PARAMS)
+        self.assertFalse(self.store.has(key, 0, 2))
+
+    def test_retry_skips_completed_ranges(self):
+        content = document(6)
+        key = checkpoint_key(EXTRACTOR_NAME, content, PARAMS)
+        completed = self.wrapper.extract_page_range(content, PARAMS, 2, 4)
+        self.store.set(key, 2, 4, completed)
+        self.wrapper._instance.extracted_ranges.clear()
+
+        out = self.extract(content)
+        self.assertEqual([c.data for c in out], [f"> page {i}".encode() for i in range(6)])
+        self.assertEqual(sorted(self.wrapper._instance.extracted_ranges), [(0, 2), (4, 6)])
+
+    def test_small_documents_run_in_one_range(self):
+        out = self.extract(document(3))
+        self.assertEqual(len(out), 3)
+        self.assertEqual(self.wrapper._instance.extracted_ranges, [(0, 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+try:
+    import pymupdf
+
+    from indexify_extractor_sdk.pdf.documents import (
+        image_to_array,
+        iter_page_images,
+        open_pdf,
+        page_range_pdf,
+        page_to_array,
+        page_to_bytes,
+        page_to_image,
+    )
+except ImportError:
+    pymupdf = None
+
+
+def make_pdf() -> bytes:
+    doc = pymupdf.open()
+    page = doc.new_page(width=144, height=72)
+    page.insert_text((10, 40), "Indexify", fontsize=12)
+    return doc.tobytes()
+
+
+@unittest.skipIf(pymupdf is None, "pymupdf is not installed")
+class TestPDFDocuments(unittest.TestCase):
+    def test_open_pdf_from_memory(self):
+        with open_pdf(make_pdf()) as doc:
+            self.assertEqual(len(doc), 1)
+            self.assertIn("Indexify", doc[0].get_text())
+
+    def test_page_to_array(self):
+        with open_pdf(make_pdf()) as doc:
+            # 144x72 points at 144 dpi is 288x144 pixels.
+            self.assertEqual(page_to_array(doc[0], dpi=144).shape, (144, 288, 3))
+            self.assertEqual(page_to_array(doc[0], dpi=144, grayscale=True).shape, (144, 288))
+            self.assertEqual(page_to_image(doc[0], dpi=144).size, (288, 144))
+
+    def test_page_to_bytes(self):
+        with open_pdf(make_pdf()) as doc:
+            png = page_to_bytes(doc[0], dpi=72)
+            jpeg = page_to_bytes(doc[0], dpi=72, format="jpeg")
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertTrue(jpeg.startswith(b"\xff\xd8"))
+        self.assertEqual(image_to_array(png).shape, (72, 144, 3))
+
+    def test_iter_page_images(self):
+        doc = pymupdf.open()
+        for i in range(10):
+            doc.new_page(width=72 + i, height=72)
+        data = doc.tobytes()
+
+        pages = list(iter_page_images(data, dpi=72))
+        self.assertEqual([page_num for page_num, _ in pages], list(range(10)))
+        self.assertEqual([image.size[0] for _, image in pages], [72 + i for i in range(10)])
+
+        threaded = list(iter_page_images(data, dpi=72, batch_size=3, num_threads=4, as_array=True, grayscale=True))
+        self.assertEqual([page_num for page_num, _ in threaded], list(range(10)))
+        self.assertEqual(threaded[4][1].shape, (72, 76))
+
+        subset = list(iter_page_images(data, dpi=72, page_nums=[7, 2]))
+        self.assertEqual([page_num for page_num, _ in subset], [7, 2])
+
+    def test_page_range_pdf(self):
+        doc = pymupdf.open()
+        for i in range(5):
+            doc.new_page(width=72 + i, height=72)
+        data = doc.tobytes()
+
+        self.assertIs(page_range_pdf(data, 0, 5), data)
+        with open_pdf(page_range_pdf(data, 1, 3)) as pages:
+            self.assertEqual([page.rect.width for page in pages], [73, 74])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+from indexify_extractor_sdk.rate_limiter import (
+    EmbeddingBatcher,
+    GlobalClientConfig,
+    RateLimit,
+    RequestScheduler,
+    RetryableError,
+    TokenBucketStore,
+    estimate_tokens,
+    get_retry_after,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        super().__init__(f"status {status_code}")
+
+
+def _consume(path, results):
+    store = TokenBucketStore(path)
+    acquired = 0
+    for _ in range(50):
+        if store.try_acquire("shared", 1, 60) == 0:
+            acquired += 1
+    results.put(acquired)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = TokenBucketStore(os.path.join(self.dir.name, "rate_limits.db"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("a" * 40), 10)
+        self.assertEqual(estimate_tokens(["a" * 4, "b" * 8]), 3)
+        messages = [{"role": "user", "content": "a" * 8}]
+        self.assertEqual(estimate_tokens(messages), 6)
+
+    def test_token_bucket(self):
+        self.assertEqual(self.store.try_acquire("k", 600, 600), 0)
+        # The bucket refills at 10 tokens per second.
+        wait = self.store.try_acquire("k", 100, 600)
+        self.assertGreater(wait, 9)
+        self.assertLessEqual(wait, 10)
+
+    def test_waiting_for_tokens_keeps_the_request_budget(self):
+        scheduler = RequestScheduler(
+            "openai",
+            "gpt-4",
+            "key",
+            RateLimit(requests_per_minute=10, tokens_per_minute=600),
+            store=self.store,
+        )
+        self.assertEqual(scheduler._reserve(600), 0)
+        for _ in range(5):
+            self.assertGreater(scheduler._reserve(600), 0)
+        # Only the request that was sent was taken from the request bucket.
+        requests = f"{scheduler._key}/requests"
+        self.assertEqual(self.store.try_acquire(requests, 9, 10), 0)
+        self.assertGreater(self.store.try_acquire(requests, 1, 10), 0)
+
+    def test_buckets_are_shared_by_processes(self):
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        path = os.path.join(self.dir.name, "rate_limits.db")
+        procs = [ctx.Process(target=_consume, args=(path, results)) for _ in range(3)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        acquired = sum(results.get() for _ in procs)
+        # 60 requests per minute allow a burst of 60, plus what refilled meanwhile.
+        self.assertGreaterEqual(acquired, 60)
+        self.assertLess(acquired, 70)
+
+    def test_retry_after(self):
+        self.assertEqual(get_retry_after(StatusError(429, {"retry-after": "2"})), 2.0)
+        self.assertEqual(
+            get_retry_after(StatusError(429, {"retry-after-ms": "150"})), 0.15
+        )
+        self.assertIsNone(get_retry_after(StatusError(429)))
+
+    def test_retries_rate_limited_requests(self):
+        scheduler = RequestScheduler(
+            "openai", "gpt-4", "key", RateLimit(requests_per_minute=600), store=self.store
+        )
+        calls = []
+
+        async def request():
+            calls.append(time.monotonic())
+            if len(calls) < 3:
+                raise StatusError(429, {"retry-after": "0.05"})
+            return "ok"
+
+        self.assertEqual(asyncio.run(scheduler.run(request)), "ok")
+        self.assertEqual(len(calls), 3)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.05)
+
+    def test_concurrent_requests(self):
+        scheduler = RequestScheduler(
+            "openai", "gpt-4", "key", RateLimit(requests_per_minute=600), store=self.store
+        )
+
+        async def request():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def run():
+            return await asyncio.gather(*[scheduler.run(request) for _ in range(20)])
+
+        self.assertEqual(asyncio.run(run()), ["ok"] * 20)
+
+    def test_does_not_retry_client_errors(self):
+        scheduler = RequestScheduler("openai", "gpt-4", store=self.store)
+        calls = []
+
+        def request():
+            calls.append(1)
+            raise StatusError(400)
+
+        with self.assertRaises(StatusError):
+            scheduler.run_sync(request)
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = RequestScheduler(
+            "openai", "gpt-4", max_retries=2, base_delay=0.01, store=self.store
+        )
+
+        def request():
+            raise StatusError(503)
+
+        with self.assertRaises(RetryableError):
+            scheduler.run_sync(request)
+
+    def test_embedding_batcher_coalesces_requests(self):
+        scheduler = RequestScheduler("openai", "ada", store=self.store)
+        batches = []
+
+        async def embed(texts):
+            batches.append(texts)
+            return [[float(len(t))] for t in texts]
+
+        async def run():
+            batcher = EmbeddingBatcher(scheduler, embed, max_batch_size=4)
+            return await asyncio.gather(
+                batcher.embed(["a", "bb"]),
+                batcher.embed(["ccc", "dddd"]),
+                batcher.embed(["eeeee"]),
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [[[1.0], [2.0]], [[3.0], [4.0]], [[5.0]]])
+        self.assertEqual([len(b) for b in batches], [4, 1])
+
+    def test_embedding_batcher_caps_batch_tokens(self):
+        scheduler = RequestScheduler("openai", "ada", store=self.store)
+        batches = []
+
+        async def embed(texts):
+            batches.append(texts)
+            return [[float(len(t))] for t in texts]
+
+        async def run():
+            batcher = EmbeddingBatcher(scheduler, embed, max_batch_size=16, max_batch_tokens=25)
+            return await batcher.embed(["x" * 40] * 5)
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [[40.0]] * 5)
+        # Every text is estimated at 10 tokens, so two fit in a request.
+        self.assertEqual([len(b) for b in batches], [2, 2, 1])
+
+    def test_global_client_config(self):
+        configured = []
+        config = GlobalClientConfig(configured.append)
+        events = []
+
+        async def request(key, name):
+            async with config.use(key):
+                events.append((name, "start", configured[-1]))
+                await asyncio.sleep(0.02)
+                events.append((name, "end", configured[-1]))
+
+        async def run():
+            await asyncio.gather(
+                request("a", 1), request("a", 2), request("b", 3), request("a", 4)
+            )
+
+        asyncio.run(run())
+        # Every request ran with its own key, the library was configured once
+        # per switch, and "b" waited for the requests with "a" in flight.
+        self.assertTrue(
+            all(key == {1: "a", 2: "a", 3: "b", 4: "a"}[name] for name, _, key in events)
+        )
+        self.assertEqual(configured, ["a", "b", "a"])
+        self.assertGreater(events.index((3, "start", "b")), events.index((2, "end", "a")))
+
+
+if __name__ == "__main__":
+    unittest.main()
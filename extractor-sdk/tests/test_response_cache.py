@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from indexify_extractor_sdk.response_cache import ResponseCache, request_key
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "response_cache.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_request_key_is_normalized(self):
+        a = request_key({"model": "gpt-4", "messages": [{"role": "user", "content": "hi\r\n"}]})
+        b = request_key({"messages": [{"content": " hi", "role": "user"}], "model": "gpt-4"})
+        c = request_key({"model": "gpt-4", "messages": [{"role": "user", "content": "hello"}]})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_cached(self):
+        cache = ResponseCache(self.path)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            return {"content": "response"}
+
+        request = {"model": "gpt-4", "prompt": "hello"}
+        self.assertEqual(cache.cached(request, fn), {"content": "response"})
+        self.assertEqual(cache.cached(request, fn), {"content": "response"})
+        self.assertEqual(len(calls), 1)
+        cache.cached(request, fn, bypass=True)
+        self.assertEqual(len(calls), 2)
+
+        stats = cache.stats()
+        self.assertEqual(stats.hits, 1)
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.hit_rate, 0.5)
+        self.assertEqual(stats.entries, 1)
+
+    def test_cached_async(self):
+        cache = ResponseCache(self.path)
+
+        async def fn():
+            return "response"
+
+        async def run():
+            await cache.cached_async({"prompt": "a"}, fn)
+            return await cache.cached_async({"prompt": "a"}, fn)
+
+        self.assertEqual(asyncio.run(run()), "response")
+        self.assertEqual(cache.stats().hits, 1)
+
+    def test_cached_none(self):
+        cache = ResponseCache(self.path)
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            return None
+
+        async def run():
+            for _ in range(3):
+                self.assertIsNone(await cache.cached_async({"prompt": "a"}, fn))
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.lookup(request_key({"prompt": "a"})), (True, None))
+        self.assertEqual(cache.lookup("missing"), (False, None))
+
+    def test_ttl(self):
+        cache = ResponseCache(self.path, ttl=0.05)
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("key"))
+
+    def test_size_eviction(self):
+        cache = ResponseCache(self.path, max_size_bytes=1000)
+        for i in range(10):
+            cache.set(f"key{i}", "x" * 198)
+            # Keep the first entry hot.
+            cache.get("key0")
+        stats = cache.stats()
+        self.assertLessEqual(stats.size_bytes, 1000)
+        self.assertEqual(cache.get("key0"), "x" * 198)
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache.get("key9"), "x" * 198)
+
+    def test_size_is_kept_without_summing(self):
+        def summed():
+            with sqlite3.connect(self.path) as conn:
+                return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        cache = ResponseCache(self.path, ttl=0.05, max_size_bytes=1000)
+        cache.set("short", "x" * 98)
+        cache.set("short", "x" * 48)
+        self.assertEqual(cache.stats().size_bytes, 50)
+        time.sleep(0.1)
+        for i in range(10):
+            cache.set(f"key{i}", "x" * 198)
+            self.assertEqual(cache.stats().size_bytes, summed())
+        self.assertLessEqual(cache.stats().size_bytes, 1000)
+        self.assertIsNone(cache.get("short"))
+        cache.clear()
+        self.assertEqual(cache.stats().size_bytes, 0)
+
+    def test_shared_between_instances(self):
+        ResponseCache(self.path).set("key", [1, 2, 3])
+        self.assertEqual(ResponseCache(self.path).get("key"), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
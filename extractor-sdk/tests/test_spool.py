@@ -0,0 +1,26 @@
+import os
+import unittest
+
+from indexify_extractor_sdk.spool import spool_dir, spooled_file
+
+
+class TestSpool(unittest.TestCase):
+    def test_spooled_file(self):
+        with spooled_file(b"%PDF-1.7", suffix=".pdf") as path:
+            self.assertTrue(path.endswith(".pdf"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"%PDF-1.7")
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+
+    def test_spool_dir_removed_on_error(self):
+        with self.assertRaises(ValueError):
+            with spool_dir() as directory:
+                with open(os.path.join(directory, "page.png"), "wb") as f:
+                    f.write(b"png")
+                raise ValueError("extraction failed")
+        self.assertFalse(os.path.exists(directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
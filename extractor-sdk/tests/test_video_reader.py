@@ -0,0 +1,145 @@
+import functools
+import gc
+import os
+import tempfile
+import unittest
+
+try:
+    import cv2
+    import numpy as np
+
+    from indexify_extractor_sdk.video.reader import (
+        NUM_WORKERS_ENV,
+        VideoInfo,
+        VideoSegmentReader,
+        iter_segment,
+        video_info,
+        video_segments,
+    )
+except ImportError:
+    cv2 = None
+
+
+def make_video(path: str, num_frames: int, fps: int = 10):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (64, 48))
+    for i in range(num_frames):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        cv2.putText(frame, str(i), (2, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        frame[:, :, 0] = i * 3 % 256
+        writer.write(frame)
+    writer.release()
+
+
+def mean_intensity(frame, channel: int):
+    return int(frame[:, :, channel].mean())
+
+
+@unittest.skipIf(cv2 is None, "opencv is not installed")
+class TestVideoReader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "video.mp4")
+        make_video(cls.path, 95)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_video_segments(self):
+        self.assertEqual(video_segments(10, 4), [(0, 4), (4, 8), (8, 10)])
+        # Segments are a multiple of the step long.
+        self.assertEqual(video_segments(10, 4, step=3), [(0, 3), (3, 6), (6, 9), (9, 10)])
+        self.assertEqual(video_segments(0, 4), [])
+
+    def test_video_info(self):
+        info = video_info(self.path)
+        self.assertEqual(info.num_frames, 95)
+        self.assertEqual((info.width, info.height), (64, 48))
+
+    def test_segments_match_a_single_pass(self):
+        expected = [(i, f) for i, f in iter_segment(self.path, 0, None, step=3)]
+        reader = VideoSegmentReader(
+            num_workers=2, segment_seconds=2, min_seconds_for_pool=0, min_segment_seconds=1
+        )
+        try:
+            frames = list(reader.frames(self.path, step=3))
+            transformed = list(
+                reader.frames(self.path, step=3, transform=functools.partial(mean_intensity, channel=0))
+            )
+        finally:
+            reader.shutdown()
+        self.assertEqual([i for i, _ in frames], list(range(0, 95, 3)))
+        self.assertEqual([i for i, _ in frames], [i for i, _ in expected])
+        for (_, frame), (_, want) in zip(frames, expected):
+            self.assertTrue(np.array_equal(frame, want))
+        self.assertEqual(transformed, [(i, mean_intensity(f, 0)) for i, f in expected])
+
+    def test_buffer_bounds_segments_in_flight(self):
+        frame_bytes = 640 * 360 * 3
+        reader = VideoSegmentReader(num_workers=8, max_buffer_bytes=9000 * frame_bytes)
+        info = VideoInfo(fps=30.0, num_frames=108000, width=640, height=360)
+        self.assertEqual(reader.plan(info), (900, 9))
+        # Segments are shortened only to fit two of them in flight, and never
+        # below the minimum length.
+        reader.max_buffer_bytes = 800 * frame_bytes
+        self.assertEqual(reader.plan(info), (400, 2))
+        reader.max_buffer_bytes = 250 * frame_bytes
+        self.assertEqual(reader.plan(info), (300, 0))
+        self.assertEqual(reader.plan(info, step=30), (900, 8))
+
+    def test_buffer_smaller_than_a_segment(self):
+        frame_bytes = 64 * 48 * 3
+        reader = VideoSegmentReader(
+            num_workers=2,
+            segment_seconds=2,
+            min_seconds_for_pool=0,
+            min_segment_seconds=1,
+            max_buffer_bytes=25 * frame_bytes,
+        )
+        self.assertEqual(reader.plan(video_info(self.path)), (12, 2))
+        try:
+            frames = list(reader.frames(self.path))
+        finally:
+            reader.shutdown()
+        self.assertEqual([i for i, _ in frames], list(range(95)))
+        # Too small for two segments of the minimum length, read in process.
+        reader.max_buffer_bytes = 15 * frame_bytes
+        self.assertEqual(reader.plan(video_info(self.path))[1], 1)
+        self.assertEqual(len(list(reader.frames(self.path))), 95)
+        self.assertIsNone(reader._executor)
+
+    def test_readers_decode_in_process_unless_configured(self):
+        environ = dict(os.environ)
+        try:
+            os.environ.pop(NUM_WORKERS_ENV, None)
+            self.assertEqual(VideoSegmentReader()._num_workers, 1)
+            os.environ[NUM_WORKERS_ENV] = "3"
+            self.assertEqual(VideoSegmentReader()._num_workers, 3)
+            self.assertEqual(VideoSegmentReader(num_workers=2)._num_workers, 2)
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def test_pool_is_shut_down_with_the_reader(self):
+        reader = VideoSegmentReader(
+            num_workers=2, segment_seconds=2, min_seconds_for_pool=0, min_segment_seconds=1
+        )
+        self.assertEqual(len(list(reader.frames(self.path, step=5))), 19)
+        executor = reader._executor
+        self.assertIsNotNone(executor)
+        del reader
+        gc.collect()
+        with self.assertRaises(RuntimeError):
+            executor.submit(abs, 1)
+
+    def test_short_videos_are_read_in_process(self):
+        reader = VideoSegmentReader(num_workers=2)
+        with open(self.path, "rb") as f:
+            frames = list(reader.read(f.read()))
+        self.assertEqual(len(frames), 95)
+        self.assertIsNone(reader._executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
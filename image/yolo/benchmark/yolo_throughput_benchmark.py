@@ -0,0 +1,104 @@
+"""
+CPU throughput of YOLO detection and tracking, one image per forward pass
+against batches, on synthetic street-like images.
+
+    python yolo_throughput_benchmark.py --images 128 --batch-sizes 1 4 8 16 32
+
+Detection runs through YoloExtractor.extract_batch, tracking through
+TrackExtractor.track_batch on consecutive frames of a moving scene.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "video", "tracking"))
+
+from yolo_extractor import YoloExtractor, YoloExtractorConfig  # noqa: E402
+from track_extractor import TrackExtractor  # noqa: E402
+from indexify_extractor_sdk import Content  # noqa: E402
+
+
+def make_frames(count: int, width: int, height: int):
+    """Frames of boxes and circles drifting across a gradient background."""
+    rng = random.Random(0)
+    shapes = [
+        (rng.randrange(width), rng.randrange(height), rng.randrange(20, 120), rng.choice([-6, -3, 3, 6]),
+         tuple(rng.randrange(256) for _ in range(3)))
+        for _ in range(12)
+    ]
+    background = np.linspace(40, 200, width, dtype=np.uint8)[None, :, None].repeat(height, 0).repeat(3, 2)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        for x, y, size, speed, color in shapes:
+            cx = (x + i * speed) % width
+            cv2.rectangle(frame, (cx, y), (cx + size, y + size // 2), color, -1)
+            cv2.circle(frame, (cx + size // 4, y + size // 2), size // 6, (20, 20, 20), -1)
+        frames.append(frame)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=128)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    frames = make_frames(args.images, args.width, args.height)
+    contents = [
+        Content(content_type="image/jpeg", data=cv2.imencode(".jpg", frame)[1].tobytes())
+        for frame in frames
+    ]
+    print(f"{args.images} images {args.width}x{args.height}, {args.threads} threads")
+
+    detector = YoloExtractor()
+    # Loads the model and warms up.
+    detector.extract(contents[0], YoloExtractorConfig())
+    start = time.perf_counter()
+    for content in contents:
+        detector.extract(content, YoloExtractorConfig())
+    single = time.perf_counter() - start
+    print(f"{'detect, extract per image':34} {args.images / single:7.1f} images/s")
+    for batch_size in args.batch_sizes:
+        config = YoloExtractorConfig(batch_size=batch_size)
+        start = time.perf_counter()
+        detector.extract_batch(contents, [config] * len(contents))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{f'detect, extract_batch of {batch_size}':34} {args.images / elapsed:7.1f} images/s  "
+            f"{single / elapsed:5.2f}x"
+        )
+
+    tracker = TrackExtractor()
+    counts = list(range(len(frames)))
+    for batch_size in args.batch_sizes:
+        # A new predictor starts with new trackers.
+        tracker.model.predictor = None
+        start = time.perf_counter()
+        tracks = set()
+        for i in range(0, len(frames), batch_size):
+            features = tracker.track_batch(counts[i : i + batch_size], frames[i : i + batch_size])
+            tracks.update(json.loads(f.value)["track_id"] for f in features)
+        elapsed = time.perf_counter() - start
+        if batch_size == args.batch_sizes[0]:
+            baseline = elapsed
+        print(
+            f"{f'track, batches of {batch_size}':34} {args.images / elapsed:7.1f} frames/s  "
+            f"{baseline / elapsed:5.2f}x  {len(tracks)} track ids"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
-from typing import List, Union, Optional
+from typing import Dict, List, Tuple, Union
 from indexify_extractor_sdk import Content, Extractor, Feature
 from pydantic import BaseModel, Field
-import json
 from ultralytics import YOLO
 import cv2
 import numpy as np
@@ -10,6 +9,8 @@ class YoloExtractorConfig(BaseModel):
     model_name: str = Field(default='yolov8n.pt')
     conf: float = Field(default=0.25)
     iou: float = Field(default=0.7)
+    # Images per forward pass.
+    batch_size: int = Field(default=16)
 
 class YoloExtractor(Extractor):
     name = "tensorlake/yolo-extractor"
@@ -21,37 +22,49 @@ class YoloExtractor(Extractor):
         super(YoloExtractor, self).__init__()
         self._models = {}
 
-    def extract(self, content: Content, params: YoloExtractorConfig) -> List[Union[Feature, Content]]:
-        contents = []
-
-        # Load the YOLO model
-        if params.model_name not in self._models:
-            self._models[params.model_name] = YOLO(params.model_name)
-
-        # Decode the image data
-        nparr = np.frombuffer(content.data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    def _model(self, model_name: str) -> YOLO:
+        if model_name not in self._models:
+            self._models[model_name] = YOLO(model_name)
+        return self._models[model_name]
 
-        # Run inference
-        results = self._models[params.model_name](img, conf=params.conf, iou=params.iou)
+    def detections(self, result) -> Feature:
+        # All the boxes of an image in one feature, as columns.
+        boxes = result.boxes
+        return Feature.metadata(
+            {
+                "bbox": np.round(boxes.xyxy.cpu().numpy(), 1).tolist(),
+                "class": [result.names[c] for c in boxes.cls.cpu().numpy().astype(int).tolist()],
+                "score": np.round(boxes.conf.cpu().numpy(), 4).tolist(),
+            },
+            name="detections",
+        )
 
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                class_id = int(box.cls)
-                class_name = result.names[class_id]
-                confidence = float(box.conf)
-
-                detection = {
-                    "bbox": [x1, y1, x2, y2],
-                    "class": class_name,
-                    "score": confidence,
-                }
+    def extract(self, content: Content, params: YoloExtractorConfig) -> List[Union[Feature, Content]]:
+        return self.extract_batch([content], [params])[0]
 
-                contents.append(Content(content_type="application/json", data=json.dumps(detection)))
+    def extract_batch(
+        self, content_list: List[Content], params: List[YoloExtractorConfig]
+    ) -> List[List[Union[Feature, Content]]]:
+        # Images of tasks with the same model and thresholds share forward passes.
+        groups: Dict[Tuple, List[int]] = {}
+        for i, config in enumerate(params):
+            config = config or YoloExtractorConfig()
+            key = (config.model_name, config.conf, config.iou, max(1, config.batch_size))
+            groups.setdefault(key, []).append(i)
 
-        return contents
+        out: List[List[Union[Feature, Content]]] = [[] for _ in content_list]
+        for (model_name, conf, iou, batch_size), indexes in groups.items():
+            model = self._model(model_name)
+            for start in range(0, len(indexes), batch_size):
+                batch = indexes[start : start + batch_size]
+                images = [
+                    cv2.imdecode(np.frombuffer(content_list[i].data, np.uint8), cv2.IMREAD_COLOR)
+                    for i in batch
+                ]
+                results = model(images, conf=conf, iou=iou, verbose=False)
+                for i, result in zip(batch, results):
+                    out[i].append(self.detections(result))
+        return out
 
     def sample_input(self) -> Content:
         return self.sample_jpg()
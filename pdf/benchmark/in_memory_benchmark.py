@@ -0,0 +1,105 @@
+"""
+Measures the per page overhead and the disk writes of handing PDF pages to a
+library through temp files, against opening and rasterizing them in memory.
+
+    python in_memory_benchmark.py --docs 4 --pages 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pymupdf
+from indexify_extractor_sdk.pdf.documents import open_pdf, page_to_array, page_to_bytes
+
+from synthetic_pdf import make_pdf
+
+DPI = 100
+
+
+def written_bytes() -> int:
+    # Bytes passed to write calls by this process, None where /proc isn't available.
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def temp_file_round_trip(data: bytes):
+    """The pattern the extractors used: write the PDF and every page image to temp files."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
+        inputtmpfile.write(data)
+        inputtmpfile.flush()
+        doc = pymupdf.open(inputtmpfile.name)
+        for page in doc:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as img_file:
+                page.get_pixmap(dpi=DPI).save(img_file.name)
+                with open(img_file.name, "rb") as f:
+                    f.read()
+
+
+def in_memory(data: bytes):
+    with open_pdf(data) as doc:
+        for page in doc:
+            page_to_array(page, DPI)
+
+
+def in_memory_encoded(data: bytes, format: str = "png"):
+    with open_pdf(data) as doc:
+        for page in doc:
+            page_to_bytes(page, DPI, format=format)
+
+
+def measure(documents, fn):
+    before = written_bytes()
+    start = time.perf_counter()
+    for data in documents:
+        fn(data)
+    elapsed = time.perf_counter() - start
+    after = written_bytes()
+    return elapsed, (after - before) if before is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        documents = []
+        for i in range(args.docs):
+            path = os.path.join(workdir, f"doc_{i}.pdf")
+            make_pdf(path, args.pages)
+            with open(path, "rb") as f:
+                documents.append(f.read())
+
+        # Count the files left behind in a private temp directory.
+        tempdir = os.path.join(workdir, "tmp")
+        os.mkdir(tempdir)
+        tempfile.tempdir = tempdir
+
+        total_pages = args.docs * args.pages
+        print(f"{args.docs} docs x {args.pages} pages at {DPI} dpi")
+        for name, fn in [
+            ("temp files", temp_file_round_trip),
+            ("in memory (array)", in_memory),
+            ("in memory (png)", in_memory_encoded),
+            ("in memory (jpeg)", lambda data: in_memory_encoded(data, "jpeg")),
+        ]:
+            elapsed, written = measure(documents, fn)
+            leaked = len(os.listdir(tempdir))
+            written_mb = f"{written / 1e6:.1f} MB written" if written is not None else "writes unknown"
+            print(
+                f"{name:18} {1000 * elapsed / total_pages:6.2f} ms/page, "
+                f"{written_mb}, {leaked} files left in tmp"
+            )
+            for leftover in os.listdir(tempdir):
+                os.unlink(os.path.join(tempdir, leftover))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmarks the page-range subtasks of the PDF extractor on a synthetic corpus
+of multi-hundred-page PDFs: a whole document extracted in one call, against
+its ranges of `pages_per_range` pages run across worker processes, as the
+agent runs them, and merged in page order.
+
+    python page_parallel_benchmark.py --docs 4 --pages 400 --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from indexify_extractor_sdk import PageRangeExtractor
+from indexify_extractor_sdk.pdf.documents import open_pdf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "pdfextractor"))
+
+from utils.pages import extract_page_range  # noqa: E402
+
+from synthetic_pdf import make_pdf  # noqa: E402
+
+
+class PageRanges(PageRangeExtractor):
+    """Splits documents into page ranges the way the agent does for PDFExtractor."""
+
+    name = "benchmark/page-ranges"
+
+    def page_span(self, content, params=None):
+        with open_pdf(content) as doc:
+            return 0, len(doc)
+
+    def extract_page_range(self, content, params, start, end):
+        raise NotImplementedError
+
+    def sample_input(self):
+        raise NotImplementedError
+
+
+def merge(results):
+    merged = {"markdown": None, "text": [], "images": []}
+    markdown = [r["markdown"] for r in results if r["markdown"] is not None]
+    if markdown:
+        merged["markdown"] = "".join(markdown)
+    for r in results:
+        merged["text"].extend(r["text"])
+        merged["images"].extend(r["images"])
+    return merged
+
+
+def run(documents, extract):
+    start = time.perf_counter()
+    results = [extract(document) for document in documents]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--pages-per-range", type=int, default=PageRangeExtractor.pages_per_range)
+    parser.add_argument("--output-format", default="text", choices=["text", "markdown"])
+    args = parser.parse_args()
+
+    output_types = ["text", "image"]
+    ranges = PageRanges()
+    ranges.pages_per_range = args.pages_per_range
+    with tempfile.TemporaryDirectory() as tmpdir:
+        documents = []
+        for i in range(args.docs):
+            path = os.path.join(tmpdir, f"doc_{i}.pdf")
+            make_pdf(path, args.pages)
+            with open(path, "rb") as f:
+                documents.append(f.read())
+    total_pages = args.docs * args.pages
+
+    whole, expected = run(
+        documents,
+        lambda d: extract_page_range(d, 0, args.pages, output_types, args.output_format),
+    )
+    with ProcessPoolExecutor(max_workers=args.workers) as workers:
+        # Warm up the workers so process start up isn't part of the measurement.
+        list(workers.map(abs, range(args.workers)))
+
+        def extract_ranges(document):
+            futures = [
+                workers.submit(extract_page_range, document, start, end, output_types, args.output_format)
+                for start, end in ranges.page_ranges(document)
+            ]
+            return merge([f.result() for f in futures])
+
+        split, actual = run(documents, extract_ranges)
+
+    # Text and images must match. Markdown may differ where pymupdf4llm
+    # lays out a range boundary, so it isn't compared.
+    assert [r["text"] for r in expected] == [r["text"] for r in actual], "page range text differs"
+    assert [r["images"] for r in expected] == [r["images"] for r in actual], "page range images differ"
+
+    num_ranges = len(ranges.page_ranges(documents[0]))
+    print(f"{args.docs} docs x {args.pages} pages, output format {args.output_format}")
+    print(f"whole document: {whole:.2f}s ({total_pages / whole:.0f} pages/s)")
+    print(
+        f"page ranges:    {split:.2f}s ({total_pages / split:.0f} pages/s), "
+        f"{num_ranges} ranges per doc on {args.workers} workers"
+    )
+    print(f"speedup:        {whole / split:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measures the peak memory of rasterizing a whole document up front, as
+convert_from_bytes does, against streaming the pages a batch at a time with
+iter_page_images, for growing page counts. Every run happens in a fresh
+process so that peak RSS isn't shared between runs.
+
+    python page_streaming_benchmark.py --pages 50 100 200 --dpi 200
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from indexify_extractor_sdk.pdf.documents import iter_page_images
+
+from synthetic_pdf import make_pdf
+
+
+def consume(image):
+    # Stands in for the OCR or model call made on every page.
+    image.getpixel((0, 0))
+
+
+def run(path: str, mode: str, dpi: int, num_threads: int):
+    with open(path, "rb") as f:
+        data = f.read()
+    start = time.perf_counter()
+    if mode == "all":
+        images = [image for _, image in iter_page_images(data, dpi=dpi)]
+        for image in images:
+            consume(image)
+    else:
+        for _, image in iter_page_images(data, dpi=dpi, num_threads=num_threads):
+            consume(image)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux.
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed} {peak_mb}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run[0], args.run[1], args.dpi, args.threads)
+        return
+
+    print(f"{'pages':>6} {'mode':>10} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for num_pages in args.pages:
+            path = os.path.join(tmpdir, f"doc_{num_pages}.pdf")
+            make_pdf(path, num_pages)
+            for mode in ["all", "streaming"]:
+                output = subprocess.check_output(
+                    [sys.executable, __file__, "--dpi", str(args.dpi), "--threads", str(args.threads), "--run", path, mode],
+                    text=True,
+                )
+                elapsed, peak_mb = map(float, output.split())
+                print(f"{num_pages:>6} {mode:>10} {elapsed:>8.2f} {peak_mb:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Synthetic multi-page PDFs shared by the PDF benchmarks."""
+import pymupdf
+
+PARAGRAPH = (
+    "Indexify extracts structured data from unstructured documents. "
+    "This synthetic paragraph fills the page with enough text to make "
+    "text extraction and layout analysis do real work. "
+) * 6
+
+
+def make_pdf(path: str, num_pages: int, images_every: int = 4):
+    doc = pymupdf.open()
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 128, 128), False)
+    for page_num in range(num_pages):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Section {page_num + 1}", fontsize=18)
+        page.insert_textbox(pymupdf.Rect(72, 80, 540, 700), PARAGRAPH, fontsize=10)
+        if page_num % images_every == 0:
+            # Distinct images, so every page has its own image to extract.
+            pixmap.set_pixel(page_num % 128, 0, (page_num % 256, 0, 0))
+            page.insert_image(pymupdf.Rect(72, 700, 200, 828), pixmap=pixmap)
+    doc.save(path)
+    doc.close()
@@ -0,0 +1,104 @@
+"""
+Benchmarks table cell OCR on synthetic table images: one OCR call per cell
+against text detection once per table with words assigned to the cells.
+
+    python table_ocr_benchmark.py --tables 4 --rows 40 --cols 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "pdfextractor"))
+
+from utils.tt_module import apply_ocr, load_reader  # noqa: E402
+
+CELL_WIDTH = 120
+CELL_HEIGHT = 32
+
+
+def make_table(rows: int, cols: int, empty_fraction: float, seed: int):
+    """
+    Renders a table and returns the image, the cell coordinates in the format
+    of get_cell_coordinates_by_row and the expected rows.
+    """
+    rng = random.Random(seed)
+    font = ImageFont.load_default(size=16)
+    image = Image.new("RGB", (cols * CELL_WIDTH, rows * CELL_HEIGHT), "white")
+    draw = ImageDraw.Draw(image)
+    cell_coordinates = []
+    expected = []
+    for r in range(rows):
+        row_bbox = [0, r * CELL_HEIGHT, cols * CELL_WIDTH, (r + 1) * CELL_HEIGHT]
+        cells = []
+        texts = []
+        for c in range(cols):
+            bbox = [c * CELL_WIDTH, r * CELL_HEIGHT, (c + 1) * CELL_WIDTH, (r + 1) * CELL_HEIGHT]
+            draw.rectangle(bbox, outline="black")
+            text = "" if rng.random() < empty_fraction else f"{rng.randint(0, 99999)}"
+            if text:
+                draw.text((bbox[0] + 10, bbox[1] + 7), text, fill="black", font=font)
+                texts.append(text)
+            column_bbox = [bbox[0], 0, bbox[2], rows * CELL_HEIGHT]
+            cells.append({"column": column_bbox, "cell": bbox})
+        cell_coordinates.append({"row": row_bbox, "cells": cells, "cell_count": cols})
+        expected.append(texts)
+    return image, cell_coordinates, expected
+
+
+def per_cell_ocr(cell_coordinates, table_image):
+    reader = load_reader()
+    data = {}
+    for idx, row in enumerate(cell_coordinates):
+        row_text = []
+        for cell in row["cells"]:
+            result = reader.readtext(np.array(table_image.crop(cell["cell"])))
+            if len(result) > 0:
+                row_text.append(" ".join([x[1] for x in result]))
+        data[idx] = row_text
+    return data
+
+
+def accuracy(data, expected):
+    correct = total = 0
+    for idx, texts in enumerate(expected):
+        found = [text for text in data[idx] if text]
+        total += len(texts)
+        correct += sum(1 for a, b in zip(found, texts) if a.replace(" ", "") == b)
+    return correct / max(total, 1)
+
+
+def run(tables, ocr):
+    start = time.perf_counter()
+    scores = [accuracy(ocr(cells, image), expected) for image, cells, expected in tables]
+    return time.perf_counter() - start, sum(scores) / len(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--empty-fraction", type=float, default=0.1)
+    args = parser.parse_args()
+
+    tables = [make_table(args.rows, args.cols, args.empty_fraction, seed) for seed in range(args.tables)]
+    # Load the OCR models before timing.
+    load_reader()
+
+    per_cell, per_cell_accuracy = run(tables, per_cell_ocr)
+    per_table, per_table_accuracy = run(tables, apply_ocr)
+
+    num_cells = args.tables * args.rows * args.cols
+    print(f"{args.tables} tables x {args.rows} rows x {args.cols} columns")
+    print(f"per cell:  {per_cell:.2f}s ({num_cells / per_cell:.0f} cells/s), accuracy {per_cell_accuracy:.3f}")
+    print(f"per table: {per_table:.2f}s ({num_cells / per_table:.0f} cells/s), accuracy {per_table_accuracy:.3f}")
+    print(f"speedup:   {per_cell / per_table:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
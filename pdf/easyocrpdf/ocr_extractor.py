@@ -1,9 +1,17 @@
 from typing import List, Union
 import io
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.pdf.documents import open_pdf, page_to_array
+from indexify_extractor_sdk.pdf.page_classifier import route_pages
+from pydantic import BaseModel
 from .utils.ocr_module import get_text
-import fitz
-import tempfile
+
+# Resolution pages without a usable text layer are rasterized at for OCR.
+OCR_DPI = 200
+
+class OCRExtractorConfig(BaseModel):
+    # OCR every page, even when it has a usable text layer.
+    force_ocr: bool = False
 
 class OCRExtractor(Extractor):
     name = "tensorlake/easyocr"
@@ -14,36 +22,25 @@ class OCRExtractor(Extractor):
     def __init__(self):
         super().__init__()
 
-    def extract(self, content: Content, params = None) -> List[Union[Feature, Content]]:
+    def extract(self, content: Content, params: OCRExtractorConfig = None) -> List[Union[Feature, Content]]:
+        params = params or OCRExtractorConfig()
         contents = []
-        full_text = ""
 
         suffix = f'.{content.content_type.split("/")[-1]}'
         if not suffix.endswith(".pdf"):
             image_text = get_text(content.data)
             contents.append(Content.from_text(image_text))
         else:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
-                inputtmpfile.write(content.data)
-                inputtmpfile.flush()
-
-                doc = fitz.open(inputtmpfile.name)
-                for i in range(len(doc)):
-                    page = doc[i]
-                    page_text = page.get_text()
-                    image_list = page.get_images()
-
-                    if page_text:
-                        full_text += page_text + " "
-
-                    for img in image_list:
-                        xref = img[0]
-                        pix = fitz.Pixmap(doc, xref)
-                        image_text = get_text(pix.tobytes())
-                        full_text += image_text + " "
-                
-                feature = Feature.metadata(value={"type": "text"})
-                contents.append(Content.from_text(full_text, features=[feature]))
+            with open_pdf(content.data) as doc:
+                # Only pages without a usable text layer are rasterized and OCR'd.
+                def ocr(page_nums):
+                    return [get_text(page_to_array(doc[n], OCR_DPI)) for n in page_nums]
+
+                pages = route_pages(doc, ocr, force_ocr=params.force_ocr)
+                full_text = " ".join(page.text for page in pages if page.text)
+
+            feature = Feature.metadata(value={"type": "text"})
+            contents.append(Content.from_text(full_text, features=[feature]))
         
         return contents
 
@@ -1,8 +1,13 @@
 import easyocr
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def get_reader():
+    # Create the EasyOCR reader once, loading its models is expensive
+    return easyocr.Reader(['en'])
 
 def get_text(image):
-    # Create an instance of the EasyOCR reader
-    reader = easyocr.Reader(['en'])
+    reader = get_reader()
 
     # Perform text detection and recognition
     result = reader.readtext(image, detail = 0)
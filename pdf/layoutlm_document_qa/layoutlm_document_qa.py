@@ -1,10 +1,23 @@
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.pdf.documents import iter_page_images, open_pdf
+from indexify_extractor_sdk.pdf.page_classifier import classify_pages
 from typing import List
 from transformers import pipeline
 from pydantic import BaseModel
-from pdf2image import convert_from_bytes
 import tempfile
 
+# Resolution pages without a usable text layer are rasterized at for OCR.
+OCR_DPI = 200
+
+
+def page_word_boxes(page):
+    # The pipeline expects boxes normalized to a 0-1000 grid.
+    width, height = page.rect.width, page.rect.height
+    return [
+        (text, [int(1000 * x0 / width), int(1000 * y0 / height), int(1000 * x1 / width), int(1000 * y1 / height)])
+        for x0, y0, x1, y1, text, *_ in page.get_text("words")
+    ]
+
 
 class LayoutLMDocumentQAConfig(BaseModel):
     query: str = "What is the invoice total?"
@@ -34,18 +47,31 @@ class LayoutLMDocumentQA(Extractor):
         return result
 
     def extract_from_pdf(self, content: Content, params: LayoutLMDocumentQAConfig):
-        images = convert_from_bytes(content.data)
         results = []
-        # iterate over each image
-        for i, img in enumerate(images):
-            with tempfile.NamedTemporaryFile(suffix=".jpg", delete=True) as tmpfile:
-                img.save(tmpfile.name)
-                result = self.nlp(tmpfile.name, params.query)[0]
-                result["page"] = i
+        with open_pdf(content.data) as doc:
+            ocr_pages = []
+            for page, classification in zip(doc, classify_pages(doc)):
+                if classification.needs_ocr:
+                    ocr_pages.append(page.number)
+                    continue
+                # words and boxes from the text layer, no OCR needed
+                word_boxes = page_word_boxes(page)
+                if not word_boxes:
+                    # a blank page, nothing to answer from
+                    continue
+                result = self.nlp(None, params.query, word_boxes=word_boxes)[0]
+                result["page"] = page.number
                 results.append(result)
-        sorted_results = sorted(results, key=lambda x: x["score"], reverse=True)
+
+        # the pipeline runs tesseract on the page images, rasterized a few at a time
+        for page_num, img in iter_page_images(content.data, dpi=OCR_DPI, page_nums=ocr_pages):
+            result = self.nlp(img, params.query)[0]
+            result["page"] = page_num
+            results.append(result)
+        if not results:
+            return {}
         # return the highest score from the results
-        return sorted_results[0]
+        return max(results, key=lambda x: x["score"])
 
     def extract(
         self, content: Content, params: LayoutLMDocumentQAConfig
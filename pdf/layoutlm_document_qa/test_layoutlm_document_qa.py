@@ -0,0 +1,53 @@
+import unittest
+
+import pymupdf
+
+from indexify_extractor_sdk import Content
+
+from layoutlm_document_qa import LayoutLMDocumentQA, LayoutLMDocumentQAConfig
+
+
+class FakePipeline:
+    """Answers with the first word of the page, and records the calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, image, query, word_boxes=None):
+        self.calls.append(word_boxes)
+        return [{"answer": word_boxes[0][0], "score": 0.9}]
+
+
+def make_pdf(*texts) -> bytes:
+    doc = pymupdf.open()
+    for text in texts:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text, fontsize=11)
+    return doc.tobytes()
+
+
+class TestLayoutLMDocumentQA(unittest.TestCase):
+    def setUp(self):
+        # the model isn't needed to route the pages
+        self.extractor = LayoutLMDocumentQA.__new__(LayoutLMDocumentQA)
+        self.extractor.nlp = FakePipeline()
+
+    def extract(self, data: bytes):
+        content = Content(content_type="application/pdf", data=data)
+        return self.extractor.extract(content, LayoutLMDocumentQAConfig())[0].value
+
+    def test_skips_blank_pages(self):
+        value = self.extract(make_pdf("", "Total 42.00", ""))
+        self.assertEqual(value["answer"], "Total")
+        self.assertEqual(value["page"], 1)
+        self.assertEqual(len(self.extractor.nlp.calls), 1)
+
+    def test_blank_document(self):
+        value = self.extract(make_pdf("", ""))
+        self.assertIsNone(value["answer"])
+        self.assertEqual(self.extractor.nlp.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,12 @@
 from marker.convert import convert_single_pdf
 from marker.models import load_all_models
-import tempfile
-from indexify_extractor_sdk import Content, Extractor, Feature
+import io
+from indexify_extractor_sdk import Content, Feature, PageRangeExtractor
+from indexify_extractor_sdk.pdf.documents import open_pdf
+from indexify_extractor_sdk.spool import spooled_file
 
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, List, Union
+from typing import Optional, Literal, List, Tuple, Union
 
 class MarkdownExtractorConfig(BaseModel):
     max_pages: Optional[int] = None
@@ -13,7 +15,7 @@ class MarkdownExtractorConfig(BaseModel):
     batch_multiplier: Optional[int] = 2
     output_types: List[str] = Field(default_factory=lambda: ["text"])
 
-class MarkdownExtractor(Extractor):
+class MarkdownExtractor(PageRangeExtractor):
     name = "tensorlake/marker"
     description = "Markdown Extractor for PDFs"
     system_dependencies = ["ffmpeg", "libsm6", "libxext6"]
@@ -23,28 +25,49 @@ class MarkdownExtractor(Extractor):
         super(MarkdownExtractor, self).__init__()
         self.model_lst = load_all_models()
 
-    def extract(self, content: Content, params: MarkdownExtractorConfig) -> List[Union[Feature, Content]]:
+    def page_span(self, content: Content, params: MarkdownExtractorConfig) -> Tuple[int, int]:
+        with open_pdf(content.data) as doc:
+            num_pages = len(doc)
+        start = params.start_page or 0
+        end = num_pages if params.max_pages is None else min(num_pages, start + params.max_pages)
+        return start, end
+
+    def extract_page_range(self, content: Content, params: MarkdownExtractorConfig, start: int, end: int) -> List[Union[Feature, Content]]:
         contents = []
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
-            inputtmpfile.write(content.data)
-            inputtmpfile.flush()
+        langs = params.langs.split(",") if params.langs else None
 
-            langs = params.langs.split(",") if params.langs else None
+        # marker only reads documents from a path, the spooled file is removed once it's done.
+        with spooled_file(content.data, suffix=".pdf") as path:
+            full_text, images, out_meta = convert_single_pdf(path, self.model_lst, max_pages=end - start, langs=langs, batch_multiplier=params.batch_multiplier, start_page=start)
 
-            full_text, images, out_meta = convert_single_pdf(inputtmpfile.name, self.model_lst, max_pages=params.max_pages, langs=langs, batch_multiplier=params.batch_multiplier, start_page=params.start_page)
-            
-            if "text" in params.output_types:
-                feature = Feature.metadata(value=out_meta)
-                contents.append(Content.from_text(full_text, features=[feature]))
+        if "text" in params.output_types:
+            feature = Feature.metadata(value=out_meta)
+            contents.append(Content.from_text(full_text, features=[feature]))
 
-            if "image" in params.output_types:
-                for filename, image in images.items():
-                    feature = Feature.metadata({"type": "image", "file": filename})
-                    contents.append(Content(content_type="image/png", data=image, features=[feature]))
+        if "image" in params.output_types:
+            for filename, image in images.items():
+                # marker returns PIL images, encode them in memory.
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                feature = Feature.metadata({"type": "image", "file": filename})
+                contents.append(Content(content_type="image/png", data=buffer.getvalue(), features=[feature]))
 
         return contents
 
+    def merge_page_ranges(self, content: Content, params: MarkdownExtractorConfig, outputs: List[List[Union[Feature, Content]]]) -> List[Union[Feature, Content]]:
+        texts = [out for range_outputs in outputs for out in range_outputs if out.content_type == "text/plain"]
+        images = [out for range_outputs in outputs for out in range_outputs if out.content_type != "text/plain"]
+        if len(texts) <= 1:
+            return texts + images
+
+        # The metadata of the first range, with the page count of the whole document.
+        out_meta = dict(texts[0].features[0].value)
+        if "pages" in out_meta:
+            out_meta["pages"] = sum(text.features[0].value.get("pages", 0) for text in texts)
+        full_text = "\n\n".join(text.data.decode("utf-8") for text in texts)
+        return [Content.from_text(full_text, features=[Feature.metadata(value=out_meta)])] + images
+
     def sample_input(self) -> Content:
         return self.sample_scientific_pdf()
 
@@ -1,9 +1,10 @@
 from typing import List, Iterable, Optional
 from pydantic import BaseModel
 from indexify_extractor_sdk import Extractor, Content, Feature
-import tempfile
+from indexify_extractor_sdk.pdf.documents import open_pdf
+from indexify_extractor_sdk.pdf.page_classifier import route_pages
+import io
 import ocrmypdf
-import fitz
 
 
 class OCRMyPDFConfig(BaseModel):
@@ -12,6 +13,8 @@ class OCRMyPDFConfig(BaseModel):
     remove_background: Optional[bool] = None
     rotate_pages: Optional[bool] = None
     skip_text: Optional[bool] = True
+    # OCR every page, even when it has a usable text layer.
+    force_ocr: Optional[bool] = None
 
 
 class OCRMyPDFExtractor(Extractor):
@@ -25,25 +28,29 @@ class OCRMyPDFExtractor(Extractor):
         super(OCRMyPDFExtractor, self).__init__()
 
     def extract(self, content: Content, params: OCRMyPDFConfig) -> List[Content]:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
-            inputtmpfile.write(content.data)
-            inputtmpfile.flush()
+        options = {k: v for k, v in dict(params).items() if v is not None}
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as outtmpfile:
-                ocrmypdf.ocr(inputtmpfile.name, outtmpfile.name, **dict(params))
+        # Only the pages without a usable text layer go through ocrmypdf.
+        def ocr(page_nums):
+            page_options = dict(options, pages=",".join(str(n + 1) for n in page_nums))
+            # These pages were classified as needing OCR, any text they have is unusable.
+            page_options.pop("skip_text", None)
+            page_options["force_ocr"] = True
+            # ocrmypdf reads and writes the documents as streams, no temp files needed.
+            output = io.BytesIO()
+            ocrmypdf.ocr(io.BytesIO(content.data), output, **page_options)
+            with open_pdf(output.getvalue()) as ocr_doc:
+                return [ocr_doc[n].get_text() for n in page_nums]
 
-                contents = []
-                full_text = ""
+        contents = []
+        with open_pdf(content.data) as doc:
+            pages = route_pages(doc, ocr, force_ocr=bool(params.force_ocr))
+        full_text = "".join(page.text + " " for page in pages)
 
-                # extract text from each page
-                doc = fitz.open(outtmpfile.name)
-                for i, page in enumerate(doc):
-                    full_text += page.get_text() + " "
-                
-                feature = Feature.metadata(value={"type": "text"})
-                contents.append(Content.from_text(full_text, features=[feature]))
+        feature = Feature.metadata(value={"type": "text"})
+        contents.append(Content.from_text(full_text, features=[feature]))
 
-                return contents
+        return contents
 
     def sample_input(self) -> Content:
         return self.sample_image_based_pdf()
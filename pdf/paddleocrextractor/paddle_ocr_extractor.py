@@ -1,13 +1,16 @@
 from typing import List, Union
 import json
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.pdf.documents import iter_page_images, open_pdf
+from indexify_extractor_sdk.pdf.page_classifier import route_pages
 from pydantic import BaseModel, Field
-import tempfile
+import numpy as np
 from paddleocr import PaddleOCR
-from pdf2image import convert_from_path
 
 class PaddleOCRExtractorConfig(BaseModel):
     output_types: List[str] = Field(default_factory=lambda: ["text"])
+    # OCR every page, even when it has a usable text layer.
+    force_ocr: bool = False
 
 class PaddleOCRExtractor(Extractor):
     name = "tensorlake/paddleocr_extractor"
@@ -21,29 +24,30 @@ class PaddleOCRExtractor(Extractor):
 
     def extract(self, content: Content, params: PaddleOCRExtractorConfig) -> List[Union[Feature, Content]]:
         contents = []
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
-            inputtmpfile.write(content.data)
-            inputtmpfile.flush()
-
-            if "text" in params.output_types:
-                # Convert PDF to images
-                images = convert_from_path(inputtmpfile.name, dpi=200)  # Adjust DPI as needed
-
-                all_texts = []
-                for image in images:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as img_file:
-                        image.save(img_file.name, 'PNG')
-                        result = self.ocr.ocr(img_file.name, cls=True)
-                        for res in result:
-                            texts = [line[1][0] for line in res]
-                            all_texts.extend(texts)
-
-                md_text = "\n".join(all_texts)
-                feature = Feature.metadata(value={"type": "text"})
-                contents.append(Content.from_text(md_text, features=[feature]))
+        if "text" in params.output_types:
+            with open_pdf(content.data) as doc:
+                # Only pages without a usable text layer are rasterized and OCR'd.
+                pages = route_pages(doc, self._ocr_pages(content.data), force_ocr=params.force_ocr)
+            md_text = "\n".join(page.text for page in pages if page.text)
+            feature = Feature.metadata(value={"type": "text"})
+            contents.append(Content.from_text(md_text, features=[feature]))
 
         return contents
 
+    def _ocr_pages(self, data):
+        def ocr(page_nums):
+            texts = []
+            # Pages are rasterized a few at a time rather than all up front.
+            for _, image in iter_page_images(data, dpi=200, page_nums=page_nums, as_array=True):  # Adjust DPI as needed
+                # PaddleOCR expects BGR images, like the ones read by OpenCV.
+                result = self.ocr.ocr(np.ascontiguousarray(image[:, :, ::-1]), cls=True)
+                lines = []
+                for res in result:
+                    lines.extend([line[1][0] for line in res or []])
+                texts.append("\n".join(lines))
+            return texts
+        return ocr
+
     def sample_input(self) -> Content:
         return self.sample_scientific_pdf()
 
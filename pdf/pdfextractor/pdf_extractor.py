@@ -1,18 +1,17 @@
-from typing import List, Union, Optional, Literal
+from typing import Dict, List, Union, Literal, Tuple
 import json
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, Feature, PageRangeExtractor
+from indexify_extractor_sdk.pdf.documents import open_pdf
 from pydantic import BaseModel, Field
 from .utils.tt_module import get_tables
-import pymupdf
-import fitz
-import pymupdf4llm
-import tempfile
+from .utils.pages import extract_page_range
 
 class PDFExtractorConfig(BaseModel):
     output_types: List[str] = Field(default_factory=lambda: ["text"])
     output_format: Literal['markdown', 'text'] = "markdown"
+    table_dpi: int = 200
 
-class PDFExtractor(Extractor):
+class PDFExtractor(PageRangeExtractor):
     name = "tensorlake/pdfextractor"
     description = "PDF Extractor for Texts, Images & Tables"
     system_dependencies = ["poppler-utils"]
@@ -21,38 +20,47 @@ class PDFExtractor(Extractor):
     def __init__(self):
         super(PDFExtractor, self).__init__()
 
-    def extract(self, content: Content, params: PDFExtractorConfig) -> List[Union[Feature, Content]]:
-        contents = []
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
-            inputtmpfile.write(content.data)
-            inputtmpfile.flush()
+    def page_span(self, content: Content, params: PDFExtractorConfig) -> Tuple[int, int]:
+        with open_pdf(content.data) as doc:
+            return 0, len(doc)
+
+    def extract_page_range(self, content: Content, params: PDFExtractorConfig, start: int, end: int) -> List[Union[Feature, Content]]:
+        pages = extract_page_range(content.data, start, end, params.output_types, params.output_format)
+        tables = {}
+        if "table" in params.output_types:
+            tables = get_tables(content.data, dpi=params.table_dpi, page_nums=range(start, end))
+        return self._to_contents(pages, tables, params)
+
+    def merge_page_ranges(self, content: Content, params: PDFExtractorConfig, outputs: List[List[Union[Feature, Content]]]) -> List[Union[Feature, Content]]:
+        # Keep the layout of a single call: the text of all the pages first,
+        # then the images, then the tables.
+        texts, others = [], []
+        for range_outputs in outputs:
+            for out in range_outputs:
+                (texts if out.content_type == "text/plain" else others).append(out)
+        others.sort(key=lambda out: out.content_type == "application/json")
 
-            if "text" in params.output_types:
-                if params.output_format == "markdown":
-                    md_text = pymupdf4llm.to_markdown(inputtmpfile.name)
-                    contents.append(Content.from_text(md_text))
-                else:
-                    with pymupdf.open(inputtmpfile.name) as doc:
-                        for page_num, page in enumerate(doc):
-                            text = page.get_text()
-                            contents.append(Content.from_text(text, features=[Feature.metadata({"page_num": page_num})]))
+        if "text" in params.output_types and params.output_format == "markdown":
+            texts = [Content.from_text("".join(out.data.decode("utf-8") for out in texts))]
+        return texts + others
+
+    def _to_contents(self, pages: Dict, tables: Dict, params: PDFExtractorConfig) -> List[Union[Feature, Content]]:
+        contents = []
+        if "text" in params.output_types:
+            if params.output_format == "markdown":
+                contents.append(Content.from_text(pages["markdown"]))
+            else:
+                for page_num, text in pages["text"]:
+                    contents.append(Content.from_text(text, features=[Feature.metadata({"page_num": page_num})]))
 
-            if "image" in params.output_types:
-                doc = fitz.open(inputtmpfile.name)
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    for img_index, img in enumerate(page.get_images(full=True)):
-                        xref = img[0]
-                        base_image = doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        feature = Feature.metadata({"page": page_num, "img_num": img_index})
-                        contents.append(Content(content_type="image/png", data=image_bytes, features=[feature]))
+        if "image" in params.output_types:
+            for page_num, img_index, image_bytes in pages["images"]:
+                feature = Feature.metadata({"page": page_num, "img_num": img_index})
+                contents.append(Content(content_type="image/png", data=image_bytes, features=[feature]))
 
-            if "table" in params.output_types:
-                tables = get_tables(content.data)
-                for page_index, content in tables.items():
-                    feature = Feature.metadata({"page": page_index})
-                    contents.append(Content(content_type="application/json", data=json.dumps(content), features=[feature]))
+        for page_index, table in tables.items():
+            feature = Feature.metadata({"page": page_index})
+            contents.append(Content(content_type="application/json", data=json.dumps(table), features=[feature]))
 
         return contents
 
@@ -0,0 +1,31 @@
+from typing import Dict, List
+
+import pymupdf4llm
+from indexify_extractor_sdk.pdf.documents import open_pdf
+
+
+def extract_page_range(
+    data: bytes, start: int, end: int, output_types: List[str], output_format: str
+) -> Dict:
+    """
+    Extracts the text and the images of the pages [start, end) of the PDF in
+    `data`.
+    """
+    result = {"markdown": None, "text": [], "images": []}
+    with open_pdf(data) as doc:
+        if "text" in output_types:
+            if output_format == "markdown":
+                result["markdown"] = pymupdf4llm.to_markdown(
+                    doc, pages=list(range(start, end))
+                )
+            else:
+                for page_num in range(start, end):
+                    result["text"].append((page_num, doc[page_num].get_text()))
+
+        if "image" in output_types:
+            for page_num in range(start, end):
+                page = doc.load_page(page_num)
+                for img_index, img in enumerate(page.get_images(full=True)):
+                    base_image = doc.extract_image(img[0])
+                    result["images"].append((page_num, img_index, base_image["image"]))
+    return result
@@ -1,27 +1,57 @@
 from transformers import AutoModelForObjectDetection
 import torch
-from pdf2image import convert_from_bytes
 from torchvision import transforms
 from transformers import TableTransformerForObjectDetection
 import numpy as np
 import easyocr
-from tqdm.auto import tqdm
+import logging
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from indexify_extractor_sdk.pdf.documents import iter_page_images, open_pdf
+
+logger = logging.getLogger(__name__)
 
-model = AutoModelForObjectDetection.from_pretrained("microsoft/table-transformer-detection", revision="no_timm")
-model.config.id2label
 device = "cuda" if torch.cuda.is_available() else "cpu"
-model.to(device)
-structure_model = TableTransformerForObjectDetection.from_pretrained("microsoft/table-structure-recognition-v1.1-all")
-structure_model.to(device)
-reader = easyocr.Reader(['en'])
-
-def pdf_to_img(pdf_path):
-    image_list = []
-    images = convert_from_bytes(pdf_path)
-    for i in range(len(images)):
-        image = images[i].convert("RGB")
-        image_list.append(image)
-    return image_list
+
+# Resolution pages are rasterized at, same as the pdf2image default.
+DEFAULT_DPI = 200
+
+# Number of pages sent through the detection model in one forward pass.
+DEFAULT_BATCH_SIZE = 8
+
+# Batch size of the OCR recognition model.
+OCR_BATCH_SIZE = 32
+
+detection_class_thresholds = {
+    "table": 0.5,
+    "table rotated": 0.5,
+    "no object": 10
+}
+
+class TableModels:
+    def __init__(self):
+        self.model = AutoModelForObjectDetection.from_pretrained("microsoft/table-transformer-detection", revision="no_timm")
+        self.model.to(device)
+        self.model.eval()
+        self.id2label = dict(self.model.config.id2label)
+        self.id2label[len(self.id2label)] = "no object"
+
+        self.structure_model = TableTransformerForObjectDetection.from_pretrained("microsoft/table-structure-recognition-v1.1-all")
+        self.structure_model.to(device)
+        self.structure_model.eval()
+        self.structure_id2label = dict(self.structure_model.config.id2label)
+        self.structure_id2label[len(self.structure_id2label)] = "no object"
+
+@lru_cache(maxsize=None)
+def load_models() -> TableModels:
+    return TableModels()
+
+@lru_cache(maxsize=None)
+def load_reader():
+    # The OCR model is only needed for tables without a text layer.
+    return easyocr.Reader(['en'])
 
 class MaxResize(object):
     def __init__(self, max_size=800):
@@ -35,6 +65,44 @@ class MaxResize(object):
 
         return resized_image
 
+detection_transform = transforms.Compose([
+    MaxResize(800),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+structure_transform = transforms.Compose([
+    MaxResize(1000),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+def page_tokens(page, dpi=DEFAULT_DPI):
+    """
+    Returns the words of the PDF text layer of the page, with their bounding
+    boxes in the pixel coordinates of the page rasterized at `dpi`.
+    """
+    scale = dpi / 72
+    tokens = []
+    for x0, y0, x1, y1, text, *_ in page.get_text("words"):
+        tokens.append({'text': text, 'bbox': [x0*scale, y0*scale, x1*scale, y1*scale]})
+    return tokens
+
+def batch_pixel_values(images, transform):
+    """
+    Transforms the images and pads them to a single batch. The pixel mask
+    marks the real pixels of every image.
+    """
+    tensors = [transform(image) for image in images]
+    height = max(t.shape[1] for t in tensors)
+    width = max(t.shape[2] for t in tensors)
+    pixel_values = torch.zeros((len(tensors), 3, height, width))
+    pixel_mask = torch.zeros((len(tensors), height, width), dtype=torch.long)
+    for i, t in enumerate(tensors):
+        pixel_values[i, :, :t.shape[1], :t.shape[2]] = t
+        pixel_mask[i, :t.shape[1], :t.shape[2]] = 1
+    return pixel_values.to(device), pixel_mask.to(device)
+
 def box_cxcywh_to_xyxy(x):
     x_c, y_c, w, h = x.unbind(-1)
     b = [(x_c - 0.5 * w), (y_c - 0.5 * h), (x_c + 0.5 * w), (y_c + 0.5 * h)]
@@ -46,11 +114,11 @@ def rescale_bboxes(out_bbox, size):
     b = b * torch.tensor([img_w, img_h, img_w, img_h], dtype=torch.float32)
     return b
 
-def outputs_to_objects(outputs, img_size, id2label):
-    m = outputs.logits.softmax(-1).max(-1)
+def outputs_to_objects(outputs, img_size, id2label, index=0):
+    m = outputs.logits[index:index+1].softmax(-1).max(-1)
     pred_labels = list(m.indices.detach().cpu().numpy())[0]
     pred_scores = list(m.values.detach().cpu().numpy())[0]
-    pred_bboxes = outputs['pred_boxes'].detach().cpu()[0]
+    pred_bboxes = outputs['pred_boxes'].detach().cpu()[index]
     pred_bboxes = [elem.tolist() for elem in rescale_bboxes(pred_bboxes, img_size)]
 
     objects = []
@@ -62,6 +130,28 @@ def outputs_to_objects(outputs, img_size, id2label):
 
     return objects
 
+def iob(bbox1, bbox2):
+    """
+    Computes the intersection area over the area of the first bounding box.
+    """
+    return iob_matrix(np.array([bbox1], dtype=np.float32), np.array([bbox2], dtype=np.float32))[0, 0]
+
+def iob_matrix(boxes1, boxes2):
+    """
+    Computes the intersection over the area of each box of `boxes1` with every
+    box of `boxes2`. Boxes are (x0, y0, x1, y1) rows, the result is a
+    len(boxes1) x len(boxes2) matrix.
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+    x0 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y0 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x1 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y1 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    intersection = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    return intersection / np.maximum(area, 1e-6)[:, None]
+
 def objects_to_crops(img, tokens, objects, class_thresholds, padding=10):
     """
     Process the bounding boxes produced by the table detection model into
@@ -80,7 +170,7 @@ def objects_to_crops(img, tokens, objects, class_thresholds, padding=10):
 
         cropped_img = img.crop(bbox)
 
-        table_tokens = [token for token in tokens if iob(token['bbox'], bbox) >= 0.5]
+        table_tokens = [dict(token) for token in tokens if iob(token['bbox'], bbox) >= 0.5]
         for token in table_tokens:
             token['bbox'] = [token['bbox'][0]-bbox[0],
                              token['bbox'][1]-bbox[1],
@@ -139,29 +229,93 @@ def get_cell_coordinates_by_row(table_data):
 
     return cell_coordinates
 
-def apply_ocr(cell_coordinates, cropped_table):
-    # let's OCR row by row
+def assign_tokens_to_cells(cell_coordinates, tokens):
+    """
+    Fills the text of every cell with the text layer tokens lying inside it.
+    Returns one list of cell texts per row, empty strings for cells without
+    tokens.
+    """
+    cells = [cell["cell"] for row in cell_coordinates for cell in row["cells"]]
+    texts = [""] * len(cells)
+    if len(cells) > 0 and len(tokens) > 0:
+        overlap = iob_matrix([token['bbox'] for token in tokens], cells)
+        best_cell = overlap.argmax(axis=1)
+        cell_tokens = defaultdict(list)
+        for token_index in np.nonzero(overlap.max(axis=1) >= 0.5)[0]:
+            cell_tokens[best_cell[token_index]].append(tokens[token_index])
+        for cell_index, in_cell in cell_tokens.items():
+            in_cell.sort(key=lambda t: (round(t['bbox'][1]), t['bbox'][0]))
+            texts[cell_index] = " ".join(t['text'] for t in in_cell)
+
+    rows = []
+    offset = 0
+    for row in cell_coordinates:
+        rows.append(texts[offset:offset + len(row["cells"])])
+        offset += len(row["cells"])
+    return rows
+
+def quad_to_bbox(quad):
+    xs = [point[0] for point in quad]
+    ys = [point[1] for point in quad]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+def ocr_missing_cells(cell_coordinates, table_image, cell_texts, batch_size=OCR_BATCH_SIZE):
+    """
+    OCRs the cells without text. Text detection runs once on the whole table
+    and the words are assigned to the cells by IoB, the cells still empty
+    after that are recognized in a single batched call.
+    """
+    reader = load_reader()
+    cells = [cell["cell"] for row in cell_coordinates for cell in row["cells"]]
+    texts = [text for row in cell_texts for text in row]
+    if all(texts):
+        return cell_texts
+
+    words = [{'text': text, 'bbox': quad_to_bbox(quad)} for quad, text, _ in reader.readtext(table_image, batch_size=batch_size)]
+    words_by_cell = [text for row in assign_tokens_to_cells(cell_coordinates, words) for text in row]
+    texts = [text or word_text for text, word_text in zip(texts, words_by_cell)]
+
+    height, width = table_image.shape[:2]
+    boxes = []
+    for cell, text in zip(cells, texts):
+        if text:
+            continue
+        x0, y0 = max(int(cell[0]), 0), max(int(cell[1]), 0)
+        x1, y1 = min(int(np.ceil(cell[2])), width), min(int(np.ceil(cell[3])), height)
+        if x1 > x0 and y1 > y0:
+            boxes.append([x0, x1, y0, y1])
+    if len(boxes) > 0:
+        results = reader.recognize(table_image, horizontal_list=boxes, free_list=[], batch_size=batch_size)
+        recognized = [{'text': text, 'bbox': quad_to_bbox(quad)} for quad, text, _ in results if text]
+        recognized_by_cell = [text for row in assign_tokens_to_cells(cell_coordinates, recognized) for text in row]
+        texts = [text or recognized_text for text, recognized_text in zip(texts, recognized_by_cell)]
+
+    rows = []
+    offset = 0
+    for row in cell_coordinates:
+        rows.append(texts[offset:offset + len(row["cells"])])
+        offset += len(row["cells"])
+    return rows
+
+def apply_ocr(cell_coordinates, cropped_table, cell_texts=None):
+    """
+    OCRs the cells of the table which don't have a text yet, and returns the
+    table rows as lists of non empty cell texts, padded to the same length.
+    """
+    if cell_texts is None:
+        cell_texts = [["" for _ in row["cells"]] for row in cell_coordinates]
+    cell_texts = ocr_missing_cells(cell_coordinates, np.array(cropped_table), cell_texts)
+
     data = dict()
     max_num_columns = 0
-    for idx, row in enumerate(tqdm(cell_coordinates)):
-      row_text = []
-      for cell in row["cells"]:
-        # crop cell out of image
-        cell_image = np.array(cropped_table.crop(cell["cell"]))
-        # apply OCR
-        result = reader.readtext(np.array(cell_image))
-        if len(result) > 0:
-          # print([x[1] for x in list(result)])
-          text = " ".join([x[1] for x in result])
-          row_text.append(text)
+    for idx, row_texts in enumerate(cell_texts):
+      row_text = [text for text in row_texts if len(text) > 0]
 
       if len(row_text) > max_num_columns:
           max_num_columns = len(row_text)
 
       data[idx] = row_text
 
-    print("Max number of columns:", max_num_columns)
-
     # pad rows which don't have max_num_columns elements
     # to make sure all rows have the same number of columns
     for row, row_data in data.copy().items():
@@ -171,60 +325,71 @@ def apply_ocr(cell_coordinates, cropped_table):
 
     return data
 
-def get_tables(pdf_path):
-    image_list = pdf_to_img(pdf_path)
+def get_tables(pdf_bytes, dpi=DEFAULT_DPI, batch_size=DEFAULT_BATCH_SIZE, num_threads=1, timings=None, page_nums=None):
+    """
+    Detects and extracts the tables of a PDF, or of its pages `page_nums`.
+    Pages are rasterized a batch at a time with `num_threads` threads, the
+    detection model runs on batches of pages and the structure model on all
+    the tables found in a batch. Cell text comes from the PDF text layer, only
+    the cells without one are OCR'd. Per stage timings are added to `timings`.
+    """
+    if timings is None:
+        timings = defaultdict(float)
+    models = load_models()
     data_dict = {}
-    for index, image in enumerate(image_list):
-        detection_transform = transforms.Compose([
-            MaxResize(800),
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-        ])
-
-        pixel_values = detection_transform(image).unsqueeze(0)
-        pixel_values = pixel_values.to(device)
-
-        with torch.no_grad():
-            outputs = model(pixel_values)
-
-        id2label = model.config.id2label
-        id2label[len(model.config.id2label)] = "no object"
-
-        objects = outputs_to_objects(outputs, image.size, id2label)
-
-        tokens = []
-        detection_class_thresholds = {
-            "table": 0.5,
-            "table rotated": 0.5,
-            "no object": 10
-        }
-        crop_padding = 10
-
-        tables_crops = objects_to_crops(image, tokens, objects, detection_class_thresholds, padding=0)
-        
-        for table_index, table_crop in enumerate(tables_crops):
-            cropped_table = table_crop['image'].convert("RGB")
-
-            structure_transform = transforms.Compose([
-                MaxResize(1000),
-                transforms.ToTensor(),
-                transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-            ])
-
-            pixel_values = structure_transform(cropped_table).unsqueeze(0)
-            pixel_values = pixel_values.to(device)
 
+    pages = iter_page_images(pdf_bytes, dpi=dpi, batch_size=batch_size, num_threads=num_threads, page_nums=page_nums)
+    with open_pdf(pdf_bytes) as doc:
+        while True:
+            start = time.perf_counter()
+            batch = list(islice(pages, batch_size))
+            timings["rasterize"] += time.perf_counter() - start
+            if len(batch) == 0:
+                break
+            page_indexes = [index for index, _ in batch]
+            images = [image for _, image in batch]
+
+            start = time.perf_counter()
+            pixel_values, pixel_mask = batch_pixel_values(images, detection_transform)
             with torch.no_grad():
-                outputs = structure_model(pixel_values)
-
-            structure_id2label = structure_model.config.id2label
-            structure_id2label[len(structure_id2label)] = "no object"
+                outputs = models.model(pixel_values, pixel_mask=pixel_mask)
+            timings["detection"] += time.perf_counter() - start
+
+            crops = []
+            for i, (index, image) in enumerate(zip(page_indexes, images)):
+                objects = outputs_to_objects(outputs, image.size, models.id2label, index=i)
+                if len(objects) == 0:
+                    continue
+                start = time.perf_counter()
+                tokens = page_tokens(doc[index], dpi)
+                timings["text_layer"] += time.perf_counter() - start
+                tables_crops = objects_to_crops(image, tokens, objects, detection_class_thresholds, padding=0)
+                for table_index, table_crop in enumerate(tables_crops):
+                    crops.append((f"{index+1}.{table_index+1}", table_crop))
+            if len(crops) == 0:
+                continue
+
+            start = time.perf_counter()
+            cropped_tables = [table_crop['image'].convert("RGB") for _, table_crop in crops]
+            pixel_values, pixel_mask = batch_pixel_values(cropped_tables, structure_transform)
+            with torch.no_grad():
+                outputs = models.structure_model(pixel_values, pixel_mask=pixel_mask)
+            timings["structure"] += time.perf_counter() - start
 
-            cells = outputs_to_objects(outputs, cropped_table.size, structure_id2label)
-            if cells[0]['score'] > 0.95:
+            for i, ((key, table_crop), cropped_table) in enumerate(zip(crops, cropped_tables)):
+                cells = outputs_to_objects(outputs, cropped_table.size, models.structure_id2label, index=i)
+                if len(cells) == 0 or cells[0]['score'] <= 0.95:
+                    continue
                 cell_coordinates = get_cell_coordinates_by_row(cells)
 
-                data = apply_ocr(cell_coordinates, cropped_table)
-                data_dict[f"{index+1}.{table_index+1}"] = data
-    
+                start = time.perf_counter()
+                cell_texts = assign_tokens_to_cells(cell_coordinates, table_crop['tokens'])
+                timings["text_layer"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                data_dict[key] = apply_ocr(cell_coordinates, cropped_table, cell_texts)
+                timings["ocr"] += time.perf_counter() - start
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("table extraction timings: %s", ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
     return data_dict
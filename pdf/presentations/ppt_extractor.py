@@ -1,63 +1,114 @@
-from typing import List, Union, Optional
+
+from typing import Dict, List, Tuple, Union
 from pydantic import BaseModel, Field
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, Feature, PageRangeExtractor
 from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE_TYPE
+from itertools import islice
+import io
 import requests
-import tempfile
 
 class PPTExtractorConfig(BaseModel):
-    output_types: List[str] = Field(default_factory=lambda: ["text", "table"])
+    output_types: List[str] = Field(default_factory=lambda: ["text", "table", "image"])
+
+def iter_shapes(shapes):
+    # Shapes inside groups are walked as well.
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_shapes(shape.shapes)
+        else:
+            yield shape
+
+def walk_slide(slide, output_types: List[str], seen_images: set) -> Dict:
+    """
+    Collects the text, images and tables of a slide in a single pass over its
+    shapes. Images already in `seen_images` are only referenced by hash.
+    """
+    result = {"text": [], "images": [], "tables": []}
+    for shape in iter_shapes(slide.shapes):
+        if shape.has_text_frame:
+            if "text" in output_types:
+                result["text"].extend(paragraph.text for paragraph in shape.text_frame.paragraphs)
+        elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            if "image" in output_types:
+                image = shape.image
+                blob = None
+                if image.sha1 not in seen_images:
+                    seen_images.add(image.sha1)
+                    blob = image.blob
+                result["images"].append((image.sha1, image.content_type, blob))
+        elif shape.has_table:
+            if "table" in output_types:
+                result["tables"].append([[cell.text for cell in row.cells] for row in shape.table.rows])
+    return result
 
-class PPTExtractor(Extractor):
+def walk_slides(prs, start: int, end: int, output_types: List[str]) -> List[Dict]:
+    seen_images = set()
+    # Indexing prs.slides rescans the slide list, iterate over it instead.
+    return [walk_slide(slide, output_types, seen_images) for slide in islice(prs.slides, start, end)]
+
+class PPTExtractor(PageRangeExtractor):
     name = "tensorlake/ppt"
     description = "An extractor that let's you extract information from presentations."
     system_dependencies = []
     input_mime_types = ["application/vnd.ms-powerpoint", "application/vnd.openxmlformats-officedocument.presentationml.presentation"]
 
+    # Every range opens the whole deck again, so ranges are longer than the
+    # ones of PDFs, whose pages are loaded on their own.
+    pages_per_range = 128
+    min_pages_to_split = 256
+
     def __init__(self):
         super(PPTExtractor, self).__init__()
 
+    def page_span(self, content: Content, params: PPTExtractorConfig) -> Tuple[int, int]:
+        return 0, len(Presentation(io.BytesIO(content.data)).slides)
+
     def extract(self, content: Content, params: PPTExtractorConfig) -> List[Union[Feature, Content]]:
+        # In a single call the deck is walked in one pass rather than in ranges.
+        return self.extract_page_range(content, params, *self.page_span(content, params))
+
+    def extract_page_range(self, content: Content, params: PPTExtractorConfig, start: int, end: int) -> List[Union[Feature, Content]]:
+        prs = Presentation(io.BytesIO(content.data))
+        slides = walk_slides(prs, start, end, params.output_types)
         contents = []
-        prs = None
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".pptx") as inputtmpfile:
-            inputtmpfile.write(content.data)
-            inputtmpfile.flush()
-            prs = Presentation(inputtmpfile.name)
-        
-            # Iterate through slides
-        for slide_idx, slide in enumerate(prs.slides):
-            # Extract text
-            text_output = []
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        text_output.append(paragraph.text)
-                    contents.append(Content.from_text("\n".join(text_output), features=[Feature.metadata({"page": slide_idx})]))
-
-            # Extract images
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    image = shape.image
-                    contents.append(Content(content_type="image/png", data=image.blob, features=[Feature.metadata({"page": slide_idx})]))
-
-            # Extract tables
-            for shape in slide.shapes:
-                if shape.has_table:
-                    table = shape.table
-                    table_data = []
-                    for row in table.rows:
-                        row_data = []
-                        for cell in row.cells:
-                            row_data.append(cell.text)
-                        table_data.append(row_data)
-
-                    # Save table to a file
-                    contents.append(Content.from_json(table_data, features=[Feature.metadata({"page": slide_idx})]))
+
+        # Images used on several slides, such as logos, are emitted once and
+        # referenced by hash from the text of every slide using them.
+        emitted_images = set()
+        for slide_idx, slide in enumerate(slides, start):
+            metadata = {"page": slide_idx}
+            if slide["images"]:
+                metadata["images"] = [sha1 for sha1, _, _ in slide["images"]]
+
+            if slide["text"]:
+                contents.append(Content.from_text("\n".join(slide["text"]), features=[Feature.metadata(metadata)]))
+
+            for sha1, content_type, blob in slide["images"]:
+                if sha1 in emitted_images:
+                    continue
+                emitted_images.add(sha1)
+                contents.append(Content(content_type=content_type, data=blob, features=[Feature.metadata({"page": slide_idx, "image_hash": sha1})]))
+
+            for table_data in slide["tables"]:
+                contents.append(Content.from_json(table_data, features=[Feature.metadata({"page": slide_idx})]))
 
         return contents
 
+    def merge_page_ranges(self, content: Content, params: PPTExtractorConfig, outputs: List[List[Union[Feature, Content]]]) -> List[Union[Feature, Content]]:
+        # Every range emits the images it uses, keep the first of each.
+        merged = []
+        emitted_images = set()
+        for range_outputs in outputs:
+            for out in range_outputs:
+                image_hash = out.features[0].value.get("image_hash") if out.features else None
+                if image_hash is not None:
+                    if image_hash in emitted_images:
+                        continue
+                    emitted_images.add(image_hash)
+                merged.append(out)
+        return merged
+
     def sample_input(self) -> Content:
         req = requests.get("https://pub-157277cc11d64fb1a11f71cc52c688eb.r2.dev/figures.pptx")
         ppt_data = req.content
@@ -71,4 +122,4 @@ if __name__ == "__main__":
     extractor = PPTExtractor()
     params = PPTExtractorConfig(output_types=["text", "table"])
     results = extractor.extract(data, params)
-    print(results)
\ No newline at end of file
+    print(results)
@@ -1,7 +1,8 @@
 from unstructured.partition.pdf import partition_pdf
-import tempfile
-from typing import List, Union, Optional
-from indexify_extractor_sdk import Content, Extractor, Feature
+import io
+from typing import List, Union, Optional, Tuple
+from indexify_extractor_sdk import Content, Feature, PageRangeExtractor
+from indexify_extractor_sdk.pdf.documents import open_pdf, page_range_pdf
 from pydantic import BaseModel, Field
 
 class UnstructuredIOConfig(BaseModel):
@@ -10,7 +11,7 @@ class UnstructuredIOConfig(BaseModel):
     infer_table_structure: Optional[bool] = True
     output_types: List[str] = Field(default_factory=lambda: ["text"])
 
-class UnstructuredIOExtractor(Extractor):
+class UnstructuredIOExtractor(PageRangeExtractor):
     name = "tensorlake/unstructuredio"
     description = "This extractor uses unstructured.io to extract pieces of pdf document into separate plain text content data."
     system_dependencies = ["libmagic-dev", "poppler-utils", "tesseract-ocr"]
@@ -19,31 +20,43 @@ class UnstructuredIOExtractor(Extractor):
     def __init__(self):
         super(UnstructuredIOExtractor, self).__init__()
 
-    def extract(self, content: Content, params: UnstructuredIOConfig) -> List[Union[Feature, Content]]:
+    def page_span(self, content: Content, params: UnstructuredIOConfig) -> Tuple[int, int]:
+        with open_pdf(content.data) as doc:
+            return 0, len(doc)
+
+    def extract_page_range(self, content: Content, params: UnstructuredIOConfig, start: int, end: int) -> List[Union[Feature, Content]]:
         contents = []
         strategy = params.strategy
         hi_res_model_name = params.hi_res_model_name
         infer_table_structure = params.infer_table_structure
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as inputtmpfile:
-            inputtmpfile.write(content.data)
-            inputtmpfile.flush()
-
-            elements = partition_pdf(inputtmpfile.name, strategy=strategy, hi_res_model_name=hi_res_model_name, infer_table_structure=infer_table_structure)
-
-            if "text" in params.output_types:
-                md_text = "\n\n".join([str(el) for el in elements])
-                feature = Feature.metadata(value={"type": "text"})
-                contents.append(Content.from_text(md_text, features=[feature]))
-            
-            if "table" in params.output_types:
-                tables = [el for el in elements if el.category == "Table"]
-                for table in tables:
-                    feature = Feature.metadata({"type": "table"})
-                    contents.append(Content.from_text(table.metadata.text_as_html, features=[feature]))
+        # partition_pdf reads the document from memory, only the pages of the range are handed to it.
+        elements = partition_pdf(file=io.BytesIO(page_range_pdf(content.data, start, end)), strategy=strategy, hi_res_model_name=hi_res_model_name, infer_table_structure=infer_table_structure, starting_page_number=start + 1)
+
+        if "text" in params.output_types:
+            md_text = "\n\n".join([str(el) for el in elements])
+            feature = Feature.metadata(value={"type": "text"})
+            contents.append(Content.from_text(md_text, features=[feature]))
+        
+        if "table" in params.output_types:
+            tables = [el for el in elements if el.category == "Table"]
+            for table in tables:
+                feature = Feature.metadata({"type": "table"})
+                contents.append(Content.from_text(table.metadata.text_as_html, features=[feature]))
 
         return contents
 
+    def merge_page_ranges(self, content: Content, params: UnstructuredIOConfig, outputs: List[List[Union[Feature, Content]]]) -> List[Union[Feature, Content]]:
+        if "text" not in params.output_types or len(outputs) <= 1:
+            return super().merge_page_ranges(content, params, outputs)
+
+        # The text of every range comes first, followed by its tables.
+        texts = [range_outputs[0].data.decode("utf-8") for range_outputs in outputs]
+        md_text = "\n\n".join(text for text in texts if text)
+        feature = Feature.metadata(value={"type": "text"})
+        tables = [table for range_outputs in outputs for table in range_outputs[1:]]
+        return [Content.from_text(md_text, features=[feature])] + tables
+
     def sample_input(self) -> Content:
         return self.sample_scientific_pdf()
 
@@ -0,0 +1,117 @@
+"""
+Memory used to chunk a large text file: one Content per chunk holding a copy
+of its text, against ContentChunk references into the parent's bytes. Also
+reports the size of the pickled chunks, which is what the worker process
+sends back to the agent.
+
+    python chunk_memory_benchmark.py --mb 200 --chunk-size 1000
+
+Uses the native splitter when indexify-text-splitters is installed, and
+paragraph spans computed here otherwise.
+"""
+import argparse
+import gc
+import pickle
+import random
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from indexify_extractor_sdk import Content, ContentChunk, Feature
+
+try:
+    from indexify_text_splitters import NativeTextSplitter
+except ImportError:
+    NativeTextSplitter = None
+
+WORDS = "the of and to in is that for it as was with be by on not he this are or his from at which".split()
+
+
+def make_text(size: int) -> bytes:
+    rng = random.Random(0)
+    paragraphs = []
+    for _ in range(512):
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+            for _ in range(rng.randint(2, 8))
+        ]
+        paragraphs.append(" ".join(sentences))
+    block = "\n\n".join(paragraphs).encode("utf-8") + b"\n\n"
+    return (block * (size // len(block) + 1))[:size]
+
+
+def paragraph_spans(data: bytes, chunk_size: int) -> List[Tuple[int, int]]:
+    """Greedily packs paragraphs into spans of up to chunk_size bytes."""
+    spans = []
+    start = 0
+    while start < len(data):
+        end = min(start + chunk_size, len(data))
+        if end < len(data):
+            cut = data.rfind(b"\n\n", start, end)
+            end = cut if cut > start else end
+        spans.append((start, end))
+        start = end + 2 if data[end : end + 2] == b"\n\n" else end
+    return spans
+
+
+def split_spans(data: bytes, chunk_size: int) -> List[Tuple[int, int]]:
+    if NativeTextSplitter is None:
+        return paragraph_spans(data, chunk_size)
+    return [(s.start, s.end) for s in NativeTextSplitter("recursive", chunk_size=chunk_size).split_spans(data)]
+
+
+def copied_chunks(parent: Content, spans) -> List[Content]:
+    # What ChunkExtractor did before: decode the document, then one Content
+    # with its own copy of the text per chunk.
+    text = parent.data.decode("utf-8")
+    texts = [text[start:end] for start, end in spans] if text.isascii() else [
+        parent.data[start:end].decode("utf-8") for start, end in spans
+    ]
+    return [
+        Content.from_text(chunk, features=parent.features, labels=parent.labels)
+        for chunk in texts
+    ]
+
+
+def referenced_chunks(parent: Content, spans) -> List[ContentChunk]:
+    return [ContentChunk(parent, start, end, content_type="text/plain") for start, end in spans]
+
+
+def measure(name: str, build, parent: Content, spans):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = build(parent, spans)
+    built = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(chunks, protocol=pickle.HIGHEST_PROTOCOL))
+    print(
+        f"{name:12} {len(chunks):>9} chunks  held {current / 1e6:9.1f} MB  "
+        f"peak {peak / 1e6:9.1f} MB  pickled {pickled / 1e6:9.1f} MB  {built:6.2f} s"
+    )
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=200)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    data = make_text(int(args.mb * 1e6))
+    parent = Content(
+        content_type="text/plain",
+        data=data,
+        features=[Feature.metadata({"filename": "large.txt"})],
+        labels={"source": "benchmark"},
+    )
+    spans = split_spans(data, args.chunk_size)
+    print(f"{len(data) / 1e6:.0f} MB text, {len(spans)} chunks of up to {args.chunk_size} bytes")
+    print("memory is allocated on top of the parent's bytes, pickled sizes include them")
+    measure("copied", copied_chunks, parent, spans)
+    measure("referenced", referenced_chunks, parent, spans)
+
+
+if __name__ == "__main__":
+    main()
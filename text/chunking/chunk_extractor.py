@@ -1,22 +1,51 @@
 from pydantic import BaseModel
 from langchain import text_splitter
 from langchain.docstore.document import Document
-from typing import Callable, List, Literal
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+import json
 
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, ContentChunk, Extractor, Feature
+from .utils.semantic_chunker import SemanticChunker
+from .utils.token_chunker import TokenChunker
+
+try:
+    from indexify_text_splitters import NativeTextSplitter
+except ImportError:
+    NativeTextSplitter = None
+
+
+# chunk_size of the splitters when it isn't set, in characters. The semantic
+# splitter isn't capped by default, its chunks break where the topic changes.
+DEFAULT_CHUNK_SIZE = 100
 
 
 class ChunkExtractionInputParams(BaseModel):
     overlap: int = 0
-    chunk_size: int = 100
-    text_splitter: Literal["char", "recursive", "markdown", "html", "json"] = "recursive"
+    chunk_size: Optional[int] = None
+    text_splitter: Literal[
+        "char", "recursive", "markdown", "html", "json", "sentence", "semantic"
+    ] = "recursive"
     headers_to_split_on: List[str] = []
+    # With a tokenizer, e.g. "sentence-transformers/all-MiniLM-L6-v2", chunks
+    # hold up to max_tokens tokens of it (default: the model's input length)
+    # and overlap counts tokens. chunk_size is ignored.
+    tokenizer: Optional[str] = None
+    max_tokens: Optional[int] = None
+    # The semantic splitter breaks chunks where the similarity of neighbouring
+    # sentences drops more than at breakpoint_percentile of the boundaries,
+    # with the embeddings of this installed embedding extractor.
+    embedding_extractor: str = "tensorlake/minilm-l6"
+    breakpoint_percentile: float = 95.0
+
+
+# Splitters without a langchain equivalent.
+NATIVE_ONLY_SPLITTERS = ("sentence", "semantic")
 
 
 class ChunkExtractor(Extractor):
     name = "tensorlake/chunk-extractor"
     description = "Text Chunk Extractor"
-    python_dependencies = ["langchain", "lxml"]
+    python_dependencies = ["indexify-text-splitters", "langchain", "lxml", "numpy", "transformers"]
     system_dependencies = []
 
 
@@ -25,47 +54,158 @@ class ChunkExtractor(Extractor):
 
     def extract(
         self, content: Content, params: ChunkExtractionInputParams
-    ) -> List[Content]:
-
-        splitter = self._create_splitter(params)
-        text = content.data.decode("utf-8")
-        chunks = splitter(text)
-        chunk_contents = []
-        for chunk in chunks:
-            if type(chunk) == Document:
-                chunk_content = Content.from_text(
-                    chunk.page_content,
-                    features=content.features,
-                    labels=content.labels,
-                )
-                if chunk.metadata:
-                    chunk_content.features.append(Feature.metadata(chunk.metadata))
-            else:
-                chunk_content = Content.from_text(
-                    chunk,
-                    features=content.features,
-                    labels=content.labels
+    ) -> List[ContentChunk]:
+        # Chunks reference the parent's bytes by offset and share its features
+        # and labels until they add their own metadata.
+        if params.text_splitter in NATIVE_ONLY_SPLITTERS:
+            self._check_native_splitter(params)
+        if params.text_splitter == "semantic":
+            sentences = NativeTextSplitter("sentence", chunk_size=0).split_spans(content.data)
+            chunker = SemanticChunker(
+                params.embedding_extractor,
+                chunk_size=self._chunk_size(params),
+                breakpoint_percentile=params.breakpoint_percentile,
+            )
+            spans = chunker.split_spans(content.data, [(s.start, s.end) for s in sentences])
+            return [
+                ContentChunk(content, start, end, content_type="text/plain") for start, end in spans
+            ]
+        if params.tokenizer is None and NativeTextSplitter is not None:
+            # The native splitter reads the bytes as they are and returns
+            # byte offsets, the document is never decoded into a str.
+            spans = self._create_native_splitter(params).split_spans(content.data)
+            chunks = [
+                ContentChunk(
+                    content,
+                    span.start,
+                    span.end,
+                    data=None if span.text is None else span.text.encode("utf-8"),
+                    content_type="text/plain",
                 )
+                for span in spans
+            ]
+            metadata = [span.metadata for span in spans]
+        else:
+            text = content.data.decode("utf-8")
+            pieces = self._create_splitter(params)(text)
+            chunks = self._locate_chunks(
+                content, text, [chunk for chunk, _ in pieces], params.text_splitter
+            )
+            metadata = [metadata for _, metadata in pieces]
 
-            chunk_contents.append(chunk_content)
+        for chunk, chunk_metadata in zip(chunks, metadata):
+            if chunk_metadata:
+                chunk.add_feature(Feature.metadata(chunk_metadata))
+        return chunks
 
-        return chunk_contents
+    def _chunk_size(self, input_params: ChunkExtractionInputParams) -> int:
+        if input_params.chunk_size is not None:
+            return input_params.chunk_size
+        return 0 if input_params.text_splitter == "semantic" else DEFAULT_CHUNK_SIZE
+
+    def _check_native_splitter(self, input_params: ChunkExtractionInputParams):
+        if NativeTextSplitter is None:
+            raise ValueError(
+                f"the {input_params.text_splitter} splitter needs indexify-text-splitters"
+            )
+        if input_params.tokenizer is not None:
+            raise ValueError(
+                f"the {input_params.text_splitter} splitter doesn't support a tokenizer"
+            )
+
+    def _locate_chunks(
+        self, content: Content, text: str, pieces: List[str], mode: str
+    ) -> List[ContentChunk]:
+        # Only char and recursive chunks are always substrings of the text,
+        # in order. The others carry their own bytes.
+        if mode not in ("char", "recursive"):
+            return [
+                ContentChunk(content, 0, 0, data=piece.encode("utf-8"), content_type="text/plain")
+                for piece in pieces
+            ]
+        chunks = []
+        # Character and byte offsets of the last chunk's start.
+        char_pos, byte_pos = 0, 0
+        for piece in pieces:
+            found = text.find(piece, char_pos)
+            if found < 0:
+                chunks.append(
+                    ContentChunk(content, 0, 0, data=piece.encode("utf-8"), content_type="text/plain")
+                )
+                continue
+            byte_pos += len(text[char_pos:found].encode("utf-8"))
+            char_pos = found
+            end = byte_pos + len(piece.encode("utf-8"))
+            chunks.append(ContentChunk(content, byte_pos, end, content_type="text/plain"))
+        return chunks
 
     def _create_splitter(
         self, input_params: ChunkExtractionInputParams
+    ) -> Callable[[str], List[Tuple[str, Dict[str, str]]]]:
+        if input_params.tokenizer is not None:
+            return self._create_token_splitter(input_params)
+        if NativeTextSplitter is not None:
+            splitter = self._create_native_splitter(input_params)
+            return lambda text: [(chunk.text, chunk.metadata) for chunk in splitter.split_text(text)]
+
+        splitter = self._create_langchain_splitter(input_params)
+
+        def split(text: str) -> List[Tuple[str, Dict[str, str]]]:
+            if input_params.text_splitter == "json":
+                text = json.loads(text)
+            return [
+                (chunk.page_content, chunk.metadata) if type(chunk) == Document else (chunk, {})
+                for chunk in splitter(text)
+            ]
+
+        return split
+
+    def _create_token_splitter(
+        self, input_params: ChunkExtractionInputParams
+    ) -> Callable[[str], List[Tuple[str, Dict[str, str]]]]:
+        mode = input_params.text_splitter
+        if mode == "json":
+            raise ValueError("the json splitter doesn't support a tokenizer")
+        chunker = TokenChunker(
+            input_params.tokenizer,
+            max_tokens=input_params.max_tokens,
+            overlap=input_params.overlap,
+            mode=mode if mode == "char" else "recursive",
+        )
+        if mode in ("char", "recursive"):
+            return lambda text: [(chunk, {}) for chunk in chunker.split_texts([text])[0]]
+
+        # Markdown and html are split on their headers first, and the sections
+        # are packed in one tokenizer pass.
+        sections = self._create_splitter(input_params.model_copy(update={"tokenizer": None}))
+        return lambda text: chunker.split_sections(sections(text))
+
+    def _create_native_splitter(
+        self, input_params: ChunkExtractionInputParams
+    ) -> "NativeTextSplitter":
+        # Markdown and html sections aren't split further, same as langchain.
+        structural = input_params.text_splitter in ("markdown", "html")
+        return NativeTextSplitter(
+            input_params.text_splitter,
+            chunk_size=0 if structural else self._chunk_size(input_params),
+            overlap=0 if structural else input_params.overlap,
+        )
+
+    def _create_langchain_splitter(
+        self, input_params: ChunkExtractionInputParams
     ) -> Callable[[str], List[str]]:
         if input_params.text_splitter == "recursive":
             return text_splitter.RecursiveCharacterTextSplitter(
-                chunk_size=input_params.chunk_size,
+                chunk_size=self._chunk_size(input_params),
                 chunk_overlap=input_params.overlap,
             ).split_text
         elif input_params.text_splitter == "json":
             return text_splitter.RecursiveJsonSplitter(
-                max_chunk_size=input_params.chunk_size
+                max_chunk_size=self._chunk_size(input_params)
             ).split_text
         elif input_params.text_splitter == "char":
             return text_splitter.CharacterTextSplitter(
-                chunk_size=input_params.chunk_size,
+                chunk_size=self._chunk_size(input_params),
                 chunk_overlap=input_params.overlap,
                 separator="\n\n",
             ).split_text
@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+from indexify_extractor_sdk.embedding.base_embedding import BaseEmbeddingExtractor
+
+from utils.semantic_chunker import SemanticChunker, boundary_similarities, embed_sentences
+
+
+class TopicEmbedding(BaseEmbeddingExtractor):
+    """Embeds sentences about cats and cars on two orthogonal axes."""
+
+    def __init__(self):
+        super().__init__(max_context_length=512)
+        self.batches = []
+
+    def extract_embeddings(self, texts):
+        self.batches.append(list(texts))
+        return [[float("cat" in text), float("car" in text)] for text in texts]
+
+
+def sentence_spans(data: bytes):
+    """Byte spans of the sentences, which all end with ". "."""
+    spans = []
+    start = 0
+    while start < len(data):
+        end = data.find(b".", start) + 1
+        spans.append((start, end))
+        start = end + 1
+    return spans
+
+
+CAT_SENTENCES = ["The café cat sleeps.", "A cat purrs.", "Cats chase mice, says the cat."]
+CAR_SENTENCES = ["The car is red.", "A car needs fuel.", "Electric cars are quiet, the car is too."]
+DATA = " ".join(CAT_SENTENCES + CAR_SENTENCES).encode("utf-8")
+
+
+class TestSemanticChunker(unittest.TestCase):
+    def test_boundary_similarities(self):
+        embeddings = np.array([[1, 0], [2, 0], [0, 1], [0, 3]], dtype=np.float32)
+        np.testing.assert_allclose(boundary_similarities(embeddings, window=1), [1, 0, 1], atol=1e-6)
+        # With two sentences on each side, the boundaries next to the change
+        # compare a mix of both topics.
+        np.testing.assert_allclose(
+            boundary_similarities(embeddings, window=2), [np.sqrt(0.5), 0, np.sqrt(0.5)], atol=1e-6
+        )
+
+    def test_embed_sentences(self):
+        extractor = TopicEmbedding()
+        sentences = ["a long sentence about a car", "cat", "a car"]
+        embeddings = embed_sentences(extractor, sentences)
+        # The sentences are sent shortest first, the rows stay in order.
+        self.assertEqual(extractor.batches, [["cat", "a car", "a long sentence about a car"]])
+        np.testing.assert_array_equal(embeddings, [[0, 1], [1, 0], [0, 1]])
+
+    def test_breaks_where_the_topic_changes(self):
+        sentences = sentence_spans(DATA)
+        self.assertEqual(len(sentences), 6)
+        spans = SemanticChunker(TopicEmbedding()).split_spans(DATA, sentences)
+        self.assertEqual(spans, [(sentences[0][0], sentences[2][1]), (sentences[3][0], sentences[5][1])])
+        self.assertEqual(
+            [DATA[start:end].decode("utf-8") for start, end in spans],
+            [" ".join(CAT_SENTENCES), " ".join(CAR_SENTENCES)],
+        )
+
+    def test_chunk_size_caps_chunks(self):
+        sentences = sentence_spans(DATA)
+        spans = SemanticChunker(TopicEmbedding(), chunk_size=40).split_spans(DATA, sentences)
+        texts = [DATA[start:end].decode("utf-8") for start, end in spans]
+        self.assertEqual(
+            texts,
+            [
+                "The café cat sleeps. A cat purrs.",
+                "Cats chase mice, says the cat.",
+                "The car is red. A car needs fuel.",
+                "Electric cars are quiet, the car is too.",
+            ],
+        )
+
+    def test_single_sentence(self):
+        chunker = SemanticChunker(TopicEmbedding())
+        self.assertEqual(chunker.split_spans(b"One cat.", [(0, 8)]), [(0, 8)])
+        self.assertEqual(chunker.split_spans(b"", []), [])
+        with self.assertRaises(ValueError):
+            SemanticChunker(TopicEmbedding(), breakpoint_percentile=101)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+import unittest
+
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import PreTrainedTokenizerFast
+
+from utils.token_chunker import TokenChunker
+
+WORDS = "the quick brown fox jumps over a lazy dog".split()
+
+
+def save_word_tokenizer(path: str):
+    """A tokenizer of one token per word, with a [CLS] token added to each input."""
+    vocab = {"[UNK]": 0, "[CLS]": 1}
+    for word in WORDS:
+        vocab.setdefault(word, len(vocab))
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A", special_tokens=[("[CLS]", 1)]
+    )
+    PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, unk_token="[UNK]", cls_token="[CLS]", model_max_length=32
+    ).save_pretrained(path)
+
+
+def locate(text, chunks):
+    """Start offsets of the chunks in the text, searched in order."""
+    starts = []
+    pos = 0
+    for chunk in chunks:
+        pos = text.find(chunk, pos)
+        if pos < 0:
+            return None
+        starts.append(pos)
+    return starts
+
+
+class InflatingTokenChunker(TokenChunker):
+    """Counts the chunks holding "fox" as 3 tokens longer, as a BPE merge across a cut could."""
+
+    def count_tokens(self, texts):
+        counts = super().count_tokens(texts)
+        return [n + 3 if "fox" in text else n for text, n in zip(texts, counts)]
+
+
+class TestTokenChunker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        save_word_tokenizer(cls.dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+
+    def test_budget(self):
+        # [CLS] takes one token of max_tokens.
+        self.assertEqual(TokenChunker(self.dir, max_tokens=10).budget, 9)
+        # max_tokens defaults to, and is capped at, the model's input length.
+        self.assertEqual(TokenChunker(self.dir).budget, 31)
+        self.assertEqual(TokenChunker(self.dir, max_tokens=100).budget, 31)
+        with self.assertRaises(ValueError):
+            TokenChunker(self.dir, max_tokens=10, overlap=9)
+        with self.assertRaises(ValueError):
+            TokenChunker(self.dir, mode="json")
+
+    def test_packs_tokens(self):
+        chunker = TokenChunker(self.dir, max_tokens=8)
+        text = " ".join(WORDS * 5)
+        chunks = chunker.split_texts([text])[0]
+        self.assertEqual(chunker.count_tokens(chunks), [7] * 6 + [3])
+        starts = locate(text, chunks)
+        self.assertIsNotNone(starts)
+        # Without overlap, the chunks cover the text word for word.
+        self.assertEqual(" ".join(chunks), text)
+        self.assertEqual(starts[1], len(chunks[0]) + 1)
+
+    def test_overlap(self):
+        chunker = TokenChunker(self.dir, max_tokens=8, overlap=2)
+        text = " ".join(WORDS * 3)
+        chunks = chunker.split_texts([text])[0]
+        self.assertTrue(all(n <= chunker.budget for n in chunker.count_tokens(chunks)))
+        self.assertIsNotNone(locate(text, chunks))
+        for chunk, next_chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk.split()[-2:], next_chunk.split()[:2])
+
+    def test_prefers_boundaries(self):
+        chunker = TokenChunker(self.dir, max_tokens=8)
+        text = "the quick brown fox.\n\njumps over a lazy dog"
+        self.assertEqual(
+            chunker.split_texts([text])[0], ["the quick brown fox.", "jumps over a lazy dog"]
+        )
+        # The char splitter only cuts on paragraphs, or between tokens.
+        chunker = TokenChunker(self.dir, max_tokens=5, mode="char")
+        text = "the quick brown fox. jumps over"
+        self.assertEqual(
+            chunker.split_texts([text])[0], ["the quick brown fox.", "jumps over"]
+        )
+
+    def test_repacks_over_budget_chunks(self):
+        chunker = InflatingTokenChunker(self.dir, max_tokens=11)
+        text = " ".join(WORDS * 2)
+        chunks = chunker.split_texts([text])[0]
+        # The 10 token chunks holding "fox" are over the budget of 10 once
+        # cut out, and are packed again with a margin of 8 tokens: 2 per chunk.
+        lengths = TokenChunker.count_tokens(chunker, chunks)
+        self.assertEqual(lengths, [2] * 9)
+        self.assertEqual(" ".join(chunks), text)
+        self.assertIsNotNone(locate(text, chunks))
+
+    def test_split_sections(self):
+        chunker = TokenChunker(self.dir, max_tokens=6)
+        sections = [("the quick brown fox jumps over", {"h1": "a"}), ("a lazy dog", {"h1": "b"})]
+        self.assertEqual(
+            chunker.split_sections(sections),
+            [("the quick brown fox jumps", {"h1": "a"}), ("over", {"h1": "a"}), ("a lazy dog", {"h1": "b"})],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+from functools import lru_cache
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+from indexify_extractor_sdk.base_extractor import load_extractor
+from indexify_extractor_sdk.embedding.base_embedding import BaseEmbeddingExtractor
+from indexify_extractor_sdk.extractor_worker import extractor_wrapper_map, load_extractors
+
+EMBEDDING_BATCH_SIZE = 256
+
+# Sentences on each side of a boundary whose embeddings are compared.
+WINDOW = 2
+
+
+@lru_cache(maxsize=2)
+def load_embedding_extractor(name: str) -> BaseEmbeddingExtractor:
+    """
+    Loads an installed embedding extractor, by name such as
+    "tensorlake/minilm-l6" or as "module:Class", once per process.
+    """
+    if ":" in name:
+        extractor, _ = load_extractor(name)
+    else:
+        load_extractors(name)
+        extractor = extractor_wrapper_map[name]._instance
+    if not isinstance(extractor, BaseEmbeddingExtractor):
+        raise ValueError(f"{name} isn't an embedding extractor")
+    return extractor
+
+
+def embed_sentences(extractor: BaseEmbeddingExtractor, sentences: Sequence[str]) -> np.ndarray:
+    """Embeds the sentences in batches of similar lengths, so padding stays short."""
+    order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+    embeddings = None
+    for batch_start in range(0, len(order), EMBEDDING_BATCH_SIZE):
+        batch = order[batch_start : batch_start + EMBEDDING_BATCH_SIZE]
+        vectors = np.asarray(
+            extractor.extract_embeddings([sentences[i] for i in batch]), dtype=np.float32
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(sentences), vectors.shape[1]), dtype=np.float32)
+        embeddings[batch] = vectors
+    return embeddings
+
+
+def boundary_similarities(embeddings: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """
+    Cosine similarity across each boundary between consecutive sentences, of
+    the mean embeddings of the `window` sentences before and after it. Entry
+    i is the boundary before sentence i + 1.
+    """
+    n = len(embeddings)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.maximum(norms, 1e-12)
+    sums = np.vstack([np.zeros((1, unit.shape[1]), dtype=unit.dtype), np.cumsum(unit, axis=0)])
+    boundaries = np.arange(1, n)
+    before = sums[boundaries] - sums[np.maximum(boundaries - window, 0)]
+    after = sums[np.minimum(boundaries + window, n)] - sums[boundaries]
+    dots = np.einsum("ij,ij->i", before, after)
+    lengths = np.linalg.norm(before, axis=1) * np.linalg.norm(after, axis=1)
+    return dots / np.maximum(lengths, 1e-12)
+
+
+class SemanticChunker:
+    """
+    Groups sentences into chunks which break where the topic changes: at the
+    boundaries whose similarity drop is above the `breakpoint_percentile` of
+    the document's boundaries. Chunks are also broken before they grow past
+    `chunk_size` characters when it's above 0, a single sentence can be
+    longer. All the sentences of a document are embedded in one batched pass.
+    `embedding_extractor` is the name of an installed embedding extractor, or
+    an instance.
+    """
+
+    def __init__(
+        self,
+        embedding_extractor: Union[str, BaseEmbeddingExtractor],
+        chunk_size: int = 0,
+        breakpoint_percentile: float = 95.0,
+    ):
+        if not 0 <= breakpoint_percentile <= 100:
+            raise ValueError("breakpoint_percentile must be between 0 and 100")
+        if isinstance(embedding_extractor, str):
+            embedding_extractor = load_embedding_extractor(embedding_extractor)
+        self._extractor = embedding_extractor
+        self.chunk_size = chunk_size
+        self.breakpoint_percentile = breakpoint_percentile
+
+    def split_spans(self, data: bytes, sentences: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Chunks of `data` as byte spans, given the byte spans of its sentences."""
+        if len(sentences) < 2:
+            return list(sentences)
+        texts = [str(data[start:end], "utf-8") for start, end in sentences]
+        distances = 1.0 - boundary_similarities(embed_sentences(self._extractor, texts))
+        breaks = distances > np.percentile(distances, self.breakpoint_percentile)
+
+        spans = []
+        start, end = sentences[0]
+        length = len(texts[0])
+        for i in range(1, len(sentences)):
+            grown = length + 1 + len(texts[i])
+            if breaks[i - 1] or (self.chunk_size > 0 and grown > self.chunk_size):
+                spans.append((start, end))
+                start, length = sentences[i][0], len(texts[i])
+            else:
+                length = grown
+            end = sentences[i][1]
+        spans.append((start, end))
+        return spans
@@ -0,0 +1,146 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from transformers import AutoTokenizer
+
+# Tokenizers at or above this are reported as "no limit" by transformers.
+UNBOUNDED_MAX_LENGTH = 1_000_000
+
+
+@lru_cache(maxsize=8)
+def load_tokenizer(name: str):
+    """Loads the fast tokenizer of a model once per process."""
+    return AutoTokenizer.from_pretrained(name, use_fast=True)
+
+
+def _is_paragraph(text: str, prev_end: int, gap: str) -> bool:
+    return "\n\n" in gap
+
+
+def _is_line(text: str, prev_end: int, gap: str) -> bool:
+    return "\n" in gap
+
+
+def _is_sentence(text: str, prev_end: int, gap: str) -> bool:
+    return bool(gap) and prev_end > 0 and text[prev_end - 1] in ".!?"
+
+
+def _is_word(text: str, prev_end: int, gap: str) -> bool:
+    return bool(gap)
+
+
+# Boundaries a chunk may end on, from the most to the least preferred. A
+# chunk is cut between tokens when nothing matches in its second half.
+BOUNDARIES = {
+    "char": [_is_paragraph],
+    "recursive": [_is_paragraph, _is_line, _is_sentence, _is_word],
+}
+
+
+class TokenChunker:
+    """
+    Packs text into chunks of at most `max_tokens` tokens of a model's
+    tokenizer, special tokens included, so that the chunks fill the model's
+    input without being truncated. `max_tokens` defaults to the model's
+    maximum input length and `overlap` counts tokens.
+
+    All the texts of a call are tokenized in one batch, chunks are cut on the
+    token offsets instead of re-tokenizing candidate chunks.
+    """
+
+    def __init__(self, tokenizer: str, max_tokens: Optional[int] = None, overlap: int = 0, mode: str = "recursive"):
+        if mode not in BOUNDARIES:
+            raise ValueError(f"token chunking isn't supported for the {mode} splitter")
+        self._tokenizer = load_tokenizer(tokenizer)
+        model_max_length = self._tokenizer.model_max_length
+        if max_tokens is None:
+            if model_max_length >= UNBOUNDED_MAX_LENGTH:
+                raise ValueError(f"{tokenizer} has no maximum input length, set max_tokens")
+            max_tokens = model_max_length
+        elif model_max_length < UNBOUNDED_MAX_LENGTH:
+            max_tokens = min(max_tokens, model_max_length)
+        self.budget = max_tokens - self._tokenizer.num_special_tokens_to_add()
+        if self.budget <= 0:
+            raise ValueError(f"max_tokens of {max_tokens} leaves no room for text")
+        if not 0 <= overlap < self.budget:
+            raise ValueError(f"overlap must be smaller than {self.budget} tokens")
+        self.overlap = overlap
+        self._boundaries = BOUNDARIES[mode]
+
+    def count_tokens(self, texts: Sequence[str]) -> List[int]:
+        """Number of tokens of each text, special tokens left out."""
+        if not texts:
+            return []
+        encoded = self._tokenizer(list(texts), add_special_tokens=False, verbose=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def split_texts(self, texts: Sequence[str]) -> List[List[str]]:
+        if not texts:
+            return []
+        # verbose=False: texts longer than the model's input are expected here.
+        encoded = self._tokenizer(
+            list(texts), add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )
+        result = [self._pack(text, offsets) for text, offsets in zip(texts, encoded["offset_mapping"])]
+
+        # Text cut out of its context can tokenize to a few more tokens, e.g.
+        # when a BPE merge spans the cut. Re-check all the chunks in one pass
+        # and pack the rare ones over budget again.
+        flat = [chunk for chunks in result for chunk in chunks]
+        over = {chunk for chunk, n in zip(flat, self.count_tokens(flat)) if n > self.budget}
+        if over:
+            result = [
+                [piece for chunk in chunks for piece in (self._split_over_budget(chunk) if chunk in over else [chunk])]
+                for chunks in result
+            ]
+        return result
+
+    def split_sections(
+        self, sections: Sequence[Tuple[str, Dict[str, str]]]
+    ) -> List[Tuple[str, Dict[str, str]]]:
+        """Packs the (text, metadata) sections of a structural splitter."""
+        chunks = self.split_texts([text for text, _ in sections])
+        return [
+            (chunk, metadata)
+            for (_, metadata), section_chunks in zip(sections, chunks)
+            for chunk in section_chunks
+        ]
+
+    def _split_over_budget(self, chunk: str) -> List[str]:
+        offsets = self._tokenizer(
+            chunk, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )["offset_mapping"]
+        # Leave a margin for the tokens the cut adds back.
+        return self._pack(chunk, offsets, budget=max(1, self.budget - 8))
+
+    def _pack(self, text: str, offsets: List[Tuple[int, int]], budget: Optional[int] = None) -> List[str]:
+        budget = budget or self.budget
+        # Special tokens and some tokenizers' empty pieces have empty spans.
+        offsets = [(s, e) for s, e in offsets if e > s]
+        n = len(offsets)
+        chunks = []
+        i = 0
+        while i < n:
+            end = min(i + budget, n)
+            if end < n:
+                end = self._find_cut(text, offsets, i + budget // 2, end)
+            chunk = text[offsets[i][0]:offsets[end - 1][1]].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= n:
+                break
+            i = max(end - self.overlap, i + 1)
+        return chunks
+
+    def _find_cut(self, text: str, offsets: List[Tuple[int, int]], lo: int, hi: int) -> int:
+        """The last token index in (lo, hi] on the most preferred boundary."""
+        for boundary in self._boundaries:
+            for k in range(hi, max(lo, 0), -1):
+                prev_end, start = offsets[k - 1][1], offsets[k][0]
+                # BPE tokenizers include the leading space in the token span.
+                gap_end = start
+                while gap_end < offsets[k][1] and text[gap_end].isspace():
+                    gap_end += 1
+                if boundary(text, prev_end, text[prev_end:gap_end]):
+                    return k
+        return hi
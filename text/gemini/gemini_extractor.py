@@ -1,6 +1,8 @@
 from typing import List, Union, Optional
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, AsyncExtractor, Feature
+from indexify_extractor_sdk.rate_limiter import RateLimit, estimate_tokens, get_client_config, get_scheduler
 from pydantic import BaseModel, Field
+import asyncio
 import os
 import google.generativeai as genai
 from pdf2image import convert_from_path
@@ -12,8 +14,17 @@ class GeminiExtractorConfig(BaseModel):
     key: Optional[str] = Field(default=None)
     system_prompt: str = Field(default='You are a helpful assistant.')
     user_prompt: Optional[str] = Field(default=None)
+    requests_per_minute: Optional[int] = Field(default=None)
+    tokens_per_minute: Optional[int] = Field(default=None)
 
-class GeminiExtractor(Extractor):
+# Tokens counted by Gemini for an image input.
+IMAGE_TOKENS = 258
+
+def genai_config():
+    """genai is configured for the whole process, requests with another key wait their turn."""
+    return get_client_config("gemini", lambda api_key: genai.configure(api_key=api_key))
+
+class GeminiExtractor(AsyncExtractor):
     name = "tensorlake/gemini"
     description = "An extractor that let's you use LLMs from Gemini."
     system_dependencies = []
@@ -22,26 +33,29 @@ class GeminiExtractor(Extractor):
     def __init__(self):
         super(GeminiExtractor, self).__init__()
 
-    def extract(self, content: Content, params: GeminiExtractorConfig) -> List[Union[Feature, Content]]:
+    async def extract_async(self, content: Content, params: GeminiExtractorConfig) -> List[Union[Feature, Content]]:
         contents = []
         model_name = params.model_name
         key = params.key
         prompt = params.system_prompt
         query = params.user_prompt
+        limits = RateLimit(params.requests_per_minute, params.tokens_per_minute)
 
         if content.content_type == "application/pdf":
             with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
                 temp_file.write(content.data)
                 file_path = temp_file.name
-                images = convert_from_path(file_path)
-                
-                all_responses = []
-                for i, image in enumerate(images):
+                images = await asyncio.to_thread(convert_from_path, file_path)
+
+                async def process_page(image):
                     with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_image_file:
                         image.save(temp_image_file.name, 'JPEG')
-                        response = self._process_image(temp_image_file.name, model_name, key, prompt, query)
-                        all_responses.append(f"{response}")
+                        response = await self._process_image(temp_image_file.name, model_name, key, prompt, query, limits)
                     os.unlink(temp_image_file.name)
+                    return f"{response}"
+
+                # Send the pages of the document concurrently.
+                all_responses = await asyncio.gather(*[process_page(image) for image in images])
                 
                 response_content = "\n\n".join(all_responses)
                 os.unlink(file_path)
@@ -50,27 +64,23 @@ class GeminiExtractor(Extractor):
             suffix = mimetypes.guess_extension(content.content_type)
             with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_image_file:
                 temp_image_file.write(content.data)
-                response_content = self._process_image(temp_image_file.name, model_name, key, prompt, query)
+                response_content = await self._process_image(temp_image_file.name, model_name, key, prompt, query, limits)
             os.unlink(temp_image_file.name)
         
         else:
             text = content.data.decode("utf-8")
             if query is None:
                 query = text
-            response_content = self._process_text(model_name, key, prompt, query)
+            response_content = await self._process_text(model_name, key, prompt, query, limits)
         
         contents.append(Content.from_text(response_content))
         return contents
 
-    def _process_image(self, image_path, model_name, key, prompt, query):
+    async def _process_image(self, image_path, model_name, key, prompt, query, limits):
         if ('GEMINI_API_KEY' not in os.environ) and (key is None):
             return "The GEMINI_API_KEY environment variable is not present."
         
-        if ('GEMINI_API_KEY' in os.environ) and (key is None):
-            genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-        else:
-            genai.configure(api_key=key)
-        
+        api_key = key or os.environ["GEMINI_API_KEY"]
         generation_config = {
             "temperature": 1,
             "top_p": 0.95,
@@ -78,23 +88,22 @@ class GeminiExtractor(Extractor):
             "max_output_tokens": 8192,
             "response_mime_type": "text/plain",
         }
-        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
-        
-        file = genai.upload_file(image_path, mime_type="image/jpeg")
-        chat_session = model.start_chat(history=[{"role": "user", "parts": [file]}])
-        response = chat_session.send_message(prompt + " " + (query or ""))
+        message = prompt + " " + (query or "")
+        scheduler = get_scheduler("gemini", model_name, api_key, limits)
+        async with genai_config().use(api_key):
+            model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+            
+            file = await asyncio.to_thread(genai.upload_file, image_path, mime_type="image/jpeg")
+            chat_session = model.start_chat(history=[{"role": "user", "parts": [file]}])
+            response = await scheduler.run(lambda: chat_session.send_message_async(message), tokens=estimate_tokens(message) + IMAGE_TOKENS)
         
         return response.text
 
-    def _process_text(self, model_name, key, prompt, query):
+    async def _process_text(self, model_name, key, prompt, query, limits):
         if ('GEMINI_API_KEY' not in os.environ) and (key is None):
             return "The GEMINI_API_KEY environment variable is not present."
         
-        if ('GEMINI_API_KEY' in os.environ) and (key is None):
-            genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-        else:
-            genai.configure(api_key=key)
-        
+        api_key = key or os.environ["GEMINI_API_KEY"]
         generation_config = {
             "temperature": 1,
             "top_p": 0.95,
@@ -102,10 +111,13 @@ class GeminiExtractor(Extractor):
             "max_output_tokens": 8192,
             "response_mime_type": "text/plain",
         }
-        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
-        
-        chat_session = model.start_chat(history=[])
-        response = chat_session.send_message(prompt + " " + query)
+        message = prompt + " " + query
+        scheduler = get_scheduler("gemini", model_name, api_key, limits)
+        async with genai_config().use(api_key):
+            model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+            
+            chat_session = model.start_chat(history=[])
+            response = await scheduler.run(lambda: chat_session.send_message_async(message), tokens=estimate_tokens(message))
         
         return response.text
 
@@ -1,5 +1,6 @@
 from typing import List, Tuple,Optional
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.response_cache import get_response_cache
 from pydantic import BaseModel, Json, Field
 import pickle
 import instructor
@@ -12,6 +13,7 @@ class InputParams(BaseModel):
     model: str = Field(default="gpt-3.5-turbo")
     system_message: Optional[str] = Field(default=None)
     instructions: Optional[str] = Field(default=None)
+    bypass_cache: bool = Field(default=False)
 
 
 # this is for testing purposes.
@@ -39,8 +41,13 @@ class Instructor(Extractor):
         messages = [{"role": "user", "content": f"{params.instructions}: {text}"}]
         if params.system_message:
             messages.append({"role": "system", "content": params.system_message})
-        model  = client.chat.completions.create(model=params.model,response_model=cls, messages=messages)
-        return [Feature.metadata(value=model.model_dump(), name="model")]
+        request = {"model": params.model, "schema": cls.model_json_schema(), "messages": messages}
+        value = get_response_cache().cached(
+            request,
+            lambda: client.chat.completions.create(model=params.model,response_model=cls, messages=messages).model_dump(mode="json"),
+            bypass=params.bypass_cache,
+        )
+        return [Feature.metadata(value=value, name="model")]
     
     def sample_input(self) -> Tuple[Content, BaseModel]:
         data = base64.b64encode(pickle.dumps(UserInfo)).decode("utf-8")
@@ -1,5 +1,6 @@
 from typing import List, Union
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.response_cache import get_response_cache
 from pydantic import BaseModel
 from transformers import pipeline
 from langchain.text_splitter import RecursiveCharacterTextSplitter, MarkdownTextSplitter, LatexTextSplitter
@@ -8,6 +9,9 @@ from .utils.chunk_module import FastRecursiveTextSplitter
 class InputParams(BaseModel):
     max_length: int = 130
     chunk_method: str = "indexify" # recursive, markdown, latex
+    bypass_cache: bool = False
+
+MODEL_NAME = "h2oai/h2o-danube2-1.8b-chat"
 
 class SummaryExtractor(Extractor):
     name = "tensorlake/llm-summary"
@@ -17,7 +21,7 @@ class SummaryExtractor(Extractor):
 
     def __init__(self):
         super().__init__()
-        self.summarizer = pipeline("text-generation", model="h2oai/h2o-danube2-1.8b-chat", device_map="auto")
+        self.summarizer = pipeline("text-generation", model=MODEL_NAME, device_map="auto")
 
     def extract(self, content: Content, params: InputParams) -> List[Union[Feature, Content]]:
         contents = []
@@ -27,6 +31,8 @@ class SummaryExtractor(Extractor):
 
         max_length = getattr(params, 'max_length', len(article)//4)
         chunk_method = getattr(params, 'chunk_method', 'indexify')
+        bypass_cache = getattr(params, 'bypass_cache', False)
+        cache = get_response_cache()
 
         if chunk_method == "recursive":
             text_splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=20)
@@ -56,12 +62,13 @@ class SummaryExtractor(Extractor):
                 tokenize=False,
                 add_generation_prompt=True,
             )
-            res = self.summarizer(
-                prompt,
-                max_new_tokens=(max_length//num_chunks)*2,
-                return_full_text=False
+            max_new_tokens = (max_length//num_chunks)*2
+            request = {"model": MODEL_NAME, "prompt": prompt, "max_new_tokens": max_new_tokens}
+            summary = cache.cached(
+                request,
+                lambda: self.summarizer(prompt, max_new_tokens=max_new_tokens, return_full_text=False)[0]["generated_text"],
+                bypass=bypass_cache,
             )
-            summary = res[0]["generated_text"]
             full_summary = " ".join([full_summary, summary])
 
         feature = Feature.metadata(value={"original_length": len(article.split()), "summary_length": len(full_summary.split()), "num_chunks": num_chunks}, name="text")
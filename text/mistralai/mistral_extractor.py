@@ -1,8 +1,9 @@
 from typing import List, Union, Optional
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, AsyncExtractor, Feature
+from indexify_extractor_sdk.rate_limiter import RateLimit, estimate_tokens, get_scheduler
 from pydantic import BaseModel, Field
 import os
-from mistralai.client import MistralClient
+from mistralai.async_client import MistralAsyncClient
 from mistralai.models.chat_completion import ChatMessage
 import mimetypes
 
@@ -11,8 +12,10 @@ class MistralExtractorConfig(BaseModel):
     key: Optional[str] = Field(default=None)
     system_prompt: str = Field(default='You are a helpful assistant.')
     user_prompt: Optional[str] = Field(default=None)
+    requests_per_minute: Optional[int] = Field(default=None)
+    tokens_per_minute: Optional[int] = Field(default=None)
 
-class MistralExtractor(Extractor):
+class MistralExtractor(AsyncExtractor):
     name = "tensorlake/mistral"
     description = "An extractor that let's you use LLMs from Mistral."
     system_dependencies = []
@@ -21,7 +24,7 @@ class MistralExtractor(Extractor):
     def __init__(self):
         super(MistralExtractor, self).__init__()
 
-    def extract(self, content: Content, params: MistralExtractorConfig) -> List[Union[Feature, Content]]:
+    async def extract_async(self, content: Content, params: MistralExtractorConfig) -> List[Union[Feature, Content]]:
         contents = []
         model_name = params.model_name
         key = params.key
@@ -35,14 +38,17 @@ class MistralExtractor(Extractor):
         if ('MISTRAL_API_KEY' not in os.environ) and (key is None):
             response_content = "The MISTRAL_API_KEY environment variable is not present."
         else:
-            if ('MISTRAL_API_KEY' in os.environ) and (key is None):
-                client = MistralClient(api_key=os.environ["MISTRAL_API_KEY"])
-            else:
-                client = MistralClient(api_key=key)
+            if key is None:
+                key = os.environ["MISTRAL_API_KEY"]
+            # Retries are handled by the scheduler.
+            client = self.get_client(key, lambda: MistralAsyncClient(api_key=key, max_retries=0))
+            limits = RateLimit(params.requests_per_minute, params.tokens_per_minute)
+            scheduler = get_scheduler("mistral", model_name, key, limits)
             
             messages_content = [ ChatMessage(role="system", content=prompt), ChatMessage(role="user", content=query) ]
 
-            response = client.chat( model=model_name, messages=messages_content )
+            tokens = estimate_tokens(prompt) + estimate_tokens(query)
+            response = await scheduler.run(lambda: client.chat( model=model_name, messages=messages_content ), tokens=tokens)
             response_content = response.choices[0].message.content
         
         contents.append(Content.from_text(response_content))
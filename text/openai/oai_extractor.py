@@ -1,20 +1,34 @@
 from typing import List, Union, Optional
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, AsyncExtractor, Feature
+from indexify_extractor_sdk.rate_limiter import RateLimit, estimate_tokens, get_scheduler
+from indexify_extractor_sdk.response_cache import get_response_cache
+from indexify_extractor_sdk.pdf.documents import iter_page_images
 from pydantic import BaseModel, Field
+import asyncio
+import functools
+import io
+import itertools
 import os
 import base64
-from openai import OpenAI
-from pdf2image import convert_from_path
-import tempfile
-import mimetypes
+from openai import AsyncOpenAI
 
 class OAIExtractorConfig(BaseModel):
     model: Optional[str] = Field(default='gpt-4')
     api_key: Optional[str] = Field(default=None)
+    base_url: Optional[str] = Field(default=None)
     system_prompt: str = Field(default='You are a helpful assistant.')
     user_prompt: Optional[str] = Field(default=None)
+    requests_per_minute: Optional[int] = Field(default=None)
+    tokens_per_minute: Optional[int] = Field(default=None)
+    bypass_cache: bool = Field(default=False)
 
-class OAIExtractor(Extractor):
+# Number of PDF pages rasterized and sent at a time.
+PAGE_BATCH_SIZE = 16
+
+# Tokens counted for an image input, a 1024x1024 image in high detail mode.
+IMAGE_TOKENS = 765
+
+class OAIExtractor(AsyncExtractor):
     name = "tensorlake/openai"
     description = "An extractor that let's you use LLMs from OpenAI."
     system_dependencies = []
@@ -23,95 +37,102 @@ class OAIExtractor(Extractor):
     def __init__(self):
         super(OAIExtractor, self).__init__()
 
-    def extract(self, content: Content, params: OAIExtractorConfig) -> List[Union[Feature, Content]]:
+    async def extract_async(self, content: Content, params: OAIExtractorConfig) -> List[Union[Feature, Content]]:
         contents = []
         model_name = params.model
         key = params.api_key
         prompt = params.system_prompt
         query = params.user_prompt
+        if ('OPENAI_API_KEY' not in os.environ) and (key is None):
+            return [Content.from_text("The OPENAI_API_KEY environment variable is not present.")]
+        client = self._client(key, params.base_url)
+        limits = RateLimit(params.requests_per_minute, params.tokens_per_minute)
+        scheduler = get_scheduler("openai", model_name, key or os.environ["OPENAI_API_KEY"], limits)
+        complete = functools.partial(self._complete, client, scheduler, model_name, params.base_url, bypass_cache=params.bypass_cache)
 
         if content.content_type == "application/pdf":
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(content.data)
-                file_path = temp_file.name
-                images = convert_from_path(file_path)
-                
-                all_responses = []
-                for i, image in enumerate(images):
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_image_file:
-                        image.save(temp_image_file.name, 'JPEG')
-                        response = self._process_image(temp_image_file.name, model_name, key, prompt, query)
-                        all_responses.append(f"{response}")
-                    os.unlink(temp_image_file.name)
-                
-                response_content = "\n\n".join(all_responses)
-                os.unlink(file_path)
+            async def process_page(image):
+                response = await self._process_image(complete, image, "image/jpeg", prompt, query)
+                return f"{response}"
+
+            # Pages are rasterized a batch at a time, the next batch renders
+            # while the pages of the current one are sent concurrently.
+            pages = iter_page_images(content.data, batch_size=PAGE_BATCH_SIZE)
+            render = lambda: asyncio.to_thread(self._render_pages, pages)
+            all_responses = []
+            images = await render()
+            while images:
+                next_images = asyncio.ensure_future(render())
+                all_responses.extend(await asyncio.gather(*[process_page(image) for image in images]))
+                images = await next_images
+
+            response_content = "\n\n".join(all_responses)
         
         elif content.content_type in ["image/jpeg", "image/png"]:
-            suffix = mimetypes.guess_extension(content.content_type)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_image_file:
-                temp_image_file.write(content.data)
-                response_content = self._process_image(temp_image_file.name, model_name, key, prompt, query)
-            os.unlink(temp_image_file.name)
+            response_content = await self._process_image(complete, content.data, content.content_type, prompt, query)
         
         else:
             text = content.data.decode("utf-8")
             if query is None:
                 query = text
-            response_content = self._process_text(model_name, key, prompt, query)
+            response_content = await self._process_text(complete, prompt, query)
         
         contents.append(Content.from_text(response_content))
         return contents
 
-    def _process_image(self, image_path, model_name, key, prompt, query):
-        if ('OPENAI_API_KEY' not in os.environ) and (key is None):
-            return "The OPENAI_API_KEY environment variable is not present."
-        
-        if ('OPENAI_API_KEY' in os.environ) and (key is None):
-            client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-        else:
-            client = OpenAI(api_key=key)
-        
-        with open(image_path, "rb") as image_file:
-            encoded_image = base64.b64encode(image_file.read()).decode('utf-8')
+    def _client(self, key, base_url) -> AsyncOpenAI:
+        if key is None:
+            key = os.environ["OPENAI_API_KEY"]
+        # Retries are handled by the scheduler.
+        return self.get_client((key, base_url), lambda: AsyncOpenAI(api_key=key, base_url=base_url, max_retries=0))
+
+    async def _complete(self, client, scheduler, model_name, base_url, messages, tokens, bypass_cache) -> str:
+        async def create():
+            response = await scheduler.run(lambda: client.chat.completions.create(model=model_name, messages=messages), tokens=tokens)
+            return response.choices[0].message.content
+
+        request = {"model": model_name, "base_url": base_url, "messages": messages}
+        return await get_response_cache().cached_async(request, create, bypass=bypass_cache)
+
+    def _render_pages(self, pages) -> List[bytes]:
+        images = []
+        for _, image in itertools.islice(pages, PAGE_BATCH_SIZE):
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG")
+            images.append(buffer.getvalue())
+        return images
+
+    async def _process_image(self, complete, image, mime_type, prompt, query):
+        encoded_image = base64.b64encode(image).decode('utf-8')
         
         messages_content = [
             {
                 "role": "user",
                 "content": [
                     {"type": "text", "text": prompt + " " + (query or "")},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded_image}"}}
+                    {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"}}
                 ]
             }
         ]
 
         try: 
-            response = client.chat.completions.create(model=model_name, messages=messages_content)
+            tokens = estimate_tokens(prompt + " " + (query or "")) + IMAGE_TOKENS
+            return await complete(messages_content, tokens)
         except Exception as e:
             print(f"unable to process image: {str(e)}")
             raise e
-        return response.choices[0].message.content
 
-    def _process_text(self, model_name, key, prompt, query):
-        if ('OPENAI_API_KEY' not in os.environ) and (key is None):
-            return "The OPENAI_API_KEY environment variable is not present."
-        
-        if ('OPENAI_API_KEY' in os.environ) and (key is None):
-            client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-        else:
-            client = OpenAI(api_key=key)
-        
+    async def _process_text(self, complete, prompt, query):
         messages_content = [
             {"role": "system", "content": prompt},
             {"role": "user", "content": query}
         ]
 
         try: 
-            response = client.chat.completions.create(model=model_name, messages=messages_content)
+            return await complete(messages_content, estimate_tokens(messages_content))
         except Exception as e:
             print(f"unable to process text: {str(e)}")
             raise e
-        return response.choices[0].message.content
 
     def sample_input(self) -> Content:
         return Content.from_text("Hello world, I am a good boy.")
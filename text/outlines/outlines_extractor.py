@@ -1,5 +1,6 @@
 from typing import List, Union, Optional
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.response_cache import get_response_cache
 from pydantic import BaseModel, Field
 import os
 import outlines
@@ -22,6 +23,7 @@ class OutlinesExtractorConfig(BaseModel):
     json_schema: Optional[str] = Field(default=None)
     cfg_grammar: Optional[str] = Field(default=None)
     hf_token: Optional[str] = Field(default=token)
+    bypass_cache: bool = Field(default=False)
 
 class OutlinesExtractor(Extractor):
     name = "tensorlake/outlines"
@@ -34,15 +36,25 @@ class OutlinesExtractor(Extractor):
 
     def extract(self, content: Content, params: OutlinesExtractorConfig) -> List[Union[Feature, Content]]:
         contents = []
+        text_input = content.data.decode("utf-8")
+        full_prompt = f"{params.prompt} {text_input}"
+
+        request = params.model_dump(exclude={"hf_token", "bypass_cache", "prompt"})
+        request["prompt"] = full_prompt
+        response = get_response_cache().cached(
+            request, lambda: self._generate(params, full_prompt), bypass=params.bypass_cache
+        )
+
+        contents.append(Content.from_text(response))
+        
+        return contents
+
+    def _generate(self, params: OutlinesExtractorConfig, full_prompt: str) -> str:
         model_name = params.model_name
         generation_type = params.generation_type
-        prompt = params.prompt
         max_tokens = params.max_tokens
         login(token=params.hf_token)
 
-        text_input = content.data.decode("utf-8")
-        full_prompt = f"{prompt} {text_input}"
-
         model = transformers(model_name)
 
         if generation_type == 'text':
@@ -67,9 +79,7 @@ class OutlinesExtractor(Extractor):
         else:
             response = "Invalid generation type or missing required parameters."
 
-        contents.append(Content.from_text(str(response)))
-        
-        return contents
+        return str(response)
 
     def sample_input(self) -> Content:
         return Content.from_text("Hello world, I am using Outlines.")
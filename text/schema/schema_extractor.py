@@ -1,13 +1,28 @@
 from typing import List, Union, Optional
-from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk import Content, AsyncExtractor, Feature
+from indexify_extractor_sdk.rate_limiter import RateLimit, estimate_tokens, get_client_config, get_scheduler
+from indexify_extractor_sdk.response_cache import get_response_cache
 from pydantic import BaseModel, Field
 from transformers import pipeline
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 import google.generativeai as genai
 from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 
+# Local models take the GPU, one of them is loaded and runs at a time, on a
+# thread of its own so waiting requests don't hold the event loop's threads.
+_local_model_executor = ThreadPoolExecutor(max_workers=1)
+
+@lru_cache(maxsize=1)
+def load_local_pipeline(service):
+    model = AutoModelForCausalLM.from_pretrained(service, device_map="cuda", torch_dtype="auto", trust_remote_code=True)
+    tokenizer = AutoTokenizer.from_pretrained(service)
+    return pipeline("text-generation", model=model, tokenizer=tokenizer)
+
 class SchemaExtractorConfig(BaseModel):
     service: str = Field(default='openai')
     model_name: Optional[str] = Field(default='gpt-3.5-turbo')
@@ -21,11 +36,14 @@ class SchemaExtractorConfig(BaseModel):
     example_text: Optional[str] = Field(default=None)
     data: Optional[str] = Field(default=None)
     additional_messages: str = Field(default='Extract information in JSON according to this schema and return only the output.')
+    requests_per_minute: Optional[int] = Field(default=None)
+    tokens_per_minute: Optional[int] = Field(default=None)
+    bypass_cache: bool = Field(default=False)
 
     class Config:
         allow_population_by_field_name = True
 
-class SchemaExtractor(Extractor):
+class SchemaExtractor(AsyncExtractor):
     name = "tensorlake/schema"
     description = "An extractor that let's you extract JSON from schemas."
     system_dependencies = []
@@ -34,83 +52,98 @@ class SchemaExtractor(Extractor):
     def __init__(self):
         super(SchemaExtractor, self).__init__()
 
-    def extract(self, content: Content, params: SchemaExtractorConfig) -> List[Union[Feature, Content]]:
-        contents = []
+    async def extract_async(self, content: Content, params: SchemaExtractorConfig) -> List[Union[Feature, Content]]:
         text = content.data.decode("utf-8")
 
         service = params.service
         model_name = params.model_name
         key = params.key
-        schema = params.schema
-        example_text = params.example_text
         data = params.data
-        additional_messages = params.additional_messages
         if data is None:
             data = text
 
+        if service == "openai" and ('OPENAI_API_KEY' not in os.environ) and (key is None):
+            feature = Feature.metadata(value={"model": model_name}, name="text")
+            return [Content.from_text("The OPENAI_API_KEY environment variable is not present.", features=[feature])]
+        if service == "gemini" and ('GEMINI_API_KEY' not in os.environ) and (key is None):
+            feature = Feature.metadata(value={"model": model_name}, name="text")
+            return [Content.from_text("The GEMINI_API_KEY environment variable is not present.", features=[feature])]
+
+        request = {
+            "service": service,
+            "model_name": model_name,
+            "schema": params.schema_config,
+            "example_text": params.example_text,
+            "data": data,
+            "additional_messages": params.additional_messages,
+        }
+        response_content, feature_value = await get_response_cache().cached_async(
+            request, lambda: self._generate(params, data), bypass=params.bypass_cache
+        )
+        feature = Feature.metadata(value=feature_value, name="text")
+        return [Content.from_text(response_content, features=[feature])]
+
+    async def _generate(self, params: SchemaExtractorConfig, data: str):
+        service = params.service
+        model_name = params.model_name
+        key = params.key
+        schema = params.schema_config
+        example_text = params.example_text
+        additional_messages = params.additional_messages
+        limits = RateLimit(params.requests_per_minute, params.tokens_per_minute)
+
         if service == "openai":
-            if ('OPENAI_API_KEY' not in os.environ) and (key is None):
-                response_content = "The OPENAI_API_KEY environment variable is not present."
-                feature = Feature.metadata(value={"model": model_name}, name="text")
-            else:
-                if ('OPENAI_API_KEY' in os.environ) and (key is None):
-                    client = OpenAI()
-                else:
-                    client = OpenAI(api_key=key)
-                if schema is None and example_text:
-                    schema = client.chat.completions.create(
-                        model=model_name,
-                        messages=[
-                            {"role": "system", "content": "Extract a JSON schema based on the examples" + str(example_text)},
-                            {"role": "user", "content": data}
-                        ]
-                    )
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=[
-                        {"role": "system", "content": additional_messages + str(schema)},
-                        {"role": "user", "content": data}
-                    ]
-                )
-                response_content = response.choices[0].message.content
-                feature = Feature.metadata(value={"model": response.model, "completion_tokens": response.usage.completion_tokens, "prompt_tokens": response.usage.prompt_tokens}, name="text")
-        
+            # Retries are handled by the scheduler.
+            client = self.get_client(("openai", key), lambda: AsyncOpenAI(api_key=key, max_retries=0))
+            scheduler = get_scheduler("openai", model_name, key or os.environ["OPENAI_API_KEY"], limits)
+            if schema is None and example_text:
+                schema_messages = [
+                    {"role": "system", "content": "Extract a JSON schema based on the examples" + str(example_text)},
+                    {"role": "user", "content": data}
+                ]
+                schema = await scheduler.run(lambda: client.chat.completions.create(model=model_name, messages=schema_messages), tokens=estimate_tokens(schema_messages))
+            messages = [
+                {"role": "system", "content": additional_messages + str(schema)},
+                {"role": "user", "content": data}
+            ]
+            response = await scheduler.run(lambda: client.chat.completions.create(model=model_name, messages=messages), tokens=estimate_tokens(messages))
+            response_content = response.choices[0].message.content
+            return response_content, {"model": response.model, "completion_tokens": response.usage.completion_tokens, "prompt_tokens": response.usage.prompt_tokens}
+
         if service == "gemini":
-            if ('GEMINI_API_KEY' not in os.environ) and (key is None):
-                response_content = "The GEMINI_API_KEY environment variable is not present."
-                feature = Feature.metadata(value={"model": model_name}, name="text")
-            else:
-                if ('GEMINI_API_KEY' in os.environ) and (key is None):
-                    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-                else:
-                    genai.configure(api_key=key)
-                generation_config = { "temperature": 1, "top_p": 0.95, "top_k": 64, "max_output_tokens": 8192, "response_mime_type": "text/plain", }
-                safety_settings = [ { "category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE", }, { "category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE", }, { "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE", }, { "category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE", }, ]
+            api_key = key or os.environ["GEMINI_API_KEY"]
+            generation_config = { "temperature": 1, "top_p": 0.95, "top_k": 64, "max_output_tokens": 8192, "response_mime_type": "text/plain", }
+            safety_settings = [ { "category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE", }, { "category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE", }, { "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE", }, { "category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE", }, ]
+            scheduler = get_scheduler("gemini", "gemini-1.5-flash-latest", api_key, limits)
+            # genai is configured for the whole process, requests with another key wait their turn.
+            async with get_client_config("gemini", lambda api_key: genai.configure(api_key=api_key)).use(api_key):
                 model = genai.GenerativeModel( model_name="gemini-1.5-flash-latest", safety_settings=safety_settings, generation_config=generation_config, )
                 chat_session = model.start_chat( history=[ ] )
                 if schema is None and example_text:
-                    schema = chat_session.send_message("Extract a JSON schema based on the examples" + str(example_text))
-                response = chat_session.send_message(additional_messages + str(schema) + " " + data)
-                response_content = response.text
-                feature = Feature.metadata(value={"model": model_name}, name="text")
-        
+                    schema_message = "Extract a JSON schema based on the examples" + str(example_text)
+                    schema = await scheduler.run(lambda: chat_session.send_message_async(schema_message), tokens=estimate_tokens(schema_message))
+                message = additional_messages + str(schema) + " " + data
+                response = await scheduler.run(lambda: chat_session.send_message_async(message), tokens=estimate_tokens(message))
+            return response.text, {"model": model_name}
+
         if '/' in service:
-            model = AutoModelForCausalLM.from_pretrained(service, device_map="cuda", torch_dtype="auto", trust_remote_code=True)
-            tokenizer = AutoTokenizer.from_pretrained(service)
-            pipe = pipeline("text-generation", model=model, tokenizer=tokenizer)
-            generation_args = {"max_new_tokens": 500, "return_full_text": False, "temperature": 0.0, "do_sample": False}
-            if schema is None and example_text:
-                schema_messages = [{"role": "system", "content": "Extract a JSON schema based on the examples" + str(example_text)}, {"role": "user", "content": data}]
-                schema = pipe(schema_messages, **generation_args)
-                schema = schema[0]['generated_text']
-            messages = [{"role": "system", "content": additional_messages + str(schema)}, {"role": "user", "content": data}]
-            output = pipe(messages, **generation_args)
-            response_content = output[0]['generated_text']
-            feature = Feature.metadata(value={"model": service}, name="text")
-        
-        contents.append(Content.from_text(response_content, features=[feature]))
-        
-        return contents
+            # Local models are compute bound, run them off the event loop.
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_local_model_executor, self._run_local_model, service, schema, example_text, data, additional_messages)
+
+        raise ValueError(f"unsupported service {service}")
+
+    def _run_local_model(self, service, schema, example_text, data, additional_messages):
+        pipe = load_local_pipeline(service)
+        generation_args = {"max_new_tokens": 500, "return_full_text": False, "temperature": 0.0, "do_sample": False}
+        if schema is None and example_text:
+            schema_messages = [{"role": "system", "content": "Extract a JSON schema based on the examples" + str(example_text)}, {"role": "user", "content": data}]
+            schema = pipe(schema_messages, **generation_args)
+            schema = schema[0]['generated_text']
+        messages = [{"role": "system", "content": additional_messages + str(schema)}, {"role": "user", "content": data}]
+        output = pipe(messages, **generation_args)
+        response_content = output[0]['generated_text']
+        return response_content, {"model": service}
 
     def sample_input(self) -> Content:
         return Content.from_text("Hello, I am Diptanu from Tensorlake.")
@@ -0,0 +1,146 @@
+"""
+Compares the native splitters with the langchain splitters ChunkExtractor
+used before, on generated plain text, markdown, html and json documents of
+`--mb` megabytes in total. Needs langchain, lxml and the package built with
+`maturin develop --release`.
+
+    python benchmarks/splitter_benchmark.py --mb 100 --threads 8
+"""
+import argparse
+import json
+import random
+import time
+
+from indexify_text_splitters import NativeTextSplitter
+from langchain_text_splitters import (
+    CharacterTextSplitter,
+    HTMLHeaderTextSplitter,
+    MarkdownHeaderTextSplitter,
+    RecursiveCharacterTextSplitter,
+    RecursiveJsonSplitter,
+)
+
+WORDS = "the of and to in is that for it as was with be by on not he this are or his from at which".split()
+
+MARKDOWN_HEADERS = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
+HTML_HEADERS = [("h1", "Header 1"), ("h2", "Header 2"), ("h3", "Header 3"), ("h4", "Header 4")]
+
+
+def sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def make_text(size: int, rng: random.Random) -> str:
+    parts, total = [], 0
+    while total < size:
+        part = paragraph(rng)
+        parts.append(part)
+        total += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def make_markdown(size: int, rng: random.Random) -> str:
+    parts, total, i = [], 0, 0
+    while total < size:
+        part = f"{'#' * (i % 3 + 1)} Section {i}\n\n{paragraph(rng)}\n\n{paragraph(rng)}\n"
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def make_html(size: int, rng: random.Random) -> str:
+    parts, total, i = ["<html><body>"], 0, 0
+    while total < size:
+        part = f"<h{i % 4 + 1}>Section {i}</h{i % 4 + 1}><p>{paragraph(rng)}</p><div>{paragraph(rng)}</div>"
+        parts.append(part)
+        total += len(part)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def make_json(size: int, rng: random.Random) -> str:
+    data, total, i = {}, 0, 0
+    while total < size:
+        record = {"title": sentence(rng), "body": paragraph(rng), "tags": rng.sample(WORDS, 3)}
+        data[f"record_{i}"] = record
+        total += len(json.dumps(record))
+        i += 1
+    return json.dumps(data)
+
+
+def langchain_splitter(mode: str, chunk_size: int, overlap: int):
+    if mode == "recursive":
+        return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap).split_text
+    if mode == "char":
+        return CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap, separator="\n\n").split_text
+    if mode == "markdown":
+        return MarkdownHeaderTextSplitter(headers_to_split_on=MARKDOWN_HEADERS).split_text
+    if mode == "html":
+        return HTMLHeaderTextSplitter(headers_to_split_on=HTML_HEADERS).split_text
+    # RecursiveJsonSplitter takes the parsed object, and keeps its chunks in
+    # a mutable default argument, so a fresh splitter and list per call.
+    return lambda text: RecursiveJsonSplitter(max_chunk_size=chunk_size).split_text(json.loads(text))
+
+
+def native_splitter(mode: str, chunk_size: int, overlap: int) -> NativeTextSplitter:
+    structural = mode in ("markdown", "html")
+    return NativeTextSplitter(mode, chunk_size=0 if structural else chunk_size, overlap=0 if structural else overlap)
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=100)
+    parser.add_argument("--docs", type=int, default=100, help="documents the text is spread over")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["recursive", "char", "markdown", "html", "json"])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    doc_size = int(args.mb * 1e6 / args.docs)
+    makers = {"recursive": make_text, "char": make_text, "markdown": make_markdown, "html": make_html, "json": make_json}
+
+    print(f"{args.docs} docs, {args.mb:g} MB per mode, chunk size {args.chunk_size}, overlap {args.overlap}")
+    print(f"{'mode':10} {'langchain':>12} {'native':>12} {'batch':>12} {'speedup':>8} {'chunks':>16}")
+    for mode in args.modes:
+        docs = [makers[mode](doc_size, rng) for _ in range(args.docs)]
+        mb = sum(len(doc.encode("utf-8")) for doc in docs) / 1e6
+
+        split = langchain_splitter(mode, args.chunk_size, args.overlap)
+        langchain_time, langchain_chunks = measure(lambda: [split(doc) for doc in docs])
+
+        native = native_splitter(mode, args.chunk_size, args.overlap)
+        native_time, native_chunks = measure(lambda: [native.split_text(doc) for doc in docs])
+        batch_time, batch_chunks = measure(lambda: native.split_texts(docs, num_threads=args.threads))
+        assert batch_chunks == native_chunks
+
+        langchain_count = sum(len(chunks) for chunks in langchain_chunks)
+        native_count = sum(len(chunks) for chunks in native_chunks)
+        if mode in ("recursive", "char"):
+            # Same algorithm, the chunk texts must match.
+            assert [c for chunks in langchain_chunks for c in chunks] == [
+                c.text for chunks in native_chunks for c in chunks
+            ], f"{mode} chunks differ from langchain"
+
+        print(
+            f"{mode:10} {mb / langchain_time:8.1f} MB/s {mb / native_time:8.1f} MB/s "
+            f"{mb / batch_time:8.1f} MB/s {langchain_time / batch_time:7.1f}x "
+            f"{langchain_count:>7} / {native_count:<7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from .recursive_text_splitter import _FastRecursiveTextSplitter
+from .text_splitter import NativeTextSplitter, TextChunk, TextSpan
 from typing import Any, List
 
 from langchain_text_splitters.base import TextSplitter
@@ -0,0 +1,70 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .indexify_text_splitters import _TextSplitter
+
+
+class TextChunk(NamedTuple):
+    text: str
+    # Byte offsets of the chunk in the UTF-8 encoded text.
+    start: int
+    end: int
+    metadata: Dict[str, str]
+
+
+class TextSpan(NamedTuple):
+    # Byte offsets of the chunk in the UTF-8 encoded text.
+    start: int
+    end: int
+    metadata: Dict[str, str]
+    # Set only when the chunk isn't the text between the offsets, e.g. html
+    # sections without their tags.
+    text: Optional[str]
+
+
+class NativeTextSplitter:
+    """
+    Splits text with the native char, recursive, markdown, html, json or
+    sentence splitters. Sizes count characters, or whitespace separated tokens with
+    `length_unit="token"`. For markdown and html a `chunk_size` of 0 keeps
+    every section whole, `headers` maps header markers or tags to metadata
+    keys.
+    """
+
+    def __init__(
+        self,
+        mode: str = "recursive",
+        chunk_size: int = 100,
+        overlap: int = 0,
+        length_unit: str = "char",
+        headers: Optional[Sequence[Tuple[str, str]]] = None,
+    ):
+        self._splitter = _TextSplitter(
+            mode,
+            chunk_size=chunk_size,
+            overlap=overlap,
+            length_unit=length_unit,
+            headers=list(headers) if headers is not None else None,
+        )
+
+    def split_text(self, text: str) -> List[TextChunk]:
+        return [
+            TextChunk(chunk, start, end, dict(metadata))
+            for chunk, start, end, metadata in self._splitter.split_text(text)
+        ]
+
+    def split_spans(self, data: bytes) -> List[TextSpan]:
+        """
+        Splits UTF-8 encoded text without decoding it into a str, for callers
+        which slice the chunks out of the input themselves.
+        """
+        return [
+            TextSpan(start, end, dict(metadata), text)
+            for start, end, metadata, text in self._splitter.split_spans(data)
+        ]
+
+    def split_texts(self, texts: List[str], num_threads: int = 1) -> List[List[TextChunk]]:
+        """Splits a batch of texts without taking the GIL for each chunk."""
+        return [
+            [TextChunk(chunk, start, end, dict(metadata)) for chunk, start, end, metadata in chunks]
+            for chunks in self._splitter.split_texts(texts, num_threads=num_threads)
+        ]
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from indexify_text_splitters import FastRecursiveTextSplitter, NativeTextSplitter
+
+
+def test_recursive_offsets():
+    text = "Ünïcode first paragraph.\n\nSecond paragraph, a bit longer.\nLast line."
+    data = text.encode("utf-8")
+    chunks = NativeTextSplitter("recursive", chunk_size=40).split_text(text)
+    assert [c.text for c in chunks] == [
+        "Ünïcode first paragraph.",
+        "Second paragraph, a bit longer.",
+        "Last line.",
+    ]
+    for chunk in chunks:
+        assert data[chunk.start:chunk.end].decode("utf-8") == chunk.text
+
+
+def test_token_sizes_and_overlap():
+    text = " ".join(str(i) for i in range(10))
+    chunks = NativeTextSplitter("recursive", chunk_size=4, overlap=2, length_unit="token").split_text(text)
+    assert [c.text for c in chunks] == ["0 1 2 3", "2 3 4 5", "4 5 6 7", "6 7 8 9"]
+
+
+def test_markdown_headers():
+    text = "# Title\nIntro\n## Part\nBody\n"
+    chunks = NativeTextSplitter("markdown", chunk_size=0).split_text(text)
+    assert [(c.text, c.metadata) for c in chunks] == [
+        ("Intro", {"Header 1": "Title"}),
+        ("Body", {"Header 1": "Title", "Header 2": "Part"}),
+    ]
+
+
+def test_html_headers():
+    text = "<h1>Title</h1><p>Intro</p><h2>Part</h2><p>Body &amp; more</p>"
+    chunks = NativeTextSplitter("html", chunk_size=0).split_text(text)
+    assert [(c.text, c.metadata) for c in chunks] == [
+        ("Intro", {"Header 1": "Title"}),
+        ("Body & more", {"Header 1": "Title", "Header 2": "Part"}),
+    ]
+
+
+def test_json():
+    data = {"a": {"x": "a" * 40}, "b": {"y": "b" * 40}}
+    chunks = NativeTextSplitter("json", chunk_size=60).split_text(json.dumps(data))
+    assert [json.loads(c.text) for c in chunks] == [{"a": {"x": "a" * 40}}, {"b": {"y": "b" * 40}}]
+    with pytest.raises(ValueError):
+        NativeTextSplitter("json", chunk_size=60).split_text("{not json")
+
+
+def test_split_spans():
+    text = "# Título\nÜnïcode intro\n## Part\nBody\n"
+    data = text.encode("utf-8")
+    spans = NativeTextSplitter("markdown", chunk_size=0).split_spans(data)
+    assert [(data[s.start:s.end].decode("utf-8"), s.text) for s in spans] == [
+        ("Ünïcode intro", None),
+        ("Body", None),
+    ]
+    html = NativeTextSplitter("html", chunk_size=0).split_spans(b"<h1>T</h1><p>a &amp; b</p>")
+    assert [s.text for s in html] == ["a & b"]
+    with pytest.raises(ValueError):
+        NativeTextSplitter("char").split_spans(b"\xff")
+
+
+def test_sentences():
+    text = "Dr. Smith arrived. He said hi! Then he left.\n\nA new paragraph"
+    splitter = NativeTextSplitter("sentence", chunk_size=0)
+    assert [c.text for c in splitter.split_text(text)] == [
+        "Dr. Smith arrived.",
+        "He said hi!",
+        "Then he left.",
+        "A new paragraph",
+    ]
+    packed = NativeTextSplitter("sentence", chunk_size=35).split_text(text)
+    assert [c.text for c in packed] == ["Dr. Smith arrived. He said hi!", "Then he left.\n\nA new paragraph"]
+
+
+def test_split_texts():
+    splitter = NativeTextSplitter("char", chunk_size=10)
+    texts = [f"doc {i}\n\nsecond part" for i in range(50)]
+    batched = splitter.split_texts(texts, num_threads=4)
+    assert batched == [splitter.split_text(text) for text in texts]
+
+
+def test_fast_recursive_splitter_extends_to_sentence_end():
+    text = "one two three. four five six seven. eight"
+    assert FastRecursiveTextSplitter(chunk_size=2).split_text(text) == [
+        "one two three.",
+        "four five six seven.",
+        "eight",
+    ]
@@ -0,0 +1,227 @@
+use crate::splitter::{split_recursive, Chunk, SplitConfig};
+
+// Tags which start a new line of text.
+const BLOCK_TAGS: [&str; 24] = [
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+    "footer", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "tr",
+    "ul",
+];
+
+// Tags whose content isn't text.
+const RAW_TEXT_TAGS: [&str; 4] = ["script", "style", "noscript", "template"];
+
+/// Splits html into the text of the sections under its headers, `headers`
+/// maps a header tag such as "h2" to the metadata key of its text, from the
+/// outermost level to the innermost. Chunk offsets are the span of the
+/// section in the html.
+pub fn split_html(text: &str, headers: &[(String, String)], config: &SplitConfig) -> Vec<Chunk> {
+    let mut chunks = Vec::new();
+    let mut stack: Vec<(usize, String)> = Vec::new();
+    let mut section_start = 0;
+    let mut section = String::new();
+    // Level and text of the header being read.
+    let mut header: Option<(usize, String)> = None;
+    let mut raw_text: Option<String> = None;
+    let bytes = text.as_bytes();
+    let mut pos = 0;
+
+    while pos < text.len() {
+        if bytes[pos] != b'<' {
+            let end = text[pos..].find('<').map_or(text.len(), |i| pos + i);
+            if raw_text.is_none() {
+                let decoded = decode_entities(&text[pos..end]);
+                match header.as_mut() {
+                    Some((_, header_text)) => header_text.push_str(&decoded),
+                    None => section.push_str(&decoded),
+                }
+            }
+            pos = end;
+            continue;
+        }
+
+        let rest = &text[pos..];
+        if rest.starts_with("<!--") {
+            pos = rest.find("-->").map_or(text.len(), |i| pos + i + 3);
+            continue;
+        }
+        let Some(tag_len) = rest.find('>') else {
+            break;
+        };
+        let tag_start = pos;
+        let tag_end = pos + tag_len + 1;
+        let tag = &text[pos + 1..tag_end - 1];
+        pos = tag_end;
+        if tag.starts_with('!') || tag.starts_with('?') {
+            continue;
+        }
+        let closing = tag.starts_with('/');
+        let name: String = tag
+            .trim_start_matches('/')
+            .chars()
+            .take_while(|c| c.is_ascii_alphanumeric())
+            .collect::<String>()
+            .to_ascii_lowercase();
+
+        if let Some(raw) = &raw_text {
+            if closing && *raw == name {
+                raw_text = None;
+            }
+            continue;
+        }
+        if !closing && RAW_TEXT_TAGS.contains(&name.as_str()) && !tag.ends_with('/') {
+            raw_text = Some(name);
+            continue;
+        }
+
+        if let Some(level) = headers.iter().position(|(tag, _)| *tag == name) {
+            if !closing {
+                flush(section_start, tag_start, &mut section, &stack, headers, config, &mut chunks);
+                header = Some((level, String::new()));
+            } else if let Some((header_level, header_text)) = header.take() {
+                while stack.last().map_or(false, |(l, _)| *l >= header_level) {
+                    stack.pop();
+                }
+                stack.push((header_level, normalize(&header_text).replace('\n', " ")));
+                section_start = tag_end;
+            }
+            continue;
+        }
+        if BLOCK_TAGS.contains(&name.as_str()) {
+            match header.as_mut() {
+                Some((_, header_text)) => header_text.push(' '),
+                None => section.push('\n'),
+            }
+        }
+    }
+    flush(section_start, text.len(), &mut section, &stack, headers, config, &mut chunks);
+    chunks
+}
+
+fn flush(
+    start: usize,
+    end: usize,
+    section: &mut String,
+    stack: &[(usize, String)],
+    headers: &[(String, String)],
+    config: &SplitConfig,
+    chunks: &mut Vec<Chunk>,
+) {
+    let normalized = normalize(section);
+    section.clear();
+    if normalized.is_empty() {
+        return;
+    }
+    let metadata: Vec<(String, String)> = stack
+        .iter()
+        .map(|(level, header)| (headers[*level].1.clone(), header.clone()))
+        .collect();
+    let parts = if config.chunk_size > 0 && config.unit.len(&normalized) > config.chunk_size {
+        split_recursive(&normalized, 0, normalized.len(), config)
+            .into_iter()
+            .map(|(s, e)| normalized[s..e].to_string())
+            .collect()
+    } else {
+        vec![normalized]
+    };
+    // The pieces of a split section all point at the span of the section.
+    for part in parts {
+        chunks.push(Chunk {
+            text: part,
+            start,
+            end,
+            metadata: metadata.clone(),
+        });
+    }
+}
+
+/// Collapses the whitespace of every line and drops the empty ones.
+fn normalize(text: &str) -> String {
+    text.lines()
+        .map(|line| line.split_whitespace().collect::<Vec<_>>().join(" "))
+        .filter(|line| !line.is_empty())
+        .collect::<Vec<_>>()
+        .join("\n")
+}
+
+fn decode_entities(text: &str) -> String {
+    if !text.contains('&') {
+        return text.to_string();
+    }
+    let mut out = String::with_capacity(text.len());
+    let mut rest = text;
+    while let Some(i) = rest.find('&') {
+        out.push_str(&rest[..i]);
+        rest = &rest[i..];
+        let decoded = rest[1..].find(';').filter(|&j| j <= 10).and_then(|j| {
+            let entity = &rest[1..j + 1];
+            let c = match entity {
+                "amp" => Some('&'),
+                "lt" => Some('<'),
+                "gt" => Some('>'),
+                "quot" => Some('"'),
+                "apos" => Some('\''),
+                "nbsp" => Some(' '),
+                _ => entity
+                    .strip_prefix("#x")
+                    .or_else(|| entity.strip_prefix("#X"))
+                    .map(|hex| u32::from_str_radix(hex, 16).ok())
+                    .unwrap_or_else(|| entity.strip_prefix('#').and_then(|dec| dec.parse().ok()))
+                    .and_then(char::from_u32),
+            };
+            c.map(|c| (c, j + 2))
+        });
+        match decoded {
+            Some((c, len)) => {
+                out.push(c);
+                rest = &rest[len..];
+            }
+            None => {
+                out.push('&');
+                rest = &rest[1..];
+            }
+        }
+    }
+    out.push_str(rest);
+    out
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::splitter::Splitter;
+
+    fn split(text: &str) -> Vec<Chunk> {
+        Splitter::new("html", 0, 0, "char", None)
+            .unwrap()
+            .split(text)
+            .unwrap()
+    }
+
+    #[test]
+    fn splits_on_headers() {
+        let html = "<html><head><style>p { color: red; }</style></head><body>\
+            <p>Intro</p><h1>Title</h1><p>Body &amp; more</p><p>Second</p>\
+            <h2>Sub <b>section</b></h2><div>Nested</div><!-- <h1>no</h1> -->\
+            <h1>Other</h1><ul><li>a</li><li>b</li></ul><script>var x = '<h1>';</script></body></html>";
+        let chunks = split(html);
+        let texts: Vec<&str> = chunks.iter().map(|c| c.text.as_str()).collect();
+        assert_eq!(texts, vec!["Intro", "Body & more\nSecond", "Nested", "a\nb"]);
+        assert_eq!(
+            chunks[2].metadata,
+            vec![
+                ("Header 1".to_string(), "Title".to_string()),
+                ("Header 2".to_string(), "Sub section".to_string())
+            ]
+        );
+        assert_eq!(
+            chunks[3].metadata,
+            vec![("Header 1".to_string(), "Other".to_string())]
+        );
+        assert!(html[chunks[1].start..chunks[1].end].starts_with("<p>Body"));
+    }
+
+    #[test]
+    fn decodes_entities() {
+        assert_eq!(decode_entities("a &lt;b&gt; &#233; &#x41; &unknown; &"), "a <b> é A &unknown; &");
+    }
+}
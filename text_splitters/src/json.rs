@@ -0,0 +1,503 @@
+use crate::splitter::Chunk;
+
+/// A parsed JSON value with its byte span in the source and the length of
+/// its serialization, in the format of Python's `json.dumps`.
+#[derive(Debug)]
+struct Node {
+    value: Value,
+    start: usize,
+    end: usize,
+    size: usize,
+}
+
+#[derive(Debug)]
+enum Value {
+    Null,
+    Bool(bool),
+    // Numbers are kept as written.
+    Number(String),
+    Str(String),
+    Array(Vec<Node>),
+    Object(Vec<(String, Node)>),
+}
+
+struct Parser<'a> {
+    text: &'a str,
+    bytes: &'a [u8],
+    pos: usize,
+}
+
+impl<'a> Parser<'a> {
+    fn error<T>(&self, message: &str) -> Result<T, String> {
+        Err(format!("invalid JSON at byte {}: {}", self.pos, message))
+    }
+
+    fn skip_whitespace(&mut self) {
+        while self.pos < self.bytes.len() && matches!(self.bytes[self.pos], b' ' | b'\t' | b'\n' | b'\r') {
+            self.pos += 1;
+        }
+    }
+
+    fn expect(&mut self, literal: &str) -> Result<(), String> {
+        if self.text[self.pos..].starts_with(literal) {
+            self.pos += literal.len();
+            Ok(())
+        } else {
+            self.error(&format!("expected {literal}"))
+        }
+    }
+
+    fn parse_value(&mut self) -> Result<Node, String> {
+        self.skip_whitespace();
+        let start = self.pos;
+        let value = match self.bytes.get(self.pos) {
+            None => return self.error("unexpected end of input"),
+            Some(b'n') => {
+                self.expect("null")?;
+                Value::Null
+            }
+            Some(b't') => {
+                self.expect("true")?;
+                Value::Bool(true)
+            }
+            Some(b'f') => {
+                self.expect("false")?;
+                Value::Bool(false)
+            }
+            Some(b'"') => Value::Str(self.parse_string()?),
+            Some(b'[') => {
+                self.pos += 1;
+                let mut items = Vec::new();
+                self.skip_whitespace();
+                if self.bytes.get(self.pos) == Some(&b']') {
+                    self.pos += 1;
+                } else {
+                    loop {
+                        items.push(self.parse_value()?);
+                        self.skip_whitespace();
+                        match self.bytes.get(self.pos) {
+                            Some(b',') => self.pos += 1,
+                            Some(b']') => {
+                                self.pos += 1;
+                                break;
+                            }
+                            _ => return self.error("expected , or ]"),
+                        }
+                    }
+                }
+                Value::Array(items)
+            }
+            Some(b'{') => {
+                self.pos += 1;
+                let mut entries = Vec::new();
+                self.skip_whitespace();
+                if self.bytes.get(self.pos) == Some(&b'}') {
+                    self.pos += 1;
+                } else {
+                    loop {
+                        self.skip_whitespace();
+                        if self.bytes.get(self.pos) != Some(&b'"') {
+                            return self.error("expected a key");
+                        }
+                        let key = self.parse_string()?;
+                        self.skip_whitespace();
+                        self.expect(":")?;
+                        entries.push((key, self.parse_value()?));
+                        self.skip_whitespace();
+                        match self.bytes.get(self.pos) {
+                            Some(b',') => self.pos += 1,
+                            Some(b'}') => {
+                                self.pos += 1;
+                                break;
+                            }
+                            _ => return self.error("expected , or }"),
+                        }
+                    }
+                }
+                Value::Object(entries)
+            }
+            Some(b'-' | b'0'..=b'9') => {
+                while self.pos < self.bytes.len()
+                    && matches!(self.bytes[self.pos], b'-' | b'+' | b'.' | b'e' | b'E' | b'0'..=b'9')
+                {
+                    self.pos += 1;
+                }
+                Value::Number(self.text[start..self.pos].to_string())
+            }
+            Some(_) => return self.error("unexpected character"),
+        };
+        let size = value_size(&value);
+        Ok(Node {
+            value,
+            start,
+            end: self.pos,
+            size,
+        })
+    }
+
+    fn parse_string(&mut self) -> Result<String, String> {
+        self.pos += 1;
+        let mut out = String::new();
+        loop {
+            let Some(offset) = self.text[self.pos..].find(|c| c == '"' || c == '\\') else {
+                return self.error("unterminated string");
+            };
+            out.push_str(&self.text[self.pos..self.pos + offset]);
+            self.pos += offset;
+            if self.bytes[self.pos] == b'"' {
+                self.pos += 1;
+                return Ok(out);
+            }
+            let Some(&escape) = self.bytes.get(self.pos + 1) else {
+                return self.error("unterminated string");
+            };
+            self.pos += 2;
+            match escape {
+                b'"' => out.push('"'),
+                b'\\' => out.push('\\'),
+                b'/' => out.push('/'),
+                b'b' => out.push('\u{8}'),
+                b'f' => out.push('\u{c}'),
+                b'n' => out.push('\n'),
+                b'r' => out.push('\r'),
+                b't' => out.push('\t'),
+                b'u' => {
+                    let high = self.parse_hex4()?;
+                    let code = if (0xD800..0xDC00).contains(&high) && self.text[self.pos..].starts_with("\\u") {
+                        self.pos += 2;
+                        let low = self.parse_hex4()?;
+                        0x10000 + ((high - 0xD800) << 10) + (low.wrapping_sub(0xDC00) & 0x3FF)
+                    } else {
+                        high
+                    };
+                    out.push(char::from_u32(code).unwrap_or('\u{FFFD}'));
+                }
+                _ => return self.error("invalid escape"),
+            }
+        }
+    }
+
+    fn parse_hex4(&mut self) -> Result<u32, String> {
+        let hex = self.text.get(self.pos..self.pos + 4).unwrap_or("");
+        match u32::from_str_radix(hex, 16) {
+            Ok(code) if hex.len() == 4 => {
+                self.pos += 4;
+                Ok(code)
+            }
+            _ => self.error("invalid unicode escape"),
+        }
+    }
+}
+
+/// Length of a string once serialized by `json.dumps` with `ensure_ascii`.
+fn string_size(s: &str) -> usize {
+    2 + s
+        .chars()
+        .map(|c| match c {
+            '"' | '\\' | '\n' | '\r' | '\t' | '\u{8}' | '\u{c}' => 2,
+            c if (c as u32) < 0x20 => 6,
+            c if c.is_ascii() => 1,
+            c if (c as u32) > 0xFFFF => 12,
+            _ => 6,
+        })
+        .sum::<usize>()
+}
+
+fn value_size(value: &Value) -> usize {
+    match value {
+        Value::Null => 4,
+        Value::Bool(true) => 4,
+        Value::Bool(false) => 5,
+        Value::Number(n) => n.len(),
+        Value::Str(s) => string_size(s),
+        Value::Array(items) => {
+            2 + items.iter().map(|n| n.size).sum::<usize>() + 2 * items.len().saturating_sub(1)
+        }
+        Value::Object(entries) => {
+            2 + entries
+                .iter()
+                .map(|(k, n)| string_size(k) + 2 + n.size)
+                .sum::<usize>()
+                + 2 * entries.len().saturating_sub(1)
+        }
+    }
+}
+
+fn dump_string(s: &str, out: &mut String) {
+    out.push('"');
+    for c in s.chars() {
+        match c {
+            '"' => out.push_str("\\\""),
+            '\\' => out.push_str("\\\\"),
+            '\n' => out.push_str("\\n"),
+            '\r' => out.push_str("\\r"),
+            '\t' => out.push_str("\\t"),
+            '\u{8}' => out.push_str("\\b"),
+            '\u{c}' => out.push_str("\\f"),
+            c if c.is_ascii() && (c as u32) >= 0x20 => out.push(c),
+            c => {
+                let mut units = [0u16; 2];
+                for unit in c.encode_utf16(&mut units) {
+                    out.push_str(&format!("\\u{:04x}", unit));
+                }
+            }
+        }
+    }
+    out.push('"');
+}
+
+fn dump(node: &Node, out: &mut String) {
+    match &node.value {
+        Value::Null => out.push_str("null"),
+        Value::Bool(b) => out.push_str(if *b { "true" } else { "false" }),
+        Value::Number(n) => out.push_str(n),
+        Value::Str(s) => dump_string(s, out),
+        Value::Array(items) => {
+            out.push('[');
+            for (i, item) in items.iter().enumerate() {
+                if i > 0 {
+                    out.push_str(", ");
+                }
+                dump(item, out);
+            }
+            out.push(']');
+        }
+        Value::Object(entries) => {
+            out.push('{');
+            for (i, (key, value)) in entries.iter().enumerate() {
+                if i > 0 {
+                    out.push_str(", ");
+                }
+                dump_string(key, out);
+                out.push_str(": ");
+                dump(value, out);
+            }
+            out.push('}');
+        }
+    }
+}
+
+enum Entry<'a> {
+    Leaf(&'a Node),
+    Branch(ChunkObject<'a>),
+}
+
+impl Entry<'_> {
+    fn size(&self) -> usize {
+        match self {
+            Entry::Leaf(node) => node.size,
+            Entry::Branch(object) => object.size,
+        }
+    }
+}
+
+/// An object being filled with the values of a chunk, with the length of
+/// its serialization and the span of the values in the source.
+struct ChunkObject<'a> {
+    entries: Vec<(&'a str, Entry<'a>)>,
+    size: usize,
+    span: Option<(usize, usize)>,
+}
+
+impl<'a> ChunkObject<'a> {
+    fn new() -> Self {
+        ChunkObject {
+            entries: Vec::new(),
+            size: 2,
+            span: None,
+        }
+    }
+
+    fn extend_span(&mut self, start: usize, end: usize) {
+        self.span = Some(match self.span {
+            Some((s, e)) => (s.min(start), e.max(end)),
+            None => (start, end),
+        });
+    }
+
+    fn add(&mut self, key: &'a str, entry: Entry<'a>) {
+        let separator = if self.entries.is_empty() { 0 } else { 2 };
+        self.size += separator + string_size(key) + 2 + entry.size();
+        self.entries.push((key, entry));
+    }
+
+    /// Sets `path` to `node`, creating the intermediate objects.
+    fn set(&mut self, path: &[&'a str], node: &'a Node) {
+        self.extend_span(node.start, node.end);
+        let (key, rest) = path.split_first().expect("empty path");
+        let index = self.entries.iter().position(|(k, _)| k == key);
+        if rest.is_empty() {
+            match index {
+                Some(i) => {
+                    self.size = self.size - self.entries[i].1.size() + node.size;
+                    self.entries[i].1 = Entry::Leaf(node);
+                }
+                None => self.add(key, Entry::Leaf(node)),
+            }
+            return;
+        }
+        let i = match index {
+            Some(i) if matches!(self.entries[i].1, Entry::Branch(_)) => i,
+            Some(i) => {
+                self.size = self.size - self.entries[i].1.size() + 2;
+                self.entries[i].1 = Entry::Branch(ChunkObject::new());
+                i
+            }
+            None => {
+                self.add(key, Entry::Branch(ChunkObject::new()));
+                self.entries.len() - 1
+            }
+        };
+        if let Entry::Branch(child) = &mut self.entries[i].1 {
+            let before = child.size;
+            child.set(rest, node);
+            self.size = self.size + child.size - before;
+        }
+    }
+
+    fn dump(&self, out: &mut String) {
+        out.push('{');
+        for (i, (key, entry)) in self.entries.iter().enumerate() {
+            if i > 0 {
+                out.push_str(", ");
+            }
+            dump_string(key, out);
+            out.push_str(": ");
+            match entry {
+                Entry::Leaf(node) => dump(node, out),
+                Entry::Branch(object) => object.dump(out),
+            }
+        }
+        out.push('}');
+    }
+}
+
+/// Same algorithm as langchain's RecursiveJsonSplitter: values are added to
+/// the current chunk while it stays under `max_chunk_size`, larger values
+/// are split recursively.
+fn split_into<'a>(
+    node: &'a Node,
+    path: &mut Vec<&'a str>,
+    chunks: &mut Vec<ChunkObject<'a>>,
+    max_chunk_size: usize,
+    min_chunk_size: usize,
+) {
+    match &node.value {
+        Value::Object(entries) => {
+            for (key, value) in entries {
+                path.push(key);
+                let chunk_size = chunks.last().map_or(2, |c| c.size);
+                let size = 2 + string_size(key) + 2 + value.size;
+                if chunk_size + size < max_chunk_size {
+                    chunks.last_mut().unwrap().set(path, value);
+                } else {
+                    if chunk_size >= min_chunk_size {
+                        chunks.push(ChunkObject::new());
+                    }
+                    split_into(value, path, chunks, max_chunk_size, min_chunk_size);
+                }
+                path.pop();
+            }
+        }
+        _ => chunks.last_mut().unwrap().set(path, node),
+    }
+}
+
+/// Splits a JSON object into objects of less than `max_chunk_size`
+/// characters once serialized, preserving the path to every value. Other
+/// JSON values are returned as a single chunk.
+pub fn split_json(text: &str, max_chunk_size: usize) -> Result<Vec<Chunk>, String> {
+    let mut parser = Parser {
+        text,
+        bytes: text.as_bytes(),
+        pos: 0,
+    };
+    let root = parser.parse_value()?;
+    parser.skip_whitespace();
+    if parser.pos != text.len() {
+        return parser.error("trailing characters");
+    }
+
+    if !matches!(root.value, Value::Object(_)) {
+        let mut out = String::with_capacity(root.size);
+        dump(&root, &mut out);
+        return Ok(vec![Chunk {
+            text: out,
+            start: root.start,
+            end: root.end,
+            metadata: vec![],
+        }]);
+    }
+
+    let min_chunk_size = max_chunk_size.saturating_sub(200).max(50);
+    let mut chunks = vec![ChunkObject::new()];
+    split_into(&root, &mut Vec::new(), &mut chunks, max_chunk_size, min_chunk_size);
+    Ok(chunks
+        .into_iter()
+        .filter_map(|chunk| {
+            let (start, end) = chunk.span?;
+            let mut out = String::with_capacity(chunk.size);
+            chunk.dump(&mut out);
+            Some(Chunk {
+                text: out,
+                start,
+                end,
+                metadata: vec![],
+            })
+        })
+        .collect())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn sizes_match_serialization() {
+        let text = r#"{"a":[1,2.5,"x\"y"],"b":{"c":null,"d":true,"é":"日本\n"},"e":"😀"}"#;
+        let mut parser = Parser {
+            text,
+            bytes: text.as_bytes(),
+            pos: 0,
+        };
+        let root = parser.parse_value().unwrap();
+        let mut out = String::new();
+        dump(&root, &mut out);
+        assert_eq!(
+            out,
+            r#"{"a": [1, 2.5, "x\"y"], "b": {"c": null, "d": true, "\u00e9": "\u65e5\u672c\n"}, "e": "\ud83d\ude00"}"#
+        );
+        assert_eq!(root.size, out.len());
+    }
+
+    #[test]
+    fn splits_objects() {
+        let text = r#"{"a": {"x": "aaaaaaaaaa", "y": "bbbbbbbbbb"}, "b": "cccccccccc", "c": {"z": "dddddddddd"}}"#;
+        let chunks = split_json(text, 60).unwrap();
+        let texts: Vec<&str> = chunks.iter().map(|c| c.text.as_str()).collect();
+        // Like langchain, "b" goes in the first chunk as it's below the
+        // minimum chunk size, and "c" starts a new one.
+        assert_eq!(
+            texts,
+            vec![
+                r#"{"a": {"x": "aaaaaaaaaa", "y": "bbbbbbbbbb"}, "b": "cccccccccc"}"#,
+                r#"{"c": {"z": "dddddddddd"}}"#,
+            ]
+        );
+        assert_eq!(&text[chunks[0].start..chunks[0].end], &text[6..text.find(", \"c\"").unwrap()]);
+        assert_eq!(&text[chunks[1].start..chunks[1].end], r#""dddddddddd""#);
+    }
+
+    #[test]
+    fn rejects_invalid_json() {
+        assert!(split_json("{\"a\": }", 10).is_err());
+        assert!(split_json("{\"a\": 1} x", 10).is_err());
+    }
+
+    #[test]
+    fn non_objects_are_one_chunk() {
+        let chunks = split_json("[1,2, 3]", 10).unwrap();
+        assert_eq!(chunks.len(), 1);
+        assert_eq!(chunks[0].text, "[1, 2, 3]");
+    }
+}
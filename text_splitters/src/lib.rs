@@ -1,68 +1,156 @@
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
 
 use regex::Regex;
 
+mod html;
+mod json;
+mod markdown;
+mod sentences;
+mod splitter;
+
+use splitter::{Chunk, Splitter};
+
 #[pyclass]
 struct _FastRecursiveTextSplitter {
     chunk_size: usize,
+    sentence_end: Regex,
 }
 
 #[pymethods]
 impl _FastRecursiveTextSplitter {
     #[new]
     fn new(chunk_size: usize) -> Self {
-        _FastRecursiveTextSplitter { chunk_size }
+        _FastRecursiveTextSplitter {
+            chunk_size,
+            sentence_end: Regex::new(r"[.!?]$").unwrap(),
+        }
     }
 
-    fn split_texts(&self, texts: Vec<String>) -> PyResult<Vec<String>> {
-        let mut chunks = Vec::new();
-        for text in texts {
-            chunks.extend(self.divide_text_into_chunks(&text));
-        }
-        Ok(chunks)
+    fn split_texts(&self, py: Python<'_>, texts: Vec<String>) -> PyResult<Vec<String>> {
+        Ok(py.allow_threads(|| {
+            texts
+                .iter()
+                .flat_map(|text| self.divide_text_into_chunks_native(text))
+                .collect()
+        }))
+    }
+
+    fn divide_text_into_chunks(&self, py: Python<'_>, text: &str) -> Vec<String> {
+        py.allow_threads(|| self.divide_text_into_chunks_native(text))
     }
+}
 
-    fn divide_text_into_chunks(&self, text: &str) -> Vec<String> {
+impl _FastRecursiveTextSplitter {
+    /// Chunks of at least `chunk_size` words, extended to the end of the
+    /// sentence.
+    fn divide_text_into_chunks_native(&self, text: &str) -> Vec<String> {
         let mut chunks = Vec::new();
-        let re = Regex::new(r"[.!?]$").unwrap();
         let words: Vec<&str> = text.split_whitespace().collect();
-        let mut current_chunk = Vec::new();
-        let mut current_word_count = 0;
-
-        for word in words.iter() {
-            current_chunk.push(*word);
-            current_word_count += 1;
-
-            if current_word_count >= self.chunk_size {
-                if re.is_match(word) {
-                    chunks.push(current_chunk.join(" "));
-                    current_chunk.clear();
-                    current_word_count = 0;
-                } else {
-                    // Extend to next punctuation
-                    let remainder = &words[words.len() - current_chunk.len()..];
-                    if let Some((i, _)) =
-                        remainder.iter().enumerate().find(|&(_, &w)| re.is_match(w))
-                    {
-                        current_chunk.extend(&remainder[..=i]);
-                        chunks.push(current_chunk.join(" "));
-                        current_chunk.clear();
-                        current_word_count = 0;
+        let mut start = 0;
+        let mut i = 0;
+
+        while i < words.len() {
+            if i + 1 - start >= self.chunk_size {
+                // Extend to the next end of sentence, if there is one.
+                match words[i..].iter().position(|w| self.sentence_end.is_match(w)) {
+                    Some(offset) => {
+                        i += offset;
+                        chunks.push(words[start..=i].join(" "));
+                        start = i + 1;
                     }
+                    None => break,
                 }
             }
+            i += 1;
         }
 
-        if !current_chunk.is_empty() {
-            chunks.push(current_chunk.join(" "));
+        if start < words.len() {
+            chunks.push(words[start..].join(" "));
         }
 
         chunks
     }
 }
 
+type PyChunk = (String, usize, usize, Vec<(String, String)>);
+type PySpan = (usize, usize, Vec<(String, String)>, Option<String>);
+
+fn to_py(chunks: Vec<Chunk>) -> Vec<PyChunk> {
+    chunks
+        .into_iter()
+        .map(|c| (c.text, c.start, c.end, c.metadata))
+        .collect()
+}
+
+/// Native splitter for the char, recursive, markdown, html, json and sentence
+/// modes.
+/// Chunks are returned as (text, start, end, metadata) with byte offsets in
+/// the UTF-8 encoded text.
+#[pyclass]
+struct _TextSplitter {
+    splitter: Splitter,
+}
+
+#[pymethods]
+impl _TextSplitter {
+    #[new]
+    #[pyo3(signature = (mode, chunk_size=100, overlap=0, length_unit="char", headers=None))]
+    fn new(
+        mode: &str,
+        chunk_size: usize,
+        overlap: usize,
+        length_unit: &str,
+        headers: Option<Vec<(String, String)>>,
+    ) -> PyResult<Self> {
+        let splitter = Splitter::new(mode, chunk_size, overlap, length_unit, headers)
+            .map_err(PyValueError::new_err)?;
+        Ok(_TextSplitter { splitter })
+    }
+
+    fn split_text(&self, py: Python<'_>, text: &str) -> PyResult<Vec<PyChunk>> {
+        let chunks = py
+            .allow_threads(|| self.splitter.split(text))
+            .map_err(PyValueError::new_err)?;
+        Ok(to_py(chunks))
+    }
+
+    /// Splits UTF-8 encoded bytes without copying them into a str. Chunks are
+    /// returned as (start, end, metadata, text), text is None when the chunk
+    /// is exactly data[start:end], so it can be sliced from the input.
+    fn split_spans(&self, py: Python<'_>, data: &[u8]) -> PyResult<Vec<PySpan>> {
+        let text = std::str::from_utf8(data).map_err(|e| PyValueError::new_err(e.to_string()))?;
+        let chunks = py
+            .allow_threads(|| self.splitter.split(text))
+            .map_err(PyValueError::new_err)?;
+        Ok(chunks
+            .into_iter()
+            .map(|c| {
+                let sliced = text[c.start..c.end] == c.text;
+                (c.start, c.end, c.metadata, (!sliced).then_some(c.text))
+            })
+            .collect())
+    }
+
+    /// Splits a batch of texts with the GIL released for the whole batch,
+    /// on up to `num_threads` threads.
+    #[pyo3(signature = (texts, num_threads=1))]
+    fn split_texts(
+        &self,
+        py: Python<'_>,
+        texts: Vec<String>,
+        num_threads: usize,
+    ) -> PyResult<Vec<Vec<PyChunk>>> {
+        let chunks = py
+            .allow_threads(|| self.splitter.split_batch(&texts, num_threads))
+            .map_err(PyValueError::new_err)?;
+        Ok(chunks.into_iter().map(to_py).collect())
+    }
+}
+
 #[pymodule]
 fn indexify_text_splitters(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<_FastRecursiveTextSplitter>()?;
+    m.add_class::<_TextSplitter>()?;
     Ok(())
 }
@@ -0,0 +1,140 @@
+use crate::splitter::{contiguous_chunks, split_recursive, strip, Chunk, SplitConfig};
+
+/// Splits markdown into the sections under its headers, `headers` maps a
+/// header marker such as "##" to the metadata key of its text. Header lines
+/// are left out of the sections and headers inside code blocks are ignored.
+pub fn split_markdown(
+    text: &str,
+    headers: &[(String, String)],
+    config: &SplitConfig,
+) -> Vec<Chunk> {
+    // Longest markers first, so that "##" isn't taken for "#".
+    let mut headers: Vec<&(String, String)> = headers.iter().collect();
+    headers.sort_by(|a, b| b.0.len().cmp(&a.0.len()));
+
+    let mut chunks = Vec::new();
+    // (level, metadata key, header text) of the enclosing headers.
+    let mut stack: Vec<(usize, &str, String)> = Vec::new();
+    let mut section: Option<(usize, usize)> = None;
+    let mut fence: Option<&str> = None;
+    let mut offset = 0;
+
+    for line in text.split_inclusive('\n') {
+        let line_start = offset;
+        offset += line.len();
+        let stripped = line.trim();
+
+        if let Some(marker) = fence {
+            if stripped.starts_with(marker) {
+                fence = None;
+            }
+        } else if stripped.starts_with("```") || stripped.starts_with("~~~") {
+            fence = Some(&stripped[..3]);
+        } else if let Some((marker, name)) = headers.iter().find_map(|(marker, name)| {
+            let rest = stripped.strip_prefix(marker.as_str())?;
+            (rest.is_empty() || rest.starts_with(' ')).then_some((marker, name))
+        }) {
+            flush(text, section.take(), &stack, config, &mut chunks);
+            let level = marker.matches('#').count();
+            while stack.last().map_or(false, |(l, _, _)| *l >= level) {
+                stack.pop();
+            }
+            let header = stripped[marker.len()..].trim().to_string();
+            stack.push((level, name.as_str(), header));
+            continue;
+        }
+
+        section = Some(match section {
+            Some((start, _)) => (start, offset),
+            None => (line_start, offset),
+        });
+    }
+    flush(text, section, &stack, config, &mut chunks);
+    chunks
+}
+
+fn flush(
+    text: &str,
+    section: Option<(usize, usize)>,
+    stack: &[(usize, &str, String)],
+    config: &SplitConfig,
+    chunks: &mut Vec<Chunk>,
+) {
+    let Some((start, end)) = section else { return };
+    let (start, end) = strip(text, start, end);
+    if start >= end {
+        return;
+    }
+    let metadata: Vec<(String, String)> = stack
+        .iter()
+        .map(|(_, name, header)| (name.to_string(), header.clone()))
+        .collect();
+    if config.chunk_size > 0 && config.unit.len(&text[start..end]) > config.chunk_size {
+        let spans = split_recursive(text, start, end, config);
+        chunks.extend(contiguous_chunks(text, &spans, &metadata));
+    } else {
+        chunks.extend(contiguous_chunks(text, &[(start, end)], &metadata));
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::splitter::{LengthUnit, Splitter};
+
+    fn split(text: &str, chunk_size: usize) -> Vec<Chunk> {
+        Splitter::new("markdown", chunk_size, 0, "char", None)
+            .unwrap()
+            .split(text)
+            .unwrap()
+    }
+
+    #[test]
+    fn splits_on_headers() {
+        let text = "Intro\n# Title\nBody one\n## Section\nBody two\n\nmore\n# Other\nBody three\n";
+        let chunks = split(text, 0);
+        let texts: Vec<&str> = chunks.iter().map(|c| c.text.as_str()).collect();
+        assert_eq!(texts, vec!["Intro", "Body one", "Body two\n\nmore", "Body three"]);
+        assert_eq!(chunks[0].metadata, vec![]);
+        assert_eq!(
+            chunks[2].metadata,
+            vec![
+                ("Header 1".to_string(), "Title".to_string()),
+                ("Header 2".to_string(), "Section".to_string())
+            ]
+        );
+        assert_eq!(
+            chunks[3].metadata,
+            vec![("Header 1".to_string(), "Other".to_string())]
+        );
+        for chunk in &chunks {
+            assert_eq!(&text[chunk.start..chunk.end], chunk.text);
+        }
+    }
+
+    #[test]
+    fn ignores_headers_in_code_blocks() {
+        let text = "# Title\n```\n# not a header\n```\n";
+        let chunks = split(text, 0);
+        assert_eq!(chunks.len(), 1);
+        assert_eq!(chunks[0].text, "```\n# not a header\n```");
+    }
+
+    #[test]
+    fn splits_large_sections() {
+        let text = "# Title\none two three four five six";
+        let config = SplitConfig {
+            chunk_size: 2,
+            overlap: 0,
+            unit: LengthUnit::Token,
+        };
+        let chunks = split_markdown(
+            text,
+            &[("#".to_string(), "Header 1".to_string())],
+            &config,
+        );
+        assert_eq!(chunks.len(), 3);
+        assert!(chunks.iter().all(|c| c.metadata.len() == 1));
+        assert_eq!(chunks[2].text, "five six");
+    }
+}
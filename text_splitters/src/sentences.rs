@@ -0,0 +1,187 @@
+use crate::splitter::{split_recursive, strip, SplitConfig};
+
+// Words which end with a period without ending the sentence.
+const ABBREVIATIONS: [&str; 24] = [
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no", "fig",
+    "al", "inc", "ltd", "co", "corp", "jan", "feb", "aug", "sept", "approx",
+];
+
+fn is_terminal(c: char) -> bool {
+    matches!(c, '.' | '!' | '?' | '…' | '。' | '！' | '？')
+}
+
+fn is_closing(c: char) -> bool {
+    matches!(c, '"' | '\'' | ')' | ']' | '}' | '”' | '’' | '»')
+}
+
+/// Splits text into sentences, returned as trimmed byte spans. Sentences end
+/// at terminal punctuation followed by whitespace and a word that doesn't
+/// start in lowercase, and at blank lines. Abbreviations and initials such
+/// as "Dr." or "J." don't end a sentence.
+pub fn split_sentences(text: &str) -> Vec<(usize, usize)> {
+    let mut spans = Vec::new();
+    let mut start = 0;
+    let mut pos = 0;
+    let mut push = |start: usize, end: usize| {
+        let (s, e) = strip(text, start, end);
+        if s < e {
+            spans.push((s, e));
+        }
+    };
+
+    while let Some(c) = text[pos..].chars().next() {
+        let next = pos + c.len_utf8();
+        if c == '\n' {
+            let rest = &text[next..];
+            let blank = rest.trim_start_matches([' ', '\t', '\r']).starts_with('\n');
+            if blank {
+                push(start, pos);
+                start = next;
+            }
+            pos = next;
+            continue;
+        }
+        if !is_terminal(c) {
+            pos = next;
+            continue;
+        }
+
+        // The end of the sentence, after any further punctuation and quotes.
+        let mut end = next;
+        for c in text[next..].chars() {
+            if !is_terminal(c) && !is_closing(c) {
+                break;
+            }
+            end += c.len_utf8();
+        }
+        let rest = &text[end..];
+        let ends_sentence = if matches!(c, '。' | '！' | '？') {
+            true
+        } else if rest.is_empty() {
+            true
+        } else if !rest.starts_with(char::is_whitespace) {
+            false
+        } else {
+            let following = rest.trim_start().chars().next();
+            let lowercase = following.map_or(false, |f| f.is_lowercase());
+            !lowercase && !(c == '.' && end == next && is_abbreviation(&text[start..pos]))
+        };
+        if ends_sentence {
+            push(start, end);
+            start = end;
+        }
+        pos = end;
+    }
+    push(start, text.len());
+    spans
+}
+
+/// Whether the sentence so far ends with an abbreviation or an initial.
+fn is_abbreviation(before: &str) -> bool {
+    let word = before
+        .rsplit(|c: char| c.is_whitespace() || c == '(')
+        .next()
+        .unwrap_or("");
+    let mut chars = word.chars();
+    match (chars.next(), chars.next()) {
+        (Some(c), None) => c.is_alphabetic(),
+        (Some(_), Some(_)) => ABBREVIATIONS.contains(&word.to_lowercase().as_str()),
+        _ => false,
+    }
+}
+
+/// Packs consecutive sentences into chunks of at most `chunk_size`, each
+/// sentence whole unless it's larger than a chunk on its own. Up to
+/// `overlap` of the trailing sentences of a chunk start the next one. With a
+/// `chunk_size` of 0 every sentence is a chunk.
+pub fn pack_sentences(text: &str, config: &SplitConfig) -> Vec<(usize, usize)> {
+    let sentences = split_sentences(text);
+    if config.chunk_size == 0 {
+        return sentences;
+    }
+    let unit = config.unit;
+    let mut out = Vec::new();
+    let mut i = 0;
+    while i < sentences.len() {
+        let (start, first_end) = sentences[i];
+        let mut total = unit.len(&text[start..first_end]);
+        if total > config.chunk_size {
+            out.extend(split_recursive(text, start, first_end, config));
+            i += 1;
+            continue;
+        }
+        let mut j = i + 1;
+        while j < sentences.len() {
+            let added = unit.len(&text[sentences[j - 1].1..sentences[j].1]);
+            if total + added > config.chunk_size {
+                break;
+            }
+            total += added;
+            j += 1;
+        }
+        out.push((start, sentences[j - 1].1));
+        if j >= sentences.len() {
+            break;
+        }
+        let mut k = j;
+        while k > i + 1 && unit.len(&text[sentences[k - 1].0..sentences[j - 1].1]) <= config.overlap {
+            k -= 1;
+        }
+        // Carry no more than fits with the next sentence.
+        while k < j && unit.len(&text[sentences[k].0..sentences[j].1]) > config.chunk_size {
+            k += 1;
+        }
+        i = k;
+    }
+    out
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::splitter::LengthUnit;
+
+    fn sentences(text: &str) -> Vec<&str> {
+        split_sentences(text).iter().map(|&(s, e)| &text[s..e]).collect()
+    }
+
+    #[test]
+    fn splits_sentences() {
+        let text = "Dr. Smith met J. Doe at 3.30 p.m. today. \"Is it done?\" he asked!  \
+            e.g. this isn't one. The end…\n\nNew paragraph without a stop\nsame one";
+        assert_eq!(
+            sentences(text),
+            vec![
+                "Dr. Smith met J. Doe at 3.30 p.m. today.",
+                "\"Is it done?\" he asked!  e.g. this isn't one.",
+                "The end…",
+                "New paragraph without a stop\nsame one",
+            ]
+        );
+        assert_eq!(sentences("一句话。第二句！"), vec!["一句话。", "第二句！"]);
+        assert!(sentences("  \n\n ").is_empty());
+    }
+
+    #[test]
+    fn packs_sentences() {
+        let text = "One two. Three four. Five six. Seven eight nine ten eleven.";
+        let config = SplitConfig {
+            chunk_size: 4,
+            overlap: 2,
+            unit: LengthUnit::Token,
+        };
+        let chunks: Vec<&str> = pack_sentences(text, &config)
+            .iter()
+            .map(|&(s, e)| &text[s..e])
+            .collect();
+        assert_eq!(
+            chunks,
+            vec![
+                "One two. Three four.",
+                "Three four. Five six.",
+                "Seven eight nine ten",
+                "nine ten eleven.",
+            ]
+        );
+    }
+}
@@ -0,0 +1,455 @@
+use std::collections::VecDeque;
+use std::thread;
+
+use crate::html::split_html;
+use crate::json::split_json;
+use crate::markdown::split_markdown;
+use crate::sentences::pack_sentences;
+
+/// A chunk of a text. `start` and `end` are byte offsets in the UTF-8 text
+/// that was split. For the char, recursive, markdown and sentence modes `text` is
+/// `text[start..end]`, for html and json it's the text extracted from that
+/// span of the source.
+#[derive(Debug, Clone, PartialEq)]
+pub struct Chunk {
+    pub text: String,
+    pub start: usize,
+    pub end: usize,
+    pub metadata: Vec<(String, String)>,
+}
+
+#[derive(Debug, Clone, Copy, PartialEq)]
+pub enum LengthUnit {
+    /// Unicode code points, same as `len()` in Python.
+    Char,
+    /// Whitespace separated tokens.
+    Token,
+}
+
+impl LengthUnit {
+    pub fn parse(unit: &str) -> Result<Self, String> {
+        match unit {
+            "char" => Ok(LengthUnit::Char),
+            "token" => Ok(LengthUnit::Token),
+            _ => Err(format!("unknown length unit {unit:?}, expected \"char\" or \"token\"")),
+        }
+    }
+
+    pub fn len(&self, text: &str) -> usize {
+        match self {
+            LengthUnit::Char => text.chars().count(),
+            LengthUnit::Token => text.split_whitespace().count(),
+        }
+    }
+}
+
+#[derive(Debug, Clone, Copy)]
+pub struct SplitConfig {
+    pub chunk_size: usize,
+    pub overlap: usize,
+    pub unit: LengthUnit,
+}
+
+#[derive(Debug, Clone, Copy, PartialEq)]
+pub enum Mode {
+    Char,
+    Recursive,
+    Markdown,
+    Html,
+    Json,
+    Sentence,
+}
+
+impl Mode {
+    pub fn parse(mode: &str) -> Result<Self, String> {
+        match mode {
+            "char" => Ok(Mode::Char),
+            "recursive" => Ok(Mode::Recursive),
+            "markdown" => Ok(Mode::Markdown),
+            "html" => Ok(Mode::Html),
+            "json" => Ok(Mode::Json),
+            "sentence" => Ok(Mode::Sentence),
+            _ => Err(format!(
+                "unknown mode {mode:?}, expected one of char, recursive, markdown, html, json, sentence"
+            )),
+        }
+    }
+
+    fn default_headers(&self) -> Vec<(String, String)> {
+        let headers: &[(&str, &str)] = match self {
+            Mode::Markdown => &[("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")],
+            Mode::Html => &[
+                ("h1", "Header 1"),
+                ("h2", "Header 2"),
+                ("h3", "Header 3"),
+                ("h4", "Header 4"),
+            ],
+            _ => &[],
+        };
+        headers
+            .iter()
+            .map(|(tag, name)| (tag.to_string(), name.to_string()))
+            .collect()
+    }
+}
+
+const CHAR_SEPARATOR: &str = "\n\n";
+const RECURSIVE_SEPARATORS: [&str; 4] = ["\n\n", "\n", " ", ""];
+
+/// Splits texts the way the langchain splitters of the same name do.
+///
+/// * `char` splits on blank lines and merges the pieces up to `chunk_size`.
+/// * `recursive` splits on blank lines, lines, words and characters in turn.
+/// * `markdown` and `html` split on headers and report the enclosing
+///   headers as metadata. With a non zero `chunk_size` larger sections are
+///   split further with the recursive splitter.
+/// * `json` splits a JSON object into objects of at most `chunk_size`
+///   characters once serialized.
+/// * `sentence` packs whole sentences into chunks of up to `chunk_size`, or
+///   returns every sentence with a `chunk_size` of 0.
+#[derive(Debug, Clone)]
+pub struct Splitter {
+    pub mode: Mode,
+    pub config: SplitConfig,
+    pub headers: Vec<(String, String)>,
+}
+
+impl Splitter {
+    pub fn new(
+        mode: &str,
+        chunk_size: usize,
+        overlap: usize,
+        unit: &str,
+        headers: Option<Vec<(String, String)>>,
+    ) -> Result<Self, String> {
+        let mode = Mode::parse(mode)?;
+        let unit = LengthUnit::parse(unit)?;
+        if overlap > chunk_size && chunk_size > 0 {
+            return Err(format!(
+                "overlap ({overlap}) is larger than the chunk size ({chunk_size})"
+            ));
+        }
+        if chunk_size == 0 && matches!(mode, Mode::Char | Mode::Recursive | Mode::Json) {
+            return Err("chunk_size must be larger than 0".to_string());
+        }
+        let headers = headers.unwrap_or_else(|| mode.default_headers());
+        Ok(Splitter {
+            mode,
+            config: SplitConfig {
+                chunk_size,
+                overlap,
+                unit,
+            },
+            headers,
+        })
+    }
+
+    pub fn split(&self, text: &str) -> Result<Vec<Chunk>, String> {
+        match self.mode {
+            Mode::Char => Ok(contiguous_chunks(text, &split_char(text, &self.config), &[])),
+            Mode::Recursive => Ok(contiguous_chunks(
+                text,
+                &split_recursive(text, 0, text.len(), &self.config),
+                &[],
+            )),
+            Mode::Markdown => Ok(split_markdown(text, &self.headers, &self.config)),
+            Mode::Html => Ok(split_html(text, &self.headers, &self.config)),
+            Mode::Json => split_json(text, self.config.chunk_size),
+            Mode::Sentence => Ok(contiguous_chunks(text, &pack_sentences(text, &self.config), &[])),
+        }
+    }
+
+    /// Splits `texts` on up to `num_threads` threads, results are in the
+    /// order of `texts`.
+    pub fn split_batch(
+        &self,
+        texts: &[String],
+        num_threads: usize,
+    ) -> Result<Vec<Vec<Chunk>>, String> {
+        let num_threads = num_threads.clamp(1, texts.len().max(1));
+        if num_threads == 1 {
+            return texts.iter().map(|text| self.split(text)).collect();
+        }
+        let per_thread = (texts.len() + num_threads - 1) / num_threads;
+        thread::scope(|scope| {
+            let handles: Vec<_> = texts
+                .chunks(per_thread)
+                .map(|batch| {
+                    scope.spawn(move || {
+                        batch
+                            .iter()
+                            .map(|text| self.split(text))
+                            .collect::<Result<Vec<_>, _>>()
+                    })
+                })
+                .collect();
+            let mut results = Vec::with_capacity(texts.len());
+            for handle in handles {
+                results.extend(handle.join().expect("splitter thread panicked")?);
+            }
+            Ok(results)
+        })
+    }
+}
+
+pub(crate) fn contiguous_chunks(
+    text: &str,
+    spans: &[(usize, usize)],
+    metadata: &[(String, String)],
+) -> Vec<Chunk> {
+    spans
+        .iter()
+        .map(|&(start, end)| Chunk {
+            text: text[start..end].to_string(),
+            start,
+            end,
+            metadata: metadata.to_vec(),
+        })
+        .collect()
+}
+
+/// Narrows [start, end) to exclude the surrounding whitespace of the span.
+pub(crate) fn strip(text: &str, start: usize, end: usize) -> (usize, usize) {
+    let span = &text[start..end];
+    let trimmed_start = span.trim_start();
+    let new_start = start + (span.len() - trimmed_start.len());
+    let new_end = new_start + trimmed_start.trim_end().len();
+    (new_start, new_end)
+}
+
+/// Merges consecutive splits into chunks of at most `chunk_size`, keeping up
+/// to `overlap` of the previous chunk at the start of the next one. Splits
+/// are [start, end) spans with their length, separated by separators of
+/// length `separator_len` in the text.
+fn merge_splits(
+    text: &str,
+    splits: &[(usize, usize, usize)],
+    separator_len: usize,
+    config: &SplitConfig,
+    out: &mut Vec<(usize, usize)>,
+) {
+    let mut current: VecDeque<(usize, usize, usize)> = VecDeque::new();
+    let mut total = 0;
+    let mut push = |current: &VecDeque<(usize, usize, usize)>| {
+        if let (Some(first), Some(last)) = (current.front(), current.back()) {
+            let (start, end) = strip(text, first.0, last.1);
+            if start < end {
+                out.push((start, end));
+            }
+        }
+    };
+    for &split in splits {
+        let len = split.2;
+        let separator = if current.is_empty() { 0 } else { separator_len };
+        if total + len + separator > config.chunk_size && !current.is_empty() {
+            push(&current);
+            // Drop splits from the front until the rest fits as overlap.
+            while total > config.overlap
+                || (total > 0
+                    && total + len + if current.is_empty() { 0 } else { separator_len }
+                        > config.chunk_size)
+            {
+                let Some(first) = current.pop_front() else { break };
+                total -= first.2 + if current.is_empty() { 0 } else { separator_len };
+            }
+        }
+        let separator = if current.is_empty() { 0 } else { separator_len };
+        current.push_back(split);
+        total += len + separator;
+    }
+    push(&current);
+}
+
+/// Splits [start, end) of `text` on `separator`, each split but the first
+/// starting with the separator. Empty splits are dropped.
+fn split_keeping_separator(
+    text: &str,
+    start: usize,
+    end: usize,
+    separator: &str,
+) -> Vec<(usize, usize)> {
+    let piece = &text[start..end];
+    let mut splits = Vec::new();
+    if separator.is_empty() {
+        for (i, c) in piece.char_indices() {
+            splits.push((start + i, start + i + c.len_utf8()));
+        }
+        return splits;
+    }
+    let mut previous = 0;
+    for (i, _) in piece.match_indices(separator) {
+        if i > previous {
+            splits.push((start + previous, start + i));
+        }
+        previous = i;
+    }
+    if end - start > previous {
+        splits.push((start + previous, end));
+    }
+    splits
+}
+
+pub(crate) fn split_char(text: &str, config: &SplitConfig) -> Vec<(usize, usize)> {
+    let separator_len = config.unit.len(CHAR_SEPARATOR);
+    let mut splits = Vec::new();
+    let mut previous = 0;
+    for (i, _) in text
+        .match_indices(CHAR_SEPARATOR)
+        .chain(std::iter::once((text.len(), "")))
+    {
+        if i > previous {
+            splits.push((previous, i, config.unit.len(&text[previous..i])));
+        }
+        previous = i + CHAR_SEPARATOR.len();
+    }
+    let mut out = Vec::new();
+    merge_splits(text, &splits, separator_len, config, &mut out);
+    out
+}
+
+pub(crate) fn split_recursive(
+    text: &str,
+    start: usize,
+    end: usize,
+    config: &SplitConfig,
+) -> Vec<(usize, usize)> {
+    let mut out = Vec::new();
+    split_recursive_into(text, start, end, &RECURSIVE_SEPARATORS, config, &mut out);
+    out
+}
+
+fn split_recursive_into(
+    text: &str,
+    start: usize,
+    end: usize,
+    separators: &[&str],
+    config: &SplitConfig,
+    out: &mut Vec<(usize, usize)>,
+) {
+    let piece = &text[start..end];
+    let index = separators
+        .iter()
+        .position(|separator| separator.is_empty() || piece.contains(separator))
+        .unwrap_or(separators.len() - 1);
+    let separator = separators[index];
+    let rest = &separators[index + 1..];
+
+    let mut good: Vec<(usize, usize, usize)> = Vec::new();
+    for (split_start, split_end) in split_keeping_separator(text, start, end, separator) {
+        let len = config.unit.len(&text[split_start..split_end]);
+        if len < config.chunk_size {
+            good.push((split_start, split_end, len));
+            continue;
+        }
+        if !good.is_empty() {
+            merge_splits(text, &good, 0, config, out);
+            good.clear();
+        }
+        if rest.is_empty() {
+            let (s, e) = strip(text, split_start, split_end);
+            if s < e {
+                out.push((s, e));
+            }
+        } else {
+            split_recursive_into(text, split_start, split_end, rest, config, out);
+        }
+    }
+    if !good.is_empty() {
+        merge_splits(text, &good, 0, config, out);
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn config(chunk_size: usize, overlap: usize) -> SplitConfig {
+        SplitConfig {
+            chunk_size,
+            overlap,
+            unit: LengthUnit::Char,
+        }
+    }
+
+    fn texts(text: &str, spans: &[(usize, usize)]) -> Vec<String> {
+        spans.iter().map(|&(s, e)| text[s..e].to_string()).collect()
+    }
+
+    #[test]
+    fn recursive_splits_on_words() {
+        let text = "This is a test string to be split into chunks";
+        let spans = split_recursive(text, 0, text.len(), &config(10, 0));
+        assert_eq!(
+            texts(text, &spans),
+            vec!["This is a", "test", "string to", "be split", "into", "chunks"]
+        );
+    }
+
+    #[test]
+    fn recursive_prefers_paragraphs() {
+        let text = "First paragraph.\n\nSecond paragraph is longer.\nWith two lines.";
+        let spans = split_recursive(text, 0, text.len(), &config(30, 0));
+        assert_eq!(
+            texts(text, &spans),
+            vec!["First paragraph.", "Second paragraph is longer.", "With two lines."]
+        );
+    }
+
+    #[test]
+    fn recursive_overlap() {
+        let text = "one two three four five six";
+        let spans = split_recursive(text, 0, text.len(), &config(13, 6));
+        assert_eq!(
+            texts(text, &spans),
+            vec!["one two three", "three four", "four five", "five six"]
+        );
+    }
+
+    #[test]
+    fn recursive_handles_multibyte_characters() {
+        let text = "héllo wörld ünïcode ñ";
+        let spans = split_recursive(text, 0, text.len(), &config(3, 0));
+        for (s, e) in spans {
+            assert!(text[s..e].chars().count() <= 3);
+        }
+    }
+
+    #[test]
+    fn char_merges_paragraphs() {
+        let text = "a a a\n\nb b b\n\nc c c\n\nd";
+        let spans = split_char(text, &config(12, 0));
+        assert_eq!(texts(text, &spans), vec!["a a a\n\nb b b", "c c c\n\nd"]);
+    }
+
+    #[test]
+    fn token_lengths() {
+        let text = "one two three four five six seven";
+        let config = SplitConfig {
+            chunk_size: 3,
+            overlap: 0,
+            unit: LengthUnit::Token,
+        };
+        let spans = split_recursive(text, 0, text.len(), &config);
+        assert_eq!(
+            texts(text, &spans),
+            vec!["one two three", "four five six", "seven"]
+        );
+    }
+
+    #[test]
+    fn batch_preserves_order() {
+        let splitter = Splitter::new("recursive", 5, 0, "char", None).unwrap();
+        let texts: Vec<String> = (0..20).map(|i| format!("text {i} abc")).collect();
+        let serial = splitter.split_batch(&texts, 1).unwrap();
+        let parallel = splitter.split_batch(&texts, 4).unwrap();
+        assert_eq!(serial, parallel);
+        assert_eq!(serial[7][1].text, "7");
+    }
+
+    #[test]
+    fn rejects_bad_config() {
+        assert!(Splitter::new("words", 5, 0, "char", None).is_err());
+        assert!(Splitter::new("recursive", 5, 10, "char", None).is_err());
+        assert!(Splitter::new("recursive", 5, 0, "bytes", None).is_err());
+    }
+}
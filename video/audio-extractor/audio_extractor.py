@@ -1,37 +1,80 @@
-from typing import List
+from typing import List, Literal, Optional
 from indexify_extractor_sdk import Content, Extractor, Feature
-import moviepy.editor as mp
-import tempfile
+from indexify_extractor_sdk.audio.decoding import run_ffmpeg
 from pydantic import BaseModel
 
+# Audio codecs which are copied out of the video as they are, with the
+# container they're written to and its mime type. All of these containers
+# can be written to a pipe.
+COPY_CONTAINERS = {
+    "aac": ("adts", "audio/aac"),
+    "mp3": ("mp3", "audio/mpeg"),
+    "flac": ("flac", "audio/flac"),
+    "opus": ("ogg", "audio/ogg"),
+    "vorbis": ("ogg", "audio/ogg"),
+}
+
+# Encoder, container and mime type of the formats audio is decoded to.
+DECODED_FORMATS = {
+    "flac": ("flac", "flac", "audio/flac"),
+    "wav": ("pcm_s16le", "wav", "audio/wav"),
+    "mp3": ("libmp3lame", "mp3", "audio/mpeg"),
+}
+
 class AudioExtractorConfig(BaseModel):
-   pass
+    # "auto" copies the audio track when its codec is in COPY_CONTAINERS and
+    # decodes it to FLAC otherwise, "copy" fails for the other codecs.
+    output_format: Literal["auto", "copy", "flac", "wav", "mp3"] = "auto"
+    # Of decoded audio, what the ASR extractors resample to anyway.
+    sample_rate: int = 16000
+    channels: int = 1
 
 
 class AudioExtractor(Extractor):
     name = "tensorlake/audio-extractor"
     description = "Extract audio from video"
+    system_dependencies = ["ffmpeg"]
     input_mime_types = ["video", "video/mp4", "video/mov", "video/avi"]
 
     def __init__(self):
         super(AudioExtractor, self).__init__()
 
+    def audio_codec(self, data: bytes) -> Optional[str]:
+        out = run_ffmpeg(
+            "ffprobe",
+            ["-select_streams", "a:0", "-show_entries", "stream=codec_name", "-of", "csv=p=0"],
+            data,
+        )
+        return out.decode().strip() or None
+
     def extract(self, content: Content, params: AudioExtractorConfig) -> List[Content]:
-        suffix = f'.{content.content_type.split("/")[-1]}'
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=True) as tmpfile:
-            # write bytes to temp file
-            tmpfile.write(content.data)
-            tmpfile.flush() 
-
-            # moviepy read file 
-            video = mp.VideoFileClip(tmpfile.name)
-            
-            # write audio to tmp file and return content
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=True) as tmpfile_audio:
-                video.audio.write_audiofile(tmpfile_audio.name, codec="libmp3lame")
-                f = open(tmpfile_audio.name, "rb")
-                data = f.read()
-                return [Content(data=data, content_type="audio/mpeg")]
+        output_format = params.output_format
+        if output_format in ("auto", "copy"):
+            codec = self.audio_codec(content.data)
+            if codec is None:
+                raise ValueError("the video has no audio track")
+            if codec in COPY_CONTAINERS:
+                # The compressed audio is demuxed, not decoded and encoded again.
+                container, mime_type = COPY_CONTAINERS[codec]
+                data = run_ffmpeg(
+                    "ffmpeg", ["-map", "0:a:0", "-c:a", "copy", "-f", container, "pipe:1"], content.data
+                )
+                return [Content(data=data, content_type=mime_type)]
+            if output_format == "copy":
+                raise ValueError(f"{codec} audio can't be copied, use the flac or wav output_format")
+            output_format = "flac"
+
+        encoder, container, mime_type = DECODED_FORMATS[output_format]
+        args = [
+            "-map", "0:a:0",
+            "-ac", str(params.channels),
+            "-ar", str(params.sample_rate),
+            "-c:a", encoder,
+            "-f", container,
+            "pipe:1",
+        ]
+        data = run_ffmpeg("ffmpeg", args, content.data)
+        return [Content(data=data, content_type=mime_type)]
 
     def sample_input(self) -> Content:
         return self.sample_mp4()
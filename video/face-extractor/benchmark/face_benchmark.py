@@ -0,0 +1,111 @@
+"""
+Times FaceExtractor against the previous pipeline, which wrote the sampled
+frames as JPEGs to data/frames, re-read them one at a time for detection,
+pickled the encodings per frame, merged the pickles and clustered them with
+DBSCAN(n_jobs=1). Also runs two extractions concurrently in one process and
+checks they give the same faces as one alone.
+
+    python face_benchmark.py --video interview.mp4
+"""
+import argparse
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import face_recognition
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from face_extractor import FaceExtractor, auto_resize  # noqa: E402
+from indexify_extractor_sdk import Content  # noqa: E402
+
+
+def baseline(path: str, directory: str, save_fps: float = 1):
+    # The previous extract(): sampled frames through the disk, encodings
+    # through per-frame pickles.
+    frames_dir = os.path.join(directory, "frames")
+    encodings_dir = os.path.join(directory, "encodings")
+    os.makedirs(frames_dir)
+    os.makedirs(encodings_dir)
+    cap = cv2.VideoCapture(path)
+    _, frame = cap.read()
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    frame_count = 1
+    while frame_count < total_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        if frame_count % int(fps * save_fps) == 0:
+            cv2.imwrite(os.path.join(frames_dir, f"{frame_count}.jpg"), auto_resize(frame))
+        frame_count += 1
+
+    for id, name in enumerate(sorted(os.listdir(frames_dir))):
+        image_path = os.path.join(frames_dir, name)
+        rgb = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+        boxes = face_recognition.face_locations(rgb, model="cnn")
+        encodings = face_recognition.face_encodings(rgb, boxes)
+        d = [{"image_path": image_path, "loc": box, "encoding": enc} for box, enc in zip(boxes, encodings)]
+        with open(os.path.join(encodings_dir, f"encodings_{id}.pickle"), "wb") as f:
+            f.write(pickle.dumps(d))
+    datastore = []
+    for name in os.listdir(encodings_dir):
+        with open(os.path.join(encodings_dir, name), "rb") as f:
+            datastore.extend(pickle.loads(f.read()))
+    with open(os.path.join(directory, "encodings.pickle"), "wb") as f:
+        f.write(pickle.dumps(datastore))
+    with open(os.path.join(directory, "encodings.pickle"), "rb") as f:
+        datastore = pickle.loads(f.read())
+    if not datastore:
+        return 0
+    clt = DBSCAN(eps=0.5, metric="euclidean", n_jobs=1)
+    clt.fit([d["encoding"] for d in datastore])
+    return len(np.where(np.unique(clt.labels_) > -1)[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", help="an mp4 with faces, the SDK's sample video by default")
+    args = parser.parse_args()
+
+    extractor = FaceExtractor()
+    if args.video:
+        with open(args.video, "rb") as f:
+            content = Content(content_type="video/mp4", data=f.read())
+    else:
+        content = extractor.sample_mp4()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "input.mp4")
+        with open(path, "wb") as f:
+            f.write(content.data)
+        start = time.perf_counter()
+        faces = baseline(path, os.path.join(directory, "data"))
+        baseline_time = time.perf_counter() - start
+        print(f"{'previous pipeline':22} {baseline_time:8.2f} s  {faces} faces")
+    finally:
+        shutil.rmtree(directory)
+
+    start = time.perf_counter()
+    alone = extractor.extract(content)
+    elapsed = time.perf_counter() - start
+    print(f"{'in memory':22} {elapsed:8.2f} s  {len(alone)} faces  {baseline_time / elapsed:5.1f}x")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(2) as pool:
+        concurrent = list(pool.map(extractor.extract, [content, content]))
+    elapsed = time.perf_counter() - start
+    same = all([c.features[0].value for c in out] == [c.features[0].value for c in alone] for out in concurrent)
+    print(f"{'2 concurrent tasks':22} {elapsed:8.2f} s  {'same faces' if same else 'FACES DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
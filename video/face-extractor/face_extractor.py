@@ -1,64 +1,70 @@
 import logging
-import os
-import pickle
-import shutil
-import tempfile
-import time
-from collections import defaultdict
 from io import BytesIO
-from typing import List
+from typing import List, Tuple
 
 import cv2
 import face_recognition
 import numpy as np
-from imutils import paths
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.spool import spooled_file
+from indexify_extractor_sdk.video.reader import VideoSegmentReader, video_info
 from PIL import Image
 from sklearn.cluster import DBSCAN
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sampled frames per face detection pass.
+FACE_BATCH_SIZE = 32
 
-class FaceExtractor(Extractor):
-    name = "tensorlake/face-extractor"
-    description = "Extract unique faces from a video"
-    system_dependencies = []
-    input_mime_types = ["video", "video/mp4"]
 
-    def extract(self, content: Content, params = None) -> List[Content]:
-        content.content_type
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmpfile:
-            tmpfile_name = tmpfile.name
-            tmpfile.write(content.data)
-            tmpfile.flush()
+def rescale_by_height(image, target_height, method=cv2.INTER_LANCZOS4):
+    """Rescale `image` to `target_height` (preserving aspect ratio)."""
+    w = int(round(target_height * image.shape[1] / image.shape[0]))
+    return cv2.resize(image, (w, target_height), interpolation=method)
 
-        # Now use OpenCV to read the video
-        self.filename = tmpfile_name
 
-        if not os.path.exists(self.filename):
-            raise ValueError(f"file: {self.filename} not found")
+# Given a target width, adjust the image by calculating the height and resize
+def rescale_by_width(image, target_width, method=cv2.INTER_LANCZOS4):
+    """Rescale `image` to `target_width` (preserving aspect ratio)."""
+    h = int(round(target_width * image.shape[0] / image.shape[1]))
+    return cv2.resize(image, (target_width, h), interpolation=method)
 
-        self.save_fps = 1
-        self.frame_freq = 60
 
-        data_dir = "data"
-        self.encodings_pkl_path = os.path.join(data_dir, "encodings.pickle")
+def auto_resize(frame):
+    height, width, _ = frame.shape
+    if height > 500:
+        frame = rescale_by_height(frame, 500)
+    height, width, _ = frame.shape
+    if width > 700:
+        frame = rescale_by_width(frame, 700)
+    return frame
 
-        self.frames_dir = os.path.join(data_dir, "frames")
-        os.makedirs(self.frames_dir, exist_ok=True)
 
-        self.encodings_dir = os.path.join(data_dir, "encodings")
-        os.makedirs(self.encodings_dir, exist_ok=True)
+def prepare_frame(frame):
+    # Runs in the reader's workers, so only small RGB frames come back.
+    return cv2.cvtColor(auto_resize(frame), cv2.COLOR_BGR2RGB)
 
-        # process data
-        self.extract_frames()
-        self.extract_encodings()
-        cluster_images = self.cluster_images()
 
-        # clean up
-        os.remove(tmpfile_name)
-        shutil.rmtree("data")
+class FaceExtractor(Extractor):
+    name = "tensorlake/face-extractor"
+    description = "Extract unique faces from a video"
+    system_dependencies = []
+    input_mime_types = ["video", "video/mp4"]
+
+    def __init__(self, frame_freq=60, save_fps=1):
+        super(FaceExtractor, self).__init__()
+        self.save_fps = save_fps
+        self._reader = VideoSegmentReader()
+
+    def extract(self, content: Content, params = None) -> List[Content]:
+        # Everything stays in memory and in local variables, so concurrent
+        # tasks don't share any state.
+        frames, encodings, crops = self.encode_faces(content.data)
+        if len(encodings) == 0:
+            return []
+        cluster_images = self.cluster_images(encodings, frames, crops)
+
         content_list = []
         for k in cluster_images.keys():
             feature = Feature.metadata(
@@ -80,104 +86,47 @@ class FaceExtractor(Extractor):
 
         return content_list
 
-    def __init__(self, frame_freq=60, save_fps=1):
-        super(FaceExtractor, self).__init__()
-
-    def _rescale_by_height(self, image, target_height, method=cv2.INTER_LANCZOS4):
-        """Rescale `image` to `target_height` (preserving aspect ratio)."""
-        w = int(round(target_height * image.shape[1] / image.shape[0]))
-        return cv2.resize(image, (w, target_height), interpolation=method)
-
-    # Given a target width, adjust the image by calculating the height and resize
-    def _rescale_by_width(self, image, target_width, method=cv2.INTER_LANCZOS4):
-        """Rescale `image` to `target_width` (preserving aspect ratio)."""
-        h = int(round(target_width * image.shape[0] / image.shape[1]))
-        return cv2.resize(image, (target_width, h), interpolation=method)
-
-    def _auto_resize(self, frame):
-        height, width, _ = frame.shape
-
-        if height > 500:
-            frame = self._rescale_by_height(frame, 500)
-            self._auto_resize(frame)
-
-        if width > 700:
-            frame = self._rescale_by_width(frame, 700)
-            self._auto_resize(frame)
-
-        return frame
-
-    def extract_frames(self):
-        cap = cv2.VideoCapture(self.filename)
-        _, frame = cap.read()
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-
-        logger.info(f"Total Frames {total_frames} @ {fps} fps")
-        logger.info("Calculating number of frames per second")
-
-        if os.path.exists(self.frames_dir):
-            shutil.rmtree(self.frames_dir)
-            time.sleep(0.5)
-        os.mkdir(self.frames_dir)
-
-        frame_count = 1
-        while frame_count < total_frames:
-            success, frame = cap.read()
-            if not success:
-                break
-            if frame_count % int(fps * self.save_fps) == 0:
-                logger.info(f"Saving frame number {frame_count}")
-                frame = self._auto_resize(frame)
-                filename = str(frame_count) + ".jpg"
-                cv2.imwrite(os.path.join(self.frames_dir, filename), frame)
-            frame_count += 1
-        logger.info("Frames extracted")
-
-    def extract_encodings(self):
-        logger.info("Extract Encodings")
-        data = []
-        for id, image_path in enumerate(paths.list_images(self.frames_dir)):
-            image = cv2.imread(image_path)
-            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            boxes = face_recognition.face_locations(rgb, model="cnn")
-            encodings = face_recognition.face_encodings(rgb, boxes)
-            d = [
-                {"image_path": image_path, "loc": box, "encoding": enc}
-                for (box, enc) in zip(boxes, encodings)
-            ]
-            data.append({"id": id, "encodings": d})
-            logger.info(f"Extract {id}")
-        self.encodings_to_pkl(data)
-        self.generate_main_encodings_pkl()
-        logger.info("DONE")
-
-    def encodings_to_pkl(self, data):
-        for d in data:
-            encodings = d["encodings"]
-            id = d["id"]
-            with open(
-                os.path.join(self.encodings_dir, "encodings_" + str(id) + ".pickle"),
-                "wb",
-            ) as f:
-                f.write(pickle.dumps(encodings))
-
-    def generate_main_encodings_pkl(self):
-        datastore = []
-        pickle_paths = []
-
-        for path in os.listdir(self.encodings_dir):
-            if path.endswith(".pickle"):
-                pickle_paths.append(os.path.join(self.encodings_dir, path))
-
-        for pickle_path in pickle_paths:
-            with open(pickle_path, "rb") as f:
-                data = pickle.loads(f.read())
-                datastore.extend(data)
-
-        with open(self.encodings_pkl_path, "wb") as f:
-            f.write(pickle.dumps(datastore))
+    def encode_faces(self, data: bytes) -> Tuple[List[int], np.ndarray, List[np.ndarray]]:
+        """
+        Decodes and samples the video, detects the faces of batches of frames
+        and encodes them. Returns the frame, encoding and crop of every face,
+        the encodings stacked into one array.
+        """
+        frames, encodings, crops = [], [], []
+
+        def process(batch):
+            indexes = [index for index, _ in batch]
+            images = [image for _, image in batch]
+            batch_locations = face_recognition.batch_face_locations(
+                images, number_of_times_to_upsample=1, batch_size=len(images)
+            )
+            for index, image, boxes in zip(indexes, images, batch_locations):
+                if not boxes:
+                    continue
+                for box, encoding in zip(boxes, face_recognition.face_encodings(image, boxes)):
+                    frames.append(index)
+                    encodings.append(encoding)
+                    # Only the crops are kept, not the frames.
+                    crops.append(self.crop_image(box, image))
+            logger.info(f"Encoded faces of frames {indexes[0]} to {indexes[-1]}")
+
+        batch = []
+        for frame in self.iter_frames(data):
+            batch.append(frame)
+            if len(batch) == FACE_BATCH_SIZE:
+                process(batch)
+                batch = []
+        if batch:
+            process(batch)
+
+        encodings = np.vstack(encodings) if encodings else np.empty((0, 128))
+        return frames, encodings, crops
+
+    def iter_frames(self, data: bytes):
+        """Yields (frame index, RGB frame) for one frame every `save_fps` seconds."""
+        with spooled_file(data, suffix=".mp4") as path:
+            step = max(1, int(video_info(path).fps * self.save_fps))
+            yield from self._reader.frames(path, step, transform=prepare_frame)
 
     def crop_image(self, loc, image):
         (o_top, o_right, o_bottom, o_left) = loc
@@ -203,22 +152,13 @@ class FaceExtractor(Extractor):
             right = width
 
         image = image[top:bottom, left:right]
-        image = self._rescale_by_width(image, 100)
+        image = rescale_by_width(image, 100)
         return image
 
-    def cluster_images(self, max_per_label=1):
-        # load the serialized face encodings + bounding box locations from
-        # disk, then extract the set of encodings to so we can cluster on
-        # them
-        logger.info("Loading encodings")
-        encodings_data = pickle.loads(open(self.encodings_pkl_path, "rb").read())
-        encodings_data = np.array(encodings_data)
-
-        encodings = [d["encoding"] for d in encodings_data]
-
+    def cluster_images(self, encodings: np.ndarray, frames: List[int], crops: List[np.ndarray], max_per_label=1):
         # cluster the embeddings
         logger.info("Clustering")
-        clt = DBSCAN(eps=0.5, metric="euclidean", n_jobs=1)
+        clt = DBSCAN(eps=0.5, metric="euclidean", n_jobs=-1)
         clt.fit(encodings)
         logger.info("DONE")
 
@@ -228,16 +168,10 @@ class FaceExtractor(Extractor):
         unique_faces_count = len(np.where(label_ids > -1)[0])
         logger.info(f"# unique faces: {unique_faces_count}")
 
-        result = defaultdict(lambda: [])
+        result = {}
         for label in range(unique_faces_count):
-            ids = np.where(labels == label)[0]
-            for id in ids[:max_per_label]:
-                image_path = encodings_data[id]["image_path"]
-                image = cv2.imread(image_path)
-                frame, _ = os.path.splitext(os.path.basename(image_path))
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                image = self.crop_image(encodings_data[id]["loc"], image)
-                result[label].append({"image": image, "frame": frame})
+            ids = np.flatnonzero(labels == label)[:max_per_label]
+            result[label] = [{"image": crops[id], "frame": str(frames[id])} for id in ids]
         return result
 
     def sample_input(self) -> Content:
@@ -0,0 +1,116 @@
+"""
+Times KeyFrameExtractor on a synthetic video of scenes generated with OpenCV,
+against the previous pass which decoded every frame and computed its
+histogram at full resolution.
+
+    python keyframe_benchmark.py --minutes 5 --width 1280 --height 720
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from key_frame_extractor import KeyFrameExtractor, KeyFrameExtractorConfig, av  # noqa: E402
+from indexify_extractor_sdk import Content  # noqa: E402
+
+
+def make_video(path: str, minutes: float, width: int, height: int, fps: int, scene_seconds: float):
+    """Writes scenes of a textured background with a moving ball, returns the scene starts."""
+    rng = random.Random(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    num_frames = int(minutes * 60 * fps)
+    scene_frames = int(scene_seconds * fps)
+    ys, xs = np.mgrid[0:height, 0:width]
+    cuts = []
+    for i in range(num_frames):
+        if i % scene_frames == 0:
+            cuts.append(i)
+            color = np.array([rng.randrange(256) for _ in range(3)], dtype=np.float32)
+            period = rng.uniform(20, 200)
+            background = (color * (0.6 + 0.4 * np.sin(xs / period)[..., None] * np.cos(ys / period)[..., None])).astype(np.uint8)
+        frame = background.copy()
+        t = (i % scene_frames) / scene_frames
+        center = (int(width * t), int(height / 2 + height / 4 * np.sin(6 * t)))
+        cv2.circle(frame, center, height // 10, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return cuts
+
+
+def baseline(path: str, threshold: float):
+    # The previous extract(): cap.read() on every frame, full size histograms.
+    cap = cv2.VideoCapture(path)
+    hist_prev = None
+    frames = []
+    frame_count = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        hist_current = cv2.calcHist([frame_gray], [0], None, [256], [0, 256])
+        if hist_prev is None or cv2.compareHist(hist_current, hist_prev, cv2.HISTCMP_CORREL) < threshold:
+            cv2.imencode(".jpg", frame)
+            frames.append(frame_count)
+        hist_prev = hist_current
+        frame_count += 1
+    cap.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--scene-seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scenes.mp4")
+        cuts = make_video(path, args.minutes, args.width, args.height, args.fps, args.scene_seconds)
+        with open(path, "rb") as f:
+            content = Content(content_type="video/mp4", data=f.read())
+        print(
+            f"{args.minutes:g} min {args.width}x{args.height}@{args.fps}, {len(cuts)} scenes, "
+            f"{len(content.data) / 1e6:.1f} MB"
+        )
+
+        start = time.perf_counter()
+        frames = baseline(path, 0.8)
+        baseline_time = time.perf_counter() - start
+        print(f"{'every frame':34} {baseline_time:7.2f} s  {len(frames):4} frames")
+
+        extractor = KeyFrameExtractor()
+        configs = [
+            ("grab, every frame, small hists", KeyFrameExtractorConfig(scene_fps=0)),
+            ("grab, 4 fps", KeyFrameExtractorConfig(sampling="grab")),
+            ("seek, 4 fps", KeyFrameExtractorConfig(sampling="seek")),
+            ("seek, 1 fps", KeyFrameExtractorConfig(sampling="seek", scene_fps=1)),
+            ("max_fps 1, grab", KeyFrameExtractorConfig(key_frames=False, max_fps=1)),
+            ("max_fps 1, seek", KeyFrameExtractorConfig(key_frames=False, max_fps=1, sampling="seek")),
+        ]
+        if av is not None:
+            configs.append(("iframes", KeyFrameExtractorConfig(sampling="iframes")))
+        for name, config in configs:
+            start = time.perf_counter()
+            out = extractor.extract(content, config)
+            elapsed = time.perf_counter() - start
+            # Scene cuts found, within a second.
+            found = {c for c in cuts for o in out if 0 <= o.features[0].value["frame"] - c < args.fps}
+            print(
+                f"{name:34} {elapsed:7.2f} s  {len(out):4} frames  {len(found)}/{len(cuts)} cuts  "
+                f"{baseline_time / elapsed:5.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Decoding throughput of the SDK's VideoSegmentReader by number of workers, on
+a synthetic video, and a check that every worker count yields the same frames
+as one pass.
+
+    python segment_reader_benchmark.py --minutes 60 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from keyframe_benchmark import make_video  # noqa: E402
+from indexify_extractor_sdk.video.reader import VideoSegmentReader, video_info  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--segment-seconds", type=float, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scenes.mp4")
+        make_video(path, args.minutes, args.width, args.height, args.fps, scene_seconds=10)
+        info = video_info(path)
+        print(f"{args.minutes:g} min {info.width}x{info.height}@{info.fps:g}, {info.num_frames} frames, step {args.step}")
+
+        expected = None
+        baseline = None
+        for num_workers in sorted(set(args.workers)):
+            reader = VideoSegmentReader(num_workers, segment_seconds=args.segment_seconds, min_seconds_for_pool=0)
+            start = time.perf_counter()
+            # Frame sums stand in for the consumer, to check the order and content.
+            sums = [(index, int(frame[::16, ::16].sum())) for index, frame in reader.frames(path, args.step)]
+            elapsed = time.perf_counter() - start
+            reader.shutdown()
+            expected = expected or sums
+            baseline = baseline or elapsed
+            print(
+                f"{num_workers:3} workers {elapsed:8.2f} s  {len(sums) / elapsed:8.1f} frames/s  "
+                f"{baseline / elapsed:5.1f}x  {'same frames' if sums == expected else 'FRAMES DIFFER'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
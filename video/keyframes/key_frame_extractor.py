@@ -1,16 +1,47 @@
 from indexify_extractor_sdk import Content, Extractor, Feature
-from typing import List
+from indexify_extractor_sdk.spool import spooled_file
+from indexify_extractor_sdk.video.reader import VideoSegmentReader, video_info
+from functools import partial
+from typing import Iterator, List, Literal, Tuple
 import cv2
-import tempfile
-from io import BytesIO
+import numpy as np
 from pydantic import BaseModel
 
+try:
+    import av
+except ImportError:
+    av = None
+
 
 class KeyFrameExtractorConfig(BaseModel):
     # maxfps can be used if key_frames is turned off
     max_fps: int = 60
     key_frames: bool = True
     key_frames_threshold: float = 0.8
+    # Frames per second compared for scene detection, 0 compares every frame.
+    scene_fps: float = 4.0
+    # How sampled frames are reached: "grab" decodes every frame but only
+    # converts the sampled ones, "seek" jumps to each sampled frame, which
+    # pays off when they're further apart than the video's keyframes, and
+    # "iframes" decodes only the codec's I-frames (needs PyAV). "grab"
+    # decodes segments of long videos in parallel.
+    sampling: Literal["grab", "seek", "iframes"] = "grab"
+    # Width frames are downscaled to for the histograms, 0 keeps full size.
+    analysis_width: int = 160
+
+
+def histogram(frame, analysis_width: int):
+    height, width = frame.shape[:2]
+    if 0 < analysis_width < width:
+        size = (analysis_width, max(1, round(height * analysis_width / width)))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.calcHist([frame_gray], [0], None, [256], [0, 256])
+
+
+def with_histogram(frame, analysis_width: int):
+    # Runs in the reader's workers, next to the decoding.
+    return frame, histogram(frame, analysis_width)
 
 
 class KeyFrameExtractor(Extractor):
@@ -20,9 +51,10 @@ class KeyFrameExtractor(Extractor):
 
     def __init__(self):
         super(KeyFrameExtractor, self).__init__()
+        self._reader = VideoSegmentReader()
 
-    def get_skip_factor(self, fps: float, max_fps: int):
-        if fps > max_fps:
+    def get_skip_factor(self, fps: float, max_fps: float):
+        if max_fps > 0 and fps > max_fps:
             skip_factor = int(fps / max_fps)
         else:
             skip_factor = 1
@@ -32,10 +64,11 @@ class KeyFrameExtractor(Extractor):
         similarity = cv2.compareHist(hist_current, hist_prev, cv2.HISTCMP_CORREL)
         return similarity < threshold
 
+    def histogram(self, frame, analysis_width: int):
+        return histogram(frame, analysis_width)
+
     def frame_to_content(self, frame, frame_count, fps) -> Content:
-        output = BytesIO()
         _, buffer = cv2.imencode(".jpg", frame)
-        output.write(buffer)
 
         feature = Feature.metadata(
             {"frame": frame_count, "timestamp": frame_count / fps}
@@ -43,36 +76,80 @@ class KeyFrameExtractor(Extractor):
 
         return Content(
             content_type=f"image/jpeg",
-            data=output.getvalue(),
+            data=buffer.tobytes(),
             features=[feature],
         )
 
-    def extract(self, content: Content, params: KeyFrameExtractorConfig) -> List[Content]:
-        content_list = []
-
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=True) as tmpfile:
-            tmpfile.write(content.data)
-            tmpfile.flush()  # Ensure data is written to disk
-
-            cap = cv2.VideoCapture(tmpfile.name)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-
-            frame_count = 0
-            skip_factor = self.get_skip_factor(fps, params.max_fps)
-            hist_prev = None
-            while cap.isOpened():
-                # Capture frame-by-frame
-                ret, frame = cap.read()
-
+    def grab_frames(self, cap, step: int) -> Iterator[Tuple[int, np.ndarray]]:
+        # grab() demuxes and decodes, retrieve() converts the frame to BGR,
+        # which is skipped for the frames in between.
+        frame_count = 0
+        while cap.grab():
+            if frame_count % step == 0:
+                ret, frame = cap.retrieve()
                 if not ret:
                     break
+                yield frame_count, frame
+            frame_count += 1
+
+    def seek_frames(self, cap, step: int) -> Iterator[Tuple[int, np.ndarray]]:
+        num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if num_frames <= 0 or step == 1:
+            yield from self.grab_frames(cap, step)
+            return
+        for frame_count in range(0, num_frames, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_count, frame
+
+    def iframes(self, path: str) -> Iterator[Tuple[int, np.ndarray, float]]:
+        if av is None:
+            raise ValueError("sampling iframes needs PyAV, pip install av")
+        with av.open(path) as container:
+            stream = container.streams.video[0]
+            stream.codec_context.skip_frame = "NONKEY"
+            fps = float(stream.average_rate or stream.guessed_rate or 0)
+            for frame in container.decode(stream):
+                timestamp = float(frame.pts * stream.time_base) if frame.pts is not None else 0.0
+                yield round(timestamp * fps), frame.to_ndarray(format="bgr24"), fps
 
+    def extract(self, content: Content, params: KeyFrameExtractorConfig) -> List[Content]:
+        content_list = []
+
+        with spooled_file(content.data, suffix=".mp4") as path:
+            cap = None
+            if params.sampling == "iframes":
+                frames = ((count, frame, None, fps) for count, frame, fps in self.iframes(path))
+            else:
+                fps = video_info(path).fps
                 if params.key_frames:
-                    # calculate histogram
-                    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    hist_current = cv2.calcHist(
-                        [frame_gray], [0], None, [256], [0, 256]
+                    step = self.get_skip_factor(fps, params.scene_fps)
+                else:
+                    step = self.get_skip_factor(fps, params.max_fps)
+                if params.sampling == "seek":
+                    cap = cv2.VideoCapture(path)
+                    frames = ((count, frame, None, fps) for count, frame in self.seek_frames(cap, step))
+                elif params.key_frames:
+                    transform = partial(with_histogram, analysis_width=params.analysis_width)
+                    frames = (
+                        (count, frame, hist, fps)
+                        for count, (frame, hist) in self._reader.frames(path, step, transform)
                     )
+                else:
+                    frames = ((count, frame, None, fps) for count, frame in self._reader.frames(path, step))
+
+            try:
+                hist_prev = None
+                # Frames arrive in order, scene changes across the reader's
+                # segment boundaries are compared like any others.
+                for frame_count, frame, hist_current, fps in frames:
+                    if not params.key_frames:
+                        content_list.append(self.frame_to_content(frame, frame_count, fps))
+                        continue
+                    if hist_current is None:
+                        hist_current = self.histogram(frame, params.analysis_width)
                     if (hist_prev is None) or self.is_keyframe(
                         hist_current, hist_prev, params.key_frames_threshold
                     ):
@@ -80,10 +157,10 @@ class KeyFrameExtractor(Extractor):
                             self.frame_to_content(frame, frame_count, fps)
                         )
                     hist_prev = hist_current
-                elif frame_count % skip_factor == 0:
-                    content_list.append(self.frame_to_content(frame, frame_count, fps))
-
-                frame_count += 1
+            finally:
+                frames.close()
+                if cap is not None:
+                    cap.release()
 
             return content_list
 
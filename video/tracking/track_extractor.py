@@ -1,10 +1,12 @@
 from typing import List, Union
 from indexify_extractor_sdk import Content, Extractor, Feature
+from indexify_extractor_sdk.video.reader import VideoSegmentReader
 import requests
-import tempfile
-import cv2
 from ultralytics import YOLO
 
+# Frames per forward pass.
+TRACK_BATCH_SIZE = 16
+
 class TrackExtractor(Extractor):
     name = "tensorlake/tracking"
     description = "A YOLO based object tracker for video."
@@ -14,37 +16,46 @@ class TrackExtractor(Extractor):
     def __init__(self):
         super().__init__()
         self.model = YOLO('yolov8n.pt')
+        self._reader = VideoSegmentReader()
 
-    def extract(self, content: Content, params = None) -> List[Union[Feature, Content]]:
+    def track_batch(self, frame_counts: List[int], frames: List) -> List[Feature]:
+        # The frames of a batch go through one forward pass, then update the
+        # tracker one after the other. persist keeps the tracker across
+        # batches, so ids carry on from one batch to the next.
         features = []
-        frame_count = 0
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmpfile:
-            self.filename = tmpfile.name
-            tmpfile.write(content.data)
-            tmpfile.flush()
-
-        # Open the video file
-        cap = cv2.VideoCapture(self.filename)
+        results = self.model.track(frames, persist=True, verbose=False)
+        for frame_count, r in zip(frame_counts, results):
+            boxes = r.boxes
+            # Boxes without a confirmed track have no id yet.
+            if boxes.id is None:
+                continue
+            ids = boxes.id.int().tolist()
+            classes = boxes.cls.int().tolist()
+            for b, id, c in zip(boxes.xyxy.tolist(), ids, classes):
+                name = self.model.names[c]
+                feature = Feature.metadata({"frame": frame_count, "track_id": id, "bounding_box": b, "object_name": name})
+                features.append(feature)
+        return features
 
-        # Loop through the video frames
-        while cap.isOpened():
-            # Read a frame from the video
-            success, frame = cap.read()
+    def extract(self, content: Content, params = None) -> List[Union[Feature, Content]]:
+        features = []
 
-            if success:
-                # Run YOLOv8 tracking on the frame, persisting tracks between frames
-                results = self.model.track(frame, persist=True)
+        # Tracks carry over between the batches of a video, not between videos.
+        predictor = getattr(self.model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", []):
+            tracker.reset()
 
-                for r in results:
-                    boxes = r.boxes
-                    for box in boxes:
-                        b = box.xyxy[0]
-                        c = box.cls
-                        id = box.id.int().tolist()
-                        name = self.model.names[int(c)]
-                        feature = Feature.metadata({"frame": frame_count, "track_id": id, "bounding_box": b.tolist(), "object_name": name})
-                        features.append(feature)
-            frame_count += 1
+        # Segments of the video are decoded in parallel, the frames arrive in
+        # order so the tracker sees one continuous stream.
+        frame_counts, frames = [], []
+        for frame_count, frame in self._reader.read(content.data):
+            frame_counts.append(frame_count)
+            frames.append(frame)
+            if len(frames) == TRACK_BATCH_SIZE:
+                features.extend(self.track_batch(frame_counts, frames))
+                frame_counts, frames = [], []
+        if frames:
+            features.extend(self.track_batch(frame_counts, frames))
 
         return features
 